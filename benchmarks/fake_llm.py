@@ -0,0 +1,97 @@
+# benchmarks/fake_llm.py
+"""
+Deterministic stand-in LLM client for benchmarking the pipeline offline.
+
+use as bellow:
+>>> client = FakeLLMClient(latency_ms=20, sigma=0.5, error_rate=0.01, seed=0)
+>>> await client.generate_response(prompt, {"model_name": "fake"})
+"""
+
+import asyncio
+import random
+import sys
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Any
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from core.exceptions import LLMProviderError  # noqa: E402
+from core.interfaces import LLMClient  # noqa: E402
+
+WORDS = (
+    "the query joins orders with customers and filters shipped rows by date "
+    "then groups totals per region ordering the largest first using an index"
+).split()
+
+
+class FakeLLMClient(LLMClient):
+    """
+    Answers every prompt with canned text after a log-normal delay.
+
+    The median delay is ``latency_ms`` and ``sigma`` controls the tail. A
+    fraction ``error_rate`` of requests fails with a retryable 503, like an
+    overloaded provider. Explanations are about ``response_tokens`` words long;
+    SQL answers are a fenced statement followed by commentary that the
+    pipeline should cut off.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 20.0,
+        sigma: float = 0.5,
+        error_rate: float = 0.0,
+        response_tokens: int = 200,
+        chunk_tokens: int = 8,
+        seed: int = 0,
+    ) -> None:
+        """Initialize the latency, error and response size distributions."""
+        self._latency_ms = latency_ms
+        self._sigma = sigma
+        self._error_rate = error_rate
+        self._response_tokens = response_tokens
+        self._chunk_tokens = chunk_tokens
+        self._random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+
+    async def generate_response(self, prompt: str, config: dict[str, Any]) -> str:
+        """Wait for the sampled latency, then answer or fail."""
+        await self._respond()
+        return self._answer(config)
+
+    async def stream_response(
+        self, prompt: str, config: dict[str, Any]
+    ) -> AsyncIterator[str]:
+        """Yield the answer in word chunks once the sampled latency has passed."""
+        await self._respond()
+        words = self._answer(config).split(" ")
+        for i in range(0, len(words), self._chunk_tokens):
+            yield " ".join(words[i : i + self._chunk_tokens]) + " "
+            await asyncio.sleep(0)
+
+    def get_provider_name(self) -> str:
+        """Get the provider name."""
+        return "fake"
+
+    async def _respond(self) -> None:
+        """Sleep for a sampled latency and raise for a sampled error."""
+        self.requests += 1
+        delay = self._latency_ms * self._random.lognormvariate(0, self._sigma)
+        await asyncio.sleep(delay / 1000)
+        if self._random.random() < self._error_rate:
+            self.errors += 1
+            raise LLMProviderError("fake provider overloaded", 503, retryable=True)
+
+    def _answer(self, config: dict[str, Any]) -> str:
+        """SQL for the rewrite stage, prose for everything else."""
+        prose = " ".join(
+            self._random.choice(WORDS) for _ in range(self._response_tokens)
+        )
+        if config.get("stop_at") == "sql_statement":
+            return (
+                "```sql\nSELECT o.id, o.total FROM orders o "
+                "WHERE o.status = 'shipped' ORDER BY o.total DESC;\n```\n" + prose
+            )
+        return prose
@@ -0,0 +1,342 @@
+# benchmarks/pipeline.py
+"""
+Measure optimization pipeline throughput and overheads against a fake LLM.
+
+use as bellow:
+>>> python benchmarks/pipeline.py --output pipeline.json
+>>> python benchmarks/pipeline.py --baseline benchmarks/pipeline_baseline.json
+>>> python benchmarks/pipeline.py --update-baseline benchmarks/pipeline_baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+# Also puts src/ on the import path for the imports below
+from fake_llm import FakeLLMClient
+
+from config.config import OptimizerConfig
+from config.logger import logger
+from core.cassette import CassetteLLMClient
+from core.interfaces import LLMClient
+from core.resilience import ResilientLLMClient, RetryPolicy
+from core.sql_normalizer import fingerprint_sql
+from core.types import DatabaseType, QueryMetadata
+from infra.cassette import SqliteCassette
+from infra.file_handler import LocalFileHandler
+from infra.metadata_repository import MetadataRepositoryFactory
+from services.batch_optimizer import BatchQueryOptimizer
+from services.prompt_generator import PromptGeneratorFactory
+from services.query_optimizer import DatabaseQueryOptimizer
+
+EXAMPLES_DIR = Path(__file__).resolve().parents[1] / "examples"
+TABLES = ["orders", "customers", "products", "invoices", "shipments", "payments"]
+
+Metrics = dict[str, dict[str, Any]]
+
+
+def make_queries(count: int) -> list[str]:
+    """Distinct, realistic-looking queries (different fingerprints)."""
+    queries = []
+    for i in range(count):
+        table, other = TABLES[i % len(TABLES)], TABLES[(i + 1) % len(TABLES)]
+        queries.append(
+            f"SELECT t.id, t.status, SUM(o.amount) AS total\n"
+            f"FROM {table} t\nJOIN {other} o ON o.{table[:-1]}_id = t.id\n"
+            f"WHERE t.created_at >= '2024-01-01' AND t.region_id IN ({i}, {i + 1})\n"
+            f"GROUP BY t.id, t.status\nHAVING SUM(o.amount) > {i * 10}\n"
+            f"ORDER BY total DESC;"
+        )
+    return queries
+
+
+def metric(value: float, unit: str, higher_is_better: bool = False) -> dict:
+    """A single benchmark figure with its direction of improvement."""
+    return {
+        "value": round(value, 4),
+        "unit": unit,
+        "higher_is_better": higher_is_better,
+    }
+
+
+async def bench_throughput(args: argparse.Namespace) -> Metrics:
+    """End-to-end files per second of ``optimize_query`` per concurrency level."""
+    metrics: Metrics = {}
+    queries = make_queries(args.files)
+    for jobs in args.concurrency:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_dir = Path(tmp)
+            sql_files = []
+            for i, query in enumerate(queries):
+                sql_files.append(tmp_dir / f"query_{i:04d}.sql")
+                sql_files[-1].write_text(query, encoding="utf-8")
+
+            fake = FakeLLMClient(
+                latency_ms=args.latency_ms,
+                sigma=args.sigma,
+                error_rate=args.error_rate,
+                response_tokens=args.response_tokens,
+            )
+            config = OptimizerConfig(database_type=DatabaseType.SQLITE)
+            optimizer = DatabaseQueryOptimizer(
+                llm_client=ResilientLLMClient(
+                    fake,
+                    max_concurrent_requests=jobs * 2,
+                    retry_policy=RetryPolicy(max_retries=5, base_delay=0.01),
+                ),
+                file_handler=LocalFileHandler(),
+                metadata_repo=MetadataRepositoryFactory.create_repository(
+                    "json", tmp_dir / "metadata.json"
+                ),
+                config=config,
+                database_type=DatabaseType.SQLITE,
+            )
+            summary = await BatchQueryOptimizer(
+                optimizer, DatabaseType.SQLITE, jobs=jobs
+            ).optimize_files(sql_files)
+
+        rate = len(summary.succeeded) / summary.wall_time_seconds
+        metrics[f"throughput_jobs{jobs}"] = metric(rate, "files/s", True)
+        print(
+            f"  jobs={jobs:<3} {rate:8.1f} files/s "
+            f"({len(summary.failed)} failed, {fake.errors} provider errors retried)"
+        )
+    return metrics
+
+
+async def bench_replay(args: argparse.Namespace) -> Metrics:
+    """Files per second when every LLM answer is replayed from a cassette."""
+    queries = make_queries(args.replay_files)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        sql_files = []
+        for i, query in enumerate(queries):
+            sql_files.append(tmp_dir / f"query_{i:04d}.sql")
+            sql_files[-1].write_text(query, encoding="utf-8")
+        cassette = SqliteCassette(tmp_dir / "cassette.db")
+        config = OptimizerConfig(database_type=DatabaseType.SQLITE, force=True)
+
+        async def run(llm_client: LLMClient) -> float:
+            optimizer = DatabaseQueryOptimizer(
+                llm_client=llm_client,
+                file_handler=LocalFileHandler(),
+                metadata_repo=MetadataRepositoryFactory.create_repository(
+                    "sqlite", tmp_dir / "metadata.db"
+                ),
+                config=config,
+                database_type=DatabaseType.SQLITE,
+            )
+            summary = await BatchQueryOptimizer(
+                optimizer, DatabaseType.SQLITE, jobs=16
+            ).optimize_files(sql_files)
+            return len(summary.succeeded) / summary.wall_time_seconds
+
+        fake = FakeLLMClient(latency_ms=0, response_tokens=args.response_tokens)
+        await run(CassetteLLMClient("fake", cassette, "record", fake))
+        rate = await run(CassetteLLMClient("fake", cassette, "replay"))
+
+    print(
+        f"  {args.replay_files} files replayed at {rate:.1f} files/s "
+        f"({args.replay_files / rate:.1f}s)"
+    )
+    return {"replay_throughput": metric(rate, "files/s", True)}
+
+
+async def bench_metadata(args: argparse.Namespace) -> Metrics:
+    """Load and single-save cost of each metadata backend as the store grows."""
+    metrics: Metrics = {}
+    for size in args.store_sizes:
+        entries = {
+            f"{i:064x}": QueryMetadata(
+                query_sql=f"SELECT * FROM t{i % 50} WHERE id = {i};",
+                explanation_text="Selects one row by primary key",
+                version="0.1",
+                last_optimization=datetime(2024, 1, 1),
+                database_type=DatabaseType.SQLITE,
+                optimized_query=f"SELECT * FROM t{i % 50} WHERE id = {i};",
+            )
+            for i in range(size)
+        }
+        for backend in ("json", "sqlite"):
+            with tempfile.TemporaryDirectory() as tmp:
+                path = Path(tmp) / f"metadata.{'json' if backend == 'json' else 'db'}"
+                if backend == "json":
+                    path.write_text(
+                        json.dumps({k: m.to_dict() for k, m in entries.items()}),
+                        encoding="utf-8",
+                    )
+                else:
+                    await MetadataRepositoryFactory.create_repository(
+                        backend, path
+                    ).save_many(entries)
+
+                start = time.perf_counter()
+                repo = MetadataRepositoryFactory.create_repository(backend, path)
+                load_ms = (time.perf_counter() - start) * 1000
+
+                sample = next(iter(entries.values()))
+                start = time.perf_counter()
+                for i in range(args.saves):
+                    await repo.save_metadata(f"new{i:061x}", sample)
+                save_ms = (time.perf_counter() - start) * 1000 / args.saves
+                if hasattr(repo, "close"):
+                    repo.close()
+
+            metrics[f"metadata_{backend}_{size}_load"] = metric(load_ms, "ms")
+            metrics[f"metadata_{backend}_{size}_save"] = metric(save_ms, "ms")
+            print(
+                f"  {backend:<6} {size:>7} entries: load {load_ms:9.1f} ms, "
+                f"save {save_ms:8.2f} ms"
+            )
+    return metrics
+
+
+def bench_prompts_and_hashing(args: argparse.Namespace) -> Metrics:
+    """Microseconds per prompt build and per query fingerprint."""
+    queries = make_queries(20) + [
+        (EXAMPLES_DIR / "big_test.sql").read_text(encoding="utf-8")
+    ]
+    explanation = " ".join(["The query joins orders with customers."] * 40)
+    generator = PromptGeneratorFactory.create_generator(
+        DatabaseType.SQLITE, compact=True
+    )
+    cases: dict[str, Callable[[str], Any]] = {
+        "prompt_sql_to_natural": generator.generate_sql_to_natural_prompt,
+        "prompt_natural_to_sql": lambda _: generator.generate_natural_to_sql_prompt(
+            explanation
+        ),
+        "fingerprint": lambda q: fingerprint_sql(q, DatabaseType.SQLITE),
+    }
+    metrics: Metrics = {}
+    for name, case in cases.items():
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            for query in queries:
+                case(query)
+        per_call_us = (
+            (time.perf_counter() - start) * 1e6 / (args.iterations * len(queries))
+        )
+        metrics[name] = metric(per_call_us, "us")
+        print(f"  {name:<22} {per_call_us:9.1f} us/query")
+    return metrics
+
+
+def bench_logging(args: argparse.Namespace) -> Metrics:
+    """Microseconds a log call costs the caller when filtered, emitted or sampled."""
+    cases: dict[str, Callable[[int], Any]] = {
+        "log_filtered": lambda i: logger.debug(f"Read SQL file query_{i}.sql"),
+        "log_emitted": lambda i: logger.info(f"Read SQL file query_{i}.sql"),
+        "log_sampled": lambda i: logger.info(
+            f"Read SQL file query_{i}.sql", sample="bench"
+        ),
+    }
+    calls = args.iterations * 200
+    metrics: Metrics = {}
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        logger.configure(level="INFO", json_format=True, stream=devnull)
+        try:
+            for name, case in cases.items():
+                start = time.perf_counter()
+                for i in range(calls):
+                    case(i)
+                per_call_us = (time.perf_counter() - start) * 1e6 / calls
+                logger.flush()
+                metrics[name] = metric(per_call_us, "us")
+                print(f"  {name:<22} {per_call_us:9.2f} us/call")
+        finally:
+            logger.configure(level="ERROR")
+    return metrics
+
+
+def compare(results: Metrics, baseline: Metrics, tolerance: float) -> list[str]:
+    """Metrics that got worse than the baseline by more than the tolerance."""
+    regressions = []
+    for name, current in results.items():
+        if (reference := baseline.get(name)) is None or not reference["value"]:
+            continue
+        ratio = current["value"] / reference["value"]
+        worse = (
+            ratio < 1 - tolerance
+            if current["higher_is_better"]
+            else ratio > 1 + tolerance
+        )
+        if worse:
+            regressions.append(
+                f"{name}: {current['value']} {current['unit']} "
+                f"vs baseline {reference['value']} ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def main() -> int:
+    """Run the pipeline benchmarks and compare against the optional baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=48)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--response-tokens", type=int, default=200)
+    parser.add_argument("--replay-files", type=int, default=1000)
+    parser.add_argument("--store-sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--saves", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--update-baseline", type=Path, default=None)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="fraction")
+    args = parser.parse_args()
+
+    # Per-file progress and retry logging would swamp the report
+    logger.configure(level="ERROR")
+
+    print("end-to-end throughput:")
+    metrics = asyncio.run(bench_throughput(args))
+    print("cassette replay:")
+    metrics |= asyncio.run(bench_replay(args))
+    print("metadata store:")
+    metrics |= asyncio.run(bench_metadata(args))
+    print("prompt build and hashing:")
+    metrics |= bench_prompts_and_hashing(args)
+    print("logging overhead:")
+    metrics |= bench_logging(args)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("output", "baseline", "update_baseline", "tolerance")
+        },
+        "metrics": metrics,
+    }
+    for path in (args.output, args.update_baseline):
+        if path is not None:
+            path.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+            print(f"results written to {path}")
+
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if baseline["parameters"] != report["parameters"]:
+            print("warning: parameters differ from the baseline run")
+        if regressions := compare(metrics, baseline["metrics"], args.tolerance):
+            print(f"performance regressions beyond {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"no regressions beyond {args.tolerance:.0%} of {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
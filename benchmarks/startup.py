@@ -0,0 +1,75 @@
+# benchmarks/startup.py
+"""
+Measure CLI startup time and the slowest imports behind it.
+
+use as bellow:
+>>> python benchmarks/startup.py --runs 5 --top 15 --budget 1.5
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+IMPORT_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \| *(\S+)")
+
+
+def time_help(runs: int) -> list[float]:
+    """Wall-clock seconds for `main.py --help` in fresh interpreters."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "main.py", "--help"],
+            cwd=SRC_DIR,
+            capture_output=True,
+            check=True,
+        )
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def slowest_imports(top: int) -> list[tuple[str, float]]:
+    """Top-level packages ranked by cumulative import time in milliseconds."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    packages: dict[str, float] = {}
+    for match in IMPORT_LINE.finditer(stderr):
+        cumulative, module = match.groups()
+        root = module.split(".")[0]
+        packages[root] = max(packages.get(root, 0.0), int(cumulative) / 1000)
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def main() -> int:
+    """Run the startup benchmark and enforce the optional budget."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--budget", type=float, default=None, help="seconds")
+    args = parser.parse_args()
+
+    timings = time_help(args.runs)
+    median = statistics.median(timings)
+    print(f"sqlo --help: median {median:.3f}s, min {min(timings):.3f}s")
+    print("slowest imports (cumulative ms):")
+    for module, millis in slowest_imports(args.top):
+        print(f"  {millis:9.1f}  {module}")
+
+    if args.budget is not None and median > args.budget:
+        print(f"startup budget exceeded: {median:.3f}s > {args.budget:.3f}s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,77 @@
 # src/config/config.py
-from dataclasses import dataclass
-from typing import Literal
+from dataclasses import asdict, dataclass, fields, replace
+from pathlib import Path
+from typing import Any, Literal, cast, get_args
 
 from core.types import DatabaseType
 
+DEFAULT_CACHE_PATH = Path("./.sqlo_cache/llm_responses.db")
+DEFAULT_LATENCY_PATH = Path("./.sqlo_cache/latency.json")
+DEFAULT_SOCKET_PATH = Path("./.sqlo_cache/sqlo.sock")
+DEFAULT_MANIFEST_PATH = Path("./.sqlo_cache/watch_manifest.json")
+_PATH_FIELDS = ("cache_path", "metadata_path", "latency_path", "cassette_path")
+
+Provider = Literal["gemini", "openai", "claude"]
+PROVIDERS: tuple[str, ...] = get_args(Provider)
+
+
+def parse_provider(name: str) -> Provider:
+    """Validate an LLM provider name."""
+    if name not in PROVIDERS:
+        raise ValueError(f"Unsupported LLM provider: {name}")
+    return cast(Provider, name)
+
 
 @dataclass
 class OptimizerConfig:
     """Configuration for query optimizer."""
 
-    provider: Literal["gemini", "openai", "claude"] = "gemini"
+    provider: Provider = "gemini"
     model_name: str = "gemini-2.0-flash"
     temperature: float = 0.1
     max_output_tokens: int = 8192
     database_type: DatabaseType = DatabaseType.ORACLE
     # API Keys (optional, can be set via environment variables)
     api_key: str | None = None
+    # Maximum in-flight requests per provider client (provider default if unset)
+    max_concurrent_requests: int | None = None
+    # Provider quota (unenforced if unset) and handling of throttling and errors
+    requests_per_minute: float | None = None
+    tokens_per_minute: float | None = None
+    max_retries: int = 5
+    adaptive_concurrency: bool = True
+    # Other ``provider[:model]`` targets to hedge slow requests and fail over to
+    fallback_providers: tuple[str, ...] = ()
+    # Latency percentile of the current provider after which a request is hedged
+    hedge_percentile: float = 0.95
+    # Per-request timeout after which a hedged request fails over (none if unset)
+    request_timeout_seconds: float | None = None
+    # Per-provider latency histograms kept between runs when hedging
+    latency_path: Path | None = DEFAULT_LATENCY_PATH
+    # On-disk LLM response cache (disabled when no path is set)
+    cache_path: Path | None = None
+    cache_max_bytes: int = 256 * 1024 * 1024
+    cache_ttl_seconds: float | None = None
+    # Record every LLM interaction to this archive, or replay them from it offline
+    cassette_path: Path | None = None
+    cassette_mode: Literal["record", "replay"] = "replay"
+    # Replayed answers wait this fraction of their recorded latency
+    replay_latency: float = 0.0
+    # Replace literals with placeholders when fingerprinting queries
+    parameterize_literals: bool = False
+    # Metadata persistence backend and location (backend default if unset)
+    metadata_backend: Literal["json", "sqlite"] = "json"
+    metadata_path: Path | None = None
+    # Rewrites sampled per query; the best by local plan cost or runtime is kept
+    candidates: int = 1
+    # Deterministic rewrites applied before the LLM sees the query
+    apply_rules: bool = True
+    # Regenerate every stage even when a stored result could be reused
+    force: bool = False
+    # Strip template indentation, SQL comments and extra whitespace from prompts
+    compact_prompts: bool = True
+    # Optimize the subqueries of large queries separately, then compose them
+    decompose: bool = False
 
     def get_default_model_for_provider(self) -> str:
         """Get default model name for the provider."""
@@ -25,7 +81,116 @@ class OptimizerConfig:
             "claude": "claude-3-5-sonnet-20241022",
         }.get(self.provider, self.model_name)
 
+    def get_default_concurrency_for_provider(self) -> int:
+        """Get default number of concurrent requests for the provider."""
+        return {
+            "gemini": 8,
+            "openai": 8,
+            "claude": 4,
+        }.get(self.provider, 4)
+
     def __post_init__(self) -> None:
         """Post-initialization to set default model if not specified."""
         if self.model_name == "gemini-2.0-flash" and self.provider != "gemini":
             self.model_name = self.get_default_model_for_provider()
+        if self.max_concurrent_requests is None:
+            self.max_concurrent_requests = self.get_default_concurrency_for_provider()
+        if self.candidates < 1:
+            raise ValueError("candidates must be at least 1")
+        if self.max_retries < 0:
+            raise ValueError("max_retries must not be negative")
+        if self.metadata_backend not in ("json", "sqlite"):
+            raise ValueError(f"Unsupported metadata backend: {self.metadata_backend}")
+        if self.cassette_mode not in ("record", "replay"):
+            raise ValueError(f"Unsupported cassette mode: {self.cassette_mode}")
+        if not 0 < self.hedge_percentile < 1:
+            raise ValueError("hedge_percentile must be between 0 and 1")
+        for spec in self.fallback_providers:
+            if (provider := spec.partition(":")[0]) not in PROVIDERS:
+                raise ValueError(f"Unsupported fallback LLM provider: {provider}")
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to dictionary for JSON serialization."""
+        data = asdict(self)
+        data["database_type"] = self.database_type.value
+        data["fallback_providers"] = list(self.fallback_providers)
+        for name in _PATH_FIELDS:
+            data[name] = str(data[name]) if data[name] is not None else None
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "OptimizerConfig":
+        """Create from dictionary, ignoring unknown keys."""
+        known = {f.name for f in fields(cls)}
+        values = {key: value for key, value in data.items() if key in known}
+        values["database_type"] = DatabaseType(values["database_type"])
+        values["fallback_providers"] = tuple(values.get("fallback_providers", ()))
+        for name in _PATH_FIELDS:
+            if values.get(name) is not None:
+                values[name] = Path(values[name])
+        return cls(**values)
+
+    def get_fallback_configs(self) -> list["OptimizerConfig"]:
+        """Derive a configuration for each fallback provider."""
+        configs = []
+        for spec in self.fallback_providers:
+            provider, _, model_name = spec.partition(":")
+            configs.append(
+                replace(
+                    self,
+                    provider=parse_provider(provider),
+                    model_name=model_name or OptimizerConfig.model_name,
+                    max_concurrent_requests=None,
+                    api_key=None,
+                    fallback_providers=(),
+                )
+            )
+        return configs
+
+
+@dataclass(frozen=True)
+class ComparisonTarget:
+    """A database/provider/model combination to optimize for in a comparison."""
+
+    database_type: DatabaseType
+    provider: Provider | None = None
+    model_name: str | None = None
+
+    @classmethod
+    def parse(cls, spec: str) -> "ComparisonTarget":
+        """Parse a ``database[:provider[:model]]`` target specification."""
+        database, _, rest = spec.partition(":")
+        provider, _, model_name = rest.partition(":")
+        try:
+            target_provider = parse_provider(provider) if provider else None
+        except ValueError:
+            raise ValueError(
+                f"Unsupported LLM provider in target '{spec}': {provider}"
+            ) from None
+        return cls(
+            database_type=DatabaseType(database.strip().lower()),
+            provider=target_provider,
+            model_name=model_name or None,
+        )
+
+    @property
+    def label(self) -> str:
+        """Unique, file-name friendly label for this target."""
+        parts = [self.database_type.value, self.provider, self.model_name]
+        return "_".join(part.replace("/", "-") for part in parts if part)
+
+    def apply(self, config: OptimizerConfig) -> OptimizerConfig:
+        """Derive the configuration for this target from a base configuration."""
+        target_config = replace(config, database_type=self.database_type)
+        if self.provider and self.provider != config.provider:
+            # Reset provider-specific settings so __post_init__ picks defaults
+            target_config = replace(
+                target_config,
+                provider=self.provider,
+                model_name=OptimizerConfig.model_name,
+                max_concurrent_requests=None,
+                api_key=None,
+            )
+        if self.model_name:
+            target_config.model_name = self.model_name
+        return target_config
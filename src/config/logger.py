@@ -2,20 +2,37 @@
 Unholy singleton to use as global logger.
 God and Guido van Rossum may forgive me.
 
+The level, format and sampling come from the environment (``SQLO_LOG_LEVEL``,
+``SQLO_LOG_FORMAT`` and ``SQLO_LOG_SAMPLE``) and can be changed at runtime
+with ``logger.configure``. Rendered lines are queued to a background thread
+writing to stderr, so a log call never waits on the terminal or a pipe and
+never splits a line printed to stdout.
+
 use as bellow:
 >>> from infra.logger impor logger
 >>> logger.info("This is an info message.")
+>>> logger.info(f"Read {path}", sample="file_read")  # high-volume: 1 in N kept
 """
 
+import atexit
 import logging
+import os
+import queue
+import sys
+import threading
+from typing import Any, TextIO
 
 import structlog
 
+DEFAULT_LEVEL = "INFO"
+# Keep the first and then every N-th event of each sampled message kind
+DEFAULT_SAMPLE_EVERY = 100
+
 
 class Singleton(type):
     """Metaclass to ensure a class is treated as a singleton."""
 
-    _instances = {}
+    _instances: dict[type, Any] = {}
 
     def __call__(cls, *args, **kwargs):
         if cls not in cls._instances:
@@ -24,6 +41,109 @@ class Singleton(type):
         return cls._instances[cls]
 
 
+class QueueWriter:
+    """
+    File-like sink that hands rendered lines to a background writer thread.
+
+    The thread writes whatever has queued up in one go and flushes once per
+    batch. Lines still queued at interpreter exit are written before it ends.
+    """
+
+    def __init__(self, stream: TextIO | None = None) -> None:
+        """Start the writer thread; ``None`` writes to the current ``sys.stderr``."""
+        self.stream = stream
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._run, name="log-writer", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, line: str) -> None:
+        """Queue a rendered line for the stream current at the time of the call."""
+        self._queue.put((self.stream or sys.stderr, line))
+
+    def flush(self) -> None:
+        """Batches are flushed by the writer thread."""
+
+    def sync(self) -> None:
+        """Block until every line queued so far has been written."""
+        if self._thread.is_alive():
+            written = threading.Event()
+            self._queue.put(written)
+            written.wait()
+
+    def close(self) -> None:
+        """Write the remaining lines and stop the thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        """Write queued lines in batches until closed."""
+        while True:
+            batch = self._drain()
+            streams: dict[TextIO, list[str]] = {}
+            for item in batch:
+                if isinstance(item, tuple):
+                    streams.setdefault(item[0], []).append(item[1])
+            for stream, lines in streams.items():
+                self._write(stream, "".join(lines))
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if None in batch:
+                return
+
+    def _drain(self) -> list[Any]:
+        """Wait for the next item, then take everything else already queued."""
+        batch = [self._queue.get()]
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    @staticmethod
+    def _write(stream: TextIO, text: str) -> None:
+        """Write and flush, ignoring a closed or broken stream."""
+        try:
+            stream.write(text)
+            stream.flush()
+        except (OSError, ValueError):
+            pass
+
+
+class EventSampler:
+    """
+    Processor dropping most events that carry a ``sample`` kind.
+
+    The first event of a kind and then every ``every``-th one are kept and
+    marked with the sampling rate; events without ``sample`` always pass.
+    """
+
+    def __init__(self, every: int = DEFAULT_SAMPLE_EVERY) -> None:
+        """Initialize with the sampling interval."""
+        if every < 1:
+            raise ValueError(f"Log sampling interval must be at least 1: {every}")
+        self.every = every
+        self._counts: dict[str, int] = {}
+
+    def __call__(
+        self, logger: Any, method_name: str, event_dict: structlog.typing.EventDict
+    ) -> structlog.typing.EventDict:
+        """Pass, mark or drop a single event."""
+        if (kind := event_dict.pop("sample", None)) is None:
+            return event_dict
+        seen = self._counts.get(kind, 0)
+        self._counts[kind] = seen + 1
+        if seen % self.every:
+            raise structlog.DropEvent
+        if self.every > 1:
+            event_dict["sampled"] = f"1/{self.every}"
+        return event_dict
+
+
 class GlobalLogger(metaclass=Singleton):
     """
     Singleton class to use as a global logger.
@@ -34,20 +154,76 @@ class GlobalLogger(metaclass=Singleton):
     """
 
     def __init__(self):
-        """Configure the logger."""
-        structlog.configure(
-            wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
-            processors=[
+        """Configure the logger from the environment."""
+        self._writer = QueueWriter()
+        self.configure()
+
+    def configure(
+        self,
+        level: str | None = None,
+        json_format: bool | None = None,
+        sample_every: int | None = None,
+        stream: TextIO | None = None,
+    ) -> None:
+        """
+        (Re)configure the level, renderer, sampling and output stream.
+
+        Unset arguments fall back to ``SQLO_LOG_LEVEL`` (default INFO),
+        ``SQLO_LOG_FORMAT`` (``json`` or ``console``; default JSON unless the
+        output is a terminal) and ``SQLO_LOG_SAMPLE`` (default 100).
+        """
+        level = (level or os.getenv("SQLO_LOG_LEVEL") or DEFAULT_LEVEL).upper()
+        if (level_number := logging.getLevelNamesMapping().get(level)) is None:
+            raise ValueError(f"Unknown log level: {level}")
+        if sample_every is None:
+            sample_every = int(os.getenv("SQLO_LOG_SAMPLE", DEFAULT_SAMPLE_EVERY))
+        self._writer.sync()
+        self._writer.stream = stream
+        if json_format is None:
+            json_format = _json_format(stream or sys.stderr)
+
+        renderers: list[structlog.typing.Processor] = (
+            [
+                structlog.processors.TimeStamper(fmt="iso"),
+                structlog.processors.JSONRenderer(),
+            ]
+            if json_format
+            else [
                 structlog.processors.TimeStamper(fmt="%Y-%m-%d %H:%M.%S"),
-                structlog.processors.add_log_level,
                 structlog.dev.ConsoleRenderer(),
-            ],
+            ]
+        )
+        processors: list[structlog.typing.Processor] = [
+            EventSampler(sample_every),
+            structlog.processors.add_log_level,
+            *renderers,
+        ]
+        structlog.configure(
+            wrapper_class=structlog.make_filtering_bound_logger(level_number),
+            processors=processors,
+            logger_factory=structlog.WriteLoggerFactory(file=self._writer),
+            cache_logger_on_first_use=True,
         )
+        # Bound once here instead of looked up on every call
+        self._logger = structlog.get_logger().bind()
+
+    def flush(self) -> None:
+        """Wait until queued log lines are written, e.g. before printing a report."""
+        self._writer.sync()
 
     def __getattr__(self, item):
-        """Delegate log methods to structlog's get_logger."""
-        logger = structlog.get_logger()
-        return getattr(logger, item)
+        """Delegate log methods to the cached structlog logger."""
+        return getattr(self._logger, item)
+
+
+def _json_format(stream: TextIO) -> bool:
+    """JSON lines unless configured otherwise or writing to a terminal."""
+    if (name := os.getenv("SQLO_LOG_FORMAT", "").lower()) in ("json", "console"):
+        return name == "json"
+    try:
+        return not stream.isatty()
+    except (AttributeError, ValueError):
+        return True
 
 
 # You should import this instance, it already abstracts enough
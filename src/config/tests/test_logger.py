@@ -0,0 +1,91 @@
+# tests/test_logger.py
+import io
+import json
+
+import pytest
+import structlog
+
+from config.logger import EventSampler, QueueWriter, logger
+
+
+@pytest.fixture
+def log_stream():
+    """Route the global logger to a buffer and restore it afterwards."""
+    stream = io.StringIO()
+    yield stream
+    logger.configure()
+
+
+class TestEventSampler:
+    """Test sampling of high-volume log events."""
+
+    def test_keeps_first_and_every_nth_event_per_kind(self):
+        """Test only every n-th event of a kind passes, marked with the rate."""
+        sampler = EventSampler(every=3)
+        kept = []
+        for i in range(7):
+            try:
+                kept.append(sampler(None, "info", {"event": i, "sample": "read"}))
+            except structlog.DropEvent:
+                pass
+
+        assert kept == [
+            {"event": 0, "sampled": "1/3"},
+            {"event": 3, "sampled": "1/3"},
+            {"event": 6, "sampled": "1/3"},
+        ]
+
+    def test_unsampled_events_always_pass(self):
+        """Test events without a sample kind are untouched."""
+        sampler = EventSampler(every=100)
+
+        assert sampler(None, "info", {"event": "a"}) == {"event": "a"}
+        assert sampler(None, "info", {"event": "b"}) == {"event": "b"}
+
+
+class TestQueueWriter:
+    """Test the background log writer."""
+
+    def test_sync_waits_for_queued_lines(self):
+        """Test lines are written in order once sync returns."""
+        stream = io.StringIO()
+        writer = QueueWriter(stream)
+        for i in range(100):
+            writer.write(f"{i}\n")
+        writer.sync()
+
+        assert stream.getvalue().splitlines() == [str(i) for i in range(100)]
+        writer.close()
+
+
+class TestGlobalLogger:
+    """Test runtime configuration of the global logger."""
+
+    def test_level_and_json_format(self, log_stream):
+        """Test events below the level are dropped and the rest rendered as JSON."""
+        logger.configure(level="warning", json_format=True, stream=log_stream)
+        logger.info("hidden")
+        logger.warning("shown", path="a.sql")
+        logger.flush()
+
+        (line,) = log_stream.getvalue().splitlines()
+        assert json.loads(line) | {"timestamp": None} == {
+            "event": "shown",
+            "path": "a.sql",
+            "level": "warning",
+            "timestamp": None,
+        }
+
+    def test_level_from_environment(self, log_stream, monkeypatch):
+        """Test SQLO_LOG_LEVEL applies when no level is given."""
+        monkeypatch.setenv("SQLO_LOG_LEVEL", "debug")
+        logger.configure(json_format=True, stream=log_stream)
+        logger.debug("details")
+        logger.flush()
+
+        assert json.loads(log_stream.getvalue())["event"] == "details"
+
+    def test_unknown_level(self):
+        """Test an unknown level is rejected."""
+        with pytest.raises(ValueError, match="Unknown log level"):
+            logger.configure(level="chatty")
@@ -0,0 +1,67 @@
+# tests/test_tracing.py
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+from config.tracing import Tracer
+
+
+class TestTracer:
+    """Test span recording, profiles and trace files."""
+
+    def test_spans_are_kept_only_while_recording(self):
+        """Test spans before recording starts are only logged."""
+        tracer = Tracer()
+        with tracer.span("hash"):
+            pass
+        tracer.start_recording()
+        with tracer.span("hash") as fields:
+            fields["hit"] = True
+
+        assert [(s.name, s.fields) for s in tracer.spans] == [("hash", {"hit": True})]
+
+    def test_failed_span_records_error(self):
+        """Test exceptions are recorded on the span and re-raised."""
+        tracer = Tracer()
+        tracer.start_recording()
+
+        with pytest.raises(ValueError):
+            with tracer.span("file_read"):
+                raise ValueError("boom")
+
+        assert tracer.spans[0].fields == {"error": "ValueError"}
+
+    def test_profile_percentiles(self):
+        """Test the profile groups spans per stage with nearest-rank percentiles."""
+        tracer = Tracer()
+        tracer.start_recording()
+        for _ in range(3):
+            with tracer.span("metadata_lookup"):
+                pass
+        with tracer.span("output_write"):
+            pass
+
+        lookup, write = tracer.profile()
+
+        assert (lookup.stage, lookup.count, write.count) == ("metadata_lookup", 3, 1)
+        assert lookup.p50_ms <= lookup.p95_ms <= lookup.total_ms
+
+    @pytest.mark.asyncio
+    async def test_chrome_trace_lanes(self, tmp_path: Path):
+        """Test concurrent tasks get separate lanes in the Chrome trace."""
+        tracer = Tracer()
+        tracer.start_recording()
+
+        async def stage():
+            with tracer.span("sql_to_natural", prompt_tokens=10):
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(stage(), stage())
+        tracer.write_chrome_trace(tmp_path / "trace.json")
+
+        events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+        assert {e["ph"] for e in events} == {"X"}
+        assert len({e["tid"] for e in events}) == 2
+        assert events[0]["args"] == {"prompt_tokens": 10}
@@ -0,0 +1,150 @@
+# src/config/tracing.py
+"""
+Global tracer timing the stages of an optimization run.
+
+use as bellow:
+>>> from config.tracing import tracer
+>>> with tracer.span("metadata_lookup", query_hash=query_hash) as fields:
+...     fields["hit"] = True
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from config.logger import logger
+
+
+@dataclass
+class Span:
+    """A finished, timed section of work."""
+
+    name: str
+    start: float
+    duration: float
+    # Asyncio task (or thread) the span ran in
+    lane: int
+    fields: dict[str, Any]
+
+
+@dataclass
+class StageProfile:
+    """Latency distribution of all spans of one stage."""
+
+    stage: str
+    durations_ms: list[float]
+
+    @property
+    def count(self) -> int:
+        """Number of spans."""
+        return len(self.durations_ms)
+
+    @property
+    def p50_ms(self) -> float:
+        """Median duration."""
+        return self._percentile(50)
+
+    @property
+    def p95_ms(self) -> float:
+        """95th percentile duration (nearest rank)."""
+        return self._percentile(95)
+
+    @property
+    def total_ms(self) -> float:
+        """Summed duration."""
+        return sum(self.durations_ms)
+
+    def _percentile(self, percent: int) -> float:
+        """Nearest-rank percentile of the span durations."""
+        ordered = sorted(self.durations_ms)
+        rank = max(1, -(-len(ordered) * percent // 100))
+        return ordered[rank - 1]
+
+
+class Tracer:
+    """
+    Times named spans and logs each one as structured fields.
+
+    Spans are only kept (for ``profile`` and the trace file) once recording is
+    enabled, so long-running processes do not accumulate them.
+    """
+
+    def __init__(self) -> None:
+        """Start with recording disabled."""
+        self._recording = False
+        self._spans: list[Span] = []
+        self._lanes: dict[int, int] = {}
+        self._origin = time.perf_counter()
+
+    @property
+    def spans(self) -> list[Span]:
+        """Spans recorded so far, in order of completion."""
+        return list(self._spans)
+
+    def start_recording(self) -> None:
+        """Keep finished spans for the profile and the trace file."""
+        self._recording = True
+
+    @contextmanager
+    def span(self, name: str, **fields: Any) -> Iterator[dict[str, Any]]:
+        """Time the enclosed block; fields added to the yielded dict are logged too."""
+        start = time.perf_counter()
+        try:
+            yield fields
+        except BaseException as e:
+            fields["error"] = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            logger.debug(
+                "span", span=name, duration_ms=round(duration * 1000, 3), **fields
+            )
+            if self._recording:
+                self._spans.append(Span(name, start, duration, self._lane(), fields))
+
+    def profile(self) -> list[StageProfile]:
+        """Duration distribution per stage, in order of first appearance."""
+        stages: dict[str, list[float]] = {}
+        for span in sorted(self._spans, key=lambda s: s.start):
+            stages.setdefault(span.name, []).append(span.duration * 1000)
+        return [StageProfile(stage, durations) for stage, durations in stages.items()]
+
+    def write_chrome_trace(self, path: Path) -> None:
+        """Write the recorded spans in Chrome trace format (chrome://tracing, Perfetto)."""
+        pid = os.getpid()
+        events = [
+            {
+                "name": span.name,
+                "ph": "X",
+                "ts": round((span.start - self._origin) * 1e6, 1),
+                "dur": round(span.duration * 1e6, 1),
+                "pid": pid,
+                "tid": span.lane,
+                "args": span.fields,
+            }
+            for span in self._spans
+        ]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}, default=str),
+            encoding="utf-8",
+        )
+
+    def _lane(self) -> int:
+        """Small stable number of the current asyncio task or thread."""
+        try:
+            key = id(asyncio.current_task())
+        except RuntimeError:
+            key = threading.get_ident()
+        return self._lanes.setdefault(key, len(self._lanes) + 1)
+
+
+# Shared by every module, like the global logger
+tracer = Tracer()
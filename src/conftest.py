@@ -31,6 +31,11 @@ def mock_llm_client() -> Mock:
     """Mock LLM client for testing."""
     client = Mock()
     client.generate_response = AsyncMock(return_value="Generated response")
+
+    async def stream_response(prompt, config):
+        yield await client.generate_response(prompt, config)
+
+    client.stream_response = stream_response
     client.get_provider_name.return_value = "test"
     return client
 
@@ -0,0 +1,121 @@
+# src/core/caching.py
+import asyncio
+import hashlib
+import json
+from collections.abc import AsyncGenerator
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import Any
+
+from config.logger import logger
+from core.interfaces import LLMClient, ResponseCache
+
+
+def request_key(provider: str, prompt: str, config: dict[str, Any]) -> str:
+    """Stable key of an LLM request from provider, prompt and generation config."""
+    return hashlib.sha256(
+        json.dumps(
+            {"provider": provider, "prompt": prompt, "config": config},
+            sort_keys=True,
+            default=str,
+        ).encode("utf-8")
+    ).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters for a caching LLM client."""
+
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class CachingLLMClient(LLMClient):
+    """LLM client decorator that serves repeated prompts from a response cache."""
+
+    def __init__(self, client: LLMClient, cache: ResponseCache) -> None:
+        self._client = client
+        self._cache = cache
+        self._in_flight: dict[str, asyncio.Future[str]] = {}
+        self.stats = CacheStats()
+
+    @property
+    def client(self) -> LLMClient:
+        """The wrapped client that serves cache misses."""
+        return self._client
+
+    def cache_key(self, prompt: str, config: dict[str, Any]) -> str:
+        """Build the cache key from provider, prompt and generation config."""
+        return request_key(self._client.get_provider_name(), prompt, config)
+
+    async def generate_response(self, prompt: str, config: dict[str, Any]) -> str:
+        """Return a cached response or generate and store a new one."""
+        key = self.cache_key(prompt, config)
+        if (cached := await self._cache.get(key)) is not None:
+            self.stats.hits += 1
+            return cached
+
+        # Identical prompts already being generated share one provider call
+        if (pending := self._in_flight.get(key)) is not None:
+            self.stats.hits += 1
+            return await asyncio.shield(pending)
+
+        self.stats.misses += 1
+        future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            response = await self._client.generate_response(prompt, config)
+            await self._cache.set(key, response)
+            future.set_result(response)
+            return response
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so waiter-less failures are not reported as unhandled
+            future.exception()
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            del self._in_flight[key]
+
+    async def stream_response(
+        self, prompt: str, config: dict[str, Any]
+    ) -> AsyncGenerator[str, None]:
+        """Replay a cached response as one chunk, or stream and store a new one."""
+        key = self.cache_key(prompt, config)
+        if (cached := await self._cache.get(key)) is not None:
+            self.stats.hits += 1
+            yield cached
+            return
+
+        self.stats.misses += 1
+        chunks: list[str] = []
+        async with aclosing(self._client.stream_response(prompt, config)) as stream:
+            try:
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    yield chunk
+            except GeneratorExit:
+                # The consumer stopped early on purpose; the truncated text is
+                # the stage result only when the config declares that stop rule
+                if config.get("stop_at"):
+                    await self._cache.set(key, "".join(chunks))
+                raise
+        await self._cache.set(key, "".join(chunks))
+
+    def get_provider_name(self) -> str:
+        """Get the provider name of the wrapped client."""
+        return self._client.get_provider_name()
+
+    def log_stats(self) -> None:
+        """Log hit/miss counters for the current run."""
+        logger.info(
+            f"LLM cache: {self.stats.hits} hits, {self.stats.misses} misses "
+            f"({self.stats.hit_rate:.0%} hit rate)"
+        )
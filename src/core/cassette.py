@@ -0,0 +1,143 @@
+# src/core/cassette.py
+import asyncio
+import time
+from collections.abc import AsyncGenerator
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import Any, Literal
+
+from config.logger import logger
+from core.caching import request_key
+from core.interfaces import LLMCassette, LLMClient
+
+CassetteMode = Literal["record", "replay"]
+
+
+class CassetteMissError(LookupError):
+    """A replayed request was never recorded in the cassette."""
+
+
+@dataclass
+class CassetteStats:
+    """Counters of recorded and replayed interactions."""
+
+    recorded: int = 0
+    replayed: int = 0
+
+
+class CassetteLLMClient(LLMClient):
+    """
+    LLM client decorator that records interactions to a cassette or replays them.
+
+    In ``record`` mode every request goes to the wrapped client and the answer is
+    stored with its latency. In ``replay`` mode no provider is contacted: answers
+    come from the cassette, optionally after the recorded latency scaled by
+    ``replay_latency``, and an unrecorded request raises ``CassetteMissError``.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        cassette: LLMCassette,
+        mode: CassetteMode,
+        client: LLMClient | None = None,
+        replay_latency: float = 0.0,
+    ) -> None:
+        """Initialize; recording needs the client that serves real requests."""
+        if mode == "record" and client is None:
+            raise ValueError("Recording a cassette needs an LLM client")
+        self._provider = provider
+        self._cassette = cassette
+        self._mode = mode
+        self._client = client
+        self._replay_latency = replay_latency
+        self.stats = CassetteStats()
+
+    @property
+    def client(self) -> LLMClient | None:
+        """The wrapped client that serves recorded requests, if any."""
+        return self._client
+
+    @property
+    def mode(self) -> CassetteMode:
+        """Whether interactions are recorded or replayed."""
+        return self._mode
+
+    def _recorder(self) -> LLMClient:
+        """The wrapped client, which serves every request in record mode."""
+        if self._client is None:
+            raise ValueError("Recording a cassette needs an LLM client")
+        return self._client
+
+    async def generate_response(self, prompt: str, config: dict[str, Any]) -> str:
+        """Replay a recorded response, or generate and record a new one."""
+        key = request_key(self._provider, prompt, config)
+        if self._mode == "replay":
+            return await self._replay(key, prompt)
+
+        start = time.perf_counter()
+        response = await self._recorder().generate_response(prompt, config)
+        await self._record(key, prompt, config, response, start)
+        return response
+
+    async def stream_response(
+        self, prompt: str, config: dict[str, Any]
+    ) -> AsyncGenerator[str, None]:
+        """Replay a recorded response as one chunk, or stream and record a new one."""
+        key = request_key(self._provider, prompt, config)
+        if self._mode == "replay":
+            yield await self._replay(key, prompt)
+            return
+
+        start = time.perf_counter()
+        chunks: list[str] = []
+        async with aclosing(self._recorder().stream_response(prompt, config)) as stream:
+            try:
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    yield chunk
+            except GeneratorExit:
+                # Same rule as the response cache: only a declared stop makes the
+                # truncated text the result that a replay must reproduce
+                if config.get("stop_at"):
+                    await self._record(key, prompt, config, "".join(chunks), start)
+                raise
+        await self._record(key, prompt, config, "".join(chunks), start)
+
+    def get_provider_name(self) -> str:
+        """Get the provider name the interactions are recorded for."""
+        return self._provider
+
+    async def _replay(self, key: str, prompt: str) -> str:
+        """Recorded response of a request, after the simulated latency."""
+        if (recorded := await self._cassette.lookup(key)) is None:
+            preview = " ".join(prompt.split())[:80]
+            logger.error(f"Request not in cassette: {key} ({preview}...)")
+            raise CassetteMissError(
+                f"Request {key[:12]} was not recorded in the cassette; "
+                "record it again with --cassette-mode record"
+            )
+        response, latency_seconds = recorded
+        if self._replay_latency:
+            await asyncio.sleep(latency_seconds * self._replay_latency)
+        self.stats.replayed += 1
+        return response
+
+    async def _record(
+        self,
+        key: str,
+        prompt: str,
+        config: dict[str, Any],
+        response: str,
+        start: float,
+    ) -> None:
+        """Store a finished interaction with its observed latency."""
+        await self._cassette.record(
+            key,
+            self._provider,
+            prompt,
+            config,
+            response,
+            time.perf_counter() - start,
+        )
+        self.stats.recorded += 1
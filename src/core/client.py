@@ -1,56 +1,131 @@
 # src/llm/clients.py
+import asyncio
 import os
-from typing import Any
-
-from anthropic import Anthropic
-from google.genai import Client as GeminiClient
-from openai import OpenAI
+from abc import abstractmethod
+from collections.abc import AsyncGenerator
+from contextlib import aclosing
+from typing import TYPE_CHECKING, Any
 
 from config.config import OptimizerConfig
 from config.logger import logger
+from core.exceptions import LLMProviderError
 from core.interfaces import LLMClient
+from core.resilience import ResilientLLMClient, RetryPolicy
+
+# Provider SDKs are slow to import; load only the one that is actually selected
+if TYPE_CHECKING:
+    from anthropic import AsyncAnthropic
+    from google.genai import Client as GeminiClient
+    from openai import AsyncOpenAI
+
+
+class BoundedLLMClient(LLMClient):
+    """Base class for provider clients with a cap on in-flight requests."""
+
+    def __init__(self, max_concurrent_requests: int = 8) -> None:
+        if max_concurrent_requests < 1:
+            raise ValueError("max_concurrent_requests must be at least 1")
+        self._max_concurrent_requests = max_concurrent_requests
+        self._semaphore = asyncio.Semaphore(max_concurrent_requests)
+
+    @property
+    def max_concurrent_requests(self) -> int:
+        """Maximum number of requests this client keeps in flight."""
+        return self._max_concurrent_requests
+
+    async def generate_response(self, prompt: str, config: dict[str, Any]) -> str:
+        """Generate response, waiting for a free request slot first."""
+        async with self._semaphore:
+            return await self._generate(prompt, config)
+
+    async def stream_response(
+        self, prompt: str, config: dict[str, Any]
+    ) -> AsyncGenerator[str, None]:
+        """Stream response chunks, holding a request slot until the stream ends."""
+        async with self._semaphore, aclosing(self._stream(prompt, config)) as stream:
+            async for chunk in stream:
+                yield chunk
+
+    @abstractmethod
+    async def _generate(self, prompt: str, config: dict[str, Any]) -> str:
+        """Send the request to the provider without blocking the event loop."""
+        pass
 
+    async def _stream(
+        self, prompt: str, config: dict[str, Any]
+    ) -> AsyncGenerator[str, None]:
+        """Stream the provider response; providers without streaming yield once."""
+        yield await self._generate(prompt, config)
 
-class GeminiLLMClient(LLMClient):
+
+class GeminiLLMClient(BoundedLLMClient):
     """Google Gemini LLM client implementation."""
 
-    def __init__(self, client: GeminiClient) -> None:
+    def __init__(
+        self, client: "GeminiClient", max_concurrent_requests: int = 8
+    ) -> None:
+        super().__init__(max_concurrent_requests)
         self._client = client
 
-    async def generate_response(self, prompt: str, config: dict[str, Any]) -> str:
+    async def _generate(self, prompt: str, config: dict[str, Any]) -> str:
         """Generate response using Gemini."""
         try:
-            response = self._client.models.generate_content(
+            response = (
+                await self._client.aio.models.generate_content(
+                    model=config.get("model_name", "gemini-2.0-flash"),
+                    contents=prompt,
+                    config={
+                        "temperature": config.get("temperature", 0.1),
+                        "max_output_tokens": config.get("max_output_tokens", 8192),
+                    },
+                )
+            ).text
+
+            return response if response else "No response from the AI model"
+
+        except Exception as e:
+            error_msg = f"Error generating Gemini response: {str(e)}"
+            logger.error(error_msg)
+            raise LLMProviderError.from_exception(error_msg, e) from e
+
+    async def _stream(
+        self, prompt: str, config: dict[str, Any]
+    ) -> AsyncGenerator[str, None]:
+        """Stream response using Gemini."""
+        try:
+            stream = await self._client.aio.models.generate_content_stream(
                 model=config.get("model_name", "gemini-2.0-flash"),
                 contents=prompt,
                 config={
                     "temperature": config.get("temperature", 0.1),
                     "max_output_tokens": config.get("max_output_tokens", 8192),
                 },
-            ).text
-
-            return response if response else "No response from the AI model"
+            )
+            async for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
 
         except Exception as e:
-            error_msg = f"Error generating Gemini response: {str(e)}"
+            error_msg = f"Error streaming Gemini response: {str(e)}"
             logger.error(error_msg)
-            raise RuntimeError(error_msg) from e
+            raise LLMProviderError.from_exception(error_msg, e) from e
 
     def get_provider_name(self) -> str:
         """Get the provider name."""
         return "gemini"
 
 
-class OpenAILLMClient(LLMClient):
+class OpenAILLMClient(BoundedLLMClient):
     """OpenAI LLM client implementation."""
 
-    def __init__(self, client: OpenAI) -> None:
+    def __init__(self, client: "AsyncOpenAI", max_concurrent_requests: int = 8) -> None:
+        super().__init__(max_concurrent_requests)
         self._client = client
 
-    async def generate_response(self, prompt: str, config: dict[str, Any]) -> str:
+    async def _generate(self, prompt: str, config: dict[str, Any]) -> str:
         """Generate response using OpenAI."""
         try:
-            response = self._client.chat.completions.create(
+            response = await self._client.chat.completions.create(
                 model=config.get("model_name", "gpt-4"),
                 messages=[{"role": "user", "content": prompt}],
                 temperature=config.get("temperature", 0.1),
@@ -62,27 +137,61 @@ class OpenAILLMClient(LLMClient):
         except Exception as e:
             error_msg = f"Error generating OpenAI response: {str(e)}"
             logger.error(error_msg)
-            raise RuntimeError(error_msg) from e
+            raise LLMProviderError.from_exception(error_msg, e) from e
+
+    async def _stream(
+        self, prompt: str, config: dict[str, Any]
+    ) -> AsyncGenerator[str, None]:
+        """Stream response using OpenAI."""
+        try:
+            stream = await self._client.chat.completions.create(
+                model=config.get("model_name", "gpt-4"),
+                messages=[{"role": "user", "content": prompt}],
+                temperature=config.get("temperature", 0.1),
+                max_tokens=config.get("max_output_tokens", 8192),
+                stream=True,
+            )
+        except Exception as e:
+            error_msg = f"Error streaming OpenAI response: {str(e)}"
+            logger.error(error_msg)
+            raise LLMProviderError.from_exception(error_msg, e) from e
+
+        try:
+            async for chunk in stream:
+                if chunk.choices and (content := chunk.choices[0].delta.content):
+                    yield content
+        except Exception as e:
+            error_msg = f"Error streaming OpenAI response: {str(e)}"
+            logger.error(error_msg)
+            raise LLMProviderError.from_exception(error_msg, e) from e
+        finally:
+            # Closing the stream stops generation when the consumer stops early
+            await stream.close()
 
     def get_provider_name(self) -> str:
         """Get the provider name."""
         return "openai"
 
 
-class AnthropicLLMClient(LLMClient):
+class AnthropicLLMClient(BoundedLLMClient):
     """Anthropic Claude LLM client implementation."""
 
-    def __init__(self, client: Anthropic) -> None:
+    def __init__(
+        self, client: "AsyncAnthropic", max_concurrent_requests: int = 4
+    ) -> None:
+        super().__init__(max_concurrent_requests)
         self._client = client
 
-    async def generate_response(self, prompt: str, config: dict[str, Any]) -> str:
+    async def _generate(self, prompt: str, config: dict[str, Any]) -> str:
         """Generate response using Anthropic Claude."""
         try:
-            response = self._client.messages.create(
-                model=config.get("model_name", "claude-3-5-sonnet-20241022"),
-                max_tokens=config.get("max_output_tokens", 8192),
-                temperature=config.get("temperature", 0.1),
-                messages=[{"role": "user", "content": prompt}],
+            response = (
+                await self._client.messages.create(
+                    model=config.get("model_name", "claude-3-5-sonnet-20241022"),
+                    max_tokens=config.get("max_output_tokens", 8192),
+                    temperature=config.get("temperature", 0.1),
+                    messages=[{"role": "user", "content": prompt}],
+                )
             ).content
 
             return response[0].text if response else "No response from the AI model"
@@ -90,7 +199,26 @@ class AnthropicLLMClient(LLMClient):
         except Exception as e:
             error_msg = f"Error generating Anthropic response: {str(e)}"
             logger.error(error_msg)
-            raise RuntimeError(error_msg) from e
+            raise LLMProviderError.from_exception(error_msg, e) from e
+
+    async def _stream(
+        self, prompt: str, config: dict[str, Any]
+    ) -> AsyncGenerator[str, None]:
+        """Stream response using Anthropic Claude."""
+        try:
+            async with self._client.messages.stream(
+                model=config.get("model_name", "claude-3-5-sonnet-20241022"),
+                max_tokens=config.get("max_output_tokens", 8192),
+                temperature=config.get("temperature", 0.1),
+                messages=[{"role": "user", "content": prompt}],
+            ) as stream:
+                async for text in stream.text_stream:
+                    yield text
+
+        except Exception as e:
+            error_msg = f"Error streaming Anthropic response: {str(e)}"
+            logger.error(error_msg)
+            raise LLMProviderError.from_exception(error_msg, e) from e
 
     def get_provider_name(self) -> str:
         """Get the provider name."""
@@ -103,6 +231,78 @@ class LLMClientFactory:
     @staticmethod
     def create_client(config: OptimizerConfig, api_key: str | None = None) -> LLMClient:
         """Create an LLM client based on the configuration."""
+        if config.cassette_path and config.cassette_mode == "replay":
+            from core.cassette import CassetteLLMClient
+            from infra.cassette import SqliteCassette
+
+            # Offline: no provider client, API key or cache is needed
+            return CassetteLLMClient(
+                config.provider,
+                SqliteCassette(config.cassette_path, create=False),
+                "replay",
+                replay_latency=config.replay_latency,
+            )
+
+        client: LLMClient = LLMClientFactory._create_resilient_client(config, api_key)
+        if fallback_configs := config.get_fallback_configs():
+            from core.hedging import HedgedLLMClient, HedgeTarget
+
+            client = HedgedLLMClient(
+                [HedgeTarget(client, config.model_name)]
+                + [
+                    HedgeTarget(
+                        LLMClientFactory._create_resilient_client(fallback_config),
+                        fallback_config.model_name,
+                    )
+                    for fallback_config in fallback_configs
+                ],
+                hedge_percentile=config.hedge_percentile,
+                request_timeout=config.request_timeout_seconds,
+                latency_path=config.latency_path,
+            )
+        # Cache outermost so cache hits never spend rate limit budget
+        if config.cache_path:
+            from core.caching import CachingLLMClient
+            from infra.response_cache import SqliteResponseCache
+
+            client = CachingLLMClient(
+                client,
+                SqliteResponseCache(
+                    config.cache_path,
+                    max_size_bytes=config.cache_max_bytes,
+                    ttl_seconds=config.cache_ttl_seconds,
+                ),
+            )
+        if config.cassette_path:
+            from core.cassette import CassetteLLMClient
+            from infra.cassette import SqliteCassette
+
+            # Outside the cache so that cache hits are recorded too
+            client = CassetteLLMClient(
+                config.provider, SqliteCassette(config.cassette_path), "record", client
+            )
+        return client
+
+    @staticmethod
+    def _create_resilient_client(
+        config: OptimizerConfig, api_key: str | None = None
+    ) -> ResilientLLMClient:
+        """Create the provider client wrapped with rate limiting and retries."""
+        return ResilientLLMClient(
+            LLMClientFactory._create_provider_client(config, api_key),
+            config.max_concurrent_requests
+            or config.get_default_concurrency_for_provider(),
+            requests_per_minute=config.requests_per_minute,
+            tokens_per_minute=config.tokens_per_minute,
+            retry_policy=RetryPolicy(max_retries=config.max_retries),
+            adaptive_concurrency=config.adaptive_concurrency,
+        )
+
+    @staticmethod
+    def _create_provider_client(
+        config: OptimizerConfig, api_key: str | None = None
+    ) -> LLMClient:
+        """Create the provider client for the configured provider."""
         if not (
             effective_api_key := (
                 api_key
@@ -114,12 +314,28 @@ class LLMClientFactory:
                 f"API key required for {config.provider}. Set it via parameter, config, or environment variable."
             )
 
+        max_concurrent_requests = (
+            config.max_concurrent_requests
+            or config.get_default_concurrency_for_provider()
+        )
         if config.provider == "gemini":
-            return GeminiLLMClient(GeminiClient(api_key=effective_api_key))
+            from google.genai import Client as GeminiClient
+
+            return GeminiLLMClient(
+                GeminiClient(api_key=effective_api_key), max_concurrent_requests
+            )
         elif config.provider == "openai":
-            return OpenAILLMClient(OpenAI(api_key=effective_api_key))
+            from openai import AsyncOpenAI
+
+            return OpenAILLMClient(
+                AsyncOpenAI(api_key=effective_api_key), max_concurrent_requests
+            )
         elif config.provider == "claude":
-            return AnthropicLLMClient(Anthropic(api_key=effective_api_key))
+            from anthropic import AsyncAnthropic
+
+            return AnthropicLLMClient(
+                AsyncAnthropic(api_key=effective_api_key), max_concurrent_requests
+            )
         else:
             raise ValueError(f"Unsupported LLM provider: {config.provider}")
 
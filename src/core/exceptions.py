@@ -0,0 +1,63 @@
+# src/core/exceptions.py
+from typing import Any
+
+# HTTP statuses worth retrying: timeouts, conflicts, throttling and overload
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504, 529})
+# Statuses meaning the provider wants less traffic, not just another attempt
+THROTTLING_STATUS_CODES = frozenset({429, 503, 529})
+
+
+class LLMProviderError(RuntimeError):
+    """A failed LLM provider request, classified for the retry policy."""
+
+    def __init__(
+        self,
+        message: str,
+        status_code: int | None = None,
+        retryable: bool = False,
+        retry_after: float | None = None,
+    ) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+    @property
+    def throttled(self) -> bool:
+        """Whether the provider rejected the request for rate or load reasons."""
+        return self.status_code in THROTTLING_STATUS_CODES
+
+    @classmethod
+    def from_exception(cls, message: str, error: Exception) -> "LLMProviderError":
+        """Classify an SDK exception by its HTTP status, headers and type."""
+        status_code = next(
+            (
+                value
+                for value in (
+                    getattr(error, "status_code", None),
+                    getattr(error, "code", None),
+                )
+                if isinstance(value, int)
+            ),
+            None,
+        )
+        if status_code is not None:
+            retryable = status_code in RETRYABLE_STATUS_CODES
+        else:
+            # SDK connection and timeout errors carry no status
+            name = type(error).__name__
+            retryable = isinstance(error, (ConnectionError, TimeoutError)) or any(
+                kind in name for kind in ("Connection", "Timeout")
+            )
+        return cls(message, status_code, retryable, _retry_after(error))
+
+
+def _retry_after(error: Exception) -> float | None:
+    """Seconds from a ``Retry-After`` response header, if the error has one."""
+    headers: Any = getattr(getattr(error, "response", None), "headers", None)
+    if headers is None:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,305 @@
+# src/core/hedging.py
+import asyncio
+import bisect
+import json
+import time
+from collections.abc import AsyncGenerator, Awaitable, Callable, Collection
+from contextlib import aclosing
+from dataclasses import dataclass
+from math import ceil
+from pathlib import Path
+from typing import Any, Literal, TypeVar
+
+from config.logger import logger
+from core.interfaces import LLMClient
+
+T = TypeVar("T")
+LatencyKind = Literal["response", "first_chunk"]
+
+# Upper bucket bounds in seconds, 25% apart from 50ms to about five minutes
+_BUCKET_BOUNDS = tuple(round(0.05 * 1.25**i, 3) for i in range(40))
+
+
+class LatencyHistogram:
+    """Log-bucketed latency distribution with percentile estimates."""
+
+    def __init__(self, counts: list[int] | None = None) -> None:
+        """Start empty or from previously recorded bucket counts."""
+        size = len(_BUCKET_BOUNDS) + 1
+        self._counts = list(counts) if counts and len(counts) == size else [0] * size
+
+    @property
+    def count(self) -> int:
+        """Number of recorded samples."""
+        return sum(self._counts)
+
+    def record(self, seconds: float) -> None:
+        """Add a latency sample."""
+        self._counts[bisect.bisect_left(_BUCKET_BOUNDS, seconds)] += 1
+
+    def percentile(self, quantile: float) -> float | None:
+        """Upper bound of the bucket holding the quantile (0-1), if any samples."""
+        if not (total := self.count):
+            return None
+        rank, cumulative = max(1, ceil(quantile * total)), 0
+        for bucket, count in enumerate(self._counts):
+            cumulative += count
+            if cumulative >= rank:
+                return _BUCKET_BOUNDS[min(bucket, len(_BUCKET_BOUNDS) - 1)]
+        return _BUCKET_BOUNDS[-1]
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to dictionary for JSON serialization."""
+        return {
+            "count": self.count,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "counts": self._counts,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "LatencyHistogram":
+        """Create from dictionary."""
+        return cls(data.get("counts"))
+
+
+@dataclass(frozen=True)
+class HedgeTarget:
+    """A provider client and the model it is asked for."""
+
+    client: LLMClient
+    model_name: str
+
+    @property
+    def name(self) -> str:
+        """``provider:model`` label used in logs and latency records."""
+        return f"{self.client.get_provider_name()}:{self.model_name}"
+
+
+@dataclass
+class HedgingStats:
+    """Counters of hedged and failed-over requests."""
+
+    hedged: int = 0
+    failovers: int = 0
+    # Requests answered by a target other than the preferred one
+    secondary_wins: int = 0
+
+
+class HedgedLLMClient(LLMClient):
+    """
+    LLM client spreading each request over several providers in preference order.
+
+    The preferred target gets the request first. If it has not answered by the
+    configured latency percentile of its own history, the next target gets the
+    same request and whichever answers first wins; the others are cancelled.
+    An error or timeout moves on to the next target at once. Streams race on
+    their first chunk and then stay with the winner.
+    """
+
+    def __init__(
+        self,
+        targets: list[HedgeTarget],
+        hedge_percentile: float = 0.95,
+        min_samples: int = 5,
+        default_hedge_delay: float = 10.0,
+        request_timeout: float | None = None,
+        latency_path: Path | None = None,
+    ) -> None:
+        """Initialize with targets, loading recorded latencies if available."""
+        if not targets:
+            raise ValueError("At least one hedge target is required")
+        self._targets = targets
+        self._hedge_percentile = hedge_percentile
+        self._min_samples = min_samples
+        self._default_hedge_delay = default_hedge_delay
+        self._request_timeout = request_timeout
+        self._latency_path = latency_path
+        self.latencies: dict[str, dict[str, LatencyHistogram]] = {}
+        if latency_path is not None and latency_path.exists():
+            self._load_latencies(latency_path)
+        self.stats = HedgingStats()
+
+    @property
+    def clients(self) -> list[LLMClient]:
+        """Provider clients in preference order."""
+        return [target.client for target in self._targets]
+
+    def hedge_delay(self, target: HedgeTarget, kind: LatencyKind) -> float:
+        """Seconds to wait on a target before hedging to the next one."""
+        histogram = self._histogram(target, kind)
+        if histogram.count < self._min_samples:
+            return self._default_hedge_delay
+        return histogram.percentile(self._hedge_percentile) or self._default_hedge_delay
+
+    async def generate_response(self, prompt: str, config: dict[str, Any]) -> str:
+        """Generate a response from the fastest healthy target."""
+
+        async def generate(target: HedgeTarget) -> str:
+            start = time.perf_counter()
+            response = await self._with_timeout(
+                target.client.generate_response(
+                    prompt, self._config_for(target, config)
+                )
+            )
+            self._histogram(target, "response").record(time.perf_counter() - start)
+            return response
+
+        return await self._race(generate, "response")
+
+    async def stream_response(
+        self, prompt: str, config: dict[str, Any]
+    ) -> AsyncGenerator[str, None]:
+        """Stream from the target that produces the first chunk soonest."""
+
+        async def open_stream(
+            target: HedgeTarget,
+        ) -> tuple[AsyncGenerator[str, None], str | None]:
+            start = time.perf_counter()
+            stream = target.client.stream_response(
+                prompt, self._config_for(target, config)
+            )
+            try:
+                first = await self._with_timeout(anext(stream, None))
+            except BaseException:
+                await stream.aclose()
+                raise
+            self._histogram(target, "first_chunk").record(time.perf_counter() - start)
+            return stream, first
+
+        async def discard(opened: tuple[AsyncGenerator[str, None], str | None]) -> None:
+            await opened[0].aclose()
+
+        stream, first = await self._race(open_stream, "first_chunk", discard)
+        async with aclosing(stream):
+            if first is None:
+                return
+            yield first
+            async for chunk in stream:
+                yield chunk
+
+    def get_provider_name(self) -> str:
+        """Get the provider name of the preferred target."""
+        return self._targets[0].client.get_provider_name()
+
+    def save_latencies(self) -> None:
+        """Write the latency histograms so later runs start with real thresholds."""
+        if self._latency_path is None:
+            return
+        self._latency_path.parent.mkdir(parents=True, exist_ok=True)
+        self._latency_path.write_text(
+            json.dumps(
+                {
+                    name: {kind: h.to_dict() for kind, h in histograms.items()}
+                    for name, histograms in self.latencies.items()
+                },
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+
+    async def _race(
+        self,
+        attempt: Callable[[HedgeTarget], Awaitable[T]],
+        kind: LatencyKind,
+        discard: Callable[[T], Awaitable[None]] | None = None,
+    ) -> T:
+        """Run an attempt on the targets in order, hedging and failing over."""
+        remaining = list(self._targets)
+        pending: dict[asyncio.Task[T], HedgeTarget] = {}
+        latest = remaining[0]
+        error: BaseException | None = None
+
+        self._launch(remaining, pending, attempt)
+        try:
+            while pending:
+                delay = self.hedge_delay(latest, kind) if remaining else None
+                done, _ = await asyncio.wait(
+                    pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    logger.info(
+                        f"No answer from {latest.name} after {delay:.2f}s, "
+                        "hedging to the next provider"
+                    )
+                    latest = self._launch(remaining, pending, attempt) or latest
+                    self.stats.hedged += 1
+                    continue
+
+                for task in done:
+                    target = pending.pop(task)
+                    if (error := task.exception()) is None:
+                        self._count_win(target)
+                        return task.result()
+                    logger.warning(f"{target.name} failed: {error}")
+                    if (
+                        next_target := self._launch(remaining, pending, attempt)
+                    ) is not None:
+                        latest = next_target
+                        self.stats.failovers += 1
+                        logger.info(f"Failing over to {latest.name}")
+            raise error or RuntimeError("No hedge target answered")
+        finally:
+            await self._cancel(pending, discard)
+
+    @staticmethod
+    def _launch(
+        remaining: list[HedgeTarget],
+        pending: dict[asyncio.Task[T], HedgeTarget],
+        attempt: Callable[[HedgeTarget], Awaitable[T]],
+    ) -> HedgeTarget | None:
+        """Start the attempt on the next target, if one is left."""
+        if not remaining:
+            return None
+        target = remaining.pop(0)
+        pending[asyncio.ensure_future(attempt(target))] = target
+        return target
+
+    def _count_win(self, target: HedgeTarget) -> None:
+        """Record which target answered first."""
+        if target is not self._targets[0]:
+            self.stats.secondary_wins += 1
+
+    @staticmethod
+    async def _cancel(
+        pending: Collection[asyncio.Task[T]],
+        discard: Callable[[T], Awaitable[None]] | None,
+    ) -> None:
+        """Cancel the losing attempts and discard whatever they still returned."""
+        for task in pending:
+            task.cancel()
+        for result in await asyncio.gather(*pending, return_exceptions=True):
+            if discard is not None and not isinstance(result, BaseException):
+                await discard(result)
+
+    async def _with_timeout(self, awaitable: Awaitable[T]) -> T:
+        """Await with the per-request timeout, if one is configured."""
+        if self._request_timeout is None:
+            return await awaitable
+        return await asyncio.wait_for(awaitable, self._request_timeout)
+
+    @staticmethod
+    def _config_for(target: HedgeTarget, config: dict[str, Any]) -> dict[str, Any]:
+        """Generation config with the target's own model."""
+        return {**config, "model_name": target.model_name}
+
+    def _histogram(self, target: HedgeTarget, kind: LatencyKind) -> LatencyHistogram:
+        """Latency histogram of a target, created on first use."""
+        return self.latencies.setdefault(target.name, {}).setdefault(
+            kind, LatencyHistogram()
+        )
+
+    def _load_latencies(self, latency_path: Path) -> None:
+        """Read histograms written by an earlier run, ignoring unreadable files."""
+        try:
+            data = json.loads(latency_path.read_text(encoding="utf-8"))
+            self.latencies = {
+                name: {
+                    kind: LatencyHistogram.from_dict(histogram)
+                    for kind, histogram in histograms.items()
+                }
+                for name, histograms in data.items()
+            }
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable latency file {latency_path}: {e}")
@@ -1,9 +1,17 @@
 # src/core/interfaces.py (updated)
 from abc import ABC, abstractmethod
+from collections.abc import AsyncGenerator
+from hashlib import sha256
 from pathlib import Path
 from typing import Any
 
-from core.types import DatabaseType, OptimizationResult, QueryMetadata
+from core.types import (
+    BenchmarkResult,
+    DatabaseType,
+    OptimizationResult,
+    PlanComparison,
+    QueryMetadata,
+)
 
 
 class LLMClient(ABC):
@@ -14,12 +22,54 @@ class LLMClient(ABC):
         """Generate response from the LLM."""
         pass
 
+    async def stream_response(
+        self, prompt: str, config: dict[str, Any]
+    ) -> AsyncGenerator[str, None]:
+        """Stream the response as text chunks; defaults to a single chunk."""
+        yield await self.generate_response(prompt, config)
+
     @abstractmethod
     def get_provider_name(self) -> str:
         """Get the provider name for this client."""
         pass
 
 
+class ResponseCache(ABC):
+    """Abstract interface for persisted LLM responses."""
+
+    @abstractmethod
+    async def get(self, key: str) -> str | None:
+        """Retrieve a cached response, or None on a miss."""
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, response: str) -> None:
+        """Store a response under the given key."""
+        pass
+
+
+class LLMCassette(ABC):
+    """Abstract interface for an archive of recorded LLM interactions."""
+
+    @abstractmethod
+    async def record(
+        self,
+        key: str,
+        provider: str,
+        prompt: str,
+        config: dict[str, Any],
+        response: str,
+        latency_seconds: float,
+    ) -> None:
+        """Store an interaction under the given key."""
+        pass
+
+    @abstractmethod
+    async def lookup(self, key: str) -> tuple[str, float] | None:
+        """Recorded response and latency, or None if the key was never recorded."""
+        pass
+
+
 class FileHandler(ABC):
     """Abstract interface for file operations."""
 
@@ -33,6 +83,15 @@ class FileHandler(ABC):
         """Write JSON data to file."""
         pass
 
+    @abstractmethod
+    async def write_sql_file(self, file_path: Path, content: str) -> None:
+        """Write SQL content to file."""
+        pass
+
+    async def flush(self) -> None:
+        """Persist writes the handler has buffered; nothing is buffered by default."""
+        pass
+
 
 class MetadataRepository(ABC):
     """Abstract interface for metadata persistence."""
@@ -70,7 +129,49 @@ class PromptGenerator(ABC):
         """Generate prompt for natural language to SQL conversion."""
         pass
 
+    @abstractmethod
+    def generate_fragment_prompt(self, fragment_sql: str) -> str:
+        """Generate prompt for rewriting a subquery cut out of a larger query."""
+        pass
+
+    @abstractmethod
+    def generate_compose_prompt(self, skeleton: str, fragments: dict[str, str]) -> str:
+        """Generate prompt for rewriting an outer query around subquery placeholders."""
+        pass
+
     @abstractmethod
     def get_database_type(self) -> DatabaseType:
         """Get the database type this generator supports."""
         pass
+
+    def get_prompt_version(self) -> str:
+        """Short digest of all prompt templates; changes whenever they do."""
+        templates = (
+            self.generate_sql_to_natural_prompt("{sql_query}")
+            + self.generate_natural_to_sql_prompt("{explanation}")
+            + self.generate_fragment_prompt("{fragment_sql}")
+            + self.generate_compose_prompt("{skeleton}", {"{placeholder}": "{query}"})
+        )
+        return sha256(templates.encode("utf-8")).hexdigest()[:12]
+
+
+class PlanVerifier(ABC):
+    """Abstract interface for checking optimized queries against their plans."""
+
+    @abstractmethod
+    def compare_plans(
+        self, original_query: str, optimized_query: str
+    ) -> PlanComparison:
+        """Compare the execution plans of the original and optimized queries."""
+        pass
+
+
+class QueryBenchmark(ABC):
+    """Abstract interface for measuring optimized queries against the original."""
+
+    @abstractmethod
+    def compare_queries(
+        self, original_query: str, optimized_query: str
+    ) -> BenchmarkResult:
+        """Time both queries and check that they return the same rows."""
+        pass
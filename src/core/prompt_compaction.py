@@ -0,0 +1,40 @@
+# src/core/prompt_compaction.py
+import re
+from math import ceil
+
+_BLANK_LINES = re.compile(r"\n{3,}")
+# Words, digit groups (tokenizers split long numbers), whitespace runs, symbols
+_TOKEN_PIECES = re.compile(r"[^\W\d_]+|\d{1,3}|\s+|\S")
+
+
+def compact_text(text: str, dedent: bool = True) -> str:
+    """
+    Remove whitespace that carries no meaning for the model.
+
+    Trailing spaces go, runs of blank lines collapse to one and the text is
+    stripped. With ``dedent`` every line also loses its leading indentation,
+    which suits prompt templates written inside indented code.
+    """
+    lines = (line.strip() if dedent else line.rstrip() for line in text.splitlines())
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate the number of tokens a BPE tokenizer produces for a text.
+
+    Words cost one token per four letters, numbers one per three digits and
+    other symbols one each. A single space is merged into the following word,
+    longer whitespace runs cost one token per eight characters. Close enough
+    to the GPT, Gemini and Claude tokenizers for budgeting without their
+    vocabularies.
+    """
+    tokens = 0
+    for piece in _TOKEN_PIECES.findall(text):
+        if piece.isspace():
+            tokens += 0 if piece == " " else ceil(len(piece) / 8)
+        elif piece[0].isalpha():
+            tokens += ceil(len(piece) / 4)
+        else:
+            tokens += 1
+    return tokens
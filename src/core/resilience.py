@@ -0,0 +1,257 @@
+# src/core/resilience.py
+import asyncio
+import random
+import time
+from collections.abc import AsyncGenerator, Callable
+from contextlib import aclosing
+from dataclasses import dataclass
+from itertools import count
+from typing import Any
+
+from config.logger import logger
+from config.tracing import tracer
+from core.exceptions import LLMProviderError
+from core.interfaces import LLMClient
+from core.prompt_compaction import estimate_tokens
+
+
+class TokenBucket:
+    """Budget refilled continuously at a per-minute rate, e.g. requests or tokens."""
+
+    def __init__(
+        self,
+        per_minute: float,
+        capacity: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Start full; ``capacity`` bounds bursts and defaults to one minute's worth."""
+        if per_minute <= 0:
+            raise ValueError("per_minute must be positive")
+        self._rate = per_minute / 60
+        self._capacity = capacity or per_minute
+        self._available = self._capacity
+        self._clock = clock
+        self._updated = clock()
+        # Waiters are served in arrival order
+        self._lock = asyncio.Lock()
+
+    @property
+    def available(self) -> float:
+        """Budget that could be taken right now."""
+        self._refill()
+        return self._available
+
+    async def acquire(self, amount: float = 1) -> float:
+        """Wait until ``amount`` is available and take it; returns seconds waited."""
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(amount, self._capacity)
+        waited = 0.0
+        async with self._lock:
+            while (available := self.available) < amount:
+                delay = (amount - available) / self._rate
+                await asyncio.sleep(delay)
+                waited += delay
+            self._available -= amount
+        return waited
+
+    def _refill(self) -> None:
+        """Add the budget accrued since the last update."""
+        now = self._clock()
+        self._available = min(
+            self._capacity, self._available + (now - self._updated) * self._rate
+        )
+        self._updated = now
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limit on in-flight requests adjusted AIMD-style from provider feedback.
+
+    Each success raises the limit by ``1 / limit`` (about one slot per round
+    trip of the whole window), each throttling response multiplies it by
+    ``decrease_factor``. Throttles from requests admitted before the last
+    decrease are ignored, so one burst of 429s only halves the limit once.
+    """
+
+    def __init__(
+        self, max_limit: int, min_limit: int = 1, decrease_factor: float = 0.5
+    ) -> None:
+        """Start at the maximum limit."""
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError("limits must satisfy 1 <= min_limit <= max_limit")
+        self._max_limit = max_limit
+        self._min_limit = min_limit
+        self._decrease_factor = decrease_factor
+        self._limit = float(max_limit)
+        self._in_flight = 0
+        self._epoch = 0
+        self._condition = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        """Current number of requests allowed in flight."""
+        return max(self._min_limit, int(self._limit))
+
+    async def acquire(self) -> int:
+        """Wait for a free slot; returns the epoch to pass back to ``release``."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+            return self._epoch
+
+    async def release(self, epoch: int, throttled: bool | None = None) -> None:
+        """Free a slot, growing on success and shrinking on throttling."""
+        async with self._condition:
+            self._in_flight -= 1
+            if throttled and epoch == self._epoch:
+                self._limit = max(self._min_limit, self._limit * self._decrease_factor)
+                self._epoch += 1
+                logger.warning(f"Provider throttling, concurrency now {self.limit}")
+            elif throttled is False:
+                self._limit = min(self._max_limit, self._limit + 1 / self._limit)
+            self._condition.notify_all()
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Exponential backoff with full jitter for retryable provider errors."""
+
+    max_retries: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+
+    def delay(
+        self,
+        attempt: int,
+        retry_after: float | None = None,
+        rng: random.Random | None = None,
+    ) -> float:
+        """Seconds to wait before retry ``attempt`` (0-based); Retry-After wins."""
+        ceiling = min(self.max_delay, self.base_delay * 2**attempt)
+        return max((rng or random).uniform(0, ceiling), retry_after or 0)
+
+
+@dataclass
+class ResilienceStats:
+    """Counters of rate limiting and retries for a resilient LLM client."""
+
+    retries: int = 0
+    throttled: int = 0
+    failures: int = 0
+    wait_seconds: float = 0.0
+
+
+class ResilientLLMClient(LLMClient):
+    """
+    LLM client decorator that keeps requests within quota and retries failures.
+
+    Requests wait for the request and token buckets, then for a slot of the
+    adaptive concurrency limit. Retryable provider errors are retried with
+    jittered exponential backoff; streams only while nothing has been yielded.
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        max_concurrent_requests: int,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+        retry_policy: RetryPolicy | None = None,
+        adaptive_concurrency: bool = True,
+    ) -> None:
+        """Wrap a provider client; unset per-minute limits are not enforced."""
+        self._client = client
+        self._requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._limiter = AdaptiveConcurrencyLimiter(
+            max_concurrent_requests,
+            min_limit=1 if adaptive_concurrency else max_concurrent_requests,
+        )
+        self.stats = ResilienceStats()
+
+    @property
+    def max_concurrent_requests(self) -> int:
+        """Current in-flight request limit, lowered while the provider throttles."""
+        return self._limiter.limit
+
+    async def generate_response(self, prompt: str, config: dict[str, Any]) -> str:
+        """Generate a response, retrying retryable provider errors."""
+        for attempt in count():
+            epoch = await self._admit(prompt)
+            try:
+                response = await self._client.generate_response(prompt, config)
+            except LLMProviderError as e:
+                await self._limiter.release(epoch, throttled=e.throttled or None)
+                await self._backoff(e, attempt)
+                continue
+            except BaseException:
+                await self._limiter.release(epoch)
+                raise
+            await self._limiter.release(epoch, throttled=False)
+            return response
+        raise AssertionError("unreachable: count() never ends")
+
+    async def stream_response(
+        self, prompt: str, config: dict[str, Any]
+    ) -> AsyncGenerator[str, None]:
+        """Stream a response, retrying failures that happen before the first chunk."""
+        for attempt in count():
+            epoch = await self._admit(prompt)
+            started = False
+            try:
+                async with aclosing(
+                    self._client.stream_response(prompt, config)
+                ) as stream:
+                    async for chunk in stream:
+                        started = True
+                        yield chunk
+            except LLMProviderError as e:
+                await self._limiter.release(epoch, throttled=e.throttled or None)
+                if started:
+                    raise
+                await self._backoff(e, attempt)
+                continue
+            except GeneratorExit:
+                # The consumer stopped reading, e.g. at a complete statement
+                await self._limiter.release(epoch, throttled=False)
+                raise
+            except BaseException:
+                await self._limiter.release(epoch)
+                raise
+            await self._limiter.release(epoch, throttled=False)
+            return
+
+    def get_provider_name(self) -> str:
+        """Get the provider name of the wrapped client."""
+        return self._client.get_provider_name()
+
+    async def _admit(self, prompt: str) -> int:
+        """Wait for request and token budget, then for a concurrency slot."""
+        with tracer.span("llm_admission", provider=self.get_provider_name()):
+            if self._requests is not None:
+                self.stats.wait_seconds += await self._requests.acquire()
+            if self._tokens is not None:
+                self.stats.wait_seconds += await self._tokens.acquire(
+                    estimate_tokens(prompt)
+                )
+            return await self._limiter.acquire()
+
+    async def _backoff(self, error: LLMProviderError, attempt: int) -> None:
+        """Sleep before the next attempt, or re-raise when retrying is pointless."""
+        if error.throttled:
+            self.stats.throttled += 1
+        if not error.retryable or attempt >= self._retry_policy.max_retries:
+            self.stats.failures += 1
+            raise error
+        delay = self._retry_policy.delay(attempt, error.retry_after)
+        self.stats.retries += 1
+        self.stats.wait_seconds += delay
+        logger.warning(
+            f"{self.get_provider_name()} request failed "
+            f"(status {error.status_code}), retry {attempt + 1}/"
+            f"{self._retry_policy.max_retries} in {delay:.1f}s"
+        )
+        await asyncio.sleep(delay)
@@ -0,0 +1,169 @@
+# src/core/sql_normalizer.py
+import re
+from dataclasses import dataclass
+from enum import Enum
+from hashlib import sha256
+from typing import Any
+
+from core.types import DatabaseType
+
+
+class TokenType(Enum):
+    """Lexical categories produced by the SQL tokenizer."""
+
+    WHITESPACE = "whitespace"
+    COMMENT = "comment"
+    STRING = "string"
+    QUOTED_IDENTIFIER = "quoted_identifier"
+    NUMBER = "number"
+    WORD = "word"
+    PARAMETER = "parameter"
+    PUNCTUATION = "punctuation"
+
+
+@dataclass(frozen=True)
+class SqlToken:
+    """A single lexical token of a SQL text."""
+
+    type: TokenType
+    value: str
+    start: int
+
+    @property
+    def upper(self) -> str:
+        """Token text in upper case, handy for keyword comparisons."""
+        return self.value.upper()
+
+
+SQL_KEYWORDS = frozenset("""
+    ADD ALL ALTER AND ANY AS ASC BEGIN BETWEEN BODY BY CASE CAST CHECK COLUMN
+    COMMIT CONNECT CONSTRAINT CREATE CROSS CURRENT DECLARE DEFAULT DELETE DESC
+    DISTINCT DROP ELSE ELSIF END ESCAPE EXCEPT EXCEPTION EXISTS EXPLAIN FETCH
+    FIRST FOR FOREIGN FROM FULL FUNCTION GLOB GROUP HAVING IF IN INDEX INNER
+    INSERT INTERSECT INTERVAL INTO IS JOIN KEY LEFT LIKE LIMIT LOOP MATCHED
+    MERGE MINUS NATURAL NEXT NOT NULL NULLS OF OFFSET ON ONLY OR ORDER OUTER
+    OVER PACKAGE PARTITION PRAGMA PRIMARY PRIOR PROCEDURE RECURSIVE REFERENCES
+    REPLACE RETURN RETURNING RIGHT ROLLBACK ROW ROWS SELECT SET START TABLE
+    THEN TO TRIGGER TRUNCATE UNION UNIQUE UPDATE USING VALUES VIEW WHEN WHERE
+    WINDOW WITH WITHOUT
+    """.split())
+
+_TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<whitespace>\s+)
+    | (?P<comment>--[^\n]*|/\*.*?(?:\*/|\Z))
+    | (?P<string>[nN]?[qQ]'(?:\[.*?\]|\(.*?\)|\{.*?\}|<.*?>|(?P<q>.).*?(?P=q))'
+        | [xXnN]?'(?:[^']|'')*(?:'|\Z))
+    | (?P<quoted_identifier>"(?:[^"]|"")*(?:"|\Z)|`[^`]*(?:`|\Z)|\[[^\]]*(?:\]|\Z))
+    | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<word>[^\W\d]\w*(?:[$#]\w*)*)
+    | (?P<parameter>\?\d*|[:@$]\w+)
+    | (?P<punctuation>\|\||<=|>=|<>|!=|:=|=>|::|\S)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# Token types that need a separating space when adjacent to one another
+_WORD_LIKE = frozenset(
+    {
+        TokenType.WORD,
+        TokenType.NUMBER,
+        TokenType.STRING,
+        TokenType.QUOTED_IDENTIFIER,
+        TokenType.PARAMETER,
+    }
+)
+
+
+def tokenize_sql(sql: str) -> list[SqlToken]:
+    """Split SQL text into tokens, keeping whitespace and comments."""
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(sql):
+        kind = next(
+            name for name, value in match.groupdict().items() if value and name != "q"
+        )
+        tokens.append(SqlToken(TokenType(kind), match.group(), match.start()))
+    return tokens
+
+
+def normalize_sql(sql: str, parameterize_literals: bool = False) -> str:
+    """
+    Produce a canonical form of a SQL text.
+
+    Comments are dropped, whitespace collapses to the minimum needed to keep
+    tokens apart, keywords are upper-cased and unquoted identifiers are
+    lower-cased (both are case-insensitive in Oracle and SQLite). Trailing
+    semicolons are ignored. With ``parameterize_literals`` every string and
+    numeric literal becomes ``?`` and literal IN lists collapse to ``IN (?)``.
+    """
+    parts: list[str] = []
+    previous: TokenType | None = None
+    for token in tokenize_sql(sql):
+        if token.type in (TokenType.WHITESPACE, TokenType.COMMENT):
+            continue
+
+        if token.type == TokenType.WORD:
+            value = token.upper if token.upper in SQL_KEYWORDS else token.value.lower()
+        elif parameterize_literals and token.type in (
+            TokenType.STRING,
+            TokenType.NUMBER,
+        ):
+            value = "?"
+        else:
+            value = token.value
+
+        if previous in _WORD_LIKE and token.type in _WORD_LIKE:
+            parts.append(" ")
+        parts.append(value)
+        previous = token.type
+
+    normalized = "".join(parts).rstrip(";")
+    if parameterize_literals:
+        normalized = re.sub(r"IN\((?:\?,)*\?\)", "IN(?)", normalized)
+    return normalized
+
+
+def fingerprint_sql(
+    sql: str, database_type: DatabaseType, parameterize_literals: bool = False
+) -> str:
+    """Generate a formatting-insensitive hash for a SQL query and database type."""
+    return sha256(
+        f"{database_type.value}:{normalize_sql(sql, parameterize_literals)}".encode(
+            "utf-8"
+        )
+    ).hexdigest()[:16]
+
+
+def null_bindings(sql: str) -> dict[str, Any] | list[None]:
+    """NULL values for every bind parameter so the statement can be executed."""
+    parameters = [
+        token.value for token in tokenize_sql(sql) if token.type == TokenType.PARAMETER
+    ]
+    named = {p[1:] for p in parameters if not p.startswith("?")}
+    if not any(p.startswith("?") for p in parameters):
+        return dict.fromkeys(named)
+    return [None] * (sum(p.startswith("?") for p in parameters) + len(named))
+
+
+def compact_sql(sql: str) -> str:
+    """
+    Shrink a SQL text for use in prompts without changing what it does.
+
+    Comments other than optimizer hints (``/*+ ... */``) are dropped and every
+    whitespace run becomes a single space. Literals are never shortened, as
+    the model's answer has to reproduce every one of them.
+    """
+    parts: list[str] = []
+    spaced = False
+    for token in tokenize_sql(sql):
+        if token.type == TokenType.WHITESPACE or (
+            token.type == TokenType.COMMENT and not token.value.startswith("/*+")
+        ):
+            spaced = bool(parts)
+            continue
+
+        if spaced:
+            parts.append(" ")
+            spaced = False
+        parts.append(token.value)
+    return "".join(parts)
@@ -0,0 +1,111 @@
+# tests/test_caching.py
+import asyncio
+from contextlib import aclosing
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from core.caching import CachingLLMClient
+from core.interfaces import ResponseCache
+
+
+class _DictCache(ResponseCache):
+    """In-memory stand-in for a response cache."""
+
+    def __init__(self) -> None:
+        self.entries: dict[str, str] = {}
+
+    async def get(self, key: str) -> str | None:
+        return self.entries.get(key)
+
+    async def set(self, key: str, response: str) -> None:
+        self.entries[key] = response
+
+
+class TestCachingLLMClient:
+    """Test CachingLLMClient functionality."""
+
+    @pytest.fixture
+    def caching_client(self, mock_llm_client: Mock) -> CachingLLMClient:
+        """Create caching client around the mock LLM client."""
+        return CachingLLMClient(mock_llm_client, _DictCache())
+
+    @pytest.mark.asyncio
+    async def test_repeated_prompt_is_served_from_cache(self, caching_client):
+        """Test identical prompt and config only reach the provider once."""
+        config = {"model_name": "m", "temperature": 0.1}
+
+        first = await caching_client.generate_response("prompt", config)
+        second = await caching_client.generate_response("prompt", dict(config))
+
+        assert first == second == "Generated response"
+        assert caching_client._client.generate_response.call_count == 1
+        assert (caching_client.stats.hits, caching_client.stats.misses) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_config_is_part_of_the_key(self, caching_client):
+        """Test a different generation config is a cache miss."""
+        await caching_client.generate_response("prompt", {"temperature": 0.1})
+        await caching_client.generate_response("prompt", {"temperature": 0.9})
+
+        assert caching_client.stats.misses == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_prompts_share_one_call(self, mock_llm_client):
+        """Test in-flight duplicates wait for the first provider call."""
+
+        async def slow_response(prompt, config):
+            await asyncio.sleep(0.01)
+            return "slow"
+
+        mock_llm_client.generate_response = AsyncMock(side_effect=slow_response)
+        client = CachingLLMClient(mock_llm_client, _DictCache())
+
+        results = await asyncio.gather(
+            *(client.generate_response("prompt", {}) for _ in range(5))
+        )
+
+        assert results == ["slow"] * 5
+        assert mock_llm_client.generate_response.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_errors_are_not_cached(self, caching_client):
+        """Test failed generations are retried on the next call."""
+        caching_client._client.generate_response.side_effect = [
+            RuntimeError("boom"),
+            "recovered",
+        ]
+        with pytest.raises(RuntimeError):
+            await caching_client.generate_response("prompt", {})
+
+        assert await caching_client.generate_response("prompt", {}) == "recovered"
+
+    @pytest.mark.asyncio
+    async def test_stream_is_cached_and_replayed(self, caching_client):
+        """Test a streamed response is replayed from the cache."""
+        first = [c async for c in caching_client.stream_response("prompt", {})]
+        second = [c async for c in caching_client.stream_response("prompt", {})]
+
+        assert "".join(first) == "".join(second) == "Generated response"
+        assert (caching_client.stats.hits, caching_client.stats.misses) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_early_stopped_stream_cached_only_with_stop_rule(
+        self, mock_llm_client
+    ):
+        """Test truncated streams are cached only when the config declares it."""
+
+        async def stream_response(prompt, config):
+            for chunk in ["SELECT 1;", " trailing"]:
+                yield chunk
+
+        mock_llm_client.stream_response = stream_response
+        cache = _DictCache()
+        client = CachingLLMClient(mock_llm_client, cache)
+
+        for config in ({}, {"stop_at": "sql_statement"}):
+            async with aclosing(client.stream_response("prompt", config)) as stream:
+                async for _ in stream:
+                    break
+
+        assert list(cache.entries.values()) == ["SELECT 1;"]
@@ -0,0 +1,105 @@
+# tests/test_cassette.py
+from contextlib import aclosing
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+from config.config import OptimizerConfig
+from core.cassette import CassetteLLMClient, CassetteMissError
+from core.client import LLMClientFactory
+from infra.cassette import SqliteCassette
+
+
+class TestCassetteLLMClient:
+    """Test recording LLM interactions and replaying them offline."""
+
+    @pytest.fixture
+    def cassette(self, tmp_path: Path) -> SqliteCassette:
+        """Empty cassette in the temporary directory."""
+        return SqliteCassette(tmp_path / "cassette.db")
+
+    @pytest.mark.asyncio
+    async def test_record_then_replay(self, cassette, mock_llm_client: Mock):
+        """Test replayed answers match the recording without calling the provider."""
+        recorder = CassetteLLMClient("test", cassette, "record", mock_llm_client)
+        recorded = await recorder.generate_response("prompt", {"temperature": 0.1})
+
+        replayer = CassetteLLMClient("test", cassette, "replay")
+        replayed = await replayer.generate_response("prompt", {"temperature": 0.1})
+
+        assert replayed == recorded == "Generated response"
+        assert mock_llm_client.generate_response.call_count == 1
+        assert (recorder.stats.recorded, replayer.stats.replayed) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_missing_request_fails_loudly(self, cassette):
+        """Test an unrecorded prompt or config raises instead of calling out."""
+        replayer = CassetteLLMClient("test", cassette, "replay")
+
+        with pytest.raises(CassetteMissError):
+            await replayer.generate_response("prompt", {"temperature": 0.1})
+        with pytest.raises(CassetteMissError):
+            [chunk async for chunk in replayer.stream_response("prompt", {})]
+
+    @pytest.mark.asyncio
+    async def test_stopped_stream_records_truncated_text(self, cassette):
+        """Test streams cut at a declared stop replay as the truncated text."""
+        provider = Mock()
+
+        async def stream_response(prompt, config):
+            for chunk in ["SELECT 1;", " trailing commentary"]:
+                yield chunk
+
+        provider.stream_response = stream_response
+        recorder = CassetteLLMClient("test", cassette, "record", provider)
+        config = {"stop_at": "sql_statement"}
+        async with aclosing(recorder.stream_response("prompt", config)) as stream:
+            async for chunk in stream:
+                break
+
+        replayer = CassetteLLMClient("test", cassette, "replay")
+        chunks = [chunk async for chunk in replayer.stream_response("prompt", config)]
+
+        assert chunks == ["SELECT 1;"]
+
+    @pytest.mark.asyncio
+    async def test_replay_latency_is_scaled(self, cassette, monkeypatch):
+        """Test replays wait the recorded latency times the configured fraction."""
+        await cassette.record("key", "test", "prompt", {}, "answer", 2.0)
+        sleeps = []
+
+        async def sleep(seconds):
+            sleeps.append(seconds)
+
+        monkeypatch.setattr("core.cassette.asyncio.sleep", sleep)
+        replayer = CassetteLLMClient("test", cassette, "replay", replay_latency=0.5)
+
+        assert await replayer._replay("key", "prompt") == "answer"
+        assert sleeps == [1.0]
+
+    def test_factory_replays_without_api_key(self, tmp_path: Path, monkeypatch):
+        """Test replay mode needs no provider credentials but an existing cassette."""
+        monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+        cassette_path = tmp_path / "cassette.db"
+        config = OptimizerConfig(cassette_path=cassette_path)
+
+        with pytest.raises(FileNotFoundError):
+            LLMClientFactory.create_client(config)
+        SqliteCassette(cassette_path).close()
+        client = LLMClientFactory.create_client(config)
+
+        assert isinstance(client, CassetteLLMClient) and client.mode == "replay"
+
+    def test_factory_records_outside_the_cache(self, tmp_path: Path):
+        """Test recording wraps the cache so that cache hits are recorded too."""
+        config = OptimizerConfig(
+            cassette_path=tmp_path / "cassette.db",
+            cassette_mode="record",
+            cache_path=tmp_path / "cache.db",
+        )
+
+        client = LLMClientFactory.create_client(config, api_key="test-key")
+
+        assert isinstance(client, CassetteLLMClient) and client.mode == "record"
+        assert type(client.client).__name__ == "CachingLLMClient"
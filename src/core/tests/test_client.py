@@ -0,0 +1,149 @@
+# tests/test_client.py
+import asyncio
+from contextlib import aclosing
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import Mock
+
+import pytest
+
+from config.config import OptimizerConfig
+from core.client import (
+    AnthropicLLMClient,
+    GeminiLLMClient,
+    LLMClientFactory,
+    OpenAILLMClient,
+)
+
+
+class _SlowCompletions:
+    """Fake async OpenAI completions endpoint that tracks concurrency."""
+
+    def __init__(self, delay: float = 0.05) -> None:
+        self.delay = delay
+        self.in_flight = 0
+        self.peak = 0
+
+    async def create(self, **kwargs):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        message = SimpleNamespace(content=f"answer:{kwargs['messages'][0]['content']}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class TestLLMClients:
+    """Test provider client implementations."""
+
+    @pytest.fixture
+    def completions(self) -> _SlowCompletions:
+        """Create fake completions endpoint."""
+        return _SlowCompletions()
+
+    def _openai_client(self, completions: _SlowCompletions, limit: int):
+        # Stands in for the SDK client, which the provider client only duck-types
+        sdk: Any = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        return OpenAILLMClient(sdk, max_concurrent_requests=limit)
+
+    @pytest.mark.asyncio
+    async def test_requests_overlap_on_event_loop(self, completions):
+        """Test concurrent requests do not block each other."""
+        client = self._openai_client(completions, limit=10)
+
+        results = await asyncio.gather(
+            *(client.generate_response(f"q{i}", {}) for i in range(10))
+        )
+
+        assert results == [f"answer:q{i}" for i in range(10)]
+        assert completions.peak == 10
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit_is_enforced(self, completions):
+        """Test in-flight requests never exceed the configured limit."""
+        client = self._openai_client(completions, limit=3)
+
+        await asyncio.gather(*(client.generate_response("q", {}) for _ in range(9)))
+
+        assert completions.peak == 3
+
+    @pytest.mark.asyncio
+    async def test_gemini_uses_async_models(self):
+        """Test Gemini client awaits the aio endpoint."""
+        models = Mock()
+
+        async def generate_content(**kwargs):
+            return SimpleNamespace(text="gemini answer")
+
+        models.generate_content = generate_content
+        client = GeminiLLMClient(SimpleNamespace(aio=SimpleNamespace(models=models)))
+
+        assert await client.generate_response("prompt", {}) == "gemini answer"
+
+    @pytest.mark.asyncio
+    async def test_provider_error_is_wrapped(self):
+        """Test SDK failures surface as RuntimeError."""
+
+        async def create(**kwargs):
+            raise ConnectionError("boom")
+
+        client = AnthropicLLMClient(
+            SimpleNamespace(messages=SimpleNamespace(create=create))
+        )
+        with pytest.raises(RuntimeError, match="Anthropic"):
+            await client.generate_response("prompt", {})
+
+    def test_invalid_concurrency_limit(self):
+        """Test a non-positive limit is rejected."""
+        with pytest.raises(ValueError):
+            OpenAILLMClient(Mock(), max_concurrent_requests=0)
+
+    def test_factory_applies_configured_limit(self):
+        """Test factory passes the per-provider limit to the client."""
+        config = OptimizerConfig(provider="openai", max_concurrent_requests=2)
+
+        client = LLMClientFactory.create_client(config, api_key="test-key")
+
+        assert client.get_provider_name() == "openai"
+        assert client.max_concurrent_requests == 2
+
+    def test_default_limit_depends_on_provider(self):
+        """Test provider default concurrency is used when unset."""
+        assert OptimizerConfig(provider="claude").max_concurrent_requests == 4
+        assert OptimizerConfig(provider="gemini").max_concurrent_requests == 8
+
+    @pytest.mark.asyncio
+    async def test_openai_stream_is_closed_on_early_stop(self):
+        """Test stopping a stream early closes the provider stream."""
+
+        class _Stream:
+            closed = False
+
+            def __aiter__(self):
+                return self._chunks()
+
+            async def _chunks(self):
+                for text in ["SELECT 1;", " more", " text"]:
+                    delta = SimpleNamespace(content=text)
+                    yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+            async def close(self):
+                self.closed = True
+
+        stream = _Stream()
+
+        async def create(**kwargs):
+            assert kwargs["stream"] is True
+            return stream
+
+        client = OpenAILLMClient(
+            SimpleNamespace(
+                chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+            )
+        )
+        async with aclosing(client.stream_response("prompt", {})) as chunks:
+            async for chunk in chunks:
+                break
+
+        assert chunk == "SELECT 1;"
+        assert stream.closed
@@ -0,0 +1,175 @@
+# tests/test_hedging.py
+import asyncio
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from config.config import OptimizerConfig
+from core.client import LLMClientFactory
+from core.hedging import HedgedLLMClient, HedgeTarget, LatencyHistogram
+from core.resilience import ResilientLLMClient
+
+
+def _provider(name: str, response: str = "", delay: float = 0.0, error=None) -> Mock:
+    """Provider client answering after a delay, or failing."""
+    provider = Mock()
+    provider.get_provider_name.return_value = name
+    provider.closed = False
+
+    async def generate_response(prompt, config):
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return f"{response or name}:{config['model_name']}"
+
+    async def stream_response(prompt, config):
+        try:
+            yield await generate_response(prompt, config)
+            yield "!"
+        finally:
+            provider.closed = True
+
+    provider.generate_response = AsyncMock(side_effect=generate_response)
+    provider.stream_response = stream_response
+    return provider
+
+
+def _client(*providers: Mock, **options) -> HedgedLLMClient:
+    options.setdefault("default_hedge_delay", 0.05)
+    return HedgedLLMClient(
+        [HedgeTarget(p, f"{p.get_provider_name()}-model") for p in providers],
+        **options,
+    )
+
+
+class TestLatencyHistogram:
+    """Test latency bucketing and percentiles."""
+
+    def test_percentiles(self):
+        """Test percentiles are bucket upper bounds covering the samples."""
+        histogram = LatencyHistogram()
+        for seconds in [0.1] * 90 + [5.0] * 10:
+            histogram.record(seconds)
+
+        assert histogram.count == 100
+        assert 0.1 <= histogram.percentile(0.5) < 0.13
+        assert 5.0 <= histogram.percentile(0.95) < 6.3
+        assert LatencyHistogram().percentile(0.95) is None
+
+    def test_round_trip(self):
+        """Test histograms survive serialization."""
+        histogram = LatencyHistogram()
+        histogram.record(1.0)
+
+        restored = LatencyHistogram.from_dict(histogram.to_dict())
+
+        assert restored.count == 1
+        assert restored.percentile(0.5) == histogram.percentile(0.5)
+
+
+class TestHedgedLLMClient:
+    """Test hedging and failover across providers."""
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self):
+        """Test a prompt answer never reaches the fallback."""
+        primary, fallback = _provider("gemini"), _provider("openai")
+        client = _client(primary, fallback)
+
+        assert await client.generate_response("prompt", {}) == "gemini:gemini-model"
+        fallback.generate_response.assert_not_called()
+        assert client.stats.hedged == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_is_hedged(self):
+        """Test the fallback's answer wins when the primary is slow."""
+        primary, fallback = _provider("gemini", delay=5), _provider("openai")
+        client = _client(primary, fallback)
+
+        assert await client.generate_response("prompt", {}) == "openai:openai-model"
+        assert client.stats.hedged == 1
+        assert client.stats.secondary_wins == 1
+
+    @pytest.mark.asyncio
+    async def test_errors_and_timeouts_fail_over(self):
+        """Test failing and timed-out providers fall through to the next one."""
+        client = _client(
+            _provider("gemini", error=RuntimeError("down")),
+            _provider("openai", delay=5),
+            _provider("claude", delay=0.01),
+            default_hedge_delay=10,
+            request_timeout=0.05,
+        )
+
+        assert await client.generate_response("prompt", {}) == "claude:claude-model"
+        assert client.stats.failovers == 2
+        assert client.stats.hedged == 0
+
+    @pytest.mark.asyncio
+    async def test_all_providers_failing_raises_last_error(self):
+        """Test the last provider error is raised when nobody answers."""
+        client = _client(
+            _provider("gemini", error=RuntimeError("first")),
+            _provider("openai", error=RuntimeError("last")),
+        )
+
+        with pytest.raises(RuntimeError, match="last"):
+            await client.generate_response("prompt", {})
+
+    @pytest.mark.asyncio
+    async def test_hedge_delay_follows_recorded_latency(self):
+        """Test the hedge threshold is the percentile of recorded latencies."""
+        primary = _provider("gemini")
+        client = _client(primary, _provider("openai"), min_samples=3)
+        target = HedgeTarget(primary, "gemini-model")
+
+        assert client.hedge_delay(target, "response") == 0.05
+        for _ in range(3):
+            await client.generate_response("prompt", {})
+
+        assert client.hedge_delay(target, "response") == 0.05
+        assert client.latencies["gemini:gemini-model"]["response"].count == 3
+
+    @pytest.mark.asyncio
+    async def test_stream_races_first_chunk(self):
+        """Test streams continue from the first provider to produce a chunk."""
+        primary, fallback = _provider("gemini", delay=5), _provider("openai")
+        client = _client(primary, fallback)
+
+        chunks = [chunk async for chunk in client.stream_response("prompt", {})]
+
+        assert chunks == ["openai:openai-model", "!"]
+        assert primary.closed and fallback.closed
+        assert client.latencies["openai:openai-model"]["first_chunk"].count == 1
+
+    @pytest.mark.asyncio
+    async def test_latencies_persist(self, tmp_path: Path):
+        """Test recorded latencies are loaded by the next client."""
+        path = tmp_path / "latency.json"
+        client = _client(_provider("gemini"), latency_path=path)
+        await client.generate_response("prompt", {})
+        client.save_latencies()
+
+        reloaded = _client(_provider("gemini"), latency_path=path)
+
+        assert reloaded.latencies["gemini:gemini-model"]["response"].count == 1
+
+    def test_factory_builds_hedged_client(self, monkeypatch):
+        """Test fallback providers get their own resilient client and model."""
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+        config = OptimizerConfig(
+            provider="openai", fallback_providers=("claude:claude-x",), cache_path=None
+        )
+
+        client = LLMClientFactory.create_client(config, api_key="test-key")
+
+        assert isinstance(client, HedgedLLMClient)
+        assert [c.get_provider_name() for c in client.clients] == ["openai", "claude"]
+        assert all(isinstance(c, ResilientLLMClient) for c in client.clients)
+        assert config.get_fallback_configs()[0].model_name == "claude-x"
+
+    def test_invalid_fallback_provider(self):
+        """Test unknown fallback providers are rejected."""
+        with pytest.raises(ValueError):
+            OptimizerConfig(fallback_providers=("mystery",))
@@ -0,0 +1,20 @@
+# tests/test_prompt_compaction.py
+from core.prompt_compaction import compact_text, estimate_tokens
+
+
+class TestPromptCompaction:
+    """Test prompt text compaction and token estimation."""
+
+    def test_compact_text_dedents_and_collapses_blank_lines(self):
+        """Test indentation, trailing spaces and blank line runs are removed."""
+        text = "\n        First line   \n\n\n\n        Second line\n        "
+
+        assert compact_text(text) == "First line\n\nSecond line"
+        assert compact_text("a\n    b  ", dedent=False) == "a\n    b"
+
+    def test_estimate_tokens(self):
+        """Test token estimates grow with words, numbers and whitespace runs."""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("SELECT id FROM users") == 6
+        assert estimate_tokens("1234567") == 3
+        assert estimate_tokens("a" + " " * 16 + "b") == estimate_tokens("a b") + 2
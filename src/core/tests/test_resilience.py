@@ -0,0 +1,190 @@
+# tests/test_resilience.py
+import asyncio
+import random
+from contextlib import aclosing
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from core.exceptions import LLMProviderError
+from core.resilience import (
+    AdaptiveConcurrencyLimiter,
+    ResilientLLMClient,
+    RetryPolicy,
+    TokenBucket,
+)
+
+
+class _StatusError(Exception):
+    """SDK-style error carrying an HTTP status and response headers."""
+
+    def __init__(self, status_code: int, headers: dict | None = None) -> None:
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+def _provider_error(status_code: int) -> LLMProviderError:
+    return LLMProviderError.from_exception("failed", _StatusError(status_code))
+
+
+class TestProviderErrors:
+    """Test classification of provider failures."""
+
+    def test_classification(self):
+        """Test status codes, Retry-After and connection errors are classified."""
+        throttled = LLMProviderError.from_exception(
+            "failed", _StatusError(429, {"retry-after": "7"})
+        )
+        bad_request = _provider_error(400)
+        server_error = _provider_error(502)
+        connection = LLMProviderError.from_exception("failed", ConnectionError())
+
+        assert throttled.retryable and throttled.throttled
+        assert throttled.retry_after == 7.0
+        assert not bad_request.retryable
+        assert server_error.retryable and not server_error.throttled
+        assert connection.retryable and connection.status_code is None
+
+
+class TestRateLimiting:
+    """Test token buckets, backoff and adaptive concurrency."""
+
+    @pytest.mark.asyncio
+    async def test_token_bucket_waits_for_refill(self):
+        """Test acquiring past the capacity waits for the refill rate."""
+        bucket = TokenBucket(per_minute=600, capacity=2)
+
+        waits = [await bucket.acquire() for _ in range(3)]
+
+        assert waits[:2] == [0.0, 0.0]
+        assert 0.05 < waits[2] < 0.5
+        # Oversized requests are capped at the capacity instead of hanging
+        assert await bucket.acquire(1000) < 0.5
+
+    def test_retry_delay(self):
+        """Test full jitter stays under the exponential ceiling and Retry-After."""
+        policy = RetryPolicy(base_delay=1.0, max_delay=8.0)
+        rng = random.Random(0)
+
+        delays = [policy.delay(attempt, rng=rng) for attempt in range(10)]
+
+        assert all(0 <= d <= min(8.0, 2**a) for a, d in enumerate(delays))
+        assert policy.delay(0, retry_after=30.0, rng=rng) == 30.0
+
+    @pytest.mark.asyncio
+    async def test_aimd_limit(self):
+        """Test throttling halves the limit once per burst and successes regrow it."""
+        limiter = AdaptiveConcurrencyLimiter(max_limit=8)
+        epochs = [await limiter.acquire() for _ in range(4)]
+
+        await limiter.release(epochs[0], throttled=True)
+        await limiter.release(epochs[1], throttled=True)
+
+        assert limiter.limit == 4
+        for _ in range(8):
+            await limiter.release(await limiter.acquire(), throttled=False)
+        assert limiter.limit == 5
+
+
+class TestResilientLLMClient:
+    """Test retries and admission control around a provider client."""
+
+    @pytest.fixture
+    def provider(self) -> Mock:
+        """Provider client whose responses are set per test."""
+        provider = Mock()
+        provider.get_provider_name.return_value = "test"
+        return provider
+
+    def _client(self, provider: Mock, **options) -> ResilientLLMClient:
+        return ResilientLLMClient(
+            provider,
+            max_concurrent_requests=4,
+            retry_policy=RetryPolicy(max_retries=3, base_delay=0.001),
+            **options,
+        )
+
+    @pytest.mark.asyncio
+    async def test_retries_throttled_requests(self, provider: Mock):
+        """Test 429s are retried until the provider answers."""
+        provider.generate_response = AsyncMock(
+            side_effect=[_provider_error(429), _provider_error(503), "answer"]
+        )
+        client = self._client(provider)
+
+        assert await client.generate_response("prompt", {}) == "answer"
+        assert client.stats.retries == 2
+        assert client.stats.throttled == 2
+        assert client.max_concurrent_requests == 2
+
+    @pytest.mark.asyncio
+    async def test_gives_up_on_permanent_errors(self, provider: Mock):
+        """Test non-retryable errors and exhausted retries are raised."""
+        provider.generate_response = AsyncMock(side_effect=_provider_error(400))
+        client = self._client(provider)
+
+        with pytest.raises(LLMProviderError):
+            await client.generate_response("prompt", {})
+        assert provider.generate_response.call_count == 1
+
+        provider.generate_response = AsyncMock(side_effect=_provider_error(500))
+        with pytest.raises(LLMProviderError):
+            await client.generate_response("prompt", {})
+        assert provider.generate_response.call_count == 4
+
+    @pytest.mark.asyncio
+    async def test_stream_retried_before_first_chunk(self, provider: Mock):
+        """Test a stream failing before any output is retried from scratch."""
+        attempts = 0
+
+        async def stream_response(prompt, config):
+            nonlocal attempts
+            attempts += 1
+            if attempts == 1:
+                raise _provider_error(429)
+            for chunk in ["SELECT ", "1;"]:
+                yield chunk
+
+        provider.stream_response = stream_response
+        client = self._client(provider)
+
+        chunks = [chunk async for chunk in client.stream_response("prompt", {})]
+
+        assert chunks == ["SELECT ", "1;"]
+        assert attempts == 2
+
+    @pytest.mark.asyncio
+    async def test_stream_stopped_early_counts_as_success(
+        self, provider: Mock, monkeypatch
+    ):
+        """Test closing a stream after its first chunk releases the slot as a success."""
+
+        async def stream_response(prompt, config):
+            for chunk in ["SELECT 1;", " trailing"]:
+                yield chunk
+
+        provider.stream_response = stream_response
+        client = self._client(provider)
+        release = AsyncMock(wraps=client._limiter.release)
+        monkeypatch.setattr(client._limiter, "release", release)
+
+        async with aclosing(client.stream_response("prompt", {})) as chunks:
+            async for chunk in chunks:
+                break
+
+        release.assert_awaited_once_with(0, throttled=False)
+
+    @pytest.mark.asyncio
+    async def test_request_quota_spaces_requests(self, provider: Mock):
+        """Test the request bucket delays requests beyond the quota."""
+        provider.generate_response = AsyncMock(return_value="answer")
+        client = self._client(provider, requests_per_minute=1200)
+        client._requests = TokenBucket(per_minute=1200, capacity=1)
+
+        start = asyncio.get_running_loop().time()
+        await asyncio.gather(*(client.generate_response("p", {}) for _ in range(3)))
+
+        assert asyncio.get_running_loop().time() - start >= 0.09
+        assert client.stats.wait_seconds > 0
@@ -0,0 +1,92 @@
+# tests/test_sql_normalizer.py
+import pytest
+
+from core.sql_normalizer import (
+    TokenType,
+    compact_sql,
+    fingerprint_sql,
+    normalize_sql,
+    tokenize_sql,
+)
+from core.types import DatabaseType
+
+
+class TestSqlNormalizer:
+    """Test SQL normalization and fingerprinting."""
+
+    @pytest.mark.parametrize(
+        "variant",
+        [
+            "select id, name from users where age > 18;",
+            "SELECT id,\n       name\n  FROM users\n WHERE age>18",
+            "-- active users\nSELECT id, name FROM users /* adults */ WHERE age > 18;",
+            "Select ID, Name From Users Where Age > 18 ;",
+        ],
+    )
+    def test_formatting_variants_share_fingerprint(self, variant: str):
+        """Test whitespace, case and comments do not change the fingerprint."""
+        base = "SELECT id, name FROM users WHERE age > 18;"
+
+        assert fingerprint_sql(variant, DatabaseType.ORACLE) == fingerprint_sql(
+            base, DatabaseType.ORACLE
+        )
+
+    def test_semantic_changes_change_fingerprint(self):
+        """Test literal and string content still distinguish queries."""
+        assert normalize_sql("SELECT * FROM t WHERE a = 'X'") != normalize_sql(
+            "SELECT * FROM t WHERE a = 'x'"
+        )
+        assert normalize_sql("SELECT * FROM t WHERE a > 1") != normalize_sql(
+            "SELECT * FROM t WHERE a > 2"
+        )
+
+    def test_comment_markers_inside_strings_are_kept(self):
+        """Test string literals are not mistaken for comments."""
+        assert (
+            normalize_sql("SELECT '--not a comment' FROM dual")
+            == "SELECT '--not a comment' FROM dual"
+        )
+
+    def test_parameterize_literals(self):
+        """Test literal parameterization and IN-list collapsing."""
+        first = normalize_sql("SELECT * FROM t WHERE a = 'x' AND b IN (1, 2, 3)", True)
+        second = normalize_sql("SELECT * FROM t WHERE a = 'y' AND b IN (4)", True)
+
+        assert first == second == "SELECT*FROM t WHERE a=? AND b IN(?)"
+
+    def test_database_type_is_part_of_fingerprint(self):
+        """Test the same query differs across database types."""
+        query = "SELECT 1 FROM dual"
+
+        assert fingerprint_sql(query, DatabaseType.ORACLE) != fingerprint_sql(
+            query, DatabaseType.SQLITE
+        )
+
+    def test_tokenize_oracle_quoted_string(self):
+        """Test Oracle q-quoted strings are a single token."""
+        tokens = [
+            t for t in tokenize_sql("SELECT q'[it's]' FROM dual") if t.value.strip()
+        ]
+
+        assert tokens[1].type == TokenType.STRING
+        assert tokens[1].value == "q'[it's]'"
+
+    def test_compact_sql_drops_comments_but_keeps_hints(self):
+        """Test compaction removes comments and whitespace but not hints or strings."""
+        sql = (
+            "-- report\nSELECT /*+ INDEX(u) */ id,\n       name  /* pk */\n"
+            "  FROM users u\n WHERE note = 'a  -- b';"
+        )
+
+        assert compact_sql(sql) == (
+            "SELECT /*+ INDEX(u) */ id, name FROM users u WHERE note = 'a  -- b';"
+        )
+
+    def test_compact_sql_keeps_long_in_lists(self):
+        """Test every value of a long literal IN list survives compaction."""
+        values = ", ".join(str(i) for i in range(1, 101))
+        sql = f"SELECT * FROM t\n WHERE id IN ({values})\n   AND code IN ('a', -1)"
+
+        assert compact_sql(sql) == (
+            f"SELECT * FROM t WHERE id IN ({values}) AND code IN ('a', -1)"
+        )
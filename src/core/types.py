@@ -1,7 +1,9 @@
 # src/core/types.py (updated)
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
+from pathlib import Path
+from typing import Any
 
 
 class OptimizationStage(Enum):
@@ -27,8 +29,13 @@ class QueryMetadata:
     version: str
     last_optimization: datetime
     database_type: DatabaseType
+    # What produced this version, so unchanged queries can reuse it
+    optimized_query: str | None = None
+    model_name: str | None = None
+    prompt_version: str | None = None
+    settings_version: str | None = None
 
-    def to_dict(self) -> dict[str, str]:
+    def to_dict(self) -> dict[str, str | None]:
         """Convert to dictionary for JSON serialization."""
         return {
             "query_sql": self.query_sql,
@@ -36,8 +43,316 @@ class QueryMetadata:
             "version": self.version,
             "last_optimization": self.last_optimization.isoformat(),
             "database_type": self.database_type.value,
+            "optimized_query": self.optimized_query,
+            "model_name": self.model_name,
+            "prompt_version": self.prompt_version,
+            "settings_version": self.settings_version,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "QueryMetadata":
+        """Build metadata from its JSON representation."""
+        return cls(
+            query_sql=data["query_sql"],
+            explanation_text=data["explanation_text"],
+            version=data["version"],
+            last_optimization=datetime.fromisoformat(data["last_optimization"]),
+            # Handle backward compatibility for database_type
+            database_type=DatabaseType(data.get("database_type", "oracle")),
+            optimized_query=data.get("optimized_query"),
+            model_name=data.get("model_name"),
+            prompt_version=data.get("prompt_version"),
+            settings_version=data.get("settings_version"),
+        )
+
+
+@dataclass
+class QueryPlan:
+    """SQLite query plan of a single statement, with counts of notable steps."""
+
+    steps: list[str]
+    full_scans: int = 0
+    index_scans: int = 0
+    index_searches: int = 0
+    temp_btrees: int = 0
+    correlated_subqueries: int = 0
+    automatic_indexes: int = 0
+
+    @property
+    def cost(self) -> int:
+        """Rough relative cost used to rank plans of equivalent queries."""
+        return (
+            10 * self.full_scans
+            + 5 * self.index_scans
+            + self.index_searches
+            + 5 * self.temp_btrees
+            + 20 * self.correlated_subqueries
+            + 3 * self.automatic_indexes
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to dictionary for JSON serialization."""
+        return {
+            "steps": self.steps,
+            "full_scans": self.full_scans,
+            "index_scans": self.index_scans,
+            "index_searches": self.index_searches,
+            "temp_btrees": self.temp_btrees,
+            "correlated_subqueries": self.correlated_subqueries,
+            "automatic_indexes": self.automatic_indexes,
+            "cost": self.cost,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "QueryPlan":
+        """Create from dictionary."""
+        return cls(**{key: value for key, value in data.items() if key != "cost"})
+
+
+@dataclass
+class PlanComparison:
+    """Side-by-side query plans of the original and optimized queries."""
+
+    original: QueryPlan | None
+    optimized: QueryPlan | None
+    regressions: list[str] = field(default_factory=list)
+    improvements: list[str] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def has_regressions(self) -> bool:
+        """Whether the optimized query looks worse than the original."""
+        return bool(self.regressions)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to dictionary for JSON serialization."""
+        return {
+            "original": self.original.to_dict() if self.original else None,
+            "optimized": self.optimized.to_dict() if self.optimized else None,
+            "regressions": self.regressions,
+            "improvements": self.improvements,
+            "errors": self.errors,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "PlanComparison":
+        """Create from dictionary."""
+        return cls(
+            original=(
+                QueryPlan.from_dict(data["original"]) if data["original"] else None
+            ),
+            optimized=(
+                QueryPlan.from_dict(data["optimized"]) if data["optimized"] else None
+            ),
+            regressions=data.get("regressions", []),
+            improvements=data.get("improvements", []),
+            errors=data.get("errors", []),
+        )
+
+
+@dataclass
+class QueryTiming:
+    """Wall-clock timings of repeated executions of a single query."""
+
+    runs_ms: list[float]
+    row_count: int
+
+    @property
+    def p50_ms(self) -> float:
+        """Median execution time."""
+        return self._percentile(50)
+
+    @property
+    def p95_ms(self) -> float:
+        """95th percentile execution time (nearest rank)."""
+        return self._percentile(95)
+
+    def _percentile(self, percent: int) -> float:
+        """Nearest-rank percentile of the recorded runs."""
+        ordered = sorted(self.runs_ms)
+        rank = max(1, -(-len(ordered) * percent // 100))
+        return ordered[rank - 1]
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to dictionary for JSON serialization."""
+        return {
+            "p50_ms": round(self.p50_ms, 3),
+            "p95_ms": round(self.p95_ms, 3),
+            "runs": len(self.runs_ms),
+            "row_count": self.row_count,
+            "runs_ms": self.runs_ms,
         }
 
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "QueryTiming":
+        """Create from dictionary; the percentiles are derived from the runs."""
+        return cls(runs_ms=data["runs_ms"], row_count=data["row_count"])
+
+
+@dataclass
+class BenchmarkResult:
+    """Measured execution of the original and optimized queries on synthetic data."""
+
+    original: QueryTiming | None
+    optimized: QueryTiming | None
+    equivalent: bool
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def speedup(self) -> float | None:
+        """How many times faster the optimized query is, by median time."""
+        if self.original is None or self.optimized is None:
+            return None
+        if self.optimized.p50_ms == 0:
+            return None
+        return self.original.p50_ms / self.optimized.p50_ms
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to dictionary for JSON serialization."""
+        return {
+            "original": self.original.to_dict() if self.original else None,
+            "optimized": self.optimized.to_dict() if self.optimized else None,
+            "speedup": round(self.speedup, 3) if self.speedup is not None else None,
+            "equivalent": self.equivalent,
+            "errors": self.errors,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "BenchmarkResult":
+        """Create from dictionary."""
+        return cls(
+            original=(
+                QueryTiming.from_dict(data["original"]) if data["original"] else None
+            ),
+            optimized=(
+                QueryTiming.from_dict(data["optimized"]) if data["optimized"] else None
+            ),
+            equivalent=data["equivalent"],
+            errors=data.get("errors", []),
+        )
+
+
+@dataclass
+class AppliedRule:
+    """A deterministic rewrite rule that fired on a query."""
+
+    rule: str
+    description: str
+
+    def to_dict(self) -> dict[str, str]:
+        """Convert to dictionary for JSON serialization."""
+        return {"rule": self.rule, "description": self.description}
+
+
+@dataclass
+class RuleRewrite:
+    """Query produced by the rule-based pre-optimizer."""
+
+    query: str
+    applied_rules: list[AppliedRule] = field(default_factory=list)
+    # Nothing left for the LLM to improve, so its round trips can be skipped
+    complete: bool = False
+
+
+@dataclass
+class QueryFragment:
+    """A subquery cut out of a larger query to be optimized on its own."""
+
+    placeholder: str
+    query: str
+    # Drop-in rewrite, unset until optimized or when the rewrite was rejected
+    optimized_query: str | None = None
+    error: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to dictionary for JSON serialization."""
+        return {
+            "placeholder": self.placeholder,
+            "query": self.query,
+            "optimized_query": self.optimized_query,
+            "error": self.error,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "QueryFragment":
+        """Create from dictionary."""
+        return cls(**data)
+
+
+@dataclass
+class DecomposedQuery:
+    """A query split into an outer skeleton with placeholders and its fragments."""
+
+    skeleton: str
+    fragments: list[QueryFragment]
+    # Outer query rewritten by the compose pass, kept only if placeholders survived
+    optimized_skeleton: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to dictionary for JSON serialization."""
+        return {
+            "skeleton": self.skeleton,
+            "optimized_skeleton": self.optimized_skeleton,
+            "fragments": [fragment.to_dict() for fragment in self.fragments],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "DecomposedQuery":
+        """Create from dictionary."""
+        return cls(
+            skeleton=data["skeleton"],
+            fragments=[QueryFragment.from_dict(f) for f in data["fragments"]],
+            optimized_skeleton=data["optimized_skeleton"],
+        )
+
+
+@dataclass
+class RewriteCandidate:
+    """One sampled rewrite of a query and how it fared in local checks."""
+
+    index: int
+    query: str
+    valid: bool = True
+    score: float | None = None
+    error: str | None = None
+    plan_comparison: PlanComparison | None = None
+    benchmark: BenchmarkResult | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to dictionary for JSON serialization."""
+        return {
+            "index": self.index,
+            "query": self.query,
+            "valid": self.valid,
+            "score": self.score,
+            "error": self.error,
+            "plan_comparison": (
+                self.plan_comparison.to_dict() if self.plan_comparison else None
+            ),
+            "benchmark": self.benchmark.to_dict() if self.benchmark else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "RewriteCandidate":
+        """Create from dictionary."""
+        return cls(
+            index=data["index"],
+            query=data["query"],
+            valid=data["valid"],
+            score=data["score"],
+            error=data["error"],
+            plan_comparison=(
+                PlanComparison.from_dict(data["plan_comparison"])
+                if data["plan_comparison"]
+                else None
+            ),
+            benchmark=(
+                BenchmarkResult.from_dict(data["benchmark"])
+                if data["benchmark"]
+                else None
+            ),
+        )
+
 
 @dataclass
 class OptimizationResult:
@@ -48,3 +363,144 @@ class OptimizationResult:
     optimized_query: str
     metadata: QueryMetadata
     database_type: DatabaseType
+    output_path: Path | None = None
+    plan_comparison: PlanComparison | None = None
+    benchmark: BenchmarkResult | None = None
+    candidates: list[RewriteCandidate] = field(default_factory=list)
+    applied_rules: list[AppliedRule] = field(default_factory=list)
+    reused_stages: list[OptimizationStage] = field(default_factory=list)
+    # Estimated prompt tokens sent per stage, summed over candidate samples
+    prompt_tokens: dict[str, int] = field(default_factory=dict)
+    decomposition: DecomposedQuery | None = None
+    # Multi-statement scripts: per-statement results, errors by statement index
+    # and the reassembled script
+    statements: list["OptimizationResult"] = field(default_factory=list)
+    statement_errors: dict[int, str] = field(default_factory=dict)
+    script_path: Path | None = None
+
+
+@dataclass
+class BatchItemResult:
+    """Outcome of optimizing a single file within a batch run."""
+
+    sql_file: str
+    success: bool
+    duration_seconds: float
+    version: str | None = None
+    error: str | None = None
+    # Every LLM stage was skipped in favour of the stored result
+    reused: bool = False
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to dictionary for JSON serialization."""
+        return {
+            "sql_file": self.sql_file,
+            "success": self.success,
+            "duration_seconds": round(self.duration_seconds, 3),
+            "version": self.version,
+            "error": self.error,
+            "reused": self.reused,
+        }
+
+
+@dataclass
+class BatchSummary:
+    """Summary of a batch optimization run."""
+
+    database_type: DatabaseType
+    jobs: int
+    started_at: datetime
+    wall_time_seconds: float
+    items: list[BatchItemResult] = field(default_factory=list)
+
+    @property
+    def succeeded(self) -> list[BatchItemResult]:
+        """Items that were optimized successfully."""
+        return [item for item in self.items if item.success]
+
+    @property
+    def failed(self) -> list[BatchItemResult]:
+        """Items whose optimization raised an error."""
+        return [item for item in self.items if not item.success]
+
+    @property
+    def reused(self) -> list[BatchItemResult]:
+        """Items served entirely from stored results."""
+        return [item for item in self.items if item.reused]
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to dictionary for JSON serialization."""
+        durations = [item.duration_seconds for item in self.items]
+        return {
+            "database_type": self.database_type.value,
+            "jobs": self.jobs,
+            "started_at": self.started_at.isoformat(),
+            "wall_time_seconds": round(self.wall_time_seconds, 3),
+            "total": len(self.items),
+            "succeeded": len(self.succeeded),
+            "failed": len(self.failed),
+            "reused": len(self.reused),
+            "total_file_seconds": round(sum(durations), 3),
+            "max_file_seconds": round(max(durations, default=0.0), 3),
+            "items": [item.to_dict() for item in self.items],
+        }
+
+
+@dataclass
+class WatchedFile:
+    """Manifest entry tying a watched SQL file to the results generated for it."""
+
+    content_hash: str
+    mtime_ns: int
+    size: int
+    # Metadata entry keys (statement fingerprints), in statement order
+    statement_hashes: list[str]
+    output_path: str | None = None
+    script_path: str | None = None
+    version: str | None = None
+    # Last optimization failed; the file is retried on every pass until it succeeds
+    error: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to dictionary for JSON serialization."""
+        return {
+            "content_hash": self.content_hash,
+            "mtime_ns": self.mtime_ns,
+            "size": self.size,
+            "statement_hashes": self.statement_hashes,
+            "output_path": self.output_path,
+            "script_path": self.script_path,
+            "version": self.version,
+            "error": self.error,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "WatchedFile":
+        """Create from dictionary."""
+        return cls(
+            content_hash=data["content_hash"],
+            mtime_ns=data["mtime_ns"],
+            size=data["size"],
+            statement_hashes=data["statement_hashes"],
+            output_path=data.get("output_path"),
+            script_path=data.get("script_path"),
+            version=data.get("version"),
+            error=data.get("error"),
+        )
+
+
+@dataclass
+class WatchRun:
+    """Outcome of one pass over the watched files."""
+
+    # Files whose content changed, re-optimized as a batch
+    summary: BatchSummary | None = None
+    # New or edited statements among them; the rest reuse their stored results
+    changed_statements: int = 0
+    # Files deleted since the last pass, with their outputs removed
+    removed: list[str] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        """Whether the pass found nothing to do."""
+        return self.summary is None and not self.removed
@@ -0,0 +1,87 @@
+# src/infra/cassette.py
+import json
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+from typing import Any
+
+from config.logger import logger
+from core.interfaces import LLMCassette
+
+
+class SqliteCassette(LLMCassette):
+    """Recorded LLM interactions in a single SQLite file, compressed and keyed."""
+
+    def __init__(self, storage_path: Path, create: bool = True) -> None:
+        """Open the archive; a missing file is an error unless it may be created."""
+        if not create and not storage_path.exists():
+            raise FileNotFoundError(f"Cassette not found: {storage_path}")
+        self._storage_path = storage_path
+        self._storage_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self._storage_path, timeout=30)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS interactions (
+                key TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                prompt BLOB NOT NULL,
+                config TEXT NOT NULL,
+                response BLOB NOT NULL,
+                latency_seconds REAL NOT NULL,
+                recorded_at REAL NOT NULL
+            )
+            """)
+        self._connection.commit()
+
+    async def record(
+        self,
+        key: str,
+        provider: str,
+        prompt: str,
+        config: dict[str, Any],
+        response: str,
+        latency_seconds: float,
+    ) -> None:
+        """Store an interaction, replacing an earlier recording of the same key."""
+        with self._connection:
+            self._connection.execute(
+                """
+                INSERT OR REPLACE INTO interactions
+                    (key, provider, prompt, config, response, latency_seconds,
+                     recorded_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    key,
+                    provider,
+                    zlib.compress(prompt.encode("utf-8")),
+                    json.dumps(config, sort_keys=True, default=str),
+                    zlib.compress(response.encode("utf-8")),
+                    latency_seconds,
+                    time.time(),
+                ),
+            )
+
+    async def lookup(self, key: str) -> tuple[str, float] | None:
+        """Recorded response and latency, or None if the key was never recorded."""
+        if not (
+            row := self._connection.execute(
+                "SELECT response, latency_seconds FROM interactions WHERE key = ?",
+                (key,),
+            ).fetchone()
+        ):
+            return None
+        return zlib.decompress(row[0]).decode("utf-8"), row[1]
+
+    def count(self) -> int:
+        """Number of recorded interactions."""
+        return self._connection.execute("SELECT COUNT(*) FROM interactions").fetchone()[
+            0
+        ]
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        logger.info(f"Closing cassette {self._storage_path} ({self.count()} entries)")
+        self._connection.close()
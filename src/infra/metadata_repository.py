@@ -1,11 +1,14 @@
 # src/infrastructure/metadata_repository.py
-import hashlib
 import json
-from datetime import datetime
+import sqlite3
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import replace
 from pathlib import Path
 
 from config.logger import logger
 from core.interfaces import MetadataRepository
+from core.sql_normalizer import fingerprint_sql
 from core.types import DatabaseType, QueryMetadata
 
 
@@ -13,18 +16,39 @@ class JsonMetadataRepository(MetadataRepository):
     """JSON-based metadata repository implementation."""
 
     def __init__(
-        self, storage_path: Path = Path("./optimization_metadata.json")
+        self,
+        storage_path: Path = Path("./optimization_metadata.json"),
+        parameterize_literals: bool = False,
     ) -> None:
         """Initialize with storage path."""
         self._storage_path = storage_path
+        self._parameterize_literals = parameterize_literals
         self._metadata_cache: dict[str, QueryMetadata] = {}
+        # Legacy keys are left alone here; re-keying every entry on each load
+        # is a one-off migration (see migrate_legacy_keys)
         self._load_metadata()
 
     def _generate_query_hash(self, query: str, database_type: DatabaseType) -> str:
-        """Generate hash for SQL query including database type."""
-        return hashlib.sha256(
-            f"{database_type.value}:{query}".encode("utf-8")
-        ).hexdigest()[:16]
+        """Generate fingerprint for SQL query including database type."""
+        return fingerprint_sql(query, database_type, self._parameterize_literals)
+
+    def _rekey_legacy_entries(self) -> int:
+        """Move entries stored under raw-text hashes to their fingerprint keys."""
+        migrated: dict[str, QueryMetadata] = {}
+        moved = 0
+        for query_hash, metadata in self._metadata_cache.items():
+            key = self._generate_query_hash(metadata.query_sql, metadata.database_type)
+            moved += key != query_hash
+            # Formatting variants collapse into one key; keep the newest entry
+            if (
+                current := migrated.get(key)
+            ) is None or metadata.last_optimization > current.last_optimization:
+                migrated[key] = metadata
+
+        if moved:
+            logger.info(f"Re-keyed {moved} legacy metadata entries by fingerprint")
+        self._metadata_cache = migrated
+        return moved
 
     def _load_metadata(self) -> None:
         """Load metadata from storage."""
@@ -33,17 +57,8 @@ class JsonMetadataRepository(MetadataRepository):
                 for query_hash, metadata_dict in json.loads(
                     self._storage_path.read_text(encoding="utf-8")
                 ).items():
-                    # Handle backward compatibility for database_type
-                    self._metadata_cache[query_hash] = QueryMetadata(
-                        query_sql=metadata_dict["query_sql"],
-                        explanation_text=metadata_dict["explanation_text"],
-                        version=metadata_dict["version"],
-                        last_optimization=datetime.fromisoformat(
-                            metadata_dict["last_optimization"]
-                        ),
-                        database_type=DatabaseType(
-                            metadata_dict.get("database_type", "oracle")
-                        ),
+                    self._metadata_cache[query_hash] = QueryMetadata.from_dict(
+                        metadata_dict
                     )
                 logger.info(f"Loaded {len(self._metadata_cache)} metadata entries")
         except Exception as e:
@@ -65,20 +80,184 @@ class JsonMetadataRepository(MetadataRepository):
                 ),
                 encoding="utf-8",
             )
-            logger.info("Metadata saved successfully")
+            logger.info("Metadata saved successfully", sample="metadata_save")
         except Exception as e:
             logger.error(f"Error saving metadata: {str(e)}")
             raise
 
+    def migrate_legacy_keys(self) -> int:
+        """Persist fingerprint keys for entries loaded under legacy hashes."""
+        moved = self._rekey_legacy_entries()
+        self._save_metadata()
+        return moved
+
     def generate_hash_for_query(self, query: str, database_type: DatabaseType) -> str:
         """Generate hash for a SQL query (public method)."""
         return self._generate_query_hash(query, database_type)
 
     async def get_metadata(self, query_hash: str) -> QueryMetadata | None:
         """Retrieve metadata for a query (public method)."""
-        return self._metadata_cache.get(query_hash)
+        # Hand out copies so concurrent optimizations never share one instance
+        if (metadata := self._metadata_cache.get(query_hash)) is None:
+            return None
+        return replace(metadata)
 
     async def save_metadata(self, query_hash: str, metadata: QueryMetadata) -> None:
         """Save metadata for a query (public method)."""
-        self._metadata_cache[query_hash] = metadata
+        self._metadata_cache[query_hash] = replace(metadata)
         self._save_metadata()
+
+
+class SqliteMetadataRepository(MetadataRepository):
+    """SQLite-based metadata repository with single-row upserts."""
+
+    def __init__(
+        self,
+        storage_path: Path = Path("./optimization_metadata.db"),
+        parameterize_literals: bool = False,
+    ) -> None:
+        """Initialize with storage path and create the schema if needed."""
+        self._storage_path = storage_path
+        self._parameterize_literals = parameterize_literals
+        self._batch_depth = 0
+        self._storage_path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode: transactions are opened explicitly by batch()
+        self._connection = sqlite3.connect(
+            self._storage_path, timeout=30, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS query_metadata (
+                query_hash TEXT PRIMARY KEY,
+                database_type TEXT NOT NULL,
+                version TEXT NOT NULL,
+                last_optimization TEXT NOT NULL,
+                data TEXT NOT NULL
+            )
+            """)
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_query_metadata_database_type "
+            "ON query_metadata (database_type, query_hash)"
+        )
+
+    def generate_hash_for_query(self, query: str, database_type: DatabaseType) -> str:
+        """Generate hash for a SQL query (public method)."""
+        return fingerprint_sql(query, database_type, self._parameterize_literals)
+
+    async def get_metadata(self, query_hash: str) -> QueryMetadata | None:
+        """Retrieve metadata for a query (public method)."""
+        row = self._connection.execute(
+            "SELECT data FROM query_metadata WHERE query_hash = ?", (query_hash,)
+        ).fetchone()
+        return QueryMetadata.from_dict(json.loads(row[0])) if row else None
+
+    async def get_metadata_for_database(
+        self, query_hash: str, database_type: DatabaseType
+    ) -> QueryMetadata | None:
+        """Retrieve metadata for a query only if it targets the given database."""
+        row = self._connection.execute(
+            "SELECT data FROM query_metadata "
+            "WHERE database_type = ? AND query_hash = ?",
+            (database_type.value, query_hash),
+        ).fetchone()
+        return QueryMetadata.from_dict(json.loads(row[0])) if row else None
+
+    async def save_metadata(self, query_hash: str, metadata: QueryMetadata) -> None:
+        """Save metadata for a query (public method)."""
+        with self.batch():
+            self._upsert(query_hash, metadata)
+
+    async def save_many(self, entries: dict[str, QueryMetadata]) -> None:
+        """Save several metadata entries in a single transaction."""
+        with self.batch():
+            for query_hash, metadata in entries.items():
+                self._upsert(query_hash, metadata)
+        logger.info(f"Saved {len(entries)} metadata entries")
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Group every save inside the block into one transaction."""
+        if self._batch_depth == 0:
+            self._connection.execute("BEGIN IMMEDIATE")
+        self._batch_depth += 1
+        try:
+            yield
+        except BaseException:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._connection.execute("ROLLBACK")
+            raise
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            self._connection.execute("COMMIT")
+
+    async def import_json(self, json_path: Path) -> int:
+        """Import every entry of a JSON metadata file, re-keyed by fingerprint."""
+        source = JsonMetadataRepository(json_path, self._parameterize_literals)
+        source._rekey_legacy_entries()
+        await self.save_many(source._metadata_cache)
+        logger.info(f"Imported {len(source._metadata_cache)} entries from {json_path}")
+        return len(source._metadata_cache)
+
+    def count(self) -> int:
+        """Number of stored metadata entries."""
+        return self._connection.execute(
+            "SELECT COUNT(*) FROM query_metadata"
+        ).fetchone()[0]
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self._connection.close()
+
+    def _upsert(self, query_hash: str, metadata: QueryMetadata) -> None:
+        """Insert or replace a single metadata row."""
+        data = metadata.to_dict()
+        self._connection.execute(
+            """
+            INSERT INTO query_metadata
+                (query_hash, database_type, version, last_optimization, data)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(query_hash) DO UPDATE SET
+                database_type = excluded.database_type,
+                version = excluded.version,
+                last_optimization = excluded.last_optimization,
+                data = excluded.data
+            """,
+            (
+                query_hash,
+                data["database_type"],
+                data["version"],
+                data["last_optimization"],
+                json.dumps(data, ensure_ascii=False),
+            ),
+        )
+
+
+class MetadataRepositoryFactory:
+    """Factory for creating metadata repositories."""
+
+    @staticmethod
+    def create_repository(
+        backend: str,
+        storage_path: Path | None = None,
+        parameterize_literals: bool = False,
+    ) -> MetadataRepository:
+        """Create a metadata repository for the given backend."""
+        storage_path = storage_path or MetadataRepositoryFactory.default_path(backend)
+        if backend == "json":
+            return JsonMetadataRepository(storage_path, parameterize_literals)
+        elif backend == "sqlite":
+            return SqliteMetadataRepository(storage_path, parameterize_literals)
+        else:
+            raise ValueError(f"Unsupported metadata backend: {backend}")
+
+    @staticmethod
+    def default_path(backend: str) -> Path:
+        """Storage location used when none is configured for a backend."""
+        if backend == "json":
+            return Path("./optimization_metadata.json")
+        elif backend == "sqlite":
+            return Path("./optimization_metadata.db")
+        else:
+            raise ValueError(f"Unsupported metadata backend: {backend}")
@@ -0,0 +1,109 @@
+# src/infra/response_cache.py
+import sqlite3
+import time
+from pathlib import Path
+
+from config.logger import logger
+from core.interfaces import ResponseCache
+
+
+class SqliteResponseCache(ResponseCache):
+    """On-disk LLM response cache with size-based LRU eviction and optional TTL."""
+
+    def __init__(
+        self,
+        storage_path: Path = Path("./.sqlo_cache/llm_responses.db"),
+        max_size_bytes: int = 256 * 1024 * 1024,
+        ttl_seconds: float | None = None,
+    ) -> None:
+        """Initialize with storage path, size budget and entry lifetime."""
+        self._storage_path = storage_path
+        self._max_size_bytes = max_size_bytes
+        self._ttl_seconds = ttl_seconds
+        self._storage_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self._storage_path, timeout=30)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """)
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_accessed_at "
+            "ON responses (accessed_at)"
+        )
+        self._connection.commit()
+
+    async def get(self, key: str) -> str | None:
+        """Retrieve a cached response and refresh its recency."""
+        if not (
+            row := self._connection.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        ):
+            return None
+
+        response, created_at = row
+        now = time.time()
+        with self._connection:
+            if self._ttl_seconds is not None and now - created_at > self._ttl_seconds:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+        return response
+
+    async def set(self, key: str, response: str) -> None:
+        """Store a response and evict least recently used entries over budget."""
+        now = time.time()
+        with self._connection:
+            self._connection.execute(
+                """
+                INSERT INTO responses (key, response, size, created_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    response = excluded.response,
+                    size = excluded.size,
+                    created_at = excluded.created_at,
+                    accessed_at = excluded.accessed_at
+                """,
+                (key, response, len(response.encode("utf-8")), now, now),
+            )
+            self._evict()
+
+    def size_bytes(self) -> int:
+        """Total size of cached responses in bytes."""
+        return self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self._connection.close()
+
+    def _evict(self) -> None:
+        """Drop expired entries, then the least recently used until under budget."""
+        if self._ttl_seconds is not None:
+            self._connection.execute(
+                "DELETE FROM responses WHERE created_at < ?",
+                (time.time() - self._ttl_seconds,),
+            )
+        if (excess := self.size_bytes() - self._max_size_bytes) <= 0:
+            return
+
+        evicted = 0
+        for key, size in self._connection.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at ASC"
+        ).fetchall():
+            if excess <= 0:
+                break
+            self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            excess -= size
+            evicted += 1
+        logger.info(f"Evicted {evicted} LLM cache entries over size budget")
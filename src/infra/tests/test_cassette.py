@@ -0,0 +1,41 @@
+# tests/test_cassette.py
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from infra.cassette import SqliteCassette
+
+
+class TestSqliteCassette:
+    """Test SqliteCassette functionality."""
+
+    @pytest.fixture
+    def cassette_path(self, tmp_path: Path) -> Path:
+        """Create cassette database path."""
+        return tmp_path / "cassettes" / "run.db"
+
+    @pytest.mark.asyncio
+    async def test_record_and_lookup(self, cassette_path: Path):
+        """Test interactions survive reopening and are stored compressed."""
+        response = "SELECT id FROM users; " * 200
+        await SqliteCassette(cassette_path).record(
+            "key", "gemini", "prompt", {"temperature": 0.1}, response, 1.5
+        )
+
+        cassette = SqliteCassette(cassette_path, create=False)
+        stored_size = (
+            sqlite3.connect(cassette_path)
+            .execute("SELECT LENGTH(response) FROM interactions")
+            .fetchone()[0]
+        )
+
+        assert await cassette.lookup("key") == (response, 1.5)
+        assert await cassette.lookup("missing") is None
+        assert cassette.count() == 1
+        assert stored_size < len(response) / 10
+
+    def test_missing_archive(self, cassette_path: Path):
+        """Test opening a missing archive for replay is an error."""
+        with pytest.raises(FileNotFoundError):
+            SqliteCassette(cassette_path, create=False)
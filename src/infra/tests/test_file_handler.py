@@ -1,5 +1,6 @@
 # tests/test_file_handler.py
 import json
+import os
 from pathlib import Path
 
 import pytest
@@ -52,3 +53,109 @@ class TestLocalFileHandler:
 
         assert temp_json_file.exists()
         assert json.loads(temp_json_file.read_text()) == test_data
+
+    @pytest.mark.asyncio
+    async def test_write_sql_file_success(
+        self, file_handler: LocalFileHandler, tmp_path: Path
+    ):
+        """Test SQL file writing creates missing directories."""
+        sql_file = tmp_path / "out" / "script_optimized.sql"
+        await file_handler.write_sql_file(sql_file, "SELECT 1;\n")
+
+        assert sql_file.read_text() == "SELECT 1;\n"
+
+    @pytest.mark.asyncio
+    async def test_read_large_sql_file(
+        self, file_handler: LocalFileHandler, tmp_path: Path
+    ):
+        """Test large files are read whole, with surrounding whitespace stripped."""
+        sql_file = tmp_path / "large.sql"
+        body = "SELECT 1 FROM dual UNION ALL\n" * 100_000 + "SELECT 2 FROM dual;"
+        sql_file.write_text(f"\n  {body}\n\n", encoding="utf-8")
+
+        assert await file_handler.read_sql_file(sql_file) == body
+
+    @pytest.mark.asyncio
+    async def test_read_crlf_sql_file(
+        self, file_handler: LocalFileHandler, tmp_path: Path
+    ):
+        """Test Windows and old Mac line endings are read as newlines."""
+        sql_file = tmp_path / "windows.sql"
+        sql_file.write_bytes(b"SELECT 1\r\nFROM dual\rWHERE 1 = 1;\r\n")
+
+        assert await file_handler.read_sql_file(sql_file) == (
+            "SELECT 1\nFROM dual\nWHERE 1 = 1;"
+        )
+
+    @pytest.mark.asyncio
+    async def test_read_empty_sql_file(
+        self, file_handler: LocalFileHandler, tmp_path: Path
+    ):
+        """Test empty and whitespace-only files are rejected."""
+        for content in ("", "  \n"):
+            sql_file = tmp_path / "empty.sql"
+            sql_file.write_text(content)
+            with pytest.raises(ValueError, match="SQL file is empty"):
+                await file_handler.read_sql_file(sql_file)
+
+    @pytest.mark.asyncio
+    async def test_failed_write_keeps_previous_file(
+        self, file_handler: LocalFileHandler, temp_json_file: Path
+    ):
+        """Test a write that fails midway leaves the old content and no temp file."""
+        await file_handler.write_json_file(temp_json_file, {"version": 1})
+        with pytest.raises(TypeError):
+            await file_handler.write_json_file(temp_json_file, {"bad": object()})
+
+        assert json.loads(temp_json_file.read_text()) == {"version": 1}
+        assert os.listdir(temp_json_file.parent) == [temp_json_file.name]
+
+    @pytest.mark.asyncio
+    async def test_each_mode_writes_with_default_permissions(self, tmp_path: Path):
+        """Test synced writes replace the target with normal file permissions."""
+        sql_file = tmp_path / "out.sql"
+        reference = tmp_path / "reference.sql"
+        reference.write_text("")
+        await LocalFileHandler(fsync="each").write_sql_file(sql_file, "SELECT 1;")
+
+        assert sql_file.read_text() == "SELECT 1;"
+        assert sql_file.stat().st_mode == reference.stat().st_mode
+
+    @pytest.mark.asyncio
+    async def test_batch_mode_publishes_on_flush(self, tmp_path: Path):
+        """Test batched writes appear together once flushed or the batch fills."""
+        handler = LocalFileHandler(fsync="batch", batch_size=3)
+        await handler.write_sql_file(tmp_path / "a.sql", "SELECT 1;")
+        await handler.write_sql_file(tmp_path / "a.sql", "SELECT 2;")
+        await handler.write_sql_file(tmp_path / "b.sql", "SELECT 3;")
+        assert not (tmp_path / "a.sql").exists()
+
+        await handler.flush()
+        assert (tmp_path / "a.sql").read_text() == "SELECT 2;"
+        assert sorted(os.listdir(tmp_path)) == ["a.sql", "b.sql"]
+
+        for name in ("c.sql", "d.sql", "e.sql"):
+            await handler.write_sql_file(tmp_path / name, name)
+        assert (tmp_path / "e.sql").read_text() == "e.sql"
+
+    @pytest.mark.asyncio
+    async def test_batch_flush_syncs_each_file_and_directory_once(
+        self, tmp_path: Path, monkeypatch
+    ):
+        """Test a flush syncs the held-back files, not the whole system."""
+        synced: list[int] = []
+        monkeypatch.setattr("infra.file_handler.os.fsync", synced.append)
+        monkeypatch.delattr("infra.file_handler.os.sync", raising=False)
+        handler = LocalFileHandler(fsync="batch")
+        await handler.write_sql_file(tmp_path / "a.sql", "SELECT 1;")
+        await handler.write_sql_file(tmp_path / "b.sql", "SELECT 2;")
+
+        await handler.flush()
+
+        assert len(synced) == 3
+        assert sorted(os.listdir(tmp_path)) == ["a.sql", "b.sql"]
+
+    def test_unsupported_fsync_mode(self):
+        """Test an unknown durability mode is rejected."""
+        with pytest.raises(ValueError, match="Unsupported fsync mode"):
+            LocalFileHandler(fsync="sometimes")
@@ -1,8 +1,17 @@
 # tests/test_metadata_repository.py
+import json
+from datetime import datetime
+from pathlib import Path
+
 import pytest
 
+from config.config import OptimizerConfig
 from core.types import DatabaseType, QueryMetadata
-from infra.metadata_repository import JsonMetadataRepository
+from infra.metadata_repository import (
+    JsonMetadataRepository,
+    MetadataRepositoryFactory,
+    SqliteMetadataRepository,
+)
 
 
 class TestJsonMetadataRepository:
@@ -29,6 +38,33 @@ class TestJsonMetadataRepository:
         assert retrieved.version == sample_metadata.version
         assert retrieved.database_type == sample_metadata.database_type
 
+    @pytest.mark.asyncio
+    async def test_provenance_fields_round_trip(
+        self,
+        metadata_repo: JsonMetadataRepository,
+        sample_metadata: QueryMetadata,
+        temp_json_file,
+    ):
+        """Test optimized query, model and prompt version are persisted."""
+        sample_metadata.optimized_query = "SELECT id FROM users WHERE age > 18"
+        sample_metadata.model_name = "gemini-2.0-flash"
+        sample_metadata.prompt_version = "abc123"
+        sample_metadata.settings_version = "def456"
+
+        query_hash = metadata_repo.generate_hash_for_query(
+            sample_metadata.query_sql, sample_metadata.database_type
+        )
+        await metadata_repo.save_metadata(query_hash, sample_metadata)
+        retrieved = await JsonMetadataRepository(temp_json_file).get_metadata(
+            query_hash
+        )
+
+        assert retrieved is not None
+        assert retrieved.optimized_query == sample_metadata.optimized_query
+        assert retrieved.model_name == "gemini-2.0-flash"
+        assert retrieved.prompt_version == "abc123"
+        assert retrieved.settings_version == "def456"
+
     @pytest.mark.asyncio
     async def test_get_nonexistent_metadata(
         self, metadata_repo: JsonMetadataRepository
@@ -49,3 +85,123 @@ class TestJsonMetadataRepository:
         assert hash1 != metadata_repo.generate_hash_for_query(
             query, DatabaseType.SQLITE
         )
+
+    def test_formatting_variants_share_hash(
+        self, metadata_repo: JsonMetadataRepository
+    ):
+        """Test reformatted queries map to the same metadata key."""
+        assert metadata_repo.generate_hash_for_query(
+            "select *\n  from users -- all\n;", DatabaseType.ORACLE
+        ) == metadata_repo.generate_hash_for_query(
+            "SELECT * FROM users;", DatabaseType.ORACLE
+        )
+
+    @pytest.mark.asyncio
+    async def test_legacy_keys_are_migrated(self, temp_json_file):
+        """Test entries stored under raw-text hashes move to fingerprint keys."""
+        entry = {
+            "query_sql": "SELECT * FROM users;",
+            "explanation_text": "old",
+            "version": "0.1",
+            "last_optimization": datetime(2024, 1, 1).isoformat(),
+            "database_type": "sqlite",
+        }
+        newer = dict(
+            entry,
+            query_sql="select *  from USERS",
+            explanation_text="new",
+            last_optimization=datetime(2024, 6, 1).isoformat(),
+        )
+        temp_json_file.write_text(
+            json.dumps({"legacy_hash_1": entry, "legacy_hash_2": newer})
+        )
+
+        repo = JsonMetadataRepository(temp_json_file)
+        key = repo.generate_hash_for_query("SELECT * FROM users", DatabaseType.SQLITE)
+        assert await repo.get_metadata(key) is None
+
+        assert repo.migrate_legacy_keys() == 2
+        migrated = await repo.get_metadata(key)
+        assert migrated is not None and migrated.explanation_text == "new"
+        assert list(json.loads(temp_json_file.read_text())) == [key]
+
+
+class TestSqliteMetadataRepository:
+    """Test SqliteMetadataRepository functionality."""
+
+    @pytest.fixture
+    def metadata_repo(self, tmp_path) -> SqliteMetadataRepository:
+        """Create SQLite metadata repository instance."""
+        return SqliteMetadataRepository(tmp_path / "metadata.db")
+
+    @pytest.mark.asyncio
+    async def test_upsert_and_get_metadata(
+        self, metadata_repo: SqliteMetadataRepository, sample_metadata: QueryMetadata
+    ):
+        """Test saving twice updates the single stored row."""
+        await metadata_repo.save_metadata("hash", sample_metadata)
+        sample_metadata.version = "1.1"
+        await metadata_repo.save_metadata("hash", sample_metadata)
+
+        retrieved = await metadata_repo.get_metadata("hash")
+
+        assert metadata_repo.count() == 1
+        assert retrieved is not None
+        assert retrieved.version == "1.1"
+        assert retrieved.last_optimization == sample_metadata.last_optimization
+        assert await metadata_repo.get_metadata("missing") is None
+
+    @pytest.mark.asyncio
+    async def test_lookup_by_database_type(
+        self, metadata_repo: SqliteMetadataRepository, sample_metadata: QueryMetadata
+    ):
+        """Test lookups can be restricted to a database type."""
+        await metadata_repo.save_metadata("hash", sample_metadata)
+
+        assert await metadata_repo.get_metadata_for_database(
+            "hash", DatabaseType.ORACLE
+        )
+        assert not await metadata_repo.get_metadata_for_database(
+            "hash", DatabaseType.SQLITE
+        )
+
+    @pytest.mark.asyncio
+    async def test_batch_rolls_back_on_error(
+        self, metadata_repo: SqliteMetadataRepository, sample_metadata: QueryMetadata
+    ):
+        """Test saves inside a failed batch are not persisted."""
+        with pytest.raises(RuntimeError):
+            with metadata_repo.batch():
+                await metadata_repo.save_metadata("a", sample_metadata)
+                await metadata_repo.save_metadata("b", sample_metadata)
+                raise RuntimeError("abort")
+
+        assert metadata_repo.count() == 0
+
+    @pytest.mark.asyncio
+    async def test_import_json(
+        self,
+        metadata_repo: SqliteMetadataRepository,
+        sample_metadata: QueryMetadata,
+        temp_json_file,
+    ):
+        """Test entries of a JSON store are imported under fingerprint keys."""
+        json_repo = JsonMetadataRepository(temp_json_file)
+        key = json_repo.generate_hash_for_query(
+            sample_metadata.query_sql, sample_metadata.database_type
+        )
+        await json_repo.save_metadata(key, sample_metadata)
+
+        assert await metadata_repo.import_json(temp_json_file) == 1
+        imported = await metadata_repo.get_metadata(key)
+        assert imported is not None
+        assert imported.query_sql == sample_metadata.query_sql
+
+    def test_factory_rejects_unknown_backend(self):
+        """Test unsupported backends raise ValueError."""
+        with pytest.raises(ValueError, match="Unsupported metadata backend"):
+            MetadataRepositoryFactory.create_repository("yaml")
+        with pytest.raises(ValueError, match="Unsupported metadata backend"):
+            MetadataRepositoryFactory.create_repository("yaml", Path("metadata.yaml"))
+        with pytest.raises(ValueError, match="Unsupported metadata backend"):
+            OptimizerConfig(metadata_backend="yaml")  # type: ignore[arg-type]
@@ -0,0 +1,48 @@
+# tests/test_response_cache.py
+import time
+from pathlib import Path
+
+import pytest
+
+from infra.response_cache import SqliteResponseCache
+
+
+class TestSqliteResponseCache:
+    """Test SqliteResponseCache functionality."""
+
+    @pytest.fixture
+    def cache_path(self, tmp_path: Path) -> Path:
+        """Create cache database path."""
+        return tmp_path / "cache" / "responses.db"
+
+    @pytest.mark.asyncio
+    async def test_set_and_get(self, cache_path: Path):
+        """Test stored responses survive reopening the cache."""
+        await SqliteResponseCache(cache_path).set("key", "response")
+
+        assert await SqliteResponseCache(cache_path).get("key") == "response"
+        assert await SqliteResponseCache(cache_path).get("missing") is None
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction_over_size_budget(self, cache_path: Path):
+        """Test least recently used entries are evicted first."""
+        cache = SqliteResponseCache(cache_path, max_size_bytes=25)
+        await cache.set("a", "x" * 10)
+        await cache.set("b", "y" * 10)
+        time.sleep(0.01)
+        await cache.get("a")  # "a" is now more recent than "b"
+        await cache.set("c", "z" * 10)
+
+        assert await cache.get("a") == "x" * 10
+        assert await cache.get("b") is None
+        assert await cache.get("c") == "z" * 10
+        assert cache.size_bytes() <= 25
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_are_misses(self, cache_path: Path):
+        """Test entries older than the TTL are not served."""
+        cache = SqliteResponseCache(cache_path, ttl_seconds=0.01)
+        await cache.set("key", "response")
+        time.sleep(0.02)
+
+        assert await cache.get("key") is None
@@ -0,0 +1,67 @@
+# src/infra/watch_manifest.py
+import json
+from pathlib import Path
+
+from config.logger import logger
+from core.types import WatchedFile
+from infra.file_handler import LocalFileHandler
+
+MANIFEST_VERSION = 1
+
+
+class WatchManifest:
+    """
+    JSON record of the watched SQL files, keyed by absolute path.
+
+    Each entry holds the file's content fingerprint and the metadata entries
+    and output files generated from it, so a watcher can tell which files and
+    statements changed since the last pass, even across restarts.
+    """
+
+    def __init__(self, storage_path: Path) -> None:
+        """Initialize with storage path, loading existing entries."""
+        self._storage_path = storage_path
+        self._files: dict[str, WatchedFile] = {}
+        self._load()
+
+    def get(self, sql_file: Path) -> WatchedFile | None:
+        """Entry of a file, if it has been seen before."""
+        return self._files.get(str(sql_file.resolve()))
+
+    def set(self, sql_file: Path, entry: WatchedFile) -> None:
+        """Record the entry of a file."""
+        self._files[str(sql_file.resolve())] = entry
+
+    def remove(self, sql_file: Path) -> WatchedFile | None:
+        """Forget a file, returning its last entry."""
+        return self._files.pop(str(sql_file.resolve()), None)
+
+    def files(self) -> list[Path]:
+        """Every file with an entry."""
+        return [Path(path) for path in self._files]
+
+    async def save(self) -> None:
+        """Write the manifest atomically."""
+        await LocalFileHandler().write_json_file(
+            self._storage_path,
+            {
+                "version": MANIFEST_VERSION,
+                "files": {
+                    path: entry.to_dict() for path, entry in sorted(self._files.items())
+                },
+            },
+        )
+
+    def _load(self) -> None:
+        """Load entries from storage."""
+        try:
+            if self._storage_path.exists():
+                data = json.loads(self._storage_path.read_text(encoding="utf-8"))
+                self._files = {
+                    path: WatchedFile.from_dict(entry)
+                    for path, entry in data["files"].items()
+                }
+                logger.info(f"Loaded watch manifest with {len(self._files)} files")
+        except Exception as e:
+            logger.warning(f"Could not load watch manifest: {str(e)}")
+            self._files = {}
@@ -1,75 +1,743 @@
 # src/main.py (updated)
 import asyncio
+import functools
+import inspect
 import sys
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
+from typing import Annotated, Any
 
 from dotenv import load_dotenv
 from typer import Argument, Option, Typer
 
-from config.config import OptimizerConfig
+from config.config import (
+    DEFAULT_CACHE_PATH,
+    DEFAULT_MANIFEST_PATH,
+    DEFAULT_SOCKET_PATH,
+    ComparisonTarget,
+    OptimizerConfig,
+    parse_provider,
+)
 from config.logger import logger
+from config.tracing import tracer
+from core.caching import CachingLLMClient
+from core.cassette import CassetteLLMClient
 from core.client import LLMClientFactory
-from core.types import DatabaseType
-from infra.file_handler import LocalFileHandler
-from infra.metadata_repository import JsonMetadataRepository
+from core.hedging import HedgedLLMClient
+from core.interfaces import LLMClient, MetadataRepository, PlanVerifier
+from core.resilience import ResilientLLMClient
+from core.types import (
+    DatabaseType,
+    OptimizationResult,
+    OptimizationStage,
+    PlanComparison,
+    WatchRun,
+)
+from infra.file_handler import FsyncMode, LocalFileHandler
+from infra.metadata_repository import (
+    JsonMetadataRepository,
+    MetadataRepositoryFactory,
+    SqliteMetadataRepository,
+)
+from infra.watch_manifest import WatchManifest
+from services.batch_optimizer import BatchQueryOptimizer
+from services.benchmark import SqliteQueryBenchmark
+from services.comparison import QueryComparison
+from services.daemon import DaemonClient, OptimizationDaemon
+from services.plan_verifier import SqlitePlanVerifier
 from services.query_optimizer import DatabaseQueryOptimizer
+from services.watcher import QueryWatcher
 
 load_dotenv()
 
 app = Typer(help="Database SQL Query Optimizer")
 
+DEFAULT_TARGETS = ["oracle", "sqlite"]
+
+
+def _option(
+    name: str, annotation: Any, default: Any, help: str, *declarations: str
+) -> inspect.Parameter:
+    """Keyword-only typer option to add to a command signature."""
+    return inspect.Parameter(
+        name,
+        inspect.Parameter.KEYWORD_ONLY,
+        default=default,
+        annotation=Annotated[annotation, Option(*declarations, help=help)],
+    )
+
+
+# Options shared by the commands that run the optimizer, by the keyword of
+# `_build_config` they set; `_optimizer_options` adds them to each command
+_DATABASE_OPTIONS = {
+    "database": _option("database", str, "oracle", "Database type (oracle/sqlite)"),
+}
+_LLM_OPTIONS = {
+    "provider": _option(
+        "provider", str, "gemini", "LLM provider (gemini/openai/claude)"
+    ),
+    "model": _option("model", str | None, None, "Model name to use"),
+    "max_concurrent_requests": _option(
+        "max_concurrency",
+        int | None,
+        None,
+        "Maximum concurrent requests to the LLM provider",
+    ),
+    "requests_per_minute": _option(
+        "rpm",
+        float | None,
+        None,
+        "Provider request quota per minute (unlimited if unset)",
+    ),
+    "tokens_per_minute": _option(
+        "tpm",
+        float | None,
+        None,
+        "Provider prompt token quota per minute (unlimited if unset)",
+    ),
+    "max_retries": _option(
+        "max_retries", int, 5, "Retries for rate-limited or transient provider errors"
+    ),
+    "adaptive_concurrency": _option(
+        "adaptive_concurrency",
+        bool,
+        True,
+        "Lower concurrency while the provider throttles requests",
+    ),
+    "cache": _option(
+        "cache", bool, True, "Reuse cached LLM responses for identical prompts"
+    ),
+    "cache_ttl_seconds": _option(
+        "cache_ttl", float | None, None, "Cached response lifetime in seconds"
+    ),
+    "cassette_path": _option(
+        "cassette",
+        Path | None,
+        None,
+        "Archive to record LLM calls to or replay them from",
+    ),
+    "cassette_mode": _option(
+        "cassette_mode", str, "replay", "Cassette mode (record/replay)"
+    ),
+    "replay_latency": _option(
+        "replay_latency",
+        float,
+        0.0,
+        "Fraction of the recorded latency to wait when replaying",
+    ),
+}
+_HEDGING_OPTIONS = {
+    "fallback_providers": _option(
+        "fallback",
+        list[str] | None,
+        None,
+        "Provider[:model] to hedge slow requests and fail over to; repeatable",
+        "--fallback",
+    ),
+    "hedge_percentile": _option(
+        "hedge_percentile",
+        float,
+        0.95,
+        "Provider latency percentile after which requests are hedged",
+    ),
+    "request_timeout_seconds": _option(
+        "request_timeout",
+        float | None,
+        None,
+        "Seconds before a provider request fails over (with --fallback)",
+    ),
+}
+_PIPELINE_OPTIONS = {
+    "parameterize_literals": _option(
+        "parameterize_literals",
+        bool,
+        False,
+        "Ignore literal values when fingerprinting queries",
+    ),
+    "apply_rules": _option(
+        "rules", bool, True, "Apply deterministic rewrite rules before calling the LLM"
+    ),
+    "compact_prompts": _option(
+        "compact_prompts",
+        bool,
+        True,
+        "Strip comments and extra whitespace from prompts",
+    ),
+    "decompose": _option(
+        "decompose",
+        bool,
+        False,
+        "Optimize subqueries separately and compose the results",
+    ),
+    "force": _option(
+        "force",
+        bool,
+        False,
+        "Regenerate every stage even if a stored result matches",
+    ),
+    "metadata_backend": _option(
+        "metadata_backend", str, "json", "Metadata store backend (json/sqlite)"
+    ),
+    "metadata_path": _option(
+        "metadata_path", Path | None, None, "Metadata store location"
+    ),
+}
+_CANDIDATE_OPTIONS = {
+    "candidates": _option(
+        "candidates",
+        int,
+        1,
+        "Rewrites to sample; the best is picked by local SQLite checks",
+    ),
+}
+
+# Annotated types of options several commands declare themselves
+ApiKeyOption = Annotated[str | None, Option(help="API key for LLM provider")]
+SchemaOption = Annotated[
+    Path | None, Option(help="Schema DDL used to compare query plans (sqlite only)")
+]
+JobsOption = Annotated[
+    int, Option("--jobs", "-j", help="Number of files optimized at once")
+]
+ProfileOption = Annotated[
+    bool, Option(help="Print p50/p95 timings per stage at the end")
+]
+TraceOption = Annotated[
+    Path | None, Option(help="Write a Chrome trace of the run here")
+]
+
+
+def _optimizer_options(
+    database: str | None = None, hedging: bool = True, candidates: bool = True
+) -> Callable[[Callable[..., None]], Callable[..., None]]:
+    """
+    Add the shared optimizer options to a command, passing them as ``config``.
+
+    ``database`` fixes the database type instead of offering ``--database``.
+    Commands that pick their own providers leave out the hedging options and
+    commands that do not sample rewrites leave out ``--candidates``.
+    """
+    options = {
+        **({} if database else _DATABASE_OPTIONS),
+        **_LLM_OPTIONS,
+        **(_HEDGING_OPTIONS if hedging else {}),
+        **_PIPELINE_OPTIONS,
+        **(_CANDIDATE_OPTIONS if candidates else {}),
+    }
+
+    def decorate(command: Callable[..., None]) -> Callable[..., None]:
+        signature = inspect.signature(command)
+        parameters = [
+            parameter
+            for name, parameter in signature.parameters.items()
+            if name != "config"
+        ]
+
+        @functools.wraps(command)
+        def wrapper(**kwargs: Any) -> None:
+            values = {
+                keyword: kwargs.pop(parameter.name)
+                for keyword, parameter in options.items()
+            }
+            if hedging:
+                values["fallback_providers"] = tuple(values["fallback_providers"] or ())
+            if database:
+                values["database"] = database
+            command(config=_build_config(**values), **kwargs)
+
+        # Typer reads the options of a command from its signature
+        setattr(
+            wrapper,
+            "__signature__",
+            signature.replace(parameters=[*parameters, *options.values()]),
+        )
+        return wrapper
+
+    return decorate
+
+
+@app.callback()
+def configure_logging(
+    log_level: str | None = Option(
+        None,
+        "--log-level",
+        help="Log level (debug, info, warning, error); default SQLO_LOG_LEVEL or info",
+    ),
+    log_json: bool | None = Option(
+        None,
+        "--log-json/--log-console",
+        help="Log JSON lines or pretty console output; default JSON unless a terminal",
+    ),
+) -> None:
+    """Apply logging options shared by every command."""
+    try:
+        logger.configure(level=log_level, json_format=log_json)
+    except ValueError as e:
+        print(f"❌ Error: {str(e)}")
+        sys.exit(1)
+
 
 @app.command()
+@_optimizer_options()
 def optimize(
+    config: OptimizerConfig,
     sql_file: Path = Argument(..., help="Path to SQL file to optimize"),
-    database: str = Option("oracle", help="Database type (oracle/sqlite)"),
-    provider: str = Option("gemini", help="LLM provider (gemini/openai/claude)"),
-    model: str | None = Option(None, help="Model name to use"),
-    api_key: str | None = Option(None, help="API key for LLM provider"),
+    api_key: ApiKeyOption = None,
+    stream: bool = Option(True, help="Show model output as it is generated"),
+    schema: SchemaOption = None,
+    fail_on_regression: bool = Option(
+        False, help="Exit with an error when the optimized plan regresses"
+    ),
+    daemon: bool = Option(True, help="Forward to a running `serve` daemon if any"),
+    profile: ProfileOption = False,
+    trace: TraceOption = None,
     verbose: bool = Option(False, "--verbose", "-v", help="Enable verbose logging"),
 ) -> None:
     """Optimize a SQL query from file for specified database type."""
-    asyncio.run(_optimize_async(sql_file, database, provider, model, api_key, verbose))
+    with _profiling(profile, trace):
+        asyncio.run(
+            _optimize_async(
+                sql_file,
+                config,
+                api_key,
+                stream,
+                schema,
+                fail_on_regression,
+                # Spans of forwarded runs are recorded by the daemon
+                daemon and not (profile or trace),
+                verbose,
+            )
+        )
 
 
 @app.command()
+@_optimizer_options(database="oracle", hedging=False, candidates=False)
 def compare(
+    config: OptimizerConfig,
     sql_file: Path = Argument(..., help="Path to SQL file to optimize"),
-    provider: str = Option("gemini", help="LLM provider (gemini/openai/claude)"),
-    model: str | None = Option(None, help="Model name to use"),
-    api_key: str | None = Option(None, help="API key for LLM provider"),
+    api_key: ApiKeyOption = None,
+    target: list[str] | None = Option(
+        None,
+        "--target",
+        "-t",
+        help="Target as database[:provider[:model]]; repeat for several targets",
+    ),
+    profile: ProfileOption = False,
+    trace: TraceOption = None,
 ) -> None:
-    """Compare optimization results for both Oracle and SQLite."""
-    asyncio.run(_compare_async(sql_file, provider, model, api_key))
+    """Compare optimization results across databases, providers or models."""
+    try:
+        targets = [ComparisonTarget.parse(spec) for spec in target or DEFAULT_TARGETS]
+    except ValueError as e:
+        print(f"❌ Error: {str(e)}")
+        sys.exit(1)
 
+    with _profiling(profile, trace):
+        asyncio.run(_compare_async(sql_file, config, api_key, targets))
 
-async def _optimize_async(
-    sql_file: Path,
+
+@app.command("optimize-dir")
+@_optimizer_options()
+def optimize_dir(
+    config: OptimizerConfig,
+    target: str = Argument(..., help="Directory or glob pattern of SQL files"),
+    api_key: ApiKeyOption = None,
+    jobs: JobsOption = 4,
+    summary: Path = Option(
+        Path("optimization_summary.json"), help="Where to write the batch summary"
+    ),
+    fsync: FsyncMode = Option(
+        "none", help="Output durability: none, each (fsync every file) or batch"
+    ),
+    schema: SchemaOption = None,
+    profile: ProfileOption = False,
+    trace: TraceOption = None,
+) -> None:
+    """Optimize every SQL file in a directory or glob with bounded concurrency."""
+    with _profiling(profile, trace):
+        asyncio.run(
+            _optimize_dir_async(target, config, api_key, jobs, summary, schema, fsync)
+        )
+
+
+@app.command()
+@_optimizer_options(database="sqlite")
+def bench(
+    config: OptimizerConfig,
+    sql_file: Path = Argument(..., help="Path to SQL file to optimize"),
+    schema: Path = Option(..., help="SQLite schema DDL to load the data into"),
+    data: Path | None = Option(None, help="JSON spec of row counts and distributions"),
+    runs: int = Option(5, help="Timed runs per query"),
+    warmup: int = Option(1, help="Untimed runs per query before timing"),
+    api_key: ApiKeyOption = None,
+) -> None:
+    """Optimize a query for SQLite and benchmark it on synthetic data."""
+    asyncio.run(_bench_async(sql_file, config, api_key, schema, data, runs, warmup))
+
+
+@app.command("migrate-metadata")
+def migrate_metadata(
+    storage_path: Path = Argument(
+        Path("optimization_metadata.json"), help="Metadata JSON file to migrate"
+    ),
+    parameterize_literals: bool = Option(
+        False, help="Ignore literal values when fingerprinting queries"
+    ),
+) -> None:
+    """Re-key metadata entries by canonical SQL fingerprint."""
+    try:
+        moved = JsonMetadataRepository(
+            storage_path, parameterize_literals=parameterize_literals
+        ).migrate_legacy_keys()
+        print(f"🔑 Migrated {moved} metadata entries in {storage_path}")
+    except Exception as e:
+        logger.error(f"Metadata migration failed: {str(e)}")
+        print(f"❌ Error: {str(e)}")
+        sys.exit(1)
+
+
+@app.command("import-metadata")
+def import_metadata(
+    json_path: Path = Argument(
+        Path("optimization_metadata.json"), help="Metadata JSON file to import"
+    ),
+    sqlite_path: Path = Option(
+        Path("optimization_metadata.db"), help="SQLite metadata store to import into"
+    ),
+    parameterize_literals: bool = Option(
+        False, help="Ignore literal values when fingerprinting queries"
+    ),
+) -> None:
+    """Import a JSON metadata file into the SQLite metadata store."""
+    try:
+        imported = asyncio.run(
+            SqliteMetadataRepository(sqlite_path, parameterize_literals).import_json(
+                json_path
+            )
+        )
+        print(f"📥 Imported {imported} metadata entries into {sqlite_path}")
+    except Exception as e:
+        logger.error(f"Metadata import failed: {str(e)}")
+        print(f"❌ Error: {str(e)}")
+        sys.exit(1)
+
+
+@app.command()
+def serve(
+    api_key: str | None = Option(
+        None, help="API key for requests that do not bring their own"
+    ),
+    status: bool = Option(False, help="Show the status of the running daemon"),
+) -> None:
+    """Keep LLM clients and metadata warm for `optimize` calls in this directory."""
+    if status:
+        try:
+            info = asyncio.run(DaemonClient(DEFAULT_SOCKET_PATH).status())
+        except OSError:
+            print(f"💤 No daemon is listening on {DEFAULT_SOCKET_PATH}")
+            sys.exit(1)
+        print(
+            f"🛰️  Daemon {info['pid']}: up {info['uptime_seconds']}s, "
+            f"{info['requests']} requests, {info['llm_clients']} warm LLM clients"
+        )
+        return
+
+    daemon = OptimizationDaemon(DEFAULT_SOCKET_PATH, api_key)
+    print(f"🛰️  Serving on {DEFAULT_SOCKET_PATH} (Ctrl+C to stop)")
+    try:
+        asyncio.run(daemon.serve())
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        logger.error(f"Daemon failed: {str(e)}")
+        print(f"❌ Error: {str(e)}")
+        sys.exit(1)
+    for llm_client in daemon.clients:
+        _print_cache_stats(llm_client)
+        _print_resilience_stats(llm_client)
+
+
+@app.command()
+@_optimizer_options()
+def watch(
+    config: OptimizerConfig,
+    target: str = Argument(..., help="Directory or glob pattern of SQL files"),
+    api_key: ApiKeyOption = None,
+    jobs: JobsOption = 4,
+    debounce: float = Option(
+        0.5, help="Seconds without further saves before changed files are optimized"
+    ),
+    manifest: Path = Option(
+        DEFAULT_MANIFEST_PATH, help="Where to keep the fingerprints of watched files"
+    ),
+    once: bool = Option(False, help="Bring outputs up to date once and exit"),
+) -> None:
+    """Re-optimize SQL files as they change, keeping their outputs in sync."""
+    try:
+        asyncio.run(
+            _watch_async(target, config, api_key, jobs, debounce, manifest, once)
+        )
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching")
+
+
+def _build_config(
     database: str,
     provider: str,
     model: str | None,
+    cache: bool,
+    **options: Any,
+) -> OptimizerConfig:
+    """Build optimizer configuration from the common CLI options."""
+    try:
+        config = OptimizerConfig(
+            provider=parse_provider(provider),
+            database_type=DatabaseType(database.lower()),
+            cache_path=DEFAULT_CACHE_PATH if cache else None,
+            **options,
+        )
+    except ValueError as e:
+        print(f"❌ Error: {str(e)}")
+        sys.exit(1)
+
+    if model:
+        config.model_name = model
+    return config
+
+
+def _create_metadata_repo(config: OptimizerConfig) -> MetadataRepository:
+    """Create the configured metadata repository."""
+    return MetadataRepositoryFactory.create_repository(
+        config.metadata_backend,
+        config.metadata_path,
+        parameterize_literals=config.parameterize_literals,
+    )
+
+
+def _print_cache_stats(llm_client: LLMClient) -> None:
+    """Report cassette use and LLM cache hits and misses for the run, if enabled."""
+    client: LLMClient | None = llm_client
+    if isinstance(client, CassetteLLMClient):
+        cassette = client.stats
+        print(
+            f"📼 Cassette: {cassette.recorded} recorded, {cassette.replayed} replayed"
+        )
+        client = client.client
+    if isinstance(client, CachingLLMClient):
+        client.log_stats()
+        cache = client.stats
+        print(f"🗃️  LLM cache: {cache.hits} hits, {cache.misses} misses")
+
+
+def _print_resilience_stats(llm_client: LLMClient) -> None:
+    """Report provider throttling, retries and hedging for the run, if any."""
+    client: LLMClient | None = llm_client
+    if isinstance(client, CassetteLLMClient):
+        client = client.client
+    if isinstance(client, CachingLLMClient):
+        client = client.client
+    provider_clients = [client]
+    if isinstance(client, HedgedLLMClient):
+        client.save_latencies()
+        provider_clients = list(client.clients)
+        if (hedging := client.stats).hedged or hedging.failovers:
+            print(
+                f"🪂 Hedging: {hedging.hedged} hedged, {hedging.failovers} failovers, "
+                f"{hedging.secondary_wins} answered by a fallback provider"
+            )
+    for provider_client in provider_clients:
+        if (
+            isinstance(provider_client, ResilientLLMClient)
+            and (resilience := provider_client.stats).retries
+        ):
+            print(
+                f"🚦 {provider_client.get_provider_name()}: "
+                f"{resilience.retries} retries ({resilience.throttled} throttled), "
+                f"{resilience.wait_seconds:.1f}s waited, "
+                f"concurrency now {provider_client.max_concurrent_requests}"
+            )
+
+
+@contextmanager
+def _profiling(profile: bool, trace: Path | None) -> Iterator[None]:
+    """Record stage spans during a run and report them afterwards."""
+    if not (profile or trace):
+        yield
+        return
+    tracer.start_recording()
+    try:
+        yield
+    finally:
+        if trace:
+            tracer.write_chrome_trace(trace)
+            print(f"🧵 Trace written to: {trace}")
+        if profile:
+            _print_profile()
+
+
+def _print_profile() -> None:
+    """Show the latency distribution of every traced stage."""
+    if not (stages := tracer.profile()):
+        return
+    print("\n⏱️  Profile:")
+    print(
+        f"   {'stage':<16} {'count':>6} {'p50 ms':>10} {'p95 ms':>10} {'total ms':>11}"
+    )
+    for stage in stages:
+        print(
+            f"   {stage.stage:<16} {stage.count:>6} {stage.p50_ms:>10.1f} "
+            f"{stage.p95_ms:>10.1f} {stage.total_ms:>11.1f}"
+        )
+
+
+def _create_plan_verifier(
+    config: OptimizerConfig, schema: Path | None
+) -> PlanVerifier | None:
+    """Create a plan verifier when a schema is given for a SQLite target."""
+    if schema is None:
+        return None
+    if config.database_type != DatabaseType.SQLITE:
+        raise ValueError("--schema is only supported for the sqlite database type")
+    return SqlitePlanVerifier.from_file(schema)
+
+
+class _TokenPrinter:
+    """Echoes streamed model output with a header whenever the stage changes."""
+
+    _TITLES = {
+        OptimizationStage.SQL_TO_NATURAL: "📝 Explanation",
+        OptimizationStage.NATURAL_TO_SQL: "⚡ Optimized Query",
+    }
+
+    def __init__(self) -> None:
+        self._stage: OptimizationStage | None = None
+
+    def __call__(self, stage: OptimizationStage, chunk: str) -> None:
+        if stage is not self._stage:
+            self._stage = stage
+            print(f"\n{self._TITLES[stage]} (streaming):", flush=True)
+        print(chunk, end="", flush=True)
+
+
+def _print_reused_stages(result: OptimizationResult) -> None:
+    """Mention stages skipped because a stored result could be reused."""
+    if result.reused_stages:
+        stages = ", ".join(stage.value for stage in result.reused_stages)
+        print(f"♻️  Reused from metadata (use --force to regenerate): {stages}")
+
+
+def _print_applied_rules(result: OptimizationResult) -> None:
+    """List the deterministic rewrite rules that fired."""
+    if not result.applied_rules:
+        return
+    print(f"🧹 Rewrite rules applied: {len(result.applied_rules)}")
+    for rule in result.applied_rules:
+        print(f"   • {rule.rule}: {rule.description}")
+
+
+def _print_statements(result: OptimizationResult) -> None:
+    """Summarize the per-statement outcome of a multi-statement script."""
+    if result.script_path is None:
+        return
+    count = len(result.statements) + len(result.statement_errors)
+    reused = sum(
+        len(r.reused_stages) == len(OptimizationStage) for r in result.statements
+    )
+    print(f"📜 Statements: {count} ({reused} reused from metadata)")
+    for index, error in result.statement_errors.items():
+        print(f"   ⚠️  #{index + 1} kept unchanged: {error}")
+    print(f"💾 Optimized script saved to: {result.script_path}")
+
+
+def _print_decomposition(result: OptimizationResult) -> None:
+    """Summarize how a decomposed query was optimized."""
+    if (decomposition := result.decomposition) is None:
+        return
+    unchanged = sum(1 for f in decomposition.fragments if f.error)
+    outer = "rewritten" if decomposition.optimized_skeleton else "kept"
+    print(
+        f"🧩 Decomposed into {len(decomposition.fragments)} subqueries "
+        f"({unchanged} kept unchanged), outer query {outer}"
+    )
+
+
+def _print_prompt_tokens(result: OptimizationResult) -> None:
+    """Show the estimated prompt size of each LLM stage that ran."""
+    if result.prompt_tokens:
+        stages = ", ".join(f"{k}={v}" for k, v in result.prompt_tokens.items())
+        print(f"🔢 Prompt tokens (estimated): {stages}")
+
+
+def _print_candidates(result: OptimizationResult) -> None:
+    """Summarize the candidate tournament when several rewrites were sampled."""
+    if len(result.candidates) < 2:
+        return
+    print(f"🎲 Candidates: {len(result.candidates)} sampled")
+    selected = next(c for c in result.candidates if c.query == result.optimized_query)
+    for candidate in result.candidates:
+        marker = "🏆" if candidate is selected else "  "
+        status = (
+            f"score {candidate.score:g}"
+            if candidate.score is not None
+            else ("valid" if candidate.valid else f"rejected: {candidate.error}")
+        )
+        print(f"   {marker} #{candidate.index + 1}: {status}")
+
+
+def _print_plan_comparison(comparison: PlanComparison) -> None:
+    """Summarize the offline query plan check."""
+    original, optimized = comparison.original, comparison.optimized
+    if original is not None and optimized is not None:
+        print(f"🔍 Plan cost: {original.cost} -> {optimized.cost}")
+    for error in comparison.errors:
+        print(f"   ⚠️  {error}")
+    for regression in comparison.regressions:
+        print(f"   🔻 {regression}")
+    for improvement in comparison.improvements:
+        print(f"   🔺 {improvement}")
+
+
+async def _optimize_async(
+    sql_file: Path,
+    config: OptimizerConfig,
     api_key: str | None,
+    stream: bool,
+    schema: Path | None,
+    fail_on_regression: bool,
+    use_daemon: bool,
     verbose: bool,
 ) -> None:
     """Async optimization implementation."""
     try:
-        database_type = DatabaseType(database.lower())
-        config = OptimizerConfig(
-            provider=provider,
-            database_type=database_type,
-            api_key=LLMClientFactory._get_api_key_from_env("gemini"),
-        )
-        if model:
-            config.model_name = model
-
-        result = await DatabaseQueryOptimizer(
-            llm_client=LLMClientFactory.create_client(config, api_key),
-            file_handler=LocalFileHandler(),
-            metadata_repo=JsonMetadataRepository(),
-            config=config,
-            database_type=database_type,
-        ).optimize_query(sql_file)
+        database_type = config.database_type
+        daemon = DaemonClient(DEFAULT_SOCKET_PATH)
+        if use_daemon and await daemon.is_running():
+            logger.info(f"Forwarding to the daemon on {DEFAULT_SOCKET_PATH}")
+            llm_client = None
+            result = await daemon.optimize(
+                sql_file,
+                config,
+                api_key,
+                schema,
+                on_token=_TokenPrinter() if stream else None,
+            )
+        else:
+            llm_client = LLMClientFactory.create_client(config, api_key)
+            result = await DatabaseQueryOptimizer(
+                llm_client=llm_client,
+                file_handler=LocalFileHandler(),
+                metadata_repo=_create_metadata_repo(config),
+                config=config,
+                database_type=database_type,
+                on_token=_TokenPrinter() if stream else None,
+                plan_verifier=_create_plan_verifier(config, schema),
+            ).optimize_query(sql_file)
+        if stream:
+            print()
 
+        logger.flush()
         print(f"\n🎯 {database_type.value.upper()} Optimization Results:")
         print("=" * 60)
         print(f"📄 Original Query: {sql_file}")
@@ -78,13 +746,25 @@ async def _optimize_async(
         print(f"⚡ Optimized Query Preview: {result.optimized_query[:100]}...")
         print(f"📊 Version: {result.metadata.version}")
         print(f"⏰ Last Optimization: {result.metadata.last_optimization}")
-        print(
-            f"💾 Full results saved to: {sql_file.parent / f'{sql_file.stem}_{database_type.value}_optimization.json'}"
-        )
+        print(f"💾 Full results saved to: {result.output_path}")
+        _print_statements(result)
+        # Client statistics of a daemon span all of its requests
+        if llm_client is not None:
+            _print_cache_stats(llm_client)
+            _print_resilience_stats(llm_client)
+        _print_reused_stages(result)
+        _print_prompt_tokens(result)
+        _print_decomposition(result)
+        _print_applied_rules(result)
+        _print_candidates(result)
+        if comparison := result.plan_comparison:
+            _print_plan_comparison(comparison)
         if verbose:
             print(f"\n📋 Full {database_type.value.upper()} Optimized Query:")
             print("-" * 40)
             print(result.optimized_query)
+        if fail_on_regression and comparison and comparison.has_regressions:
+            sys.exit(1)
 
     except Exception as e:
         logger.error(f"Optimization failed: {str(e)}")
@@ -92,46 +772,240 @@ async def _optimize_async(
         sys.exit(1)
 
 
-async def _compare_async(
+async def _optimize_dir_async(
+    target: str,
+    config: OptimizerConfig,
+    api_key: str | None,
+    jobs: int,
+    summary_path: Path,
+    schema: Path | None,
+    fsync: FsyncMode,
+) -> None:
+    """Batch optimization implementation."""
+    try:
+        if not (sql_files := BatchQueryOptimizer.collect_sql_files(target)):
+            raise FileNotFoundError(f"No SQL files found for: {target}")
+
+        database_type = config.database_type
+        plan_verifier = _create_plan_verifier(config, schema)
+        file_handler = LocalFileHandler(fsync)
+        llm_client = LLMClientFactory.create_client(config, api_key)
+        try:
+            summary = await BatchQueryOptimizer(
+                DatabaseQueryOptimizer(
+                    llm_client=llm_client,
+                    file_handler=file_handler,
+                    metadata_repo=_create_metadata_repo(config),
+                    config=config,
+                    database_type=database_type,
+                    plan_verifier=plan_verifier,
+                ),
+                database_type=database_type,
+                jobs=jobs,
+            ).optimize_files(sql_files)
+            await file_handler.write_json_file(summary_path, summary.to_dict())
+        finally:
+            await file_handler.flush()
+
+        logger.flush()
+        print(f"\n📦 {database_type.value.upper()} Batch Results:")
+        print("=" * 60)
+        print(f"✅ Succeeded: {len(summary.succeeded)}/{len(summary.items)}")
+        print(f"♻️  Reused without LLM calls: {len(summary.reused)}")
+        print(f"❌ Failed: {len(summary.failed)}")
+        print(f"⏱️  Wall time: {summary.wall_time_seconds:.2f}s with {jobs} jobs")
+        for item in summary.failed:
+            print(f"   ⚠️  {item.sql_file}: {item.error}")
+        print(f"💾 Summary saved to: {summary_path}")
+        _print_cache_stats(llm_client)
+        _print_resilience_stats(llm_client)
+
+        if summary.failed:
+            sys.exit(1)
+
+    except Exception as e:
+        logger.error(f"Batch optimization failed: {str(e)}")
+        print(f"❌ Error: {str(e)}")
+        sys.exit(1)
+
+
+async def _bench_async(
     sql_file: Path,
-    provider: str,
-    model: str | None,
+    config: OptimizerConfig,
     api_key: str | None,
+    schema: Path,
+    data: Path | None,
+    runs: int,
+    warmup: int,
 ) -> None:
-    """Compare optimization results for both database types."""
+    """Optimize a query and measure it against the original on synthetic data."""
     try:
-        print(f"\n🔍 Comparing optimizations for {sql_file}")
+        benchmark = SqliteQueryBenchmark.from_files(schema, data, runs, warmup)
+        llm_client = LLMClientFactory.create_client(config, api_key)
+        result = await DatabaseQueryOptimizer(
+            llm_client=llm_client,
+            file_handler=LocalFileHandler(),
+            metadata_repo=_create_metadata_repo(config),
+            config=config,
+            database_type=config.database_type,
+            plan_verifier=SqlitePlanVerifier.from_file(schema),
+            benchmark=benchmark,
+        ).optimize_query(sql_file)
+
+        logger.flush()
+        if (measured := result.benchmark) is None:
+            print(
+                f"❌ No benchmark for {sql_file}: {_missing_benchmark_reason(result)}"
+            )
+            print(f"💾 Full results saved to: {result.output_path}")
+            sys.exit(1)
+        print("\n⏱️  SQLite Benchmark Results:")
         print("=" * 60)
+        print(f"📄 Original Query: {sql_file}")
+        for label, timing in [
+            ("Original", measured.original),
+            ("Optimized", measured.optimized),
+        ]:
+            if timing is not None:
+                print(
+                    f"   {label}: p50 {timing.p50_ms:.2f}ms, "
+                    f"p95 {timing.p95_ms:.2f}ms, {timing.row_count} rows"
+                )
+        if measured.speedup is not None:
+            print(f"🚀 Speedup: {measured.speedup:.2f}x")
+        print(f"🟰 Same rows: {'yes' if measured.equivalent else 'NO'}")
+        for error in measured.errors:
+            print(f"   ⚠️  {error}")
+        _print_applied_rules(result)
+        _print_candidates(result)
+        if result.plan_comparison:
+            _print_plan_comparison(result.plan_comparison)
+        print(f"💾 Full results saved to: {result.output_path}")
+        _print_cache_stats(llm_client)
+        _print_resilience_stats(llm_client)
+
+        if not measured.equivalent:
+            sys.exit(1)
+
+    except Exception as e:
+        logger.error(f"Benchmark failed: {str(e)}")
+        print(f"❌ Error: {str(e)}")
+        sys.exit(1)
 
-        results = {}
 
-        # Optimize for both database types
-        for db_type in [DatabaseType.ORACLE, DatabaseType.SQLITE]:
-            print(f"\n⚙️  Optimizing for {db_type.value.upper()}...")
-            config = OptimizerConfig(provider=provider, database_type=db_type)
+def _missing_benchmark_reason(result: OptimizationResult) -> str:
+    """Explain why a bench run produced no measurement."""
+    if result.statements or result.statement_errors:
+        return "scripts with several statements are not benchmarked"
+    selected = next(
+        (c for c in result.candidates if c.query == result.optimized_query), None
+    )
+    if selected is not None and selected.error:
+        return f"the optimized query failed local checks ({selected.error})"
+    return "the optimized query could not be measured"
 
-            if model:
-                config.model_name = model
 
-            results[db_type] = await DatabaseQueryOptimizer(
-                llm_client=LLMClientFactory.create_client(config, api_key),
+async def _watch_async(
+    target: str,
+    config: OptimizerConfig,
+    api_key: str | None,
+    jobs: int,
+    debounce: float,
+    manifest_path: Path,
+    once: bool,
+) -> None:
+    """Watch mode implementation."""
+    try:
+        llm_client = LLMClientFactory.create_client(config, api_key)
+        watcher = QueryWatcher(
+            DatabaseQueryOptimizer(
+                llm_client=llm_client,
                 file_handler=LocalFileHandler(),
-                metadata_repo=JsonMetadataRepository(),
+                metadata_repo=_create_metadata_repo(config),
                 config=config,
-                database_type=db_type,
-            ).optimize_query(sql_file)
+                database_type=config.database_type,
+            ),
+            target,
+            WatchManifest(manifest_path),
+            config.database_type,
+            jobs=jobs,
+            debounce_seconds=debounce,
+            on_run=_print_watch_run,
+        )
+        if once:
+            if (run := await watcher.run_once()).is_empty:
+                print("✅ Every output is up to date")
+            else:
+                _print_watch_run(run)
+            return
+        print(f"👀 Watching {target} (Ctrl+C to stop)")
+        await watcher.watch()
+
+    except Exception as e:
+        logger.error(f"Watch failed: {str(e)}")
+        print(f"❌ Error: {str(e)}")
+        sys.exit(1)
+
+
+def _print_watch_run(run: WatchRun) -> None:
+    """Report the files a watch pass re-optimized or removed."""
+    logger.flush()
+    stamp = datetime.now().strftime("%H:%M:%S")
+    if summary := run.summary:
+        print(
+            f"\n🔄 [{stamp}] Re-optimized {len(summary.succeeded)}/"
+            f"{len(summary.items)} changed files ({run.changed_statements} changed "
+            f"statements) in {summary.wall_time_seconds:.2f}s"
+        )
+        for item in summary.failed:
+            print(f"   ⚠️  {item.sql_file}: {item.error}")
+    for sql_file in run.removed:
+        print(f"🗑️  [{stamp}] {sql_file} was deleted, its outputs were removed")
+
+
+async def _compare_async(
+    sql_file: Path,
+    config: OptimizerConfig,
+    api_key: str | None,
+    targets: list[ComparisonTarget],
+) -> None:
+    """Compare optimization results across database/provider/model targets."""
+    try:
+        print(f"\n🔍 Comparing optimizations for {sql_file}")
+        print("=" * 60)
+        print(f"⚙️  Optimizing for {', '.join(t.label.upper() for t in targets)}...")
+
+        comparison = QueryComparison(
+            file_handler=LocalFileHandler(),
+            metadata_repo=_create_metadata_repo(config),
+            config=config,
+            client_factory=lambda target_config: LLMClientFactory.create_client(
+                target_config,
+                api_key if target_config.provider == config.provider else None,
+            ),
+        )
+        results = await comparison.compare(sql_file, targets)
 
+        logger.flush()
         print("\n📊 Comparison Results:")
         print("=" * 60)
 
-        for db_type, result in results.items():
-            print(f"\n🗄️  {db_type.value.upper()}:")
+        for target, result in results.items():
+            print(f"\n🗄️  {target.label.upper()}:")
+            if isinstance(result, Exception):
+                print(f"   ❌ Error: {str(result)}")
+                continue
             print(f"   📝 Explanation length: {len(result.explained_query)} chars")
             print(f"   ⚡ Query length: {len(result.optimized_query)} chars")
             print(f"   📊 Version: {result.metadata.version}")
-            print(
-                f"   💾 Saved to: {sql_file.parent / f'{sql_file.stem}_{db_type.value}_optimization.json'}"
-            )
+            print(f"   💾 Saved to: {result.output_path}")
+        for llm_client in comparison.clients:
+            _print_cache_stats(llm_client)
+            _print_resilience_stats(llm_client)
+
+        if any(isinstance(result, Exception) for result in results.values()):
+            sys.exit(1)
+
     except Exception as e:
         logger.error(f"Comparison failed: {str(e)}")
         print(f"❌ Error: {str(e)}")
@@ -0,0 +1,89 @@
+# src/services/batch_optimizer.py
+import asyncio
+import glob
+import time
+from datetime import datetime
+from pathlib import Path
+
+from config.logger import logger
+from core.interfaces import QueryOptimizer
+from core.types import (
+    BatchItemResult,
+    BatchSummary,
+    DatabaseType,
+    OptimizationStage,
+)
+
+
+class BatchQueryOptimizer:
+    """Runs a query optimizer over many SQL files with bounded concurrency."""
+
+    def __init__(
+        self, optimizer: QueryOptimizer, database_type: DatabaseType, jobs: int = 4
+    ) -> None:
+        """Initialize with the shared optimizer and the concurrency limit."""
+        if jobs < 1:
+            raise ValueError("jobs must be at least 1")
+        self._optimizer = optimizer
+        self._database_type = database_type
+        self._jobs = jobs
+
+    @staticmethod
+    def collect_sql_files(target: str) -> list[Path]:
+        """Resolve a directory or glob to SQL files, skipping generated scripts."""
+        if (path := Path(target)).is_dir():
+            files = path.rglob("*.sql")
+        else:
+            files = (Path(match) for match in glob.glob(target, recursive=True))
+        return sorted(
+            f
+            for f in files
+            if f.is_file()
+            and f.suffix.lower() == ".sql"
+            and not f.stem.endswith("_optimized")
+        )
+
+    async def optimize_files(self, sql_files: list[Path]) -> BatchSummary:
+        """Optimize every file, never letting one failure abort the run."""
+        semaphore = asyncio.Semaphore(self._jobs)
+        started_at = datetime.now()
+        start = time.perf_counter()
+
+        async def run(sql_file: Path) -> BatchItemResult:
+            async with semaphore:
+                return await self._optimize_one(sql_file)
+
+        items = await asyncio.gather(*(run(sql_file) for sql_file in sql_files))
+        summary = BatchSummary(
+            database_type=self._database_type,
+            jobs=self._jobs,
+            started_at=started_at,
+            wall_time_seconds=time.perf_counter() - start,
+            items=list(items),
+        )
+        logger.info(
+            f"Batch finished: {len(summary.succeeded)} succeeded, "
+            f"{len(summary.failed)} failed in {summary.wall_time_seconds:.2f}s"
+        )
+        return summary
+
+    async def _optimize_one(self, sql_file: Path) -> BatchItemResult:
+        """Optimize a single file and capture its outcome."""
+        start = time.perf_counter()
+        try:
+            result = await self._optimizer.optimize_query(sql_file)
+            return BatchItemResult(
+                sql_file=str(sql_file),
+                success=True,
+                duration_seconds=time.perf_counter() - start,
+                version=result.metadata.version,
+                reused=len(result.reused_stages) == len(OptimizationStage),
+            )
+        except Exception as e:
+            logger.error(f"Batch item failed for {sql_file}: {str(e)}")
+            return BatchItemResult(
+                sql_file=str(sql_file),
+                success=False,
+                duration_seconds=time.perf_counter() - start,
+                error=str(e),
+            )
@@ -0,0 +1,251 @@
+# src/services/benchmark.py
+import json
+import math
+import random
+import sqlite3
+import time
+from collections import Counter
+from collections.abc import Callable
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any
+
+from config.logger import logger
+from core.interfaces import QueryBenchmark
+from core.sql_normalizer import null_bindings
+from core.types import BenchmarkResult, QueryTiming
+
+DEFAULT_ROWS = 100
+DEFAULT_DATE_RANGE = ("2020-01-01", "2024-12-31")
+
+
+class SyntheticDataGenerator:
+    """Fills every table of a SQLite schema with reproducible random rows.
+
+    Row counts and column distributions come from a JSON data spec (see README);
+    unlisted columns get values by declared type and declared foreign keys point
+    at existing ``INTEGER PRIMARY KEY`` values of the referenced table.
+    """
+
+    def __init__(self, spec: dict[str, Any] | None = None) -> None:
+        """Initialize with a data spec; an empty spec uses defaults everywhere."""
+        spec = spec or {}
+        self._tables: dict[str, dict[str, Any]] = {
+            name.lower(): table for name, table in spec.get("tables", {}).items()
+        }
+        self._random = random.Random(spec.get("seed", 0))
+
+    @classmethod
+    def from_file(cls, spec_path: Path) -> "SyntheticDataGenerator":
+        """Create a generator from a JSON data spec file."""
+        if not spec_path.exists():
+            raise FileNotFoundError(f"Data spec file not found: {spec_path}")
+        with open(spec_path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def row_count(self, table: str) -> int:
+        """Number of rows generated for a table."""
+        return int(self._tables.get(table.lower(), {}).get("rows", DEFAULT_ROWS))
+
+    def populate(self, connection: sqlite3.Connection) -> None:
+        """Insert generated rows into every table of the connected database."""
+        tables = [
+            row[0]
+            for row in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' "
+                "AND name NOT LIKE 'sqlite_%' ORDER BY rowid"
+            )
+        ]
+        with connection:
+            for table in tables:
+                self._populate_table(connection, table)
+        logger.info(
+            f"Generated synthetic data for {len(tables)} tables: "
+            + ", ".join(f"{table}={self.row_count(table)}" for table in tables)
+        )
+
+    def _populate_table(self, connection: sqlite3.Connection, table: str) -> None:
+        """Insert the generated rows of a single table."""
+        columns = connection.execute(f'PRAGMA table_info("{table}")').fetchall()
+        foreign_keys = {
+            row[3].lower(): row[2]
+            for row in connection.execute(f'PRAGMA foreign_key_list("{table}")')
+        }
+        column_specs = {
+            name.lower(): spec
+            for name, spec in self._tables.get(table.lower(), {})
+            .get("columns", {})
+            .items()
+        }
+        rows = self.row_count(table)
+        generators = [
+            self._column_generator(
+                name=column[1],
+                declared_type=column[2].upper(),
+                is_integer_key=column[5] == 1 and "INT" in column[2].upper(),
+                spec=column_specs.get(column[1].lower(), {}),
+                references=foreign_keys.get(column[1].lower()),
+                rows=rows,
+            )
+            for column in columns
+        ]
+        names = ", ".join(f'"{column[1]}"' for column in columns)
+        placeholders = ", ".join("?" for _ in columns)
+        connection.executemany(
+            f'INSERT INTO "{table}" ({names}) VALUES ({placeholders})',
+            ([generate(i) for generate in generators] for i in range(1, rows + 1)),
+        )
+
+    def _column_generator(
+        self,
+        name: str,
+        declared_type: str,
+        is_integer_key: bool,
+        spec: dict[str, Any],
+        references: str | None,
+        rows: int,
+    ) -> Callable[[int], Any]:
+        """Build a function producing the value of a column for a row number."""
+        generate = self._value_generator(
+            name, declared_type, is_integer_key, spec, references, rows
+        )
+        if not (null_fraction := float(spec.get("null_fraction", 0))):
+            return generate
+        rng = self._random
+        return lambda i: None if rng.random() < null_fraction else generate(i)
+
+    def _value_generator(
+        self,
+        name: str,
+        declared_type: str,
+        is_integer_key: bool,
+        spec: dict[str, Any],
+        references: str | None,
+        rows: int,
+    ) -> Callable[[int], Any]:
+        """Pick a value distribution from the column spec or its declared type."""
+        rng = self._random
+        references = spec.get("references", references)
+
+        if is_integer_key and not spec:
+            return lambda i: i
+        if "values" in spec:
+            values, weights = spec["values"], spec.get("weights")
+            return lambda i: rng.choices(values, weights)[0]
+        if references:
+            upper = max(self.row_count(references.split(".")[0]), 1)
+            return lambda i: rng.randint(1, upper)
+        if "start" in spec or "DATE" in declared_type or "TIME" in declared_type:
+            start = date.fromisoformat(spec.get("start", DEFAULT_DATE_RANGE[0]))
+            end = date.fromisoformat(spec.get("end", DEFAULT_DATE_RANGE[1]))
+            days = (end - start).days
+            return lambda i: (start + timedelta(days=rng.randint(0, days))).isoformat()
+        if "min" in spec or "max" in spec:
+            low, high = spec.get("min", 0), spec.get("max", rows)
+            if isinstance(low, int) and isinstance(high, int):
+                return lambda i: rng.randint(low, high)
+            return lambda i: round(rng.uniform(low, high), 2)
+        if "INT" in declared_type:
+            return lambda i: rng.randint(1, max(rows, 1))
+        if any(t in declared_type for t in ("REAL", "FLOA", "DOUB", "NUM", "DEC")):
+            return lambda i: round(rng.uniform(0, 1000), 2)
+        distinct = int(spec.get("distinct", max(rows // 10, 1)))
+        return lambda i: f"{name}_{rng.randint(1, distinct)}"
+
+
+class SqliteQueryBenchmark(QueryBenchmark):
+    """Times queries on an in-memory SQLite database filled with synthetic data."""
+
+    def __init__(
+        self,
+        schema_ddl: str,
+        data_generator: SyntheticDataGenerator | None = None,
+        runs: int = 5,
+        warmup: int = 1,
+    ) -> None:
+        """Build and populate the in-memory database once for all measurements."""
+        if runs < 1:
+            raise ValueError("runs must be at least 1")
+        self._runs = runs
+        self._warmup = warmup
+        self._connection = sqlite3.connect(":memory:")
+        self._connection.executescript(schema_ddl)
+        (data_generator or SyntheticDataGenerator()).populate(self._connection)
+
+    @classmethod
+    def from_files(
+        cls,
+        schema_path: Path,
+        data_path: Path | None = None,
+        runs: int = 5,
+        warmup: int = 1,
+    ) -> "SqliteQueryBenchmark":
+        """Create a benchmark from a schema DDL file and an optional data spec."""
+        if not schema_path.exists():
+            raise FileNotFoundError(f"Schema file not found: {schema_path}")
+        return cls(
+            schema_path.read_text(encoding="utf-8"),
+            SyntheticDataGenerator.from_file(data_path) if data_path else None,
+            runs=runs,
+            warmup=warmup,
+        )
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """The in-memory database holding the synthetic data."""
+        return self._connection
+
+    def time_query(self, query: str) -> tuple[QueryTiming, Counter]:
+        """Run a query repeatedly, returning its timings and result multiset."""
+        statement = query.strip().rstrip(";")
+        bindings = null_bindings(query)
+        for _ in range(self._warmup):
+            self._connection.execute(statement, bindings).fetchall()
+
+        runs_ms: list[float] = []
+        for _ in range(self._runs):
+            start = time.perf_counter()
+            rows = self._connection.execute(statement, bindings).fetchall()
+            runs_ms.append((time.perf_counter() - start) * 1000)
+        return QueryTiming(runs_ms=runs_ms, row_count=len(rows)), _multiset(rows)
+
+    def compare_queries(
+        self, original_query: str, optimized_query: str
+    ) -> BenchmarkResult:
+        """Time both queries and check that they return the same rows."""
+        errors: list[str] = []
+        measured = {}
+        for label, query in [
+            ("original", original_query),
+            ("optimized", optimized_query),
+        ]:
+            try:
+                measured[label] = self.time_query(query)
+            except sqlite3.Error as e:
+                errors.append(f"{label}: {str(e)}")
+
+        original, optimized = measured.get("original"), measured.get("optimized")
+        result = BenchmarkResult(
+            original=original[0] if original else None,
+            optimized=optimized[0] if optimized else None,
+            equivalent=bool(original and optimized and original[1] == optimized[1]),
+            errors=errors,
+        )
+        if original and optimized and not result.equivalent:
+            logger.warning("Optimized query returns different rows than the original")
+        return result
+
+
+def _multiset(rows: list[tuple]) -> Counter:
+    """Rows as a multiset, tolerating float rounding differences between plans."""
+    return Counter(
+        tuple(
+            (
+                round(value, 6)
+                if isinstance(value, float) and math.isfinite(value)
+                else value
+            )
+            for value in row
+        )
+        for row in rows
+    )
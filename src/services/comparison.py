@@ -0,0 +1,77 @@
+# src/services/comparison.py
+import asyncio
+from collections.abc import Callable
+from pathlib import Path
+
+from config.config import ComparisonTarget, OptimizerConfig
+from config.logger import logger
+from core.interfaces import FileHandler, LLMClient, MetadataRepository
+from core.types import OptimizationResult
+from services.query_optimizer import DatabaseQueryOptimizer
+
+
+class QueryComparison:
+    """Optimizes one SQL file for several targets concurrently on shared infra."""
+
+    def __init__(
+        self,
+        file_handler: FileHandler,
+        metadata_repo: MetadataRepository,
+        config: OptimizerConfig,
+        client_factory: Callable[[OptimizerConfig], LLMClient],
+    ) -> None:
+        """Initialize with shared dependencies and a per-provider client factory."""
+        self._file_handler = file_handler
+        self._metadata_repo = metadata_repo
+        self._config = config
+        self._client_factory = client_factory
+        self._clients: dict[str, LLMClient] = {}
+
+    @property
+    def clients(self) -> list[LLMClient]:
+        """LLM clients created so far, one per provider."""
+        return list(self._clients.values())
+
+    def create_optimizer(self, target: ComparisonTarget) -> DatabaseQueryOptimizer:
+        """Build an optimizer for a target, reusing the provider's client."""
+        target_config = target.apply(self._config)
+        if (llm_client := self._clients.get(target_config.provider)) is None:
+            llm_client = self._client_factory(target_config)
+            self._clients[target_config.provider] = llm_client
+
+        return DatabaseQueryOptimizer(
+            llm_client=llm_client,
+            file_handler=self._file_handler,
+            metadata_repo=self._metadata_repo,
+            config=target_config,
+            database_type=target.database_type,
+            output_label=target.label,
+        )
+
+    async def compare(
+        self, sql_file: Path, targets: list[ComparisonTarget]
+    ) -> dict[ComparisonTarget, OptimizationResult | Exception]:
+        """Optimize the file for every target at once; failures are per target."""
+        if len(set(target.label for target in targets)) != len(targets):
+            raise ValueError("Comparison targets must be unique")
+
+        original_query = await self._file_handler.read_sql_file(sql_file)
+        optimizers = [self.create_optimizer(target) for target in targets]
+        outcomes = await asyncio.gather(
+            *(
+                optimizer.optimize_sql(original_query, sql_file)
+                for optimizer in optimizers
+            ),
+            return_exceptions=True,
+        )
+
+        results: dict[ComparisonTarget, OptimizationResult | Exception] = {}
+        for target, outcome in zip(targets, outcomes):
+            if isinstance(outcome, BaseException) and not isinstance(
+                outcome, Exception
+            ):
+                raise outcome
+            if isinstance(outcome, Exception):
+                logger.error(f"Comparison target {target.label} failed: {outcome}")
+            results[target] = outcome
+        return results
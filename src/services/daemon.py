@@ -0,0 +1,394 @@
+# src/services/daemon.py
+import asyncio
+import json
+import os
+import signal
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any
+
+from config.config import OptimizerConfig
+from config.logger import logger
+from core.client import LLMClientFactory
+from core.interfaces import LLMClient, MetadataRepository
+from core.types import (
+    AppliedRule,
+    BenchmarkResult,
+    DatabaseType,
+    DecomposedQuery,
+    OptimizationResult,
+    OptimizationStage,
+    PlanComparison,
+    QueryMetadata,
+    RewriteCandidate,
+)
+from infra.file_handler import LocalFileHandler
+from infra.metadata_repository import MetadataRepositoryFactory
+from services.plan_verifier import SqlitePlanVerifier
+from services.query_optimizer import DatabaseQueryOptimizer
+
+# Responses carry whole queries and streamed chunks on a single line
+_LINE_LIMIT = 64 * 1024 * 1024
+
+# Settings that change which LLM client is built; the rest are per request
+_CLIENT_FIELDS = (
+    "provider",
+    "model_name",
+    "api_key",
+    "max_concurrent_requests",
+    "requests_per_minute",
+    "tokens_per_minute",
+    "max_retries",
+    "adaptive_concurrency",
+    "fallback_providers",
+    "hedge_percentile",
+    "request_timeout_seconds",
+    "latency_path",
+    "cache_path",
+    "cache_max_bytes",
+    "cache_ttl_seconds",
+    "cassette_path",
+    "cassette_mode",
+    "replay_latency",
+)
+
+
+class DaemonError(RuntimeError):
+    """An optimization request failed inside the daemon."""
+
+
+@dataclass
+class _WarmRepository:
+    """A shared metadata repository and the requests currently using it."""
+
+    repo: MetadataRepository
+    # Storage modification time after the last write this daemon knows of
+    mtime: int | None
+    in_flight: int = 0
+
+
+class OptimizationDaemon:
+    """
+    Serves optimization requests over a Unix socket, keeping shared state warm.
+
+    LLM clients (with their connection pools, response cache and rate limits) and
+    metadata repositories are built on first use for each distinct configuration
+    and reused by later requests. The protocol is newline-delimited JSON: one
+    request line, then ``token`` events and a final ``result`` or ``error`` line.
+    """
+
+    def __init__(
+        self,
+        socket_path: Path,
+        api_key: str | None = None,
+        create_client: Callable[
+            [OptimizerConfig, str | None], LLMClient
+        ] = LLMClientFactory.create_client,
+    ) -> None:
+        """Initialize with the socket to listen on and an optional API key."""
+        self._socket_path = socket_path
+        self._api_key = api_key
+        self._create_client = create_client
+        self._clients: dict[str, LLMClient] = {}
+        self._repos: dict[tuple, _WarmRepository] = {}
+        self._repos_lock = asyncio.Lock()
+        self._started = time.monotonic()
+        self._requests = 0
+
+    @property
+    def clients(self) -> list[LLMClient]:
+        """LLM clients created so far."""
+        return list(self._clients.values())
+
+    async def serve(self) -> None:
+        """Accept requests until interrupted or terminated."""
+        if await DaemonClient(self._socket_path).is_running():
+            raise RuntimeError(f"A daemon is already listening on {self._socket_path}")
+        self._socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self._socket_path.unlink(missing_ok=True)
+        server = await asyncio.start_unix_server(
+            self._handle_connection, path=self._socket_path, limit=_LINE_LIMIT
+        )
+        # Requests may carry API keys
+        os.chmod(self._socket_path, 0o600)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGTERM, stop.set)
+        logger.info(f"Optimization daemon listening on {self._socket_path}")
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            loop.remove_signal_handler(signal.SIGTERM)
+            self._socket_path.unlink(missing_ok=True)
+            logger.info(f"Optimization daemon stopped after {self._requests} requests")
+
+    def status(self) -> dict[str, Any]:
+        """Process id, uptime and the amount of warm state."""
+        return {
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.monotonic() - self._started, 1),
+            "requests": self._requests,
+            "llm_clients": len(self._clients),
+            "metadata_repositories": len(self._repos),
+        }
+
+    async def handle(
+        self, request: dict[str, Any], emit: Callable[[dict], None]
+    ) -> Any:
+        """Run a single request, emitting intermediate events, and return its result."""
+        command = request.get("command")
+        if command == "status":
+            return self.status()
+        if command != "optimize":
+            raise ValueError(f"Unsupported daemon command: {command}")
+
+        self._requests += 1
+        config = OptimizerConfig.from_dict(request["config"])
+        api_key = request.get("api_key") or self._api_key
+        schema = request.get("schema")
+        metadata_repo = await self._acquire_repo(config)
+        try:
+            optimizer = DatabaseQueryOptimizer(
+                llm_client=self._client(config, api_key),
+                file_handler=LocalFileHandler(),
+                metadata_repo=metadata_repo,
+                config=config,
+                database_type=config.database_type,
+                on_token=lambda stage, chunk: emit(
+                    {"event": "token", "stage": stage.value, "chunk": chunk}
+                ),
+                plan_verifier=(
+                    SqlitePlanVerifier.from_file(Path(schema)) if schema else None
+                ),
+            )
+            return result_to_dict(
+                await optimizer.optimize_query(Path(request["sql_file"]))
+            )
+        finally:
+            await self._release_repo(config)
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Read one request from a connection and stream back its events."""
+
+        def emit(event: dict) -> None:
+            writer.write(json.dumps(event).encode() + b"\n")
+
+        try:
+            request = json.loads(await reader.readline())
+            emit({"event": "result", "result": await self.handle(request, emit)})
+        except Exception as e:
+            logger.error(f"Daemon request failed: {str(e)}")
+            emit({"event": "error", "message": str(e)})
+        try:
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            logger.warning("Daemon client disconnected before the response was sent")
+
+    def _client(self, config: OptimizerConfig, api_key: str | None) -> LLMClient:
+        """Warm LLM client for the configuration, created on first use."""
+        settings = config.to_dict()
+        key = json.dumps([api_key] + [settings[name] for name in _CLIENT_FIELDS])
+        if (client := self._clients.get(key)) is None:
+            client = self._clients[key] = self._create_client(config, api_key)
+        return client
+
+    async def _acquire_repo(self, config: OptimizerConfig) -> MetadataRepository:
+        """
+        Warm metadata repository, reloaded if another process changed it.
+
+        A repository is only replaced while no request uses it, so concurrent
+        requests always share one instance and never overwrite each other's
+        entries from stale copies.
+        """
+        path = self._storage_path(config)
+        async with self._repos_lock:
+            warm = self._repos.get(self._repo_key(config))
+            if warm is None or (warm.in_flight == 0 and warm.mtime != _mtime(path)):
+                warm = self._repos[self._repo_key(config)] = _WarmRepository(
+                    MetadataRepositoryFactory.create_repository(
+                        config.metadata_backend, path, config.parameterize_literals
+                    ),
+                    _mtime(path),
+                )
+            warm.in_flight += 1
+            return warm.repo
+
+    async def _release_repo(self, config: OptimizerConfig) -> None:
+        """Record the storage time after our own writes so they do not force a reload."""
+        async with self._repos_lock:
+            warm = self._repos[self._repo_key(config)]
+            warm.in_flight -= 1
+            warm.mtime = _mtime(self._storage_path(config))
+
+    def _repo_key(self, config: OptimizerConfig) -> tuple:
+        """Settings that select a distinct metadata repository."""
+        return (
+            config.metadata_backend,
+            self._storage_path(config),
+            config.parameterize_literals,
+        )
+
+    @staticmethod
+    def _storage_path(config: OptimizerConfig) -> Path:
+        """Absolute metadata location of a configuration."""
+        return (
+            config.metadata_path
+            or MetadataRepositoryFactory.default_path(config.metadata_backend)
+        ).resolve()
+
+
+class DaemonClient:
+    """Forwards optimization requests to a running ``serve`` daemon."""
+
+    def __init__(self, socket_path: Path) -> None:
+        """Initialize with the daemon socket location."""
+        self._socket_path = socket_path
+
+    async def is_running(self) -> bool:
+        """Whether a daemon accepts connections on the socket."""
+        if not self._socket_path.exists():
+            return False
+        try:
+            _, writer = await asyncio.open_unix_connection(self._socket_path)
+        except OSError:
+            return False
+        writer.close()
+        await writer.wait_closed()
+        return True
+
+    async def status(self) -> dict[str, Any]:
+        """Process id, uptime and the amount of warm state of the daemon."""
+        return await self._request({"command": "status"})
+
+    async def optimize(
+        self,
+        sql_file: Path,
+        config: OptimizerConfig,
+        api_key: str | None = None,
+        schema: Path | None = None,
+        on_token: Callable[[OptimizationStage, str], None] | None = None,
+    ) -> OptimizationResult:
+        """Optimize a SQL file in the daemon, as the local optimizer would."""
+        # The daemon resolves relative paths against its own working directory
+        config = replace(
+            config,
+            metadata_path=(
+                config.metadata_path
+                or MetadataRepositoryFactory.default_path(config.metadata_backend)
+            ).resolve(),
+            cache_path=config.cache_path.resolve() if config.cache_path else None,
+            latency_path=config.latency_path.resolve() if config.latency_path else None,
+            cassette_path=(
+                config.cassette_path.resolve() if config.cassette_path else None
+            ),
+        )
+        result = await self._request(
+            {
+                "command": "optimize",
+                "sql_file": str(sql_file.resolve()),
+                "config": config.to_dict(),
+                "api_key": api_key,
+                "schema": str(schema.resolve()) if schema else None,
+            },
+            on_token,
+        )
+        return result_from_dict(result)
+
+    async def _request(
+        self,
+        request: dict[str, Any],
+        on_token: Callable[[OptimizationStage, str], None] | None = None,
+    ) -> Any:
+        """Send a request and follow its events until the result arrives."""
+        reader, writer = await asyncio.open_unix_connection(
+            self._socket_path, limit=_LINE_LIMIT
+        )
+        try:
+            writer.write(json.dumps(request).encode() + b"\n")
+            await writer.drain()
+            while line := await reader.readline():
+                event = json.loads(line)
+                if event["event"] == "result":
+                    return event["result"]
+                if event["event"] == "error":
+                    raise DaemonError(event["message"])
+                if on_token is not None:
+                    on_token(OptimizationStage(event["stage"]), event["chunk"])
+            raise DaemonError("Daemon closed the connection without a result")
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+
+def result_to_dict(result: OptimizationResult) -> dict[str, Any]:
+    """Serialize a result, including candidates, benchmark and decomposition."""
+    return {
+        "original_query": result.original_query,
+        "explained_query": result.explained_query,
+        "optimized_query": result.optimized_query,
+        "metadata": result.metadata.to_dict(),
+        "database_type": result.database_type.value,
+        "output_path": str(result.output_path) if result.output_path else None,
+        "plan_comparison": (
+            result.plan_comparison.to_dict() if result.plan_comparison else None
+        ),
+        "benchmark": result.benchmark.to_dict() if result.benchmark else None,
+        "candidates": [candidate.to_dict() for candidate in result.candidates],
+        "applied_rules": [rule.to_dict() for rule in result.applied_rules],
+        "reused_stages": [stage.value for stage in result.reused_stages],
+        "prompt_tokens": result.prompt_tokens,
+        "decomposition": (
+            result.decomposition.to_dict() if result.decomposition else None
+        ),
+        "statements": [result_to_dict(r) for r in result.statements],
+        "statement_errors": result.statement_errors,
+        "script_path": str(result.script_path) if result.script_path else None,
+    }
+
+
+def result_from_dict(data: dict[str, Any]) -> OptimizationResult:
+    """Rebuild a result serialized by ``result_to_dict``."""
+    return OptimizationResult(
+        original_query=data["original_query"],
+        explained_query=data["explained_query"],
+        optimized_query=data["optimized_query"],
+        metadata=QueryMetadata.from_dict(data["metadata"]),
+        database_type=DatabaseType(data["database_type"]),
+        output_path=Path(data["output_path"]) if data["output_path"] else None,
+        plan_comparison=(
+            PlanComparison.from_dict(data["plan_comparison"])
+            if data["plan_comparison"]
+            else None
+        ),
+        benchmark=(
+            BenchmarkResult.from_dict(data["benchmark"]) if data["benchmark"] else None
+        ),
+        candidates=[RewriteCandidate.from_dict(c) for c in data["candidates"]],
+        applied_rules=[AppliedRule(**rule) for rule in data["applied_rules"]],
+        reused_stages=[OptimizationStage(stage) for stage in data["reused_stages"]],
+        prompt_tokens=data["prompt_tokens"],
+        decomposition=(
+            DecomposedQuery.from_dict(data["decomposition"])
+            if data["decomposition"]
+            else None
+        ),
+        statements=[result_from_dict(r) for r in data["statements"]],
+        # JSON object keys are strings
+        statement_errors={int(i): e for i, e in data["statement_errors"].items()},
+        script_path=Path(data["script_path"]) if data["script_path"] else None,
+    )
+
+
+def _mtime(path: Path) -> int | None:
+    """Modification time of a file in nanoseconds, if it exists."""
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
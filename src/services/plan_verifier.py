@@ -0,0 +1,116 @@
+# src/services/plan_verifier.py
+import re
+import sqlite3
+from pathlib import Path
+
+from config.logger import logger
+from core.interfaces import PlanVerifier
+from core.sql_normalizer import null_bindings
+from core.types import PlanComparison, QueryPlan
+
+_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)")
+_INDEXED = re.compile(r"\bUSING (COVERING |INTEGER PRIMARY KEY|PRIMARY KEY|INDEX)")
+
+
+class SqlitePlanVerifier(PlanVerifier):
+    """Compares SQLite query plans on an in-memory copy of a schema."""
+
+    def __init__(self, schema_ddl: str) -> None:
+        """Build an empty in-memory database from the schema DDL."""
+        self._connection = sqlite3.connect(":memory:")
+        self._connection.executescript(schema_ddl)
+
+    @classmethod
+    def from_file(cls, schema_path: Path) -> "SqlitePlanVerifier":
+        """Create a verifier from a schema DDL file."""
+        if not schema_path.exists():
+            raise FileNotFoundError(f"Schema file not found: {schema_path}")
+        return cls(schema_path.read_text(encoding="utf-8"))
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """The in-memory database holding the schema."""
+        return self._connection
+
+    def explain(self, query: str) -> QueryPlan:
+        """Run EXPLAIN QUERY PLAN for a single statement and classify its steps."""
+        rows = self._connection.execute(
+            f"EXPLAIN QUERY PLAN {query.strip().rstrip(';')}", null_bindings(query)
+        ).fetchall()
+        plan = QueryPlan(steps=[row[3] for row in rows])
+        for step in plan.steps:
+            if _SCAN.match(step):
+                if _INDEXED.search(step):
+                    plan.index_scans += 1
+                else:
+                    plan.full_scans += 1
+            elif step.startswith("SEARCH"):
+                plan.index_searches += 1
+            if "TEMP B-TREE" in step:
+                plan.temp_btrees += 1
+            if step.startswith("CORRELATED"):
+                plan.correlated_subqueries += 1
+            if "AUTOMATIC" in step:
+                plan.automatic_indexes += 1
+        return plan
+
+    def compare_plans(
+        self, original_query: str, optimized_query: str
+    ) -> PlanComparison:
+        """Compare both plans and flag regressions of the optimized query."""
+        errors: list[str] = []
+        comparison = PlanComparison(
+            original=self._try_explain(original_query, "original", errors),
+            optimized=self._try_explain(optimized_query, "optimized", errors),
+            errors=errors,
+        )
+        if comparison.optimized is None:
+            if comparison.original is not None:
+                comparison.regressions.append(
+                    "optimized query does not compile against the schema"
+                )
+            return comparison
+        if comparison.original is None:
+            return comparison
+
+        original, optimized = comparison.original, comparison.optimized
+        for label, before, after in [
+            ("full table scans", original.full_scans, optimized.full_scans),
+            ("temp B-trees", original.temp_btrees, optimized.temp_btrees),
+            (
+                "correlated subqueries",
+                original.correlated_subqueries,
+                optimized.correlated_subqueries,
+            ),
+            (
+                "automatic indexes",
+                original.automatic_indexes,
+                optimized.automatic_indexes,
+            ),
+        ]:
+            if after > before:
+                comparison.regressions.append(f"more {label} ({before} -> {after})")
+            elif after < before:
+                comparison.improvements.append(f"fewer {label} ({before} -> {after})")
+
+        if (
+            optimized.full_scans > original.full_scans
+            and optimized.index_searches < original.index_searches
+        ):
+            comparison.regressions.append("full scans replaced index searches")
+
+        if comparison.has_regressions:
+            logger.warning(
+                f"Query plan regressions: {'; '.join(comparison.regressions)}"
+            )
+        return comparison
+
+    def _try_explain(
+        self, query: str, label: str, errors: list[str]
+    ) -> QueryPlan | None:
+        """Explain a query, recording a failure instead of raising."""
+        try:
+            return self.explain(query)
+        except sqlite3.Error as e:
+            errors.append(f"{label}: {str(e)}")
+            return None
@@ -1,7 +1,13 @@
 # src/services/prompt_generators.py
 from core.interfaces import PromptGenerator
+from core.prompt_compaction import compact_text
+from core.sql_normalizer import compact_sql
 from core.types import DatabaseType
 
+# Placeholders substituted after the template itself has been compacted
+_SQL_PLACEHOLDER = "{sql_query}"
+_EXPLANATION_PLACEHOLDER = "{explanation}"
+
 
 class OraclePromptGenerator(PromptGenerator):
     """Generates prompts for Oracle database optimization."""
@@ -43,6 +49,54 @@ class OraclePromptGenerator(PromptGenerator):
         Consider Oracle optimizer behavior
         Please provide only the SQL query without additional explanation: """
 
+    def generate_fragment_prompt(self, fragment_sql: str) -> str:
+        """Generate prompt for rewriting an Oracle subquery on its own."""
+        intro = (
+            "You are an expert Oracle SQL developer. The following Oracle SQL subquery "
+            "is one part of a larger query and is optimized on its own."
+        )
+        return f"""
+        {intro}
+
+        Subquery:
+        ```sql
+        {fragment_sql}
+        ```
+
+        Requirements:
+
+        Return a drop-in replacement producing the same columns and rows
+        Keep references to aliases of the outer query exactly as written
+        Focus on performance optimization
+        Use Oracle-specific functions and hints only where beneficial
+        Do not wrap the subquery in parentheses or end it with a semicolon
+        Please provide only the SQL subquery without additional explanation: """
+
+    def generate_compose_prompt(self, skeleton: str, fragments: dict[str, str]) -> str:
+        """Generate prompt for rewriting an Oracle outer query around placeholders."""
+        intro = (
+            "You are an expert Oracle SQL developer. In the following Oracle SQL query "
+            "every subquery was replaced by a placeholder; the subqueries are optimized separately."
+        )
+        return f"""
+        {intro}
+
+        Outer query:
+        ```sql
+        {skeleton}
+        ```
+
+        Placeholders:
+        {_format_fragments(fragments)}
+
+        Requirements:
+
+        Optimize the outer query for Oracle (joins, filters, ordering)
+        Keep every placeholder exactly once, alone inside its own parentheses
+        Do not expand, rename or restate the placeholders
+        Keep the same result columns, rows and ordering
+        Please provide only the SQL query without additional explanation: """
+
     def get_database_type(self) -> DatabaseType:
         """Get the database type this generator supports."""
         return DatabaseType.ORACLE
@@ -91,20 +145,130 @@ class SQLitePromptGenerator(PromptGenerator):
         Avoid features not supported by SQLite
         Please provide only the SQL query without additional explanation: """
 
+    def generate_fragment_prompt(self, fragment_sql: str) -> str:
+        """Generate prompt for rewriting a SQLite subquery on its own."""
+        intro = (
+            "You are an expert SQLite SQL developer. The following SQLite SQL subquery "
+            "is one part of a larger query and is optimized on its own."
+        )
+        return f"""
+        {intro}
+
+        Subquery:
+        ```sql
+        {fragment_sql}
+        ```
+
+        Requirements:
+
+        Return a drop-in replacement producing the same columns and rows
+        Keep references to aliases of the outer query exactly as written
+        Focus on performance optimization for SQLite
+        Use SQLite built-in functions and indexes where beneficial
+        Do not wrap the subquery in parentheses or end it with a semicolon
+        Please provide only the SQL subquery without additional explanation: """
+
+    def generate_compose_prompt(self, skeleton: str, fragments: dict[str, str]) -> str:
+        """Generate prompt for rewriting a SQLite outer query around placeholders."""
+        intro = (
+            "You are an expert SQLite SQL developer. In the following SQLite SQL query "
+            "every subquery was replaced by a placeholder; the subqueries are optimized separately."
+        )
+        return f"""
+        {intro}
+
+        Outer query:
+        ```sql
+        {skeleton}
+        ```
+
+        Placeholders:
+        {_format_fragments(fragments)}
+
+        Requirements:
+
+        Optimize the outer query for SQLite (joins, filters, ordering)
+        Keep every placeholder exactly once, alone inside its own parentheses
+        Do not expand, rename or restate the placeholders
+        Keep the same result columns, rows and ordering
+        Please provide only the SQL query without additional explanation: """
+
     def get_database_type(self) -> DatabaseType:
         """Get the database type this generator supports."""
         return DatabaseType.SQLITE
 
 
+class CompactPromptGenerator(PromptGenerator):
+    """Wraps a prompt generator to send fewer tokens with the same content."""
+
+    def __init__(self, generator: PromptGenerator) -> None:
+        """Compact the wrapped templates once; inputs are compacted per prompt."""
+        self._generator = generator
+        self._sql_template = compact_text(
+            generator.generate_sql_to_natural_prompt(_SQL_PLACEHOLDER)
+        )
+        self._natural_template = compact_text(
+            generator.generate_natural_to_sql_prompt(_EXPLANATION_PLACEHOLDER)
+        )
+        self._fragment_template = compact_text(
+            generator.generate_fragment_prompt(_SQL_PLACEHOLDER)
+        )
+
+    def generate_sql_to_natural_prompt(self, sql_query: str) -> str:
+        """Compacted template around the query without comments or extra spaces."""
+        return self._sql_template.replace(_SQL_PLACEHOLDER, compact_sql(sql_query), 1)
+
+    def generate_natural_to_sql_prompt(self, explanation: str) -> str:
+        """Compacted template around the explanation, keeping its line structure."""
+        return self._natural_template.replace(
+            _EXPLANATION_PLACEHOLDER, compact_text(explanation, dedent=False), 1
+        )
+
+    def generate_fragment_prompt(self, fragment_sql: str) -> str:
+        """Compacted template around the subquery, which is sent verbatim."""
+        return self._fragment_template.replace(_SQL_PLACEHOLDER, fragment_sql, 1)
+
+    def generate_compose_prompt(self, skeleton: str, fragments: dict[str, str]) -> str:
+        """
+        Compacted template around the outer query, which is sent verbatim.
+
+        The model returns drop-in replacements for these queries, so they keep
+        their exact text; only the template and the one-line subquery context
+        are compacted.
+        """
+        template = compact_text(
+            self._generator.generate_compose_prompt(_SQL_PLACEHOLDER, fragments)
+        )
+        return template.replace(_SQL_PLACEHOLDER, skeleton, 1)
+
+    def get_database_type(self) -> DatabaseType:
+        """Get the database type of the wrapped generator."""
+        return self._generator.get_database_type()
+
+
+def _format_fragments(fragments: dict[str, str]) -> str:
+    """One ``placeholder: subquery`` line per fragment, for context."""
+    return "\n        ".join(
+        f"{placeholder}: {compact_sql(query)}"
+        for placeholder, query in fragments.items()
+    )
+
+
 class PromptGeneratorFactory:
     """Factory for creating database-specific prompt generators."""
 
     @staticmethod
-    def create_generator(database_type: DatabaseType) -> PromptGenerator:
+    def create_generator(
+        database_type: DatabaseType,
+        compact: bool = False,
+    ) -> PromptGenerator:
         """Create a prompt generator for the specified database type."""
         if database_type == DatabaseType.ORACLE:
-            return OraclePromptGenerator()
+            generator: PromptGenerator = OraclePromptGenerator()
         elif database_type == DatabaseType.SQLITE:
-            return SQLitePromptGenerator()
+            generator = SQLitePromptGenerator()
         else:
             raise ValueError(f"Unsupported database type: {database_type}")
+        if compact:
+            return CompactPromptGenerator(generator)
+        return generator
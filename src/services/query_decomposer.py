@@ -0,0 +1,186 @@
+# src/services/query_decomposer.py
+from core.sql_normalizer import SQL_KEYWORDS, SqlToken, TokenType, tokenize_sql
+from core.types import DecomposedQuery, QueryFragment
+from services.sql_extraction import extract_sql, is_well_formed_sql
+
+PLACEHOLDER = "__subquery_{}__"
+MIN_FRAGMENTS = 2
+_SUBQUERY_START = frozenset({"SELECT", "WITH"})
+# Tokens a drop-in rewrite must keep, besides non-keyword words
+_KEPT_TOKENS = frozenset(
+    {
+        TokenType.STRING,
+        TokenType.NUMBER,
+        TokenType.QUOTED_IDENTIFIER,
+        TokenType.PARAMETER,
+    }
+)
+
+
+class QueryDecomposer:
+    """Splits large queries into subqueries that can be optimized separately.
+
+    Every outermost parenthesized ``SELECT``/``WITH`` (scalar subqueries,
+    ``IN``/``EXISTS`` subqueries, derived tables and CTE bodies) becomes a
+    fragment and is replaced by a placeholder in the outer query. Subqueries
+    nested inside a fragment stay part of it.
+    """
+
+    def __init__(self, min_fragments: int = MIN_FRAGMENTS) -> None:
+        """Initialize with the fragment count below which queries stay whole."""
+        self._min_fragments = min_fragments
+
+    def decompose(self, sql: str) -> DecomposedQuery | None:
+        """Cut out the outermost subqueries, or None if there are too few."""
+        tokens = _code_tokens(sql)
+        parts: list[str] = []
+        fragments: list[QueryFragment] = []
+        cursor = 0
+        position = 0
+        while position < len(tokens):
+            if _is_punct(tokens[position], "(") and (
+                position + 1 < len(tokens)
+                and tokens[position + 1].upper in _SUBQUERY_START
+            ):
+                if (close := _matching_paren(tokens, position)) is None:
+                    return None
+                start, end = tokens[position + 1].start, tokens[close].start
+                placeholder = PLACEHOLDER.format(len(fragments) + 1)
+                fragments.append(QueryFragment(placeholder, sql[start:end].strip()))
+                parts += [sql[cursor:start], placeholder]
+                cursor = end
+                position = close
+            position += 1
+
+        if len(fragments) < self._min_fragments:
+            return None
+        parts.append(sql[cursor:])
+        return DecomposedQuery(skeleton="".join(parts), fragments=fragments)
+
+    def compose(self, decomposition: DecomposedQuery) -> str:
+        """Substitute the fragments into the outer query, preferring rewrites."""
+        replacements = {
+            fragment.placeholder: fragment.optimized_query or fragment.query
+            for fragment in decomposition.fragments
+        }
+        if decomposition.optimized_skeleton is not None:
+            composed = _substitute(decomposition.optimized_skeleton, replacements)
+            if composed is not None:
+                return composed
+        return _substitute(decomposition.skeleton, replacements) or ""
+
+    @staticmethod
+    def clean_fragment(answer: str, fragment: QueryFragment) -> str | None:
+        """
+        Subquery text from a model answer, or None if it is not one.
+
+        A rewrite that drops an identifier or literal of the fragment is
+        rejected too: it can no longer be a drop-in replacement.
+        """
+        sql = extract_sql(answer).rstrip().rstrip(";").strip()
+        tokens = _code_tokens(sql)
+        while (
+            tokens
+            and _is_punct(tokens[0], "(")
+            and _matching_paren(tokens, 0) == len(tokens) - 1
+        ):
+            start, end = tokens[0].start + 1, tokens[-1].start
+            sql = sql[start:end].strip()
+            tokens = _code_tokens(sql)
+        if not tokens or tokens[0].upper not in _SUBQUERY_START:
+            return None
+        if not is_well_formed_sql(sql) or not _preserved(fragment.query, sql):
+            return None
+        return sql
+
+    @staticmethod
+    def clean_skeleton(answer: str, decomposition: DecomposedQuery) -> str | None:
+        """
+        Outer query from a model answer, or None if it is not a drop-in rewrite.
+
+        The rewrite must keep every placeholder in its own parentheses and
+        every identifier and literal of the outer query.
+        """
+        skeleton = extract_sql(answer).strip()
+        placeholders = {f.placeholder: f.placeholder for f in decomposition.fragments}
+        if _substitute(skeleton, placeholders) is None or not _preserved(
+            decomposition.skeleton, skeleton
+        ):
+            return None
+        return skeleton
+
+
+def _code_tokens(sql: str) -> list[SqlToken]:
+    """Tokens of a SQL text without whitespace and comments."""
+    return [
+        token
+        for token in tokenize_sql(sql)
+        if token.type not in (TokenType.WHITESPACE, TokenType.COMMENT)
+    ]
+
+
+def _names_and_literals(sql: str) -> set[str]:
+    """Identifiers, literals and parameters of a SQL text."""
+    return {
+        token.value.lower() if token.type == TokenType.WORD else token.value
+        for token in _code_tokens(sql)
+        if token.type in _KEPT_TOKENS
+        or (token.type == TokenType.WORD and token.upper not in SQL_KEYWORDS)
+    }
+
+
+def _preserved(original: str, rewrite: str) -> bool:
+    """Whether a rewrite still has every identifier and literal of the original."""
+    return _names_and_literals(original) <= _names_and_literals(rewrite)
+
+
+def _is_punct(token: SqlToken, value: str) -> bool:
+    """Whether a token is the given punctuation."""
+    return token.type == TokenType.PUNCTUATION and token.value == value
+
+
+def _matching_paren(tokens: list[SqlToken], opening: int) -> int | None:
+    """Position of the parenthesis closing the one at ``opening``."""
+    depth = 0
+    for position in range(opening, len(tokens)):
+        if _is_punct(tokens[position], "("):
+            depth += 1
+        elif _is_punct(tokens[position], ")"):
+            depth -= 1
+            if depth == 0:
+                return position
+    return None
+
+
+def _substitute(skeleton: str, replacements: dict[str, str]) -> str | None:
+    """
+    Replace each placeholder of an outer query with its fragment.
+
+    Returns None unless every placeholder occurs exactly once and directly
+    inside its own parentheses, which is how the decomposer left it.
+    """
+    tokens = _code_tokens(skeleton)
+    found: dict[str, SqlToken] = {}
+    for position, token in enumerate(tokens):
+        if (placeholder := token.value.lower()) not in replacements:
+            continue
+        if (
+            placeholder in found
+            or position == 0
+            or position + 1 == len(tokens)
+            or not _is_punct(tokens[position - 1], "(")
+            or not _is_punct(tokens[position + 1], ")")
+        ):
+            return None
+        found[placeholder] = token
+    if len(found) != len(replacements):
+        return None
+
+    parts: list[str] = []
+    cursor = 0
+    for placeholder, token in sorted(found.items(), key=lambda item: item[1].start):
+        start = token.start
+        parts += [skeleton[cursor:start], replacements[placeholder]]
+        cursor = token.start + len(token.value)
+    parts.append(skeleton[cursor:])
+    return "".join(parts)
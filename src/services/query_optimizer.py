@@ -1,13 +1,50 @@
 # src/services/query_optimizer.py (updated)
+import asyncio
+import json
+from collections.abc import Callable
+from contextlib import aclosing
 from datetime import datetime
 from hashlib import sha256
 from pathlib import Path
+from typing import Any
 
 from config.config import OptimizerConfig
 from config.logger import logger
-from core.interfaces import FileHandler, LLMClient, MetadataRepository, QueryOptimizer
-from core.types import DatabaseType, OptimizationResult, QueryMetadata
+from config.tracing import tracer
+from core.interfaces import (
+    FileHandler,
+    LLMClient,
+    MetadataRepository,
+    PlanVerifier,
+    QueryBenchmark,
+    QueryOptimizer,
+)
+from core.prompt_compaction import estimate_tokens
+from core.sql_normalizer import fingerprint_sql, normalize_sql
+from core.types import (
+    BenchmarkResult,
+    DatabaseType,
+    DecomposedQuery,
+    OptimizationResult,
+    OptimizationStage,
+    PlanComparison,
+    QueryFragment,
+    QueryMetadata,
+    RewriteCandidate,
+    RuleRewrite,
+)
 from services.prompt_generator import PromptGeneratorFactory
+from services.query_decomposer import QueryDecomposer
+from services.rule_optimizer import RuleBasedOptimizer
+from services.sql_extraction import (
+    SqlStatement,
+    SqlStreamTerminator,
+    extract_sql,
+    is_query,
+    is_well_formed_sql,
+    join_sql_statements,
+    split_sql_script,
+)
 
 
 class DatabaseQueryOptimizer(QueryOptimizer):
@@ -20,87 +57,450 @@ class DatabaseQueryOptimizer(QueryOptimizer):
         metadata_repo: MetadataRepository,
         config: OptimizerConfig,
         database_type: DatabaseType,
+        output_label: str | None = None,
+        on_token: Callable[[OptimizationStage, str], None] | None = None,
+        plan_verifier: PlanVerifier | None = None,
+        benchmark: QueryBenchmark | None = None,
     ) -> None:
-        """Initialize optimizer with dependencies."""
+        """Initialize optimizer with dependencies and optional extensions."""
         self._llm_client = llm_client
         self._file_handler = file_handler
         self._metadata_repo = metadata_repo
         self._config = config
         self._database_type = database_type
-        self._prompt_generator = PromptGeneratorFactory.create_generator(database_type)
+        self._output_label = output_label or database_type.value
+        self._on_token = on_token
+        self._plan_verifier = plan_verifier
+        self._benchmark = benchmark
+        self._prompt_generator = PromptGeneratorFactory.create_generator(
+            database_type, compact=config.compact_prompts
+        )
+        self._prompt_version = self._prompt_generator.get_prompt_version()
+        self._rule_optimizer = RuleBasedOptimizer() if config.apply_rules else None
+        self._decomposer = QueryDecomposer() if config.decompose else None
+        self._settings_version = self._get_settings_version()
+
+    def get_output_path(self, sql_file_path: Path) -> Path:
+        """Path of the JSON output written for a SQL file."""
+        return (
+            sql_file_path.parent
+            / f"{sql_file_path.stem}_{self._output_label}_optimization.json"
+        )
+
+    def get_script_output_path(self, sql_file_path: Path) -> Path:
+        """Path of the reassembled script written for a multi-statement file."""
+        return (
+            sql_file_path.parent
+            / f"{sql_file_path.stem}_{self._output_label}_optimized.sql"
+        )
+
+    def statement_hashes(self, sql: str) -> list[str]:
+        """Metadata keys of the statements ``optimize_sql`` stores for a file."""
+        if len(statements := split_sql_script(sql)) > 1:
+            return [
+                self._generate_query_hash(s.text)
+                for s in statements
+                if is_query(s.text)
+            ]
+        return [self._generate_query_hash(sql)]
 
     async def optimize_query(self, sql_file_path: Path) -> OptimizationResult:
         """Optimize a SQL query from file."""
+        try:
+            with tracer.span("file_read", file=str(sql_file_path)):
+                original_query = await self._file_handler.read_sql_file(sql_file_path)
+        except Exception as e:
+            logger.error(
+                f"Error during {self._database_type.value} optimization: {str(e)}"
+            )
+            raise
+        return await self.optimize_sql(original_query, sql_file_path)
+
+    async def optimize_sql(
+        self, original_query: str, sql_file_path: Path
+    ) -> OptimizationResult:
+        """Optimize an already loaded SQL query, writing output next to its file."""
         logger.info(
-            f"Starting {self._database_type.value.upper()} optimization for: {sql_file_path}"
+            f"Starting {self._database_type.value.upper()} optimization for: {sql_file_path}",
+            sample="optimization_start",
         )
         try:
-            original_query = await self._file_handler.read_sql_file(sql_file_path)
+            if len(statements := split_sql_script(original_query)) > 1:
+                result = await self._optimize_script(
+                    original_query, statements, sql_file_path
+                )
+            else:
+                result, output = await self._optimize_statement(original_query)
+                result.output_path = self.get_output_path(sql_file_path)
+                with tracer.span("output_write"):
+                    await self._file_handler.write_json_file(result.output_path, output)
+
+            logger.info(
+                f"{self._database_type.value.upper()} optimization completed successfully",
+                sample="optimization_done",
+            )
+            return result
+        except Exception as e:
+            logger.error(
+                f"Error during {self._database_type.value} optimization: {str(e)}"
+            )
+            raise
+
+    async def _optimize_statement(
+        self, original_query: str
+    ) -> tuple[OptimizationResult, dict[str, Any]]:
+        """Optimize a single statement, returning its result and output JSON."""
+        with tracer.span("hash"):
             query_hash = self._generate_query_hash(original_query)
-            metadata = await self._get_or_create_metadata(query_hash, original_query)
+        with tracer.span("metadata_lookup") as fields:
+            stored = await self._metadata_repo.get_metadata(query_hash)
+            fields["hit"] = stored is not None
+        reusable = self._reusable_metadata(stored, original_query)
+        reused: list[OptimizationStage] = []
+        prompt_tokens: dict[str, int] = {}
+        decomposition: DecomposedQuery | None = None
 
-            logger.info("Converting SQL to natural language...")
-            explanation = await self._sql_to_natural_language(original_query)
+        rewrite = self._apply_rules(original_query)
+        if reusable is not None and reusable.optimized_query:
+            logger.info(
+                "Query, model, prompts and settings unchanged, reusing stored result",
+                sample="stage_progress",
+            )
+            explanation = reusable.explanation_text
+            candidates = [
+                self._evaluate_candidate(0, original_query, reusable.optimized_query)
+            ]
+            reused = [
+                OptimizationStage.SQL_TO_NATURAL,
+                OptimizationStage.NATURAL_TO_SQL,
+            ]
+        elif rewrite.complete:
+            logger.info(
+                "Rules fully optimized the query, skipping the LLM",
+                sample="stage_progress",
+            )
+            explanation = self._describe_rules(rewrite)
+            candidates = [self._evaluate_candidate(0, original_query, rewrite.query)]
+        elif (decomposition := self._decompose(rewrite.query)) is not None:
+            explanation = (
+                f"Optimized as {len(decomposition.fragments)} separately rewritten "
+                "subqueries composed into the rewritten outer query"
+            )
+            optimized_query = await self._optimize_decomposed(
+                decomposition, prompt_tokens
+            )
+            candidates = [self._evaluate_candidate(0, original_query, optimized_query)]
+        else:
+            if reusable is not None:
+                logger.info(
+                    "Reusing stored natural language explanation...",
+                    sample="stage_progress",
+                )
+                explanation = reusable.explanation_text
+                reused = [OptimizationStage.SQL_TO_NATURAL]
+            else:
+                logger.info(
+                    "Converting SQL to natural language...", sample="stage_progress"
+                )
+                explanation = await self._sql_to_natural_language(
+                    rewrite.query, prompt_tokens
+                )
 
-            logger.info("Converting natural language to optimized SQL...")
-            optimized_query = await self._natural_language_to_sql(explanation)
+            logger.info(
+                "Converting natural language to optimized SQL...",
+                sample="stage_progress",
+            )
+            candidates = await self._generate_candidates(
+                original_query, explanation, prompt_tokens
+            )
+        selected = self._select_candidate(candidates)
 
+        if reusable is not None and len(reused) == len(OptimizationStage):
+            metadata = reusable
+        else:
+            metadata = self._new_version(stored, original_query)
             metadata.explanation_text = explanation
+            metadata.optimized_query = selected.query
+            metadata.model_name = self._config.model_name
+            metadata.prompt_version = self._prompt_version
+            metadata.settings_version = self._settings_version
             metadata.last_optimization = datetime.now()
             metadata.database_type = self._database_type
+            with tracer.span("metadata_save"):
+                await self._metadata_repo.save_metadata(query_hash, metadata)
 
-            await self._metadata_repo.save_metadata(query_hash, metadata)
-            await self._generate_output_json(sql_file_path, metadata)
+        output = self._build_output(
+            metadata, selected, candidates, rewrite, prompt_tokens
+        )
+        if decomposition is not None:
+            output["decomposition"] = decomposition.to_dict()
+        result = OptimizationResult(
+            original_query=original_query,
+            explained_query=explanation,
+            optimized_query=selected.query,
+            metadata=metadata,
+            database_type=self._database_type,
+            plan_comparison=selected.plan_comparison,
+            benchmark=selected.benchmark,
+            candidates=candidates,
+            applied_rules=rewrite.applied_rules,
+            reused_stages=reused,
+            prompt_tokens=prompt_tokens,
+            decomposition=decomposition,
+        )
+        return result, output
 
-            logger.info(
-                f"{self._database_type.value.upper()} optimization completed successfully"
-            )
-            return OptimizationResult(
-                original_query=original_query,
-                explained_query=explanation,
-                optimized_query=optimized_query,
-                metadata=metadata,
-                database_type=self._database_type,
-            )
-        except Exception as e:
-            logger.error(
-                f"Error during {self._database_type.value} optimization: {str(e)}"
+    async def _optimize_script(
+        self, script: str, statements: list[SqlStatement], sql_file_path: Path
+    ) -> OptimizationResult:
+        """
+        Optimize every query of a script concurrently and reassemble it.
+
+        DDL, DML and PL/SQL blocks are kept as written without an LLM call.
+        """
+        hashes, outcomes = await self._optimize_queries(statements)
+        optimized: list[SqlStatement] = []
+        results: list[OptimizationResult] = []
+        errors: dict[int, str] = {}
+        entries: list[dict[str, Any]] = []
+        for index, (statement, query_hash) in enumerate(zip(statements, hashes)):
+            if query_hash is None:
+                optimized.append(statement)
+                entries.append(
+                    {"index": index, "query_sql": statement.text, "skipped": True}
+                )
+                continue
+            outcome = outcomes[query_hash]
+            if isinstance(outcome, Exception):
+                logger.warning(
+                    f"Statement {index + 1} kept unchanged after error: {outcome}"
+                )
+                optimized.append(statement)
+                errors[index] = str(outcome)
+                entries.append(
+                    {"index": index, "query_sql": statement.text, "error": str(outcome)}
+                )
+                continue
+            result, statement_output = outcome
+            results.append(result)
+            optimized.append(
+                SqlStatement(
+                    extract_sql(result.optimized_query), statement.slash_terminated
+                )
             )
-            raise
+            entries.append({"index": index, **statement_output})
 
-    async def _sql_to_natural_language(self, sql_query: str) -> str:
-        """Convert SQL query to natural language explanation."""
-        return await self._llm_client.generate_response(
-            self._prompt_generator.generate_sql_to_natural_prompt(sql_query),
-            {
-                "model_name": self._config.model_name,
-                "temperature": self._config.temperature,
-                "max_output_tokens": self._config.max_output_tokens,
-            },
+        optimized_script = join_sql_statements(optimized)
+        script_path = self.get_script_output_path(sql_file_path)
+        with tracer.span("output_write"):
+            await self._file_handler.write_sql_file(script_path, optimized_script)
+
+        prompt_tokens: dict[str, int] = {}
+        for result in results:
+            for stage, tokens in result.prompt_tokens.items():
+                prompt_tokens[stage] = prompt_tokens.get(stage, 0) + tokens
+        metadata = QueryMetadata(
+            query_sql=script,
+            explanation_text="\n\n".join(r.explained_query for r in results),
+            # Scripts have no entry of their own; report the newest statement version
+            version=max(
+                (r.metadata.version for r in results),
+                key=lambda v: [int(part) for part in v.split(".")],
+            ),
+            last_optimization=datetime.now(),
+            database_type=self._database_type,
+            optimized_query=optimized_script,
+            model_name=self._config.model_name,
+            prompt_version=self._prompt_version,
+            settings_version=self._settings_version,
         )
+        output: dict[str, Any] = metadata.to_dict()
+        output["optimized_script_path"] = str(script_path)
+        if prompt_tokens:
+            output["prompt_tokens"] = prompt_tokens
+        output["statements"] = entries
+        output_path = self.get_output_path(sql_file_path)
+        with tracer.span("output_write"):
+            await self._file_handler.write_json_file(output_path, output)
 
-    async def _natural_language_to_sql(self, explanation: str) -> str:
+        return OptimizationResult(
+            original_query=script,
+            explained_query=metadata.explanation_text,
+            optimized_query=optimized_script,
+            metadata=metadata,
+            database_type=self._database_type,
+            output_path=output_path,
+            applied_rules=[rule for r in results for rule in r.applied_rules],
+            reused_stages=[
+                stage
+                for stage in OptimizationStage
+                if not errors and all(stage in r.reused_stages for r in results)
+            ],
+            prompt_tokens=prompt_tokens,
+            statements=results,
+            statement_errors=errors,
+            script_path=script_path,
+        )
+
+    async def _optimize_queries(self, statements: list[SqlStatement]) -> tuple[
+        list[str | None],
+        dict[str, tuple[OptimizationResult, dict[str, Any]] | Exception],
+    ]:
+        """
+        Metadata key of each script statement (``None`` unless a query) and the
+        outcome of optimizing each distinct query concurrently.
+        """
+        # Repeated queries are optimized once and share their metadata entry
+        hashes = [
+            self._generate_query_hash(s.text) if is_query(s.text) else None
+            for s in statements
+        ]
+        unique: dict[str, str] = {}
+        for query_hash, statement in zip(hashes, statements):
+            if query_hash is not None:
+                unique.setdefault(query_hash, statement.text)
+        if not unique:
+            raise ValueError("Script has no queries to optimize")
+        logger.info(
+            f"Script has {len(statements)} statements ({len(unique)} distinct "
+            "queries), optimizing them concurrently"
+        )
+        answers = await asyncio.gather(
+            *(self._optimize_statement(text) for text in unique.values()),
+            return_exceptions=True,
+        )
+        outcomes: dict[str, tuple[OptimizationResult, dict[str, Any]] | Exception] = {}
+        for query_hash, outcome in zip(unique, answers):
+            if isinstance(outcome, Exception) or not isinstance(outcome, BaseException):
+                outcomes[query_hash] = outcome
+            else:
+                raise outcome  # Cancellation and interrupts are not per-query errors
+        failures = [o for o in outcomes.values() if isinstance(o, Exception)]
+        if len(failures) == len(outcomes):
+            raise failures[0]
+        return hashes, outcomes
+
+    def _generation_config(self) -> dict[str, Any]:
+        """Generation settings sent with every LLM request."""
+        return {
+            "model_name": self._config.model_name,
+            "temperature": self._config.temperature,
+            "max_output_tokens": self._config.max_output_tokens,
+        }
+
+    @staticmethod
+    def _count_prompt_tokens(
+        stage: str, prompt: str, prompt_tokens: dict[str, int]
+    ) -> int:
+        """Add the estimated size of a prompt to the per-stage token totals."""
+        tokens = estimate_tokens(prompt)
+        prompt_tokens[stage] = prompt_tokens.get(stage, 0) + tokens
+        logger.info(f"{stage} prompt: ~{tokens} tokens", sample="prompt_tokens")
+        return tokens
+
+    async def _sql_to_natural_language(
+        self, sql_query: str, prompt_tokens: dict[str, int]
+    ) -> str:
+        """Convert SQL query to natural language explanation."""
+        stage = OptimizationStage.SQL_TO_NATURAL
+        prompt = self._prompt_generator.generate_sql_to_natural_prompt(sql_query)
+        tokens = self._count_prompt_tokens(stage.value, prompt, prompt_tokens)
+        with tracer.span(stage.value, prompt_tokens=tokens) as fields:
+            if self._on_token is None:
+                explanation = await self._llm_client.generate_response(
+                    prompt, self._generation_config()
+                )
+            else:
+                chunks = []
+                async with aclosing(
+                    self._llm_client.stream_response(prompt, self._generation_config())
+                ) as stream:
+                    async for chunk in stream:
+                        chunks.append(chunk)
+                        self._on_token(stage, chunk)
+                explanation = "".join(chunks)
+            fields["completion_tokens"] = estimate_tokens(explanation)
+        return explanation
+
+    async def _natural_language_to_sql(
+        self, explanation: str, prompt_tokens: dict[str, int], candidate: int = 0
+    ) -> str:
         """Convert natural language explanation to optimized SQL."""
-        return await self._llm_client.generate_response(
-            self._prompt_generator.generate_natural_to_sql_prompt(explanation),
-            {
-                "model_name": self._config.model_name,
-                "temperature": self._config.temperature,
-                "max_output_tokens": self._config.max_output_tokens,
-            },
-        )
-
-    async def _get_or_create_metadata(
-        self, query_hash: str, query: str
-    ) -> QueryMetadata:
-        """Get existing metadata or create new."""
-        if existing_metadata := await self._metadata_repo.get_metadata(query_hash):
+        stage = OptimizationStage.NATURAL_TO_SQL
+        prompt = self._prompt_generator.generate_natural_to_sql_prompt(explanation)
+        tokens = self._count_prompt_tokens(stage.value, prompt, prompt_tokens)
+        terminator = SqlStreamTerminator()
+        # Part of the cache key: this stage's output is cut at the end of the SQL
+        config = {**self._generation_config(), "stop_at": "sql_statement"}
+        if candidate:
+            # Distinct cache key per sample so candidates are not deduplicated
+            config["candidate"] = candidate
+        echo = self._on_token if self._config.candidates == 1 else None
+        with tracer.span(
+            stage.value, prompt_tokens=tokens, candidate=candidate
+        ) as fields:
+            async with aclosing(
+                self._llm_client.stream_response(prompt, config)
+            ) as stream:
+                received = 0
+                async for chunk in stream:
+                    done = terminator.feed(chunk)
+                    if echo is not None:
+                        # Do not echo trailing commentary past the end of the SQL
+                        end = terminator.end
+                        visible = chunk if end is None else chunk[: end - received]
+                        echo(stage, visible)
+                    received += len(chunk)
+                    if done:
+                        logger.info("Complete SQL received, stopping generation early")
+                        break
+            fields["completion_tokens"] = estimate_tokens(terminator.text)
+        return terminator.text
+
+    def _reusable_metadata(
+        self, stored: QueryMetadata | None, query: str
+    ) -> QueryMetadata | None:
+        """
+        Stored metadata of the same query, model, prompts and settings, unless forced.
+
+        With parameterized literals, queries differing only in their literals
+        share a fingerprint, so the stored query must also match the text.
+        """
+        if (
+            self._config.force
+            or stored is None
+            or normalize_sql(stored.query_sql) != normalize_sql(query)
+            or not stored.explanation_text
+            or stored.model_name != self._config.model_name
+            or stored.prompt_version != self._prompt_version
+            or stored.settings_version != self._settings_version
+            or stored.database_type != self._database_type
+        ):
+            return None
+        return stored
+
+    def _get_settings_version(self) -> str:
+        """Short digest of the options that change how a query is rewritten."""
+        settings = {
+            "apply_rules": self._config.apply_rules,
+            "decompose": self._config.decompose,
+            "candidates": self._config.candidates,
+            "plan_verifier": (
+                type(self._plan_verifier).__name__ if self._plan_verifier else None
+            ),
+        }
+        return sha256(json.dumps(settings).encode("utf-8")).hexdigest()[:12]
+
+    def _new_version(self, stored: QueryMetadata | None, query: str) -> QueryMetadata:
+        """Next version of the stored metadata, or a fresh first version."""
+        if stored is not None:
             # Increment version
-            version_parts = existing_metadata.version.split(".")
+            version_parts = stored.version.split(".")
             version_parts[-1] = str(int(version_parts[-1]) + 1)
-            existing_metadata.version = ".".join(version_parts)
-            existing_metadata.database_type = self._database_type  # Update if changed
-            return existing_metadata
+            stored.version = ".".join(version_parts)
+            stored.database_type = self._database_type  # Update if changed
+            stored.query_sql = query
+            return stored
 
         return QueryMetadata(
             query_sql=query,
@@ -110,20 +510,223 @@ class DatabaseQueryOptimizer(QueryOptimizer):
             database_type=self._database_type,
         )
 
-    async def _generate_output_json(
-        self, sql_file_path: Path, metadata: QueryMetadata
+    def _apply_rules(self, query: str) -> RuleRewrite:
+        """Run the rule-based pre-optimizer, if enabled."""
+        if self._rule_optimizer is None:
+            return RuleRewrite(query=query)
+        return self._rule_optimizer.optimize(query)
+
+    def _decompose(self, query: str) -> DecomposedQuery | None:
+        """Split a query into subquery fragments, if decomposition is enabled."""
+        if self._decomposer is None:
+            return None
+        return self._decomposer.decompose(query)
+
+    async def _optimize_decomposed(
+        self, decomposition: DecomposedQuery, prompt_tokens: dict[str, int]
+    ) -> str:
+        """Rewrite every fragment and the outer query concurrently, then compose."""
+        if self._decomposer is None:
+            raise ValueError("Query decomposition is disabled")
+        fragments = decomposition.fragments
+        logger.info(
+            f"Optimizing {len(fragments)} subqueries and the outer query concurrently..."
+        )
+        if self._config.candidates > 1:
+            logger.info("Decomposed queries are rewritten once, not sampled")
+        prompts = [
+            self._prompt_generator.generate_compose_prompt(
+                decomposition.skeleton, {f.placeholder: f.query for f in fragments}
+            ),
+            *(
+                self._prompt_generator.generate_fragment_prompt(f.query)
+                for f in fragments
+            ),
+        ]
+        tokens = self._count_prompt_tokens("compose", prompts[0], prompt_tokens)
+        for prompt in prompts[1:]:
+            tokens += self._count_prompt_tokens("fragments", prompt, prompt_tokens)
+
+        with tracer.span(
+            "decompose", prompt_tokens=tokens, fragments=len(fragments)
+        ) as fields:
+            answers = await asyncio.gather(
+                *(
+                    self._llm_client.generate_response(
+                        prompt, self._generation_config()
+                    )
+                    for prompt in prompts
+                ),
+                return_exceptions=True,
+            )
+            fields["completion_tokens"] = sum(
+                estimate_tokens(answer) for answer in answers if isinstance(answer, str)
+            )
+        results: list[str | Exception] = []
+        for answer in answers:
+            if not isinstance(answer, (str, Exception)):
+                raise answer
+            results.append(answer)
+
+        self._apply_skeleton_answer(decomposition, results[0])
+        self._apply_fragment_answers(fragments, results[1:])
+        return self._decomposer.compose(decomposition)
+
+    @staticmethod
+    def _apply_skeleton_answer(
+        decomposition: DecomposedQuery, answer: str | Exception
     ) -> None:
-        """Generate JSON output file."""
-        await self._file_handler.write_json_file(
-            (
-                sql_file_path.parent
-                / f"{sql_file_path.stem}_{self._database_type.value}_optimization.json"
+        """Keep the rewritten outer query if it is a drop-in replacement."""
+        if isinstance(answer, Exception):
+            logger.warning(f"Keeping the outer query unchanged: {answer}")
+        elif (
+            skeleton := QueryDecomposer.clean_skeleton(answer, decomposition)
+        ) is None:
+            logger.warning(
+                "Keeping the outer query: the rewrite lost placeholders, "
+                "identifiers or literals"
+            )
+        else:
+            decomposition.optimized_skeleton = skeleton
+
+    @staticmethod
+    def _apply_fragment_answers(
+        fragments: list[QueryFragment], answers: list[str | Exception]
+    ) -> None:
+        """Keep each rewritten subquery that is a drop-in replacement."""
+        for fragment, answer in zip(fragments, answers):
+            if isinstance(answer, Exception):
+                fragment.error = str(answer)
+            elif (cleaned := QueryDecomposer.clean_fragment(answer, fragment)) is None:
+                fragment.error = (
+                    "not a well-formed subquery keeping its identifiers and literals"
+                )
+            else:
+                fragment.optimized_query = cleaned
+        if failed := [f.placeholder for f in fragments if f.error]:
+            logger.warning(f"Keeping {len(failed)} subqueries unchanged: {failed}")
+
+    @staticmethod
+    def _describe_rules(rewrite: RuleRewrite) -> str:
+        """Explanation of a query optimized by rules alone."""
+        changes = "\n".join(f"- {rule.description}" for rule in rewrite.applied_rules)
+        return f"Optimized by deterministic rewrite rules:\n{changes}"
+
+    async def _generate_candidates(
+        self, original_query: str, explanation: str, prompt_tokens: dict[str, int]
+    ) -> list[RewriteCandidate]:
+        """Sample the configured number of rewrites concurrently and check each."""
+        count = self._config.candidates
+        if count > 1:
+            logger.info(f"Sampling {count} candidate rewrites...")
+        answers = await asyncio.gather(
+            *(
+                self._natural_language_to_sql(explanation, prompt_tokens, i)
+                for i in range(count)
             ),
-            metadata.to_dict(),
+            return_exceptions=count > 1,
+        )
+        return [
+            (
+                RewriteCandidate(index=i, query="", valid=False, error=str(answer))
+                if isinstance(answer, BaseException)
+                else self._evaluate_candidate(i, original_query, answer)
+            )
+            for i, answer in enumerate(answers)
+        ]
+
+    def _evaluate_candidate(
+        self, index: int, original_query: str, optimized_query: str
+    ) -> RewriteCandidate:
+        """Run the local checks on a rewrite and score it (lower is better)."""
+        candidate = RewriteCandidate(index=index, query=optimized_query)
+        if not is_well_formed_sql(extract_sql(optimized_query)):
+            candidate.valid = False
+            candidate.error = "not a well-formed SQL statement"
+            return candidate
+
+        candidate.plan_comparison = self._verify_plan(original_query, optimized_query)
+        if (comparison := candidate.plan_comparison) and comparison.optimized is None:
+            candidate.valid = False
+            candidate.error = "; ".join(comparison.errors)
+            return candidate
+
+        candidate.benchmark = self._run_benchmark(original_query, optimized_query)
+        if (benchmark := candidate.benchmark) and not benchmark.equivalent:
+            candidate.valid = False
+            candidate.error = "; ".join(benchmark.errors) or "returns different rows"
+        elif benchmark and benchmark.optimized:
+            candidate.score = benchmark.optimized.p50_ms
+        elif comparison and comparison.optimized:
+            candidate.score = comparison.optimized.cost
+        return candidate
+
+    def _select_candidate(self, candidates: list[RewriteCandidate]) -> RewriteCandidate:
+        """Pick the valid candidate with the lowest score, or the first valid one."""
+        if len(candidates) == 1 and candidates[0].valid:
+            return candidates[0]
+
+        if not (valid := [c for c in candidates if c.valid]):
+            errors = "; ".join(f"#{c.index + 1}: {c.error}" for c in candidates)
+            raise ValueError(f"No candidate rewrite passed local checks ({errors})")
+        scored = [(c.score, c) for c in valid if c.score is not None]
+        winner = min(scored, key=lambda item: item[0])[1] if scored else valid[0]
+        logger.info(
+            f"Selected candidate {winner.index + 1} of {len(candidates)} "
+            f"({len(valid)} valid, score {winner.score})"
+        )
+        return winner
+
+    def _verify_plan(
+        self, original_query: str, optimized_query: str
+    ) -> PlanComparison | None:
+        """Compare query plans when a verifier is configured for SQLite."""
+        if self._plan_verifier is None or self._database_type != DatabaseType.SQLITE:
+            return None
+
+        logger.info("Comparing SQLite query plans...")
+        return self._plan_verifier.compare_plans(
+            original_query, extract_sql(optimized_query)
+        )
+
+    def _run_benchmark(
+        self, original_query: str, optimized_query: str
+    ) -> BenchmarkResult | None:
+        """Measure both queries when a benchmark is configured for SQLite."""
+        if self._benchmark is None or self._database_type != DatabaseType.SQLITE:
+            return None
+
+        logger.info("Benchmarking original and optimized queries...")
+        return self._benchmark.compare_queries(
+            original_query, extract_sql(optimized_query)
         )
 
+    @staticmethod
+    def _build_output(
+        metadata: QueryMetadata,
+        selected: RewriteCandidate,
+        candidates: list[RewriteCandidate],
+        rewrite: RuleRewrite,
+        prompt_tokens: dict[str, int],
+    ) -> dict[str, Any]:
+        """Build the JSON output of an optimized statement."""
+        output: dict[str, Any] = metadata.to_dict()
+        if prompt_tokens:
+            output["prompt_tokens"] = prompt_tokens
+        if rewrite.applied_rules:
+            output["applied_rules"] = [r.to_dict() for r in rewrite.applied_rules]
+            output["rules_only"] = rewrite.complete
+        if selected.plan_comparison is not None:
+            output["plan_comparison"] = selected.plan_comparison.to_dict()
+        if selected.benchmark is not None:
+            output["benchmark"] = selected.benchmark.to_dict()
+        if len(candidates) > 1:
+            output["selected_candidate"] = selected.index
+            output["candidates"] = [candidate.to_dict() for candidate in candidates]
+        return output
+
     def _generate_query_hash(self, query: str) -> str:
-        """Generate hash for SQL query including database type."""
-        return sha256(
-            f"{self._database_type.value}:{query}".encode("utf-8")
-        ).hexdigest()[:16]
+        """Generate fingerprint for SQL query including database type."""
+        return fingerprint_sql(
+            query, self._database_type, self._config.parameterize_literals
+        )
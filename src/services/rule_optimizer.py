@@ -0,0 +1,948 @@
+# src/services/rule_optimizer.py
+from collections import defaultdict
+from dataclasses import dataclass
+
+from config.logger import logger
+from core.sql_normalizer import SQL_KEYWORDS, TokenType, normalize_sql, tokenize_sql
+from core.types import AppliedRule, RuleRewrite
+
+_AGGREGATES = frozenset({"COUNT", "SUM", "AVG", "MIN", "MAX"})
+_CLAUSE_KEYWORDS = frozenset(
+    {
+        "WHERE", "GROUP", "HAVING", "ORDER", "LIMIT", "OFFSET", "FETCH", "WINDOW",
+        "UNION", "INTERSECT", "EXCEPT", "MINUS", "CONNECT", "START", "FOR",
+        "RETURNING",
+    }
+)  # fmt: skip
+_SET_OPERATORS = frozenset({"UNION", "INTERSECT", "EXCEPT", "MINUS"})
+# Clauses after which a DISTINCT query no longer returns every distinct row
+_ROW_LIMITS = frozenset({"LIMIT", "OFFSET", "FETCH", "TOP", "ROWNUM"})
+_FLIPPED = {">": "<", ">=": "<=", "<": ">", "<=": ">=", "=": "="}
+_MAX_PASSES = 5
+
+
+@dataclass
+class _Comparison:
+    """A ``column <op> number`` conjunct."""
+
+    conjunct: int
+    column: str
+    op: str
+    value: float
+    text: str
+    # How the number compares against a TEXT column, if it is an integer
+    literal: str | None = None
+
+    def admits(self, value: float) -> bool:
+        """Whether a value of the column satisfies this comparison."""
+        return {
+            ">": value > self.value,
+            ">=": value >= self.value,
+            "<": value < self.value,
+            "<=": value <= self.value,
+            "=": value == self.value,
+        }[self.op]
+
+
+@dataclass
+class _Subquery:
+    """A correlated ``(SELECT AGG(x) FROM t a WHERE a.k = outer.c ...)``."""
+
+    open_paren: int
+    close_paren: int
+    table: str
+    alias: str
+    key: str
+    outer_column: str
+    function: str
+    argument: str
+    conditions: list[str]
+    output_name: str | None
+
+
+class _ParsedSql:
+    """Tokens of a SQL text with parenthesis depth, indexed by code position.
+
+    Code positions skip whitespace and comments, so rules can look at
+    neighbouring tokens while edits still map back to exact text offsets.
+    """
+
+    def __init__(self, sql: str) -> None:
+        self.sql = sql
+        tokens = tokenize_sql(sql)
+        self.tokens = [
+            t for t in tokens if t.type not in (TokenType.WHITESPACE, TokenType.COMMENT)
+        ]
+        self.depth: list[int] = []
+        self.partner: dict[int, int] = {}
+        self.balanced = True
+        stack: list[int] = []
+        for position, token in enumerate(self.tokens):
+            if token.type == TokenType.PUNCTUATION and token.value == "(":
+                self.depth.append(len(stack))
+                stack.append(position)
+            elif token.type == TokenType.PUNCTUATION and token.value == ")":
+                if not stack:
+                    self.balanced = False
+                    stack.append(position)
+                opening = stack.pop()
+                self.partner[opening] = position
+                self.partner[position] = opening
+                self.depth.append(len(stack))
+            else:
+                self.depth.append(len(stack))
+        self.balanced = self.balanced and not stack
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def upper(self, position: int) -> str:
+        """Upper-cased token text, or an empty string past either end."""
+        if 0 <= position < len(self.tokens):
+            return self.tokens[position].upper
+        return ""
+
+    def start(self, position: int) -> int:
+        """Text offset where a token starts (end of text past the last token)."""
+        if position >= len(self.tokens):
+            return len(self.sql)
+        return self.tokens[position].start
+
+    def end(self, position: int) -> int:
+        """Text offset just past a token."""
+        token = self.tokens[position]
+        return token.start + len(token.value)
+
+    def text(self, first: int, last: int) -> str:
+        """Original text from token ``first`` up to and excluding ``last``."""
+        start, end = self.start(first), self.end(last - 1)
+        return self.sql[start:end]
+
+    def is_punct(self, position: int, value: str) -> bool:
+        """Whether the token at a position is the given punctuation."""
+        return (
+            0 <= position < len(self.tokens)
+            and self.tokens[position].type == TokenType.PUNCTUATION
+            and self.tokens[position].value == value
+        )
+
+    def clause_end(self, first: int, level: int, stop: frozenset[str]) -> int:
+        """First position at or after ``first`` that ends a clause at ``level``."""
+        position = first
+        while position < len(self.tokens):
+            if self.depth[position] < level or self.is_punct(position, ";"):
+                return position
+            if self.depth[position] == level and self.upper(position) in stop:
+                return position
+            position += 1
+        return position
+
+    def split(self, first: int, last: int, separator: str) -> list[tuple[int, int]]:
+        """Split a range on a top-level separator, ignoring CASE bodies."""
+        level = self.depth[first] if first < last else 0
+        parts, start, cases, between = [], first, 0, False
+        for position in range(first, last):
+            if self.depth[position] != level:
+                continue
+            word = self.upper(position)
+            if word == "CASE":
+                cases += 1
+            elif word == "END" and cases:
+                cases -= 1
+            elif word == "BETWEEN":
+                between = True
+            elif cases == 0 and (
+                word == separator or self.is_punct(position, separator)
+            ):
+                if word == "AND" and between:
+                    between = False
+                    continue
+                parts.append((start, position))
+                start = position + 1
+        parts.append((start, last))
+        return parts
+
+    def has_top_level(self, first: int, last: int, word: str) -> bool:
+        """Whether a keyword occurs at the range's own depth outside CASE bodies."""
+        return len(self.split(first, last, word)) > 1
+
+    def column(self, position: int) -> int:
+        """Length of a possibly qualified column reference starting at a position."""
+        length = 0
+        while position + length < len(self.tokens):
+            token = self.tokens[position + length]
+            plain = token.type == TokenType.WORD and token.upper not in SQL_KEYWORDS
+            if not (plain or token.type == TokenType.QUOTED_IDENTIFIER):
+                break
+            length += 1
+            if not self.is_punct(position + length, "."):
+                break
+            length += 1
+        if length and self.is_punct(position + length - 1, "."):
+            length -= 1
+        if self.is_punct(position + length, "("):
+            return 0  # function call
+        return length
+
+    def number(self, position: int) -> tuple[float, int] | None:
+        """Value and token count of an optionally signed number literal."""
+        sign = 1.0
+        length = 0
+        if self.is_punct(position, "-") or self.is_punct(position, "+"):
+            sign = -1.0 if self.tokens[position].value == "-" else 1.0
+            length = 1
+        if (
+            position + length < len(self.tokens)
+            and self.tokens[position + length].type == TokenType.NUMBER
+        ):
+            return sign * float(self.tokens[position + length].value), length + 1
+        return None
+
+
+class RuleBasedOptimizer:
+    """Deterministic rewrites applied before the query reaches the LLM."""
+
+    def optimize(self, sql: str) -> RuleRewrite:
+        """Apply every rule until none fires and report what changed."""
+        query = sql.strip().rstrip(";").rstrip()
+        applied: list[AppliedRule] = []
+        for _ in range(_MAX_PASSES):
+            fired = False
+            for rule in (
+                self._dominated_predicates,
+                self._fold_in_lists,
+                self._unnecessary_distinct,
+                self._merge_correlated_aggregates,
+            ):
+                parsed = _ParsedSql(query)
+                if not parsed.balanced or any(
+                    parsed.is_punct(p, ";") for p in range(len(parsed))
+                ):
+                    return RuleRewrite(query=sql)
+                query, rules = rule(parsed)
+                applied.extend(rules)
+                fired = fired or bool(rules)
+            if not fired:
+                break
+
+        if not applied:
+            return RuleRewrite(query=sql)
+        for applied_rule in applied:
+            logger.info(f"Rule {applied_rule.rule}: {applied_rule.description}")
+        query += ";"
+        return RuleRewrite(
+            query=query, applied_rules=applied, complete=self._is_simple(query)
+        )
+
+    @staticmethod
+    def _is_simple(sql: str) -> bool:
+        """A single-table query without subqueries leaves nothing for the LLM."""
+        parsed = _ParsedSql(sql)
+        words = [parsed.upper(p) for p in range(len(parsed))]
+        if words.count("SELECT") != 1 or words[0] != "SELECT":
+            return False
+        if {"JOIN", "WITH"} & set(words) or words.count("FROM") != 1:
+            return False
+        start = words.index("FROM") + 1
+        end = parsed.clause_end(start, parsed.depth[start - 1], _CLAUSE_KEYWORDS)
+        return len(parsed.split(start, end, ",")) == 1
+
+    def _dominated_predicates(
+        self, parsed: _ParsedSql
+    ) -> tuple[str, list[AppliedRule]]:
+        """Drop comparisons implied by a tighter one on the same column."""
+        edits: list[tuple[int, int, str]] = []
+        applied: list[AppliedRule] = []
+        for conjuncts in self._where_conjunctions(parsed):
+            comparisons = self._comparisons(parsed, conjuncts)
+            removed: dict[int, str] = {}
+            by_column: dict[str, list[_Comparison]] = defaultdict(list)
+            for comparison in comparisons:
+                by_column[comparison.column].append(comparison)
+            for group in by_column.values():
+                removed.update(self._dominated(group))
+
+            seen: dict[str, int] = {}
+            for index, (first, last) in enumerate(conjuncts):
+                text = parsed.text(first, last)
+                if index in removed or "(" in text:
+                    continue
+                if (key := normalize_sql(text)) in seen:
+                    removed[index] = f"`{text}` is repeated"
+                seen.setdefault(key, index)
+
+            if removed:
+                edits.extend(self._remove_conjuncts(parsed, conjuncts, set(removed)))
+                applied.extend(
+                    AppliedRule("dominated_predicates", reason)
+                    for _, reason in sorted(removed.items())
+                )
+        return self._apply(parsed.sql, edits), applied
+
+    @staticmethod
+    def _dominated(group: list[_Comparison]) -> dict[int, str]:
+        """Conjuncts of one column implied by the others, with the reason."""
+        equalities = [c for c in group if c.op == "="]
+        if equalities:
+            keeper = equalities[0]
+            if not _same_order(group) or any(not c.admits(keeper.value) for c in group):
+                return {}  # contradictory: leave it for a human
+            return {
+                c.conjunct: f"`{c.text}` is implied by `{keeper.text}`"
+                for c in group
+                if c is not keeper
+            }
+
+        removed = {}
+        lower = [c for c in group if c.op in (">", ">=")]
+        upper = [c for c in group if c.op in ("<", "<=")]
+        for bounds, tightest in [
+            (lower, max(lower, key=lambda c: (c.value, c.op == ">"), default=None)),
+            (upper, min(upper, key=lambda c: (c.value, c.op == "<="), default=None)),
+        ]:
+            if tightest is None or not _same_order(bounds):
+                continue
+            for c in bounds:
+                if c is not tightest:
+                    removed[c.conjunct] = f"`{c.text}` is implied by `{tightest.text}`"
+        return removed
+
+    def _fold_in_lists(self, parsed: _ParsedSql) -> tuple[str, list[AppliedRule]]:
+        """Deduplicate literal IN lists, filter them by bounds and fold singletons."""
+        edits: list[tuple[int, int, str]] = []
+        applied: list[AppliedRule] = []
+        for conjuncts in self._where_conjunctions(parsed):
+            comparisons = self._comparisons(parsed, conjuncts)
+            for first, last in conjuncts:
+                if (in_list := self._in_list(parsed, first, last)) is None:
+                    continue
+                column, negated, values = in_list
+                kept, seen = [], set()
+                for text, value in values:
+                    if (key := value if value is not None else text) in seen:
+                        continue
+                    seen.add(key)
+                    kept.append((text, value))
+                if not negated and all(value is not None for _, value in kept):
+                    bounds = [c for c in comparisons if c.column == column]
+                    kept = [
+                        (text, value)
+                        for text, value in kept
+                        if value is not None and all(c.admits(value) for c in bounds)
+                    ]
+                if not kept or (len(kept) == len(values) and len(kept) > 1):
+                    continue
+
+                original = parsed.text(first, last)
+                column_text = parsed.text(first, first + parsed.column(first))
+                if len(kept) == 1:
+                    operator = "<>" if negated else "="
+                    folded = f"{column_text} {operator} {kept[0][0]}"
+                else:
+                    operator = "NOT IN" if negated else "IN"
+                    folded = (
+                        f"{column_text} {operator} ({', '.join(t for t, _ in kept)})"
+                    )
+                edits.append((parsed.start(first), parsed.end(last - 1), folded))
+                applied.append(
+                    AppliedRule("in_list_folding", f"`{original}` -> `{folded}`")
+                )
+        return self._apply(parsed.sql, edits), applied
+
+    def _unnecessary_distinct(
+        self, parsed: _ParsedSql
+    ) -> tuple[str, list[AppliedRule]]:
+        """Remove DISTINCT where the rows are already unique or duplicates are moot."""
+        edits: list[tuple[int, int, str]] = []
+        applied: list[AppliedRule] = []
+        for position in range(len(parsed) - 1):
+            if parsed.upper(position) != "SELECT" or parsed.upper(position + 1) != (
+                "DISTINCT"
+            ):
+                continue
+            distinct = position + 1
+            if parsed.is_punct(position - 1, "(") and parsed.upper(position - 2) in (
+                "IN",
+                "EXISTS",
+            ):
+                # Limiting distinct rows keeps more values than limiting all rows
+                reason = (
+                    None
+                    if self._limits_rows(parsed, position)
+                    else f"inside {parsed.upper(position - 2)} subquery"
+                )
+            else:
+                reason = self._unique_rows(parsed, distinct + 1)
+            if reason is None:
+                continue
+            edits.append((parsed.start(distinct), parsed.start(distinct + 1), ""))
+            applied.append(
+                AppliedRule("unnecessary_distinct", f"removed DISTINCT {reason}")
+            )
+        return self._apply(parsed.sql, edits), applied
+
+    @staticmethod
+    def _limits_rows(parsed: _ParsedSql, select: int) -> bool:
+        """Whether the query starting at ``select`` caps or skips some of its rows."""
+        level = parsed.depth[select]
+        end = parsed.clause_end(select + 1, level, frozenset())
+        return any(
+            parsed.depth[p] == level and parsed.upper(p) in _ROW_LIMITS
+            for p in range(select, end)
+        )
+
+    def _unique_rows(self, parsed: _ParsedSql, first: int) -> str | None:
+        """Why the rows of a SELECT list starting at ``first`` are already unique."""
+        level = parsed.depth[first]
+        select_end = parsed.clause_end(first, level, frozenset({"FROM"}))
+        scope_end = parsed.clause_end(select_end, level, _SET_OPERATORS)
+        items = parsed.split(first, select_end, ",")
+        if any(parsed.upper(p) == "OVER" for p in range(first, select_end)):
+            return None
+
+        group_by = next(
+            (
+                p
+                for p in range(select_end, scope_end)
+                if parsed.depth[p] == level
+                and parsed.upper(p) == "GROUP"
+                and parsed.upper(p + 1) == "BY"
+            ),
+            None,
+        )
+        if group_by is None:
+            if all(self._is_aggregate(parsed, *item) for item in items):
+                return "from an aggregate-only query"
+            return None
+
+        selected = set()
+        for item_first, item_last in items:
+            expression_last = item_last
+            previous = (
+                parsed.tokens[item_last - 2] if item_last - item_first > 1 else None
+            )
+            if (
+                previous is not None
+                and parsed.column(item_last - 1) == 1
+                and (previous.type != TokenType.PUNCTUATION or previous.value == ")")
+            ):
+                selected.add(normalize_sql(parsed.text(item_last - 1, item_last)))
+                expression_last -= 1 + (parsed.upper(item_last - 2) == "AS")
+            selected.add(normalize_sql(parsed.text(item_first, expression_last)))
+        group_end = parsed.clause_end(group_by + 2, level, _CLAUSE_KEYWORDS)
+        keys = parsed.split(group_by + 2, group_end, ",")
+        if all(normalize_sql(parsed.text(*key)) in selected for key in keys):
+            return "from a query that selects every GROUP BY key"
+        return None
+
+    @staticmethod
+    def _is_aggregate(parsed: _ParsedSql, first: int, last: int) -> bool:
+        """Whether a select item is a single aggregate call, optionally aliased."""
+        if parsed.upper(first) not in _AGGREGATES or not parsed.is_punct(
+            first + 1, "("
+        ):
+            return False
+        rest = last - parsed.partner[first + 1] - 1
+        if rest == 0:
+            return True
+        alias = last - 1
+        return parsed.column(alias) == 1 and (
+            rest == 1 or (rest == 2 and parsed.upper(alias - 1) == "AS")
+        )
+
+    def _merge_correlated_aggregates(
+        self, parsed: _ParsedSql
+    ) -> tuple[str, list[AppliedRule]]:
+        """Replace repeated correlated aggregates over one table with a grouped join."""
+        if (from_clause := self._single_source_from(parsed)) is None:
+            return parsed.sql, []
+        from_start, from_end = from_clause
+        outer_aliases = self._from_aliases(parsed, from_start + 1, from_end)
+        if self._selects_star(parsed, from_start, outer_aliases):
+            return parsed.sql, []  # the joined columns would end up in the result
+        groups = self._correlated_groups(parsed, from_start, from_end, outer_aliases)
+
+        edits: list[tuple[int, int, str]] = []
+        applied: list[AppliedRule] = []
+        used_aliases = set(outer_aliases)
+        joins = []
+        for (table, key, outer_column), subqueries in groups.items():
+            if len(subqueries) < 2:
+                continue
+            alias = f"{table}_agg"
+            suffix = 1
+            while alias.lower() in used_aliases:
+                suffix += 1
+                alias = f"{table}_agg{suffix}"
+            used_aliases.add(alias.lower())
+            join, replacements = self._grouped_join(
+                alias, key, outer_column, subqueries
+            )
+            joins.append(join)
+            edits.extend(
+                (parsed.start(first), parsed.end(last), text)
+                for first, last, text in replacements
+            )
+            applied.append(
+                AppliedRule(
+                    "merge_correlated_aggregates",
+                    f"merged {len(subqueries)} correlated subqueries on "
+                    f"{table}.{key} = {outer_column} into a grouped join",
+                )
+            )
+        if joins:
+            insert_at = parsed.end(from_end - 1)
+            edits.append((insert_at, insert_at, "".join(joins)))
+        return self._apply(parsed.sql, edits), applied
+
+    @staticmethod
+    def _single_source_from(parsed: _ParsedSql) -> tuple[int, int] | None:
+        """FROM keyword and clause end of an ungrouped single-source SELECT."""
+        words = [parsed.upper(p) for p in range(len(parsed))]
+        if not words or words[0] != "SELECT":
+            return None
+        from_clause = next(
+            (p for p, w in enumerate(words) if w == "FROM" and parsed.depth[p] == 0),
+            None,
+        )
+        if from_clause is None:
+            return None
+        from_end = parsed.clause_end(from_clause + 1, 0, _CLAUSE_KEYWORDS)
+        if (
+            any(
+                parsed.depth[p] == 0 and words[p] in _SET_OPERATORS | {"GROUP"}
+                for p in range(len(parsed))
+            )
+            or len(parsed.split(from_clause + 1, from_end, ",")) > 1
+        ):
+            return None
+        return from_clause, from_end
+
+    @staticmethod
+    def _selects_star(
+        parsed: _ParsedSql, from_clause: int, outer_aliases: set[str]
+    ) -> bool:
+        """Whether the select list has a ``*`` that would also expand a new join."""
+        for first, last in parsed.split(1, from_clause, ","):
+            if first == last or not parsed.is_punct(last - 1, "*"):
+                continue
+            qualified = last - first >= 3 and parsed.is_punct(last - 2, ".")
+            if not qualified or parsed.tokens[last - 3].value.lower() not in (
+                outer_aliases
+            ):
+                return True
+        return False
+
+    def _correlated_groups(
+        self,
+        parsed: _ParsedSql,
+        from_clause: int,
+        from_end: int,
+        outer_aliases: set[str],
+    ) -> dict[tuple[str, str, str], list[_Subquery]]:
+        """Correlated aggregates outside FROM by table, key and outer column."""
+        groups: dict[tuple[str, str, str], list[_Subquery]] = defaultdict(list)
+        position = 0
+        while position < len(parsed):
+            if position in range(from_clause, from_end):
+                position = from_end
+                continue
+            if parsed.is_punct(position, "(") and parsed.upper(position + 1) == (
+                "SELECT"
+            ):
+                subquery = self._correlated_aggregate(parsed, position, outer_aliases)
+                if subquery is not None:
+                    groups[
+                        (subquery.table, subquery.key, subquery.outer_column)
+                    ].append(subquery)
+                position = parsed.partner[position] + 1
+                continue
+            position += 1
+        return groups
+
+    def _correlated_aggregate(
+        self, parsed: _ParsedSql, open_paren: int, outer_aliases: set[str]
+    ) -> _Subquery | None:
+        """Recognize ``(SELECT AGG(x) FROM t a WHERE a.k = o.c [AND ...])``."""
+        close_paren = parsed.partner[open_paren]
+        if (source := self._aggregate_source(parsed, open_paren)) is None:
+            return None
+        function, argument_end, table, alias, where = source
+        if alias.lower() in outer_aliases:
+            return None
+        level = parsed.depth[where]
+        if parsed.clause_end(where + 1, level, _CLAUSE_KEYWORDS) != close_paren:
+            return None
+        filters = self._correlated_filters(
+            parsed, where + 1, close_paren, alias, outer_aliases
+        )
+        if filters is None:
+            return None
+        argument_refs = self._column_refs(parsed, open_paren + 4, argument_end)
+        if argument_refs is None or any(q != alias.lower() for q, _ in argument_refs):
+            return None
+
+        correlation, conditions = filters
+        return _Subquery(
+            open_paren=open_paren,
+            close_paren=close_paren,
+            table=table,
+            alias=alias,
+            key=correlation[0],
+            outer_column=correlation[1],
+            function=function,
+            argument=self._requalify(parsed, open_paren + 4, argument_end, alias),
+            conditions=conditions,
+            output_name=self._output_name(parsed, close_paren),
+        )
+
+    @staticmethod
+    def _aggregate_source(
+        parsed: _ParsedSql, open_paren: int
+    ) -> tuple[str, int, str, str, int] | None:
+        """Aggregate, argument end, table, alias and WHERE of ``(SELECT AGG(x) ...``."""
+        if parsed.upper(open_paren - 1) in ("IN", "EXISTS", "ANY", "ALL", "SOME"):
+            return None
+        function = parsed.upper(open_paren + 2)
+        if function not in _AGGREGATES or not parsed.is_punct(open_paren + 3, "("):
+            return None
+        argument_end = parsed.partner[open_paren + 3]
+        if (
+            parsed.upper(open_paren + 4) == "DISTINCT"
+            or parsed.upper(argument_end + 1) != "FROM"
+        ):
+            return None
+
+        table_at = argument_end + 2
+        if parsed.column(table_at) != 1:
+            return None
+        table = parsed.tokens[table_at].value
+        where = table_at + 1
+        alias = table
+        if parsed.upper(where) == "AS":
+            where += 1
+        if parsed.column(where) == 1:
+            alias = parsed.tokens[where].value
+            where += 1
+        if parsed.upper(where) != "WHERE":
+            return None
+        return function, argument_end, table, alias, where
+
+    def _correlated_filters(
+        self,
+        parsed: _ParsedSql,
+        first: int,
+        last: int,
+        alias: str,
+        outer_aliases: set[str],
+    ) -> tuple[tuple[str, str], list[str]] | None:
+        """The one correlation predicate and the other conditions of a WHERE."""
+        correlation: tuple[str, str] | None = None
+        conditions: list[str] = []
+        for conjunct_first, conjunct_last in parsed.split(first, last, "AND"):
+            if (
+                parsed.has_top_level(conjunct_first, conjunct_last, "OR")
+                or conjunct_first == conjunct_last
+            ):
+                return None
+            refs = self._column_refs(parsed, conjunct_first, conjunct_last)
+            if refs is None:
+                return None
+            if any(q in outer_aliases for q, _ in refs):
+                matched = self._correlation(
+                    parsed, conjunct_first, conjunct_last, alias, outer_aliases
+                )
+                if matched is None or correlation is not None:
+                    return None
+                correlation = matched
+            elif any(q != alias.lower() for q, _ in refs):
+                return None
+            else:
+                conditions.append(
+                    self._requalify(parsed, conjunct_first, conjunct_last, alias)
+                )
+        if correlation is None:
+            return None
+        return correlation, conditions
+
+    @staticmethod
+    def _column_refs(
+        parsed: _ParsedSql, first: int, last: int
+    ) -> list[tuple[str, str]] | None:
+        """Qualified column references in a range; None if any is unqualified."""
+        refs = []
+        position = first
+        while position < last:
+            token = parsed.tokens[position]
+            if (
+                parsed.is_punct(position, "(")
+                and parsed.upper(position + 1) == "SELECT"
+            ):
+                return None
+            length = parsed.column(position)
+            if length == 0:
+                position += 1
+                continue
+            if length != 3:
+                return None  # unqualified columns may be correlated
+            refs.append(
+                (token.value.lower(), parsed.tokens[position + 2].value.lower())
+            )
+            position += length
+        return refs
+
+    @staticmethod
+    def _correlation(
+        parsed: _ParsedSql, first: int, last: int, alias: str, outer: set[str]
+    ) -> tuple[str, str] | None:
+        """Inner key and outer column of an ``a.k = o.c`` correlation predicate."""
+        if last - first != 7 or not parsed.is_punct(first + 3, "="):
+            return None
+        left = (parsed.tokens[first].value.lower(), parsed.tokens[first + 2].value)
+        right = (parsed.tokens[first + 4].value.lower(), parsed.tokens[first + 6].value)
+        if left[0] == alias.lower() and right[0] in outer:
+            return left[1], parsed.text(first + 4, last)
+        if right[0] == alias.lower() and left[0] in outer:
+            return right[1], parsed.text(first, first + 3)
+        return None
+
+    @staticmethod
+    def _requalify(parsed: _ParsedSql, first: int, last: int, alias: str) -> str:
+        """Text of a range with the subquery alias replaced by a placeholder."""
+        parts, cursor = [], parsed.start(first)
+        for position in range(first, last):
+            token = parsed.tokens[position]
+            if token.value.lower() == alias.lower() and parsed.is_punct(
+                position + 1, "."
+            ):
+                start = token.start
+                parts.append(parsed.sql[cursor:start])
+                parts.append("{alias}")
+                cursor = token.start + len(token.value)
+        end = parsed.end(last - 1)
+        parts.append(parsed.sql[cursor:end])
+        return "".join(parts)
+
+    @staticmethod
+    def _output_name(parsed: _ParsedSql, close_paren: int) -> str | None:
+        """Alias a subquery is given in the select list, if any."""
+        alias = close_paren + 1 + (parsed.upper(close_paren + 1) == "AS")
+        if parsed.column(alias) == 1 and (
+            parsed.is_punct(alias + 1, ",") or parsed.upper(alias + 1) == "FROM"
+        ):
+            return parsed.tokens[alias].value
+        return None
+
+    @staticmethod
+    def _from_aliases(parsed: _ParsedSql, first: int, last: int) -> set[str]:
+        """Lower-cased names that qualify columns of the tables in a FROM clause."""
+        aliases = set()
+        level = parsed.depth[first]
+        starts = [first] + [
+            p + 1
+            for p in range(first, last)
+            if parsed.depth[p] == level and parsed.upper(p) == "JOIN"
+        ]
+        for position in starts:
+            name = None
+            if parsed.is_punct(position, "("):
+                position = parsed.partner[position] + 1
+            elif length := parsed.column(position):
+                name = parsed.tokens[position + length - 1].value
+                position += length
+            position += parsed.upper(position) == "AS"
+            if position < last and parsed.column(position) == 1:
+                name = parsed.tokens[position].value
+            if name:
+                aliases.add(name.lower())
+        return aliases
+
+    @staticmethod
+    def _grouped_join(
+        alias: str, key: str, outer_column: str, subqueries: list[_Subquery]
+    ) -> tuple[str, list[tuple[int, int, str]]]:
+        """Build the grouped LEFT JOIN and the replacement of each subquery.
+
+        Replacements are given as token positions of the subquery parentheses.
+        """
+        inner = subqueries[0].alias
+        names: dict[str, str] = {}
+        expressions: dict[str, str] = {}
+        replacements = []
+        for subquery in subqueries:
+            argument = subquery.argument.replace("{alias}", inner)
+            condition = " AND ".join(
+                c.replace("{alias}", inner) for c in subquery.conditions
+            )
+            if condition:
+                value = "1" if argument == "*" else argument
+                argument = f"CASE WHEN {condition} THEN {value} END"
+            expression = f"{subquery.function}({argument})"
+            if (normalized := normalize_sql(expression)) not in names:
+                name = subquery.output_name
+                if name is None or name.lower() in {
+                    n.lower() for n in [key, *expressions]
+                }:
+                    name = f"agg_{len(expressions) + 1}"
+                names[normalized] = name
+                expressions[name] = expression
+            reference = f"{alias}.{names[normalized]}"
+            if subquery.function == "COUNT":
+                reference = f"COALESCE({reference}, 0)"
+            replacements.append((subquery.open_paren, subquery.close_paren, reference))
+
+        select_list = ",\n        ".join(
+            [f"{inner}.{key}"]
+            + [f"{expression} AS {name}" for name, expression in expressions.items()]
+        )
+        join = (
+            f"\nLEFT JOIN (\n    SELECT\n        {select_list}\n"
+            f"    FROM {subqueries[0].table} {inner}\n"
+            f"    GROUP BY {inner}.{key}\n) {alias} ON {alias}.{key} = {outer_column}"
+        )
+        return join, replacements
+
+    def _where_conjunctions(self, parsed: _ParsedSql) -> list[list[tuple[int, int]]]:
+        """Conjuncts of every WHERE clause that is a pure conjunction."""
+        conjunctions = []
+        for position in range(len(parsed)):
+            if parsed.upper(position) != "WHERE" or position + 1 >= len(parsed):
+                continue
+            level = parsed.depth[position]
+            end = parsed.clause_end(position + 1, level, _CLAUSE_KEYWORDS)
+            if end == position + 1 or parsed.has_top_level(position + 1, end, "OR"):
+                continue
+            conjuncts = parsed.split(position + 1, end, "AND")
+            if all(first < last for first, last in conjuncts):
+                conjunctions.append(conjuncts)
+        return conjunctions
+
+    @staticmethod
+    def _comparisons(
+        parsed: _ParsedSql, conjuncts: list[tuple[int, int]]
+    ) -> list[_Comparison]:
+        """Conjuncts of the form ``column <op> number`` or ``number <op> column``."""
+        comparisons = []
+        for index, (first, last) in enumerate(conjuncts):
+            text = parsed.text(first, last)
+            if (length := parsed.column(first)) and first + length < last:
+                op = parsed.tokens[first + length].value
+                number = parsed.number(first + length + 1)
+                if op in _FLIPPED and number and first + length + 1 + number[1] == last:
+                    column = normalize_sql(parsed.text(first, first + length))
+                    literal = _integer_text(parsed.text(first + length + 1, last))
+                    comparisons.append(
+                        _Comparison(index, column, op, number[0], text, literal)
+                    )
+            elif (number := parsed.number(first)) is not None:
+                op_at = first + number[1]
+                if op_at < last and parsed.tokens[op_at].value in _FLIPPED:
+                    length = parsed.column(op_at + 1)
+                    if length and op_at + 1 + length == last:
+                        column = normalize_sql(parsed.text(op_at + 1, last))
+                        op = _FLIPPED[parsed.tokens[op_at].value]
+                        literal = _integer_text(parsed.text(first, op_at))
+                        comparisons.append(
+                            _Comparison(index, column, op, number[0], text, literal)
+                        )
+        return comparisons
+
+    @staticmethod
+    def _in_list(
+        parsed: _ParsedSql, first: int, last: int
+    ) -> tuple[str, bool, list[tuple[str, float | None]]] | None:
+        """Column, negation and literal values of ``column [NOT] IN (...)``."""
+        if not (length := parsed.column(first)):
+            return None
+        position = first + length
+        negated = parsed.upper(position) == "NOT"
+        position += negated
+        if parsed.upper(position) != "IN" or not parsed.is_punct(position + 1, "("):
+            return None
+        close = parsed.partner[position + 1]
+        if close != last - 1:
+            return None
+
+        values: list[tuple[str, float | None]] = []
+        for item_first, item_last in parsed.split(position + 2, close, ","):
+            text = parsed.text(item_first, item_last) if item_first < item_last else ""
+            number = parsed.number(item_first)
+            if number is not None and item_first + number[1] == item_last:
+                values.append((text, number[0]))
+            elif (
+                item_last - item_first == 1
+                and parsed.tokens[item_first].type == TokenType.STRING
+            ):
+                values.append((text, None))
+            else:
+                return None
+        column = normalize_sql(parsed.text(first, first + length))
+        return column, negated, values
+
+    @staticmethod
+    def _remove_conjuncts(
+        parsed: _ParsedSql, conjuncts: list[tuple[int, int]], removed: set[int]
+    ) -> list[tuple[int, int, str]]:
+        """Text edits deleting conjuncts together with their AND and comments."""
+        kept = [i for i in range(len(conjuncts)) if i not in removed]
+        first_kept, last_kept = kept[0], kept[-1]
+        edits = []
+        if first_kept > 0:
+            edits.append(
+                (
+                    parsed.start(conjuncts[0][0]),
+                    parsed.start(conjuncts[first_kept][0]),
+                    "",
+                )
+            )
+        for index in range(first_kept + 1, last_kept):
+            if index in removed:
+                first, last = conjuncts[index]
+                edits.append((parsed.start(first - 1), parsed.start(last), ""))
+        if last_kept < len(conjuncts) - 1:
+            edits.append(
+                (
+                    parsed.end(conjuncts[last_kept][1] - 1),
+                    _line_end(parsed.sql, parsed.end(conjuncts[-1][1] - 1)),
+                    "",
+                )
+            )
+        return edits
+
+    @staticmethod
+    def _apply(sql: str, edits: list[tuple[int, int, str]]) -> str:
+        """Apply non-overlapping text edits given as ``(start, end, replacement)``."""
+        for start, end, replacement in sorted(edits, reverse=True):
+            sql = sql[:start] + replacement + sql[end:]
+        return sql
+
+
+def _integer_text(number: str) -> str | None:
+    """Text an integer literal becomes when compared with a TEXT column."""
+    digits = "".join(number.split())
+    if not digits.lstrip("+-").isdigit():
+        return None
+    return str(int(digits))
+
+
+def _same_order(group: list[_Comparison]) -> bool:
+    """Whether the numbers order the same way as numbers and as text.
+
+    Comparisons against a TEXT column compare the literals as strings, so
+    dropping a conjunct is only sound when both orders agree.
+    """
+    if any(c.literal is None for c in group):
+        return False
+    keys = [(c.value, c.literal or "") for c in group]
+    return all((a > b) - (a < b) == (x > y) - (x < y) for a, x in keys for b, y in keys)
+
+
+def _line_end(sql: str, offset: int) -> int:
+    """Extend an offset over a trailing same-line comment."""
+    for token in tokenize_sql(sql[offset:]):
+        if token.type == TokenType.COMMENT or (
+            token.type == TokenType.WHITESPACE and "\n" not in token.value
+        ):
+            continue
+        return offset + token.start
+    return len(sql)
@@ -0,0 +1,259 @@
+# src/services/sql_extraction.py
+import re
+from dataclasses import dataclass
+
+from core.sql_normalizer import SqlToken, TokenType, tokenize_sql
+
+_FENCE = "```"
+_OPENING_FENCE = re.compile(r"```[\w+-]*[ \t]*\n?")
+_STATEMENT_START = re.compile(
+    r"\s*(SELECT|WITH|INSERT|UPDATE|DELETE|MERGE|CREATE|ALTER|DROP|REPLACE)\b",
+    re.IGNORECASE,
+)
+# Answers that may be cut at their first top-level semicolon
+_QUERY_START = re.compile(
+    r"\s*(SELECT|WITH|INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE
+)
+# Type specifications are plain statements, their bodies are blocks
+_BLOCK_START = re.compile(
+    r"\s*(BEGIN|DECLARE|CREATE\s+(OR\s+REPLACE\s+)?"
+    r"(PROCEDURE|FUNCTION|PACKAGE|TRIGGER|TYPE\s+BODY)\b)",
+    re.IGNORECASE,
+)
+# Words starting a header whose IS or AS opens a declaration section
+_PROGRAM_HEADERS = frozenset({"PROCEDURE", "FUNCTION", "PACKAGE"})
+
+
+def find_sql_end(text: str) -> int | None:
+    """
+    Return the offset just past the first complete SQL answer, if present.
+
+    A fenced answer is complete at its closing code fence. An unfenced answer
+    that starts with a query or DML statement is complete at the first
+    top-level semicolon outside strings and comments. Answers starting with
+    DDL (such as an index followed by the query using it) or a PL/SQL block
+    are only ever considered complete by a closing fence.
+    """
+    if (opening := _OPENING_FENCE.search(text)) is not None:
+        closing = text.find(_FENCE, opening.end())
+        return closing + len(_FENCE) if closing != -1 else None
+
+    # Prose may still be followed by a fenced block; only stop on plain SQL
+    if not _QUERY_START.match(text):
+        return None
+
+    depth = 0
+    for token in tokenize_sql(text):
+        if token.type != TokenType.PUNCTUATION:
+            continue
+        if token.value == "(":
+            depth += 1
+        elif token.value == ")":
+            depth -= 1
+        elif token.value == ";" and depth <= 0:
+            return token.start + 1
+    return None
+
+
+def extract_sql(text: str) -> str:
+    """Extract the SQL from a model answer, dropping code fences and prose."""
+    if (opening := _OPENING_FENCE.search(text)) is not None:
+        start, closing = opening.end(), text.find(_FENCE, opening.end())
+        end = closing if closing != -1 else None
+        return text[start:end].strip()
+    return text.strip()
+
+
+def is_well_formed_sql(sql: str) -> bool:
+    """Cheap dialect-neutral syntax check: a statement with balanced tokens."""
+    if not (_STATEMENT_START.match(sql) or _BLOCK_START.match(sql)):
+        return False
+
+    depth = 0
+    for token in tokenize_sql(sql):
+        if token.type == TokenType.PUNCTUATION and token.value in "()":
+            depth += 1 if token.value == "(" else -1
+            if depth < 0:
+                return False
+        elif token.type == TokenType.STRING and (
+            len(token.value) < 2 or not token.value.endswith("'")
+        ):
+            return False
+        elif token.type == TokenType.QUOTED_IDENTIFIER and (
+            len(token.value) < 2 or token.value[-1] not in '"`]'
+        ):
+            return False
+        elif token.value.startswith("/*") and not token.value.endswith("*/"):
+            return False
+    return depth == 0
+
+
+class SqlStreamTerminator:
+    """Incrementally detects when a streamed SQL answer is complete."""
+
+    def __init__(self) -> None:
+        self._chunks: list[str] = []
+        self.end: int | None = None
+
+    @property
+    def text(self) -> str:
+        """Text received so far, cut at the completion point once reached."""
+        text = "".join(self._chunks)
+        return text if self.end is None else text[: self.end]
+
+    def feed(self, chunk: str) -> bool:
+        """Add a chunk and report whether the answer is now complete."""
+        self._chunks.append(chunk)
+        # Only a semicolon or a backtick can complete an answer
+        if self.end is None and (";" in chunk or "`" in chunk):
+            self.end = find_sql_end("".join(self._chunks))
+        return self.end is not None
+
+
+@dataclass(frozen=True)
+class SqlStatement:
+    """A statement of a SQL script, with how it was terminated."""
+
+    text: str
+    # Ended by a line holding only "/" (SQL*Plus) rather than a semicolon
+    slash_terminated: bool = False
+
+
+def split_sql_script(script: str) -> list[SqlStatement]:
+    """
+    Split a SQL script into its statements, in order.
+
+    Statements end at a semicolon outside strings and comments, or at a line
+    holding only ``/``. PL/SQL blocks, stored programs and triggers keep their
+    inner semicolons: they end at the next ``/`` line or, when the script has
+    none after them, at the semicolon closing their outermost unit (``BEGIN``
+    or the ``IS``/``AS`` of a program or package, up to its ``END``). Comments
+    before a statement stay with it and empty statements are dropped.
+    """
+    tokens = tokenize_sql(script)
+    slash_lines = {
+        token.start for token in tokens if token.value == "/" and _alone(script, token)
+    }
+    last_slash = max(slash_lines, default=-1)
+    statements: list[SqlStatement] = []
+    start = 0
+    in_statement = False
+    block: _BlockNesting | None = None
+    for index, token in enumerate(tokens):
+        if token.type in (TokenType.WHITESPACE, TokenType.COMMENT):
+            continue
+        if not in_statement and (token.value == ";" or token.start in slash_lines):
+            start = token.start + 1  # Empty statement
+            continue
+        if not in_statement:
+            in_statement = True
+            opening = _BLOCK_START.match(script, token.start)
+            block = _BlockNesting(opening.group()) if opening else None
+
+        if token.start in slash_lines:
+            end, slash = token.start, True
+        elif token.value == ";" and (
+            block is None or (block.closed and token.start > last_slash)
+        ):
+            end, slash = token.start + 1, False
+        else:
+            if block is not None:
+                block.feed(tokens, index)
+            continue
+
+        statements.append(SqlStatement(script[start:end].strip(), slash))
+        start, in_statement, block = token.start + 1, False, None
+
+    if in_statement:
+        statements.append(SqlStatement(script[start:].strip()))
+    return statements
+
+
+def is_query(sql: str) -> bool:
+    """Whether a statement is a query rather than DDL, DML or a PL/SQL block."""
+    for token in tokenize_sql(sql):
+        if token.type not in (TokenType.WHITESPACE, TokenType.COMMENT):
+            return token.upper in ("SELECT", "WITH") or token.value == "("
+    return False
+
+
+def join_sql_statements(statements: list[SqlStatement]) -> str:
+    """Reassemble statements into a script that splits back the same way."""
+    parts = []
+    for statement in statements:
+        text = statement.text.rstrip()
+        if statement.slash_terminated:
+            text += "\n/"
+        elif not text.endswith(";"):
+            text += ";"
+        parts.append(text)
+    return "\n\n".join(parts) + "\n"
+
+
+class _BlockNesting:
+    """
+    Open units of a PL/SQL block, to find the semicolon that closes it.
+
+    A unit opens at ``DECLARE``, at the ``IS``/``AS`` of a program, package or
+    type body header, and at a ``BEGIN`` or ``CASE`` that does not belong to
+    an open declaration section; every ``END`` (or ``END CASE``) except
+    ``END IF`` and ``END LOOP`` closes one.
+    """
+
+    def __init__(self, opening: str) -> None:
+        """Start at the matched opening of the block, e.g. ``CREATE TYPE BODY``."""
+        # One entry per open unit: whether it still waits for its BEGIN
+        self._units: list[bool] = []
+        self._opened = False
+        # TYPE would also start local type declarations; only a body's counts
+        self._in_header = opening.upper().endswith("BODY")
+        self._previous_word = ""
+
+    @property
+    def closed(self) -> bool:
+        """Whether a unit was opened and every open unit has been closed."""
+        return self._opened and not self._units
+
+    def feed(self, tokens: list[SqlToken], index: int) -> None:
+        """Account for the token at ``index``."""
+        token = tokens[index]
+        if token.value == ";":
+            self._in_header = False  # Forward declaration
+        if token.type != TokenType.WORD:
+            return
+        word, previous = token.upper, self._previous_word
+        self._previous_word = word
+        if word in _PROGRAM_HEADERS:
+            self._in_header = True
+        elif word == "DECLARE" or (self._in_header and word in ("IS", "AS")):
+            self._in_header = False
+            self._open(waits_for_begin=True)
+        elif word == "BEGIN" and self._units and self._units[-1]:
+            self._units[-1] = False
+        elif word == "BEGIN" or (word == "CASE" and previous != "END"):
+            self._open(waits_for_begin=False)
+        elif word == "END" and self._units:
+            if _next_word(tokens, index) not in ("IF", "LOOP"):
+                self._units.pop()
+
+    def _open(self, waits_for_begin: bool) -> None:
+        """Open a unit."""
+        self._units.append(waits_for_begin)
+        self._opened = True
+
+
+def _alone(script: str, token: SqlToken) -> bool:
+    """Whether a token is the only text on its line."""
+    line_start = script.rfind("\n", 0, token.start) + 1
+    line_end = script.find("\n", token.start)
+    end = line_end if line_end != -1 else None
+    return script[line_start:end].strip() == "/"
+
+
+def _next_word(tokens: list[SqlToken], index: int) -> str | None:
+    """Upper-cased next word after the token at ``index``."""
+    following = index + 1
+    for token in tokens[following:]:
+        if token.type not in (TokenType.WHITESPACE, TokenType.COMMENT):
+            return token.upper if token.type == TokenType.WORD else None
+    return None
@@ -0,0 +1,84 @@
+# tests/test_batch_optimizer.py
+import asyncio
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+from core.types import DatabaseType, OptimizationResult
+from services.batch_optimizer import BatchQueryOptimizer
+
+
+class TestBatchQueryOptimizer:
+    """Test BatchQueryOptimizer functionality."""
+
+    @pytest.fixture
+    def sql_dir(self, tmp_path: Path) -> Path:
+        """Create a directory tree with SQL files."""
+        (tmp_path / "nested").mkdir()
+        for name in ["a.sql", "b.sql", "nested/c.sql"]:
+            (tmp_path / name).write_text("SELECT 1;")
+        (tmp_path / "notes.txt").write_text("not sql")
+        return tmp_path
+
+    def test_collect_sql_files_from_directory(self, sql_dir: Path):
+        """Test directory targets are searched recursively."""
+        files = BatchQueryOptimizer.collect_sql_files(str(sql_dir))
+
+        assert [f.name for f in files] == ["a.sql", "b.sql", "c.sql"]
+
+    def test_collect_sql_files_from_glob(self, sql_dir: Path):
+        """Test glob targets only match the pattern."""
+        files = BatchQueryOptimizer.collect_sql_files(str(sql_dir / "*.sql"))
+
+        assert [f.name for f in files] == ["a.sql", "b.sql"]
+
+    def test_collect_sql_files_skips_generated_scripts(self, sql_dir: Path):
+        """Test reassembled scripts from earlier runs are not collected."""
+        (sql_dir / "a_oracle_optimized.sql").write_text("SELECT 1;")
+
+        files = BatchQueryOptimizer.collect_sql_files(str(sql_dir))
+
+        assert [f.name for f in files] == ["a.sql", "b.sql", "c.sql"]
+
+    @pytest.mark.asyncio
+    async def test_failures_do_not_abort_run(self, sample_metadata, tmp_path: Path):
+        """Test a failing file is reported while others still succeed."""
+        in_flight = 0
+        peak = 0
+
+        async def optimize_query(sql_file: Path) -> OptimizationResult:
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            if sql_file.name == "bad.sql":
+                raise ValueError("broken query")
+            return OptimizationResult(
+                original_query="SELECT 1;",
+                explained_query="",
+                optimized_query="SELECT 1;",
+                metadata=sample_metadata,
+                database_type=DatabaseType.ORACLE,
+            )
+
+        optimizer = Mock()
+        optimizer.optimize_query = optimize_query
+        files = [tmp_path / f"q{i}.sql" for i in range(6)] + [tmp_path / "bad.sql"]
+
+        summary = await BatchQueryOptimizer(
+            optimizer, DatabaseType.ORACLE, jobs=2
+        ).optimize_files(files)
+
+        assert len(summary.succeeded) == 6
+        assert [item.error for item in summary.failed] == ["broken query"]
+        assert peak == 2
+        assert summary.to_dict()["failed"] == 1
+        assert summary.started_at <= datetime.now()
+
+    def test_invalid_jobs(self):
+        """Test a non-positive job count is rejected."""
+        with pytest.raises(ValueError):
+            BatchQueryOptimizer(Mock(), DatabaseType.ORACLE, jobs=0)
@@ -0,0 +1,139 @@
+# tests/test_benchmark.py
+from pathlib import Path
+
+import pytest
+
+from core.types import QueryTiming
+from services.benchmark import SqliteQueryBenchmark, SyntheticDataGenerator
+
+SCHEMA = """
+CREATE TABLE customers (customer_id INTEGER PRIMARY KEY, name TEXT, joined DATE);
+CREATE TABLE orders (
+    order_id INTEGER PRIMARY KEY,
+    customer_id INTEGER REFERENCES customers(customer_id),
+    status TEXT,
+    total_amount REAL
+);
+"""
+
+SPEC = {
+    "seed": 7,
+    "tables": {
+        "customers": {"rows": 50},
+        "orders": {
+            "rows": 400,
+            "columns": {
+                "status": {"values": ["completed", "pending"], "weights": [3, 1]},
+                "total_amount": {"min": 1.0, "max": 10.0, "null_fraction": 0.1},
+            },
+        },
+    },
+}
+
+
+class TestSyntheticDataGenerator:
+    """Test SyntheticDataGenerator functionality."""
+
+    def test_populates_tables_from_spec(self):
+        """Test row counts, value lists and foreign key ranges."""
+        connection = SqliteQueryBenchmark(
+            SCHEMA, SyntheticDataGenerator(SPEC)
+        ).connection
+
+        assert connection.execute("SELECT COUNT(*) FROM orders").fetchone()[0] == 400
+        statuses = {row[0] for row in connection.execute("SELECT status FROM orders")}
+        assert statuses == {"completed", "pending"}
+        low, high = connection.execute(
+            "SELECT MIN(customer_id), MAX(customer_id) FROM orders"
+        ).fetchone()
+        assert 1 <= low and high <= 50
+        assert connection.execute(
+            "SELECT COUNT(*) FROM orders WHERE total_amount IS NULL"
+        ).fetchone()[0]
+
+    def test_defaults_and_seed(self):
+        """Test default row counts and reproducible data for the same seed."""
+        first = SqliteQueryBenchmark(SCHEMA, SyntheticDataGenerator(SPEC)).connection
+        second = SqliteQueryBenchmark(SCHEMA, SyntheticDataGenerator(SPEC)).connection
+        defaults = SqliteQueryBenchmark(SCHEMA).connection
+
+        query = "SELECT * FROM orders ORDER BY order_id"
+        assert first.execute(query).fetchall() == second.execute(query).fetchall()
+        assert defaults.execute("SELECT COUNT(*) FROM customers").fetchone()[0] == 100
+        joined = defaults.execute("SELECT joined FROM customers").fetchone()[0]
+        assert joined[:2] == "20"
+
+
+class TestSqliteQueryBenchmark:
+    """Test SqliteQueryBenchmark functionality."""
+
+    @pytest.fixture
+    def benchmark(self) -> SqliteQueryBenchmark:
+        """Create a benchmark over the sample schema and data."""
+        return SqliteQueryBenchmark(SCHEMA, SyntheticDataGenerator(SPEC), runs=3)
+
+    def test_equivalent_rewrite(self, benchmark: SqliteQueryBenchmark):
+        """Test that a correct rewrite is timed and marked equivalent."""
+        result = benchmark.compare_queries(
+            "SELECT c.customer_id, (SELECT COUNT(*) FROM orders o "
+            "WHERE o.customer_id = c.customer_id) FROM customers c;",
+            "SELECT c.customer_id, COUNT(o.order_id) FROM customers c "
+            "LEFT JOIN orders o ON o.customer_id = c.customer_id "
+            "GROUP BY c.customer_id ORDER BY 2 DESC",
+        )
+
+        assert result.equivalent
+        assert result.original is not None
+        assert len(result.original.runs_ms) == 3
+        assert result.original.row_count == 50
+        assert result.speedup is not None
+        assert result.to_dict()["optimized"]["runs"] == 3
+
+    def test_detects_different_rows(self, benchmark: SqliteQueryBenchmark):
+        """Test that a rewrite returning other rows is not equivalent."""
+        result = benchmark.compare_queries(
+            "SELECT status FROM orders",
+            "SELECT DISTINCT status FROM orders",
+        )
+
+        assert not result.equivalent
+        assert not result.errors
+
+    def test_records_errors(self, benchmark: SqliteQueryBenchmark):
+        """Test that a rewrite failing to run is reported, not raised."""
+        result = benchmark.compare_queries(
+            "SELECT * FROM orders WHERE status = :status", "SELECT * FROM nope"
+        )
+
+        assert result.original is not None
+        assert result.original.row_count == 0
+        assert result.optimized is None
+        assert not result.equivalent
+        assert "no such table" in result.errors[0]
+
+    def test_from_files(self, tmp_path: Path):
+        """Test loading the schema and data spec from files."""
+        schema_path = tmp_path / "schema.sql"
+        schema_path.write_text(SCHEMA, encoding="utf-8")
+        data_path = tmp_path / "data.json"
+        data_path.write_text('{"tables": {"customers": {"rows": 5}}}', encoding="utf-8")
+
+        benchmark = SqliteQueryBenchmark.from_files(schema_path, data_path, runs=1)
+
+        timing, _ = benchmark.time_query("SELECT * FROM customers")
+        assert timing.row_count == 5
+        with pytest.raises(FileNotFoundError):
+            SqliteQueryBenchmark.from_files(tmp_path / "missing.sql")
+
+
+class TestQueryTiming:
+    """Test QueryTiming functionality."""
+
+    def test_percentiles(self):
+        """Test nearest-rank p50 and p95 of recorded runs."""
+        timing = QueryTiming(
+            runs_ms=[float(ms) for ms in range(20, 0, -1)], row_count=0
+        )
+
+        assert timing.p50_ms == 10.0
+        assert timing.p95_ms == 19.0
@@ -0,0 +1,148 @@
+# tests/test_comparison.py
+import asyncio
+import time
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from config.config import ComparisonTarget, OptimizerConfig
+from core.interfaces import LLMClient
+from core.types import DatabaseType, OptimizationResult
+from services.comparison import QueryComparison
+
+
+class _SlowClient(LLMClient):
+    """LLM client that answers after a fixed delay."""
+
+    def __init__(self, provider: str) -> None:
+        self._provider = provider
+
+    async def generate_response(self, prompt, config) -> str:
+        await asyncio.sleep(0.05)
+        return f"SELECT '{self._provider}:{config['model_name']}';"
+
+    def get_provider_name(self) -> str:
+        return self._provider
+
+
+class TestComparisonTarget:
+    """Test ComparisonTarget parsing."""
+
+    def test_parse_database_only(self):
+        """Test a bare database name keeps the base provider."""
+        target = ComparisonTarget.parse("SQLite")
+
+        assert target == ComparisonTarget(DatabaseType.SQLITE)
+        assert target.label == "sqlite"
+
+    def test_parse_provider_and_model(self):
+        """Test provider and model overrides are applied to the config."""
+        target = ComparisonTarget.parse("oracle:openai:gpt-4o")
+        config = target.apply(OptimizerConfig(provider="gemini"))
+
+        assert target.label == "oracle_openai_gpt-4o"
+        assert config.provider == "openai"
+        assert config.model_name == "gpt-4o"
+        assert config.database_type == DatabaseType.ORACLE
+
+    def test_parse_provider_uses_its_default_model(self):
+        """Test switching provider resets the model to that provider's default."""
+        config = ComparisonTarget.parse("sqlite:claude").apply(OptimizerConfig())
+
+        assert config.model_name == "claude-3-5-sonnet-20241022"
+        assert config.max_concurrent_requests == 4
+
+    def test_parse_rejects_unknown_values(self):
+        """Test invalid databases and providers raise ValueError."""
+        with pytest.raises(ValueError):
+            ComparisonTarget.parse("postgres")
+        with pytest.raises(ValueError):
+            ComparisonTarget.parse("oracle:mistral")
+
+
+class TestQueryComparison:
+    """Test QueryComparison functionality."""
+
+    @pytest.fixture
+    def file_handler(self) -> Mock:
+        """Create file handler mock."""
+        file_handler = Mock()
+        file_handler.read_sql_file = AsyncMock(return_value="SELECT * FROM users;")
+        file_handler.write_json_file = AsyncMock()
+        return file_handler
+
+    @pytest.fixture
+    def metadata_repo(self) -> Mock:
+        """Create metadata repository mock."""
+        metadata_repo = Mock()
+        metadata_repo.get_metadata = AsyncMock(return_value=None)
+        metadata_repo.save_metadata = AsyncMock()
+        return metadata_repo
+
+    @pytest.mark.asyncio
+    async def test_targets_run_concurrently_on_shared_infra(
+        self, file_handler, metadata_repo, tmp_path: Path
+    ):
+        """Test all targets overlap and share the file read and clients."""
+        created = []
+
+        def client_factory(config: OptimizerConfig) -> LLMClient:
+            created.append(config.provider)
+            return _SlowClient(config.provider)
+
+        comparison = QueryComparison(
+            file_handler, metadata_repo, OptimizerConfig(), client_factory
+        )
+        targets = [
+            ComparisonTarget.parse(spec)
+            for spec in ["oracle", "sqlite", "sqlite:openai", "sqlite:openai:gpt-4o"]
+        ]
+
+        start = time.perf_counter()
+        results = await comparison.compare(tmp_path / "query.sql", targets)
+        elapsed = time.perf_counter() - start
+
+        # Each target makes two sequential 50ms calls; serial would take 400ms
+        assert elapsed < 0.3
+        assert created == ["gemini", "openai"]
+        file_handler.read_sql_file.assert_called_once()
+        openai_result, oracle_result = results[targets[3]], results[targets[0]]
+        assert isinstance(openai_result, OptimizationResult)
+        assert isinstance(oracle_result, OptimizationResult)
+        assert openai_result.optimized_query == "SELECT 'openai:gpt-4o';"
+        assert openai_result.output_path == (
+            tmp_path / "query_sqlite_openai_gpt-4o_optimization.json"
+        )
+        assert oracle_result.output_path == (
+            tmp_path / "query_oracle_optimization.json"
+        )
+
+    @pytest.mark.asyncio
+    async def test_failed_target_does_not_abort_others(
+        self, file_handler, metadata_repo, mock_llm_client, tmp_path: Path
+    ):
+        """Test failures are reported per target."""
+        metadata_repo.save_metadata.side_effect = [RuntimeError("disk full"), None]
+        mock_llm_client.generate_response.return_value = "SELECT * FROM users;"
+        comparison = QueryComparison(
+            file_handler, metadata_repo, OptimizerConfig(), lambda _: mock_llm_client
+        )
+        targets = [ComparisonTarget.parse("oracle"), ComparisonTarget.parse("sqlite")]
+
+        results = await comparison.compare(tmp_path / "query.sql", targets)
+
+        assert sum(isinstance(r, Exception) for r in results.values()) == 1
+
+    @pytest.mark.asyncio
+    async def test_duplicate_targets_are_rejected(
+        self, file_handler, metadata_repo, mock_llm_client, tmp_path: Path
+    ):
+        """Test the same target twice raises ValueError."""
+        comparison = QueryComparison(
+            file_handler, metadata_repo, OptimizerConfig(), lambda _: mock_llm_client
+        )
+        with pytest.raises(ValueError):
+            await comparison.compare(
+                tmp_path / "query.sql", [ComparisonTarget.parse("oracle")] * 2
+            )
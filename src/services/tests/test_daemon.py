@@ -0,0 +1,160 @@
+# tests/test_daemon.py
+import asyncio
+import os
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+import pytest_asyncio
+
+from config.config import OptimizerConfig
+from core.types import (
+    BenchmarkResult,
+    DatabaseType,
+    DecomposedQuery,
+    OptimizationResult,
+    OptimizationStage,
+    QueryFragment,
+    QueryMetadata,
+    QueryTiming,
+    RewriteCandidate,
+)
+from services.daemon import (
+    DaemonClient,
+    DaemonError,
+    OptimizationDaemon,
+    result_from_dict,
+    result_to_dict,
+)
+
+
+class TestOptimizationDaemon:
+    """Test serving optimization requests over a Unix socket."""
+
+    @pytest.fixture
+    def config(self, tmp_path: Path) -> OptimizerConfig:
+        """Configuration with metadata in the temporary directory."""
+        return OptimizerConfig(
+            database_type=DatabaseType.SQLITE,
+            metadata_path=tmp_path / "metadata.json",
+        )
+
+    @pytest_asyncio.fixture
+    async def daemon(self, tmp_path: Path, mock_llm_client: Mock):
+        """Daemon running in the background with a mock LLM client."""
+        mock_llm_client.generate_response.side_effect = lambda prompt, config: (
+            "SELECT id FROM users;"
+            if "SELECT" in prompt and "explanation" in prompt.lower()
+            else "Selects the adult users"
+        )
+        factory = Mock(return_value=mock_llm_client)
+        daemon = OptimizationDaemon(tmp_path / "sqlo.sock", create_client=factory)
+        task = asyncio.create_task(daemon.serve())
+        client = DaemonClient(tmp_path / "sqlo.sock")
+        while not await client.is_running():
+            await asyncio.sleep(0.01)
+        yield daemon, client, factory
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    @pytest.mark.asyncio
+    async def test_forwarded_optimization(self, daemon, config, temp_sql_file: Path):
+        """Test results and streamed tokens come back through the socket."""
+        _, client, _ = daemon
+        tokens = []
+
+        result = await client.optimize(
+            temp_sql_file, config, on_token=lambda *event: tokens.append(event)
+        )
+
+        assert result.database_type == DatabaseType.SQLITE
+        assert result.metadata.version
+        assert result.output_path.exists()
+        assert {stage for stage, _ in tokens} == set(OptimizationStage)
+
+    @pytest.mark.asyncio
+    async def test_clients_stay_warm(self, daemon, config, temp_sql_file: Path):
+        """Test later requests reuse the LLM client and report as reused."""
+        server, client, factory = daemon
+
+        await client.optimize(temp_sql_file, config)
+        second = await client.optimize(temp_sql_file, config)
+
+        assert factory.call_count == 1
+        assert len(second.reused_stages) == len(OptimizationStage)
+        assert (await client.status())["requests"] == 2
+
+    @pytest.mark.asyncio
+    async def test_repository_reloads_only_when_idle(
+        self, config: OptimizerConfig, tmp_path: Path
+    ):
+        """Test storage changes while requests run do not create a second instance."""
+        server = OptimizationDaemon(tmp_path / "sqlo.sock")
+        metadata = tmp_path / "metadata.json"
+        first = await server._acquire_repo(config)
+
+        metadata.write_text("{}")
+        os.utime(metadata, ns=(10**18, 10**18))
+        second = await server._acquire_repo(config)
+        await server._release_repo(config)
+        await server._release_repo(config)
+        os.utime(metadata, ns=(2 * 10**18, 2 * 10**18))
+        third = await server._acquire_repo(config)
+
+        assert second is first
+        assert third is not first
+        assert server.status()["metadata_repositories"] == 1
+
+    def test_result_round_trip(self):
+        """Test candidates, benchmark and decomposition survive serialization."""
+        benchmark = BenchmarkResult(
+            QueryTiming([3.0, 1.0, 2.0], 5), QueryTiming([1.0], 5), True
+        )
+        result = OptimizationResult(
+            original_query="SELECT 1",
+            explained_query="One",
+            optimized_query="SELECT 1",
+            metadata=QueryMetadata(
+                query_sql="SELECT 1",
+                explanation_text="One",
+                optimized_query="SELECT 1",
+                version="v1",
+                last_optimization=datetime(2024, 1, 1),
+                database_type=DatabaseType.SQLITE,
+            ),
+            database_type=DatabaseType.SQLITE,
+            benchmark=benchmark,
+            candidates=[
+                RewriteCandidate(0, "SELECT 1", score=1.0, benchmark=benchmark),
+                RewriteCandidate(1, "", valid=False, error="timeout"),
+            ],
+            decomposition=DecomposedQuery(
+                "SELECT (__subquery_1__)",
+                [QueryFragment("__subquery_1__", "SELECT 1", error="rejected")],
+            ),
+        )
+
+        assert result_from_dict(result_to_dict(result)) == result
+
+    @pytest.mark.asyncio
+    async def test_errors_are_forwarded(self, daemon, config, tmp_path: Path):
+        """Test failures inside the daemon are raised by the client."""
+        _, client, _ = daemon
+
+        with pytest.raises(DaemonError, match="missing.sql"):
+            await client.optimize(tmp_path / "missing.sql", config)
+
+    @pytest.mark.asyncio
+    async def test_not_running(self, tmp_path: Path):
+        """Test a missing or stale socket means no daemon."""
+        (tmp_path / "stale.sock").touch()
+
+        assert not await DaemonClient(tmp_path / "none.sock").is_running()
+        assert not await DaemonClient(tmp_path / "stale.sock").is_running()
+
+    def test_config_round_trip(self, config: OptimizerConfig):
+        """Test configurations survive JSON serialization."""
+        config.fallback_providers = ("openai",)
+
+        assert OptimizerConfig.from_dict(config.to_dict()) == config
@@ -0,0 +1,90 @@
+# tests/test_plan_verifier.py
+from pathlib import Path
+
+import pytest
+
+from services.plan_verifier import SqlitePlanVerifier
+
+SCHEMA = """
+CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT, status TEXT);
+CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER, total REAL);
+CREATE INDEX idx_users_email ON users(email);
+CREATE INDEX idx_orders_user ON orders(user_id);
+"""
+
+
+class TestSqlitePlanVerifier:
+    """Test SqlitePlanVerifier functionality."""
+
+    @pytest.fixture
+    def verifier(self) -> SqlitePlanVerifier:
+        """Create a verifier over the sample schema."""
+        return SqlitePlanVerifier(SCHEMA)
+
+    def test_explain_classifies_steps(self, verifier: SqlitePlanVerifier):
+        """Test that full scans and index searches are counted."""
+        scan = verifier.explain("SELECT * FROM users WHERE status = 'active'")
+        search = verifier.explain("SELECT * FROM users WHERE email = :email;")
+
+        assert scan.full_scans == 1
+        assert search.full_scans == 0
+        assert search.index_searches == 1
+
+    def test_flags_full_scan_replacing_index_search(self, verifier: SqlitePlanVerifier):
+        """Test that losing an index search is reported as a regression."""
+        comparison = verifier.compare_plans(
+            "SELECT * FROM users WHERE email = 'a@b.c'",
+            "SELECT * FROM users WHERE lower(email) = 'a@b.c'",
+        )
+
+        assert comparison.has_regressions
+        assert "full scans replaced index searches" in comparison.regressions
+
+    def test_flags_correlated_subquery_and_temp_btree(
+        self, verifier: SqlitePlanVerifier
+    ):
+        """Test that extra correlated subqueries and sorts are regressions."""
+        comparison = verifier.compare_plans(
+            "SELECT u.id, COUNT(o.id) FROM users u "
+            "LEFT JOIN orders o ON o.user_id = u.id GROUP BY u.id",
+            "SELECT DISTINCT u.id, (SELECT COUNT(*) FROM orders o "
+            "WHERE o.user_id = u.id) FROM users u ORDER BY 2",
+        )
+
+        assert any("correlated subqueries" in r for r in comparison.regressions)
+        assert any("temp B-trees" in r for r in comparison.regressions)
+
+    def test_reports_improvement(self, verifier: SqlitePlanVerifier):
+        """Test that a cheaper rewrite has improvements and no regressions."""
+        comparison = verifier.compare_plans(
+            "SELECT * FROM users u WHERE EXISTS "
+            "(SELECT 1 FROM orders o WHERE o.user_id = u.id AND o.total > 10)",
+            "SELECT * FROM users u WHERE u.id IN "
+            "(SELECT o.user_id FROM orders o WHERE o.total > 10)",
+        )
+
+        assert not comparison.has_regressions
+        assert comparison.original and comparison.optimized
+        assert comparison.optimized.cost < comparison.original.cost
+
+    def test_optimized_query_must_compile(self, verifier: SqlitePlanVerifier):
+        """Test that an invalid rewrite is rejected with the SQLite error."""
+        comparison = verifier.compare_plans(
+            "SELECT * FROM users", "SELECT * FROM missing_table"
+        )
+
+        assert comparison.optimized is None
+        assert comparison.has_regressions
+        assert "no such table" in comparison.errors[0]
+        assert comparison.to_dict()["optimized"] is None
+
+    def test_from_file(self, tmp_path: Path):
+        """Test loading the schema from a DDL file."""
+        schema_path = tmp_path / "schema.sql"
+        schema_path.write_text(SCHEMA, encoding="utf-8")
+
+        verifier = SqlitePlanVerifier.from_file(schema_path)
+
+        assert verifier.explain("SELECT * FROM orders").full_scans == 1
+        with pytest.raises(FileNotFoundError):
+            SqlitePlanVerifier.from_file(tmp_path / "missing.sql")
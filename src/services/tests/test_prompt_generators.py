@@ -1,7 +1,13 @@
 # tests/test_prompt_generators.py
 
 from core.types import DatabaseType
-from services.prompt_generator import OraclePromptGenerator, SQLitePromptGenerator
+from core.prompt_compaction import estimate_tokens
+from services.prompt_generator import (
+    CompactPromptGenerator,
+    OraclePromptGenerator,
+    PromptGeneratorFactory,
+    SQLitePromptGenerator,
+)
 
 
 class TestPromptGenerators:
@@ -32,3 +38,61 @@ class TestPromptGenerators:
         assert "SQLite" in natural_prompt
         assert explanation in natural_prompt
         assert "SQLite-specific" in natural_prompt
+
+    def test_compact_prompt_generator(self):
+        """Test compacted prompts keep their content with fewer tokens."""
+        generator = OraclePromptGenerator()
+        compact = PromptGeneratorFactory.create_generator(
+            DatabaseType.ORACLE, compact=True
+        )
+        sql_query = "-- find users\nSELECT *\n  FROM users\n WHERE id IN (1, 2, 3);"
+
+        raw_prompt = generator.generate_sql_to_natural_prompt(sql_query)
+        prompt = compact.generate_sql_to_natural_prompt(sql_query)
+
+        assert isinstance(compact, CompactPromptGenerator)
+        assert compact.get_database_type() == DatabaseType.ORACLE
+        assert "SELECT * FROM users WHERE id IN (1, 2, 3);" in prompt
+        assert "find users" not in prompt
+        assert "\n        " not in prompt
+        assert "Oracle-specific features" in prompt
+        assert estimate_tokens(prompt) < estimate_tokens(raw_prompt)
+        assert compact.get_prompt_version() != generator.get_prompt_version()
+
+    def test_compact_prompt_keeps_explanation_lines(self):
+        """Test explanations keep their line structure in compacted prompts."""
+        compact = CompactPromptGenerator(SQLitePromptGenerator())
+        explanation = "Lists orders:\n  - paid only   \n\n\n\n  - newest first"
+
+        prompt = compact.generate_natural_to_sql_prompt(explanation)
+
+        assert "Lists orders:\n  - paid only\n\n  - newest first" in prompt
+
+    def test_decomposition_prompts(self):
+        """Test fragment and compose prompts carry the queries and placeholders."""
+        generator = SQLitePromptGenerator()
+
+        fragment_prompt = generator.generate_fragment_prompt("SELECT 1 FROM t")
+        compose_prompt = generator.generate_compose_prompt(
+            "SELECT (__subquery_1__) FROM u", {"__subquery_1__": "SELECT 1\n FROM t"}
+        )
+
+        assert "SELECT 1 FROM t" in fragment_prompt
+        assert "drop-in replacement" in fragment_prompt
+        assert "SELECT (__subquery_1__) FROM u" in compose_prompt
+        assert "__subquery_1__: SELECT 1 FROM t" in compose_prompt
+
+    def test_compact_decomposition_prompts_keep_queries_verbatim(self):
+        """Test compacted prompts send fragments and the outer query unchanged."""
+        compact = CompactPromptGenerator(SQLitePromptGenerator())
+        fragment = "SELECT id  -- paid\n  FROM t\n WHERE note = 'a\n  b'"
+        skeleton = "SELECT (__subquery_1__)\n  FROM u  /* outer */"
+
+        fragment_prompt = compact.generate_fragment_prompt(fragment)
+        compose_prompt = compact.generate_compose_prompt(
+            skeleton, {"__subquery_1__": fragment}
+        )
+
+        assert fragment in fragment_prompt
+        assert skeleton in compose_prompt
+        assert "\n        " not in compose_prompt.replace(skeleton, "")
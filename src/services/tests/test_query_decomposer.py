@@ -0,0 +1,110 @@
+# tests/test_query_decomposer.py
+from pathlib import Path
+
+from core.sql_normalizer import normalize_sql
+from core.types import QueryFragment
+from services.query_decomposer import QueryDecomposer
+
+BIG_QUERY = Path(__file__).parents[3] / "examples" / "big_test.sql"
+
+
+class TestQueryDecomposer:
+    """Test splitting queries into subquery fragments and composing them."""
+
+    def test_outermost_subqueries_become_fragments(self):
+        """Test scalar, IN, EXISTS and derived table subqueries are cut out."""
+        sql = (
+            "SELECT (SELECT MAX(x) FROM (SELECT x FROM t) d) AS m "
+            "FROM u WHERE u.id IN (SELECT id FROM v) AND COALESCE(u.a, 0) > 1"
+        )
+
+        decomposition = QueryDecomposer().decompose(sql)
+
+        assert decomposition.skeleton == (
+            "SELECT (__subquery_1__) AS m FROM u WHERE u.id IN (__subquery_2__) "
+            "AND COALESCE(u.a, 0) > 1"
+        )
+        assert [f.query for f in decomposition.fragments] == [
+            "SELECT MAX(x) FROM (SELECT x FROM t) d",
+            "SELECT id FROM v",
+        ]
+
+    def test_small_queries_stay_whole(self):
+        """Test queries with fewer subqueries than the minimum are not split."""
+        sql = "SELECT * FROM u WHERE id IN (SELECT id FROM v)"
+
+        assert QueryDecomposer().decompose(sql) is None
+        assert QueryDecomposer(min_fragments=1).decompose(sql) is not None
+
+    def test_compose_round_trip(self):
+        """Test composing untouched fragments rebuilds the original query."""
+        sql = BIG_QUERY.read_text()
+        decomposer = QueryDecomposer()
+
+        decomposition = decomposer.decompose(sql)
+
+        assert len(decomposition.fragments) == 23
+        assert len(decomposition.skeleton) < len(sql) / 2
+        assert normalize_sql(decomposer.compose(decomposition)) == normalize_sql(sql)
+
+    def test_compose_prefers_rewrites_with_intact_placeholders(self):
+        """Test rewritten parts are used only when placeholders survived."""
+        decomposer = QueryDecomposer()
+        decomposition = decomposer.decompose(
+            "SELECT (SELECT 1 FROM a) x, (SELECT 2 FROM b) y FROM dual"
+        )
+        decomposition.fragments[0].optimized_query = "SELECT 10 FROM a"
+
+        lost = decomposer.clean_skeleton(
+            "SELECT (__subquery_1__) x FROM dual", decomposition
+        )
+        kept = decomposer.clean_skeleton(
+            "```sql\nSELECT (__SUBQUERY_2__) y, (__subquery_1__) x FROM dual\n```",
+            decomposition,
+        )
+        decomposition.optimized_skeleton = kept
+
+        assert lost is None
+        assert decomposer.compose(decomposition) == (
+            "SELECT (SELECT 2 FROM b) y, (SELECT 10 FROM a) x FROM dual"
+        )
+
+    def test_clean_fragment(self):
+        """Test model answers are reduced to a bare, well-formed subquery."""
+        fragment = QueryFragment("__subquery_1__", "SELECT 1 FROM t")
+
+        assert (
+            QueryDecomposer.clean_fragment("```sql\n(SELECT 1 FROM t);\n```", fragment)
+            == "SELECT 1 FROM t"
+        )
+        assert QueryDecomposer.clean_fragment("Here is the subquery", fragment) is None
+        assert QueryDecomposer.clean_fragment("SELECT COUNT(* FROM t", fragment) is None
+
+    def test_rewrites_must_keep_identifiers_and_literals(self):
+        """Test rewrites dropping a column, alias, table or literal are rejected."""
+        decomposer = QueryDecomposer()
+        decomposition = decomposer.decompose(
+            "SELECT (SELECT MAX(x) FROM a WHERE a.k = 'K1') x, "
+            "(SELECT 2 FROM b) y FROM dual d WHERE d.n > 10"
+        )
+        fragment = decomposition.fragments[0]
+
+        assert (
+            decomposer.clean_fragment(
+                "SELECT max(A.X) FROM a WHERE a.k = 'K1' AND 1 = 1", fragment
+            )
+            is not None
+        )
+        for dropped in [
+            "SELECT MAX(x) FROM a WHERE a.k = 'k1'",
+            "SELECT MAX(x) FROM a",
+            "SELECT MAX(x) FROM b WHERE b.k = 'K1'",
+        ]:
+            assert decomposer.clean_fragment(dropped, fragment) is None
+        assert (
+            decomposer.clean_skeleton(
+                "SELECT (__subquery_1__) x, (__subquery_2__) y FROM dual d",
+                decomposition,
+            )
+            is None
+        )
@@ -5,7 +5,11 @@ from unittest.mock import AsyncMock, Mock
 import pytest
 
 from config.config import OptimizerConfig
-from core.types import DatabaseType
+from config.tracing import Tracer
+from core.types import DatabaseType, OptimizationStage
+from infra.metadata_repository import JsonMetadataRepository
+from services.plan_verifier import SqlitePlanVerifier
+from services.query_decomposer import QueryDecomposer
 from services.query_optimizer import DatabaseQueryOptimizer
 
 
@@ -68,3 +72,507 @@ class TestDatabaseQueryOptimizer:
         )
         with pytest.raises(FileNotFoundError):
             await optimizer.optimize_query(temp_sql_file)
+
+    @pytest.mark.asyncio
+    async def test_stages_are_traced(
+        self, optimizer: DatabaseQueryOptimizer, temp_sql_file: Path, monkeypatch
+    ):
+        """Test every stage is timed, with token counts on the LLM stages."""
+        tracer = Tracer()
+        tracer.start_recording()
+        monkeypatch.setattr("services.query_optimizer.tracer", tracer)
+        optimizer._llm_client.generate_response.side_effect = [
+            "This query selects all users",
+            "SELECT u.* FROM users u;",
+        ]
+
+        await optimizer.optimize_query(temp_sql_file)
+
+        spans = {span.name: span.fields for span in tracer.spans}
+        assert list(spans) == [
+            "file_read",
+            "hash",
+            "metadata_lookup",
+            "sql_to_natural",
+            "natural_to_sql",
+            "metadata_save",
+            "output_write",
+        ]
+        assert spans["metadata_lookup"] == {"hit": False}
+        assert spans["sql_to_natural"]["prompt_tokens"] > 0
+        assert spans["natural_to_sql"]["completion_tokens"] > 0
+
+    @pytest.mark.asyncio
+    async def test_sql_stage_stops_after_complete_statement(
+        self, optimizer: DatabaseQueryOptimizer, temp_sql_file: Path, monkeypatch
+    ):
+        """Test generation stops at the closing fence and the stream is closed."""
+        consumed = []
+        closed = False
+
+        async def stream_response(prompt, config):
+            nonlocal closed
+            if "stop_at" not in config:
+                yield "explanation"
+                return
+            try:
+                for chunk in ["```sql\nSELECT id ", "FROM users;\n``", "`\n", "Note:"]:
+                    consumed.append(chunk)
+                    yield chunk
+                consumed.append("never reached")
+                yield " trailing commentary" * 100
+            finally:
+                closed = True
+
+        monkeypatch.setattr(optimizer._llm_client, "stream_response", stream_response)
+        tokens = []
+        optimizer._on_token = lambda stage, chunk: tokens.append((stage, chunk))
+
+        result = await optimizer.optimize_query(temp_sql_file)
+
+        assert result.optimized_query == "```sql\nSELECT id FROM users;\n```"
+        assert "never reached" not in consumed
+        assert closed
+        assert "".join(chunk for _, chunk in tokens) == (
+            "explanation```sql\nSELECT id FROM users;\n```"
+        )
+
+    @pytest.mark.asyncio
+    async def test_plan_comparison_written_for_sqlite(
+        self, mock_llm_client, temp_sql_file: Path
+    ):
+        """Test that the plan comparison is returned and saved with the metadata."""
+        file_handler = Mock()
+        file_handler.read_sql_file = AsyncMock(
+            return_value="SELECT * FROM users WHERE email = 'a@b.c';"
+        )
+        file_handler.write_json_file = AsyncMock()
+        metadata_repo = Mock()
+        metadata_repo.get_metadata = AsyncMock(return_value=None)
+        metadata_repo.save_metadata = AsyncMock()
+        mock_llm_client.generate_response.side_effect = [
+            "Finds a user by email",
+            "```sql\nSELECT * FROM users WHERE lower(email) = 'a@b.c';\n```",
+        ]
+        optimizer = DatabaseQueryOptimizer(
+            llm_client=mock_llm_client,
+            file_handler=file_handler,
+            metadata_repo=metadata_repo,
+            config=OptimizerConfig(
+                provider="gemini", database_type=DatabaseType.SQLITE
+            ),
+            database_type=DatabaseType.SQLITE,
+            plan_verifier=SqlitePlanVerifier(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT);"
+                "CREATE INDEX idx_users_email ON users(email);"
+            ),
+        )
+
+        result = await optimizer.optimize_query(temp_sql_file)
+
+        assert result.plan_comparison is not None
+        assert result.plan_comparison.has_regressions
+        output = file_handler.write_json_file.call_args.args[1]
+        assert output["plan_comparison"]["regressions"]
+        assert "explanation_text" in output
+
+    @pytest.mark.asyncio
+    async def test_candidates_ranked_by_plan_cost(
+        self, mock_llm_client, temp_sql_file: Path
+    ):
+        """Test that unparsable candidates are dropped and the cheapest plan wins."""
+        answers = {
+            1: "SELECT * FROM users WHERE lower(email) = 'a@b.c';",
+            2: "SELECT * FROM users WHERE (email = 'a@b.c';",
+            3: "SELECT * FROM users WHERE email = 'a@b.c';",
+        }
+        configs = []
+
+        async def stream_response(prompt, config):
+            configs.append(config)
+            if "stop_at" not in config:
+                yield "Finds a user by email"
+            else:
+                yield answers.get(config.get("candidate"), "SELECT * FROM nope;")
+
+        mock_llm_client.stream_response = stream_response
+        file_handler = Mock()
+        file_handler.read_sql_file = AsyncMock(
+            return_value="SELECT * FROM users WHERE email = 'a@b.c';"
+        )
+        file_handler.write_json_file = AsyncMock()
+        metadata_repo = Mock()
+        metadata_repo.get_metadata = AsyncMock(return_value=None)
+        metadata_repo.save_metadata = AsyncMock()
+        optimizer = DatabaseQueryOptimizer(
+            llm_client=mock_llm_client,
+            file_handler=file_handler,
+            metadata_repo=metadata_repo,
+            config=OptimizerConfig(
+                provider="gemini", database_type=DatabaseType.SQLITE, candidates=4
+            ),
+            database_type=DatabaseType.SQLITE,
+            plan_verifier=SqlitePlanVerifier(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT);"
+                "CREATE INDEX idx_users_email ON users(email);"
+            ),
+        )
+
+        result = await optimizer.optimize_query(temp_sql_file)
+
+        assert result.optimized_query == answers[3]
+        assert [c.valid for c in result.candidates] == [False, True, False, True]
+        assert result.candidates[2].error == "not a well-formed SQL statement"
+        scores = [c.score for c in result.candidates]
+        assert scores[1] is not None and scores[3] is not None
+        assert scores[1] > scores[3]
+        output = file_handler.write_json_file.call_args.args[1]
+        assert output["selected_candidate"] == 3
+        assert len(output["candidates"]) == 4
+        assert len({c.get("candidate") for c in configs if "stop_at" in c}) == 4
+
+    @pytest.mark.asyncio
+    async def test_no_valid_candidate(
+        self, optimizer: DatabaseQueryOptimizer, temp_sql_file: Path
+    ):
+        """Test that optimization fails when every candidate is rejected."""
+        optimizer._config.candidates = 2
+        optimizer._llm_client.generate_response.side_effect = [
+            "explanation",
+            "I cannot optimize this query.",
+            RuntimeError("rate limited"),
+        ]
+
+        with pytest.raises(ValueError, match="No candidate rewrite"):
+            await optimizer.optimize_query(temp_sql_file)
+
+    @pytest.mark.asyncio
+    async def test_single_invalid_candidate(
+        self, optimizer: DatabaseQueryOptimizer, temp_sql_file: Path
+    ):
+        """Test that a lone rewrite failing local checks is not written."""
+        optimizer._llm_client.generate_response.side_effect = [
+            "explanation",
+            "I cannot optimize this query.",
+        ]
+
+        with pytest.raises(ValueError, match="not a well-formed SQL statement"):
+            await optimizer.optimize_query(temp_sql_file)
+        optimizer._file_handler.write_json_file.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_rules_only_query_skips_llm(
+        self, optimizer: DatabaseQueryOptimizer, temp_sql_file: Path
+    ):
+        """Test that a query fully handled by rewrite rules never calls the LLM."""
+        optimizer._file_handler.read_sql_file.return_value = (
+            "SELECT * FROM users WHERE age > 30 AND age > 18;"
+        )
+
+        result = await optimizer.optimize_query(temp_sql_file)
+
+        assert result.optimized_query == "SELECT * FROM users WHERE age > 30;"
+        assert result.applied_rules[0].rule == "dominated_predicates"
+        optimizer._llm_client.generate_response.assert_not_called()
+        output = optimizer._file_handler.write_json_file.call_args.args[1]
+        assert output["rules_only"] is True
+        assert output["query_sql"].endswith("age > 18;")
+
+    @pytest.mark.asyncio
+    async def test_prompt_tokens_reported(
+        self, optimizer: DatabaseQueryOptimizer, temp_sql_file: Path
+    ):
+        """Test estimated prompt tokens per stage reach the result and output."""
+        optimizer._llm_client.generate_response.side_effect = [
+            "This query selects all users",
+            "SELECT u.* FROM users u;",
+        ]
+
+        result = await optimizer.optimize_query(temp_sql_file)
+
+        assert set(result.prompt_tokens) == {"sql_to_natural", "natural_to_sql"}
+        assert all(tokens > 0 for tokens in result.prompt_tokens.values())
+        output = optimizer._file_handler.write_json_file.call_args.args[1]
+        assert output["prompt_tokens"] == result.prompt_tokens
+        prompt = optimizer._llm_client.generate_response.call_args_list[0].args[0]
+        assert prompt.startswith("You are an expert Oracle")
+
+    @pytest.mark.asyncio
+    async def test_decomposed_query(
+        self, optimizer: DatabaseQueryOptimizer, temp_sql_file: Path
+    ):
+        """Test subqueries and the outer query are rewritten separately."""
+        optimizer._decomposer = QueryDecomposer()
+        optimizer._file_handler.read_sql_file.return_value = (
+            "SELECT (SELECT COUNT(*) FROM orders o WHERE o.cid = c.id) n, "
+            "(SELECT MAX(amount) FROM payments p WHERE p.cid = c.id) m "
+            "FROM customers c;"
+        )
+
+        def respond(prompt: str, config: dict) -> str:
+            if "every subquery was replaced" in prompt:
+                return "SELECT (__subquery_2__) m, (__subquery_1__) n FROM customers c;"
+            if "FROM orders" in prompt:
+                return "SELECT COUNT(1) FROM orders o WHERE o.cid = c.id"
+            return "Sure, here it is!"
+
+        optimizer._llm_client.generate_response.side_effect = respond
+
+        result = await optimizer.optimize_query(temp_sql_file)
+
+        assert optimizer._llm_client.generate_response.call_count == 3
+        assert result.optimized_query == (
+            "SELECT (SELECT MAX(amount) FROM payments p WHERE p.cid = c.id) m, "
+            "(SELECT COUNT(1) FROM orders o WHERE o.cid = c.id) n FROM customers c;"
+        )
+        assert result.decomposition is not None
+        assert result.decomposition.fragments[1].error
+        assert set(result.prompt_tokens) == {"compose", "fragments"}
+        output = optimizer._file_handler.write_json_file.call_args.args[1]
+        assert len(output["decomposition"]["fragments"]) == 2
+
+
+class TestStageMemoization:
+    """Test reuse of stored explanations and optimized queries."""
+
+    @pytest.fixture
+    def make_optimizer(self, mock_llm_client, temp_json_file):
+        """Build optimizers sharing one JSON metadata store."""
+        mock_llm_client.generate_response.side_effect = lambda prompt, config: (
+            "SELECT id FROM users;" if "stop_at" in config else "Lists user ids"
+        )
+        file_handler = Mock()
+        file_handler.read_sql_file = AsyncMock(return_value="SELECT id FROM users;")
+        file_handler.write_json_file = AsyncMock()
+
+        def make(
+            model_name: str = "gemini-2.0-flash",
+            force: bool = False,
+            parameterize_literals: bool = False,
+            candidates: int = 1,
+        ):
+            return DatabaseQueryOptimizer(
+                llm_client=mock_llm_client,
+                file_handler=file_handler,
+                metadata_repo=JsonMetadataRepository(temp_json_file),
+                config=OptimizerConfig(
+                    model_name=model_name,
+                    force=force,
+                    parameterize_literals=parameterize_literals,
+                    candidates=candidates,
+                ),
+                database_type=DatabaseType.ORACLE,
+            )
+
+        return make
+
+    @pytest.mark.asyncio
+    async def test_unchanged_query_skips_llm(
+        self, make_optimizer, mock_llm_client, temp_sql_file: Path
+    ):
+        """Test a second run with the same model and prompts makes no LLM calls."""
+        first = await make_optimizer().optimize_query(temp_sql_file)
+        second = await make_optimizer().optimize_query(temp_sql_file)
+
+        assert mock_llm_client.generate_response.call_count == 2
+        assert first.metadata.optimized_query == "SELECT id FROM users;"
+        assert first.metadata.prompt_version
+        assert second.reused_stages == list(OptimizationStage)
+        assert second.optimized_query == first.optimized_query
+        assert second.metadata.version == first.metadata.version
+
+    @pytest.mark.asyncio
+    async def test_model_change_or_force_regenerates(
+        self, make_optimizer, mock_llm_client, temp_sql_file: Path
+    ):
+        """Test a different model or --force runs both stages again."""
+        await make_optimizer().optimize_query(temp_sql_file)
+        other_model = await make_optimizer("gemini-2.5-pro").optimize_query(
+            temp_sql_file
+        )
+        forced = await make_optimizer("gemini-2.5-pro", force=True).optimize_query(
+            temp_sql_file
+        )
+
+        assert mock_llm_client.generate_response.call_count == 6
+        assert other_model.reused_stages == []
+        assert forced.reused_stages == []
+        assert forced.metadata.version == "0.2"
+
+    @pytest.mark.asyncio
+    async def test_settings_change_regenerates(
+        self, make_optimizer, mock_llm_client, temp_sql_file: Path
+    ):
+        """Test changing a rewrite option invalidates the stored result."""
+        first = await make_optimizer().optimize_query(temp_sql_file)
+        sampled = await make_optimizer(candidates=2).optimize_query(temp_sql_file)
+        again = await make_optimizer(candidates=2).optimize_query(temp_sql_file)
+
+        assert sampled.reused_stages == []
+        assert sampled.metadata.settings_version != first.metadata.settings_version
+        assert again.reused_stages == list(OptimizationStage)
+        assert mock_llm_client.generate_response.call_count == 5
+
+    @pytest.mark.asyncio
+    async def test_other_literals_regenerate(
+        self, make_optimizer, mock_llm_client, temp_sql_file: Path
+    ):
+        """Test a query sharing a parameterized fingerprint is not given another's result."""
+        optimizer = make_optimizer(parameterize_literals=True)
+        optimizer._file_handler.read_sql_file.return_value = (
+            "SELECT id FROM users WHERE id = 1;"
+        )
+        await optimizer.optimize_query(temp_sql_file)
+        optimizer._file_handler.read_sql_file.return_value = (
+            "SELECT id FROM users WHERE id = 2;"
+        )
+
+        other = await optimizer.optimize_query(temp_sql_file)
+        again = await optimizer.optimize_query(temp_sql_file)
+
+        assert other.reused_stages == []
+        assert other.metadata.query_sql == "SELECT id FROM users WHERE id = 2;"
+        assert again.reused_stages == list(OptimizationStage)
+        assert mock_llm_client.generate_response.call_count == 4
+
+    @pytest.mark.asyncio
+    async def test_missing_optimized_query_reuses_explanation(
+        self, make_optimizer, mock_llm_client, temp_sql_file: Path
+    ):
+        """Test only the NL to SQL stage runs when no optimized query is stored."""
+        optimizer = make_optimizer()
+        first = await optimizer.optimize_query(temp_sql_file)
+        first.metadata.optimized_query = None
+        await optimizer._metadata_repo.save_metadata(
+            optimizer._generate_query_hash(first.original_query), first.metadata
+        )
+
+        result = await make_optimizer().optimize_query(temp_sql_file)
+
+        assert result.reused_stages == [OptimizationStage.SQL_TO_NATURAL]
+        assert mock_llm_client.generate_response.call_count == 3
+        assert result.metadata.optimized_query == "SELECT id FROM users;"
+        assert result.metadata.version == "0.1"
+
+
+class TestScriptOptimization:
+    """Test optimization of multi-statement scripts."""
+
+    SCRIPT = (
+        "-- nightly report\n"
+        "SELECT * FROM users;\n"
+        "SELECT * FROM orders;\n"
+        "SELECT * FROM users;\n"
+    )
+
+    @pytest.fixture
+    def file_handler(self) -> Mock:
+        """File handler serving a three-statement script."""
+        file_handler = Mock()
+        file_handler.read_sql_file = AsyncMock(return_value=self.SCRIPT)
+        file_handler.write_json_file = AsyncMock()
+        file_handler.write_sql_file = AsyncMock()
+        return file_handler
+
+    @pytest.fixture
+    def make_optimizer(self, mock_llm_client, file_handler, temp_json_file):
+        """Build optimizers sharing one JSON metadata store."""
+
+        def respond(prompt: str, config: dict) -> str:
+            table = "orders" if "orders" in prompt else "users"
+            if "stop_at" in config:
+                return f"SELECT id FROM {table} ORDER BY id;"
+            return f"Lists all {table}"
+
+        mock_llm_client.generate_response.side_effect = respond
+
+        def make(**options) -> DatabaseQueryOptimizer:
+            return DatabaseQueryOptimizer(
+                llm_client=mock_llm_client,
+                file_handler=file_handler,
+                metadata_repo=JsonMetadataRepository(temp_json_file),
+                config=OptimizerConfig(),
+                database_type=DatabaseType.ORACLE,
+            )
+
+        return make
+
+    @pytest.mark.asyncio
+    async def test_statements_optimized_and_reassembled(
+        self, make_optimizer, mock_llm_client, file_handler, temp_sql_file: Path
+    ):
+        """Test each distinct statement is optimized once and kept in order."""
+        optimizer = make_optimizer()
+
+        result = await optimizer.optimize_query(temp_sql_file)
+
+        assert mock_llm_client.generate_response.call_count == 4
+        assert len(result.statements) == 3
+        script_path, script = file_handler.write_sql_file.call_args.args
+        assert script_path == optimizer.get_script_output_path(temp_sql_file)
+        assert script == (
+            "SELECT id FROM users ORDER BY id;\n\n"
+            "SELECT id FROM orders ORDER BY id;\n\n"
+            "SELECT id FROM users ORDER BY id;\n"
+        )
+        output = file_handler.write_json_file.call_args.args[1]
+        assert [entry["index"] for entry in output["statements"]] == [0, 1, 2]
+        assert output["statements"][0]["query_sql"].startswith("-- nightly report")
+        assert output["optimized_query"] == script
+
+    @pytest.mark.asyncio
+    async def test_cached_statements_skipped(
+        self, make_optimizer, mock_llm_client, file_handler, temp_sql_file: Path
+    ):
+        """Test a rerun only calls the LLM for statements not stored yet."""
+        await make_optimizer().optimize_query(temp_sql_file)
+        file_handler.read_sql_file.return_value = (
+            self.SCRIPT + "SELECT * FROM orders WHERE id > 10;\n"
+        )
+
+        result = await make_optimizer().optimize_query(temp_sql_file)
+
+        assert mock_llm_client.generate_response.call_count == 6
+        assert not result.reused_stages
+        assert sum(bool(r.reused_stages) for r in result.statements) == 3
+
+    @pytest.mark.asyncio
+    async def test_failed_statement_kept_unchanged(
+        self, make_optimizer, mock_llm_client, file_handler, temp_sql_file: Path
+    ):
+        """Test a failing statement keeps its original text in the script."""
+        respond = mock_llm_client.generate_response.side_effect
+
+        def fail_on_orders(prompt: str, config: dict) -> str:
+            if "orders" in prompt:
+                raise RuntimeError("boom")
+            return respond(prompt, config)
+
+        mock_llm_client.generate_response.side_effect = fail_on_orders
+
+        result = await make_optimizer().optimize_query(temp_sql_file)
+
+        assert result.statement_errors == {1: "boom"}
+        script = file_handler.write_sql_file.call_args.args[1]
+        assert "SELECT * FROM orders;" in script
+
+    @pytest.mark.asyncio
+    async def test_ddl_and_dml_kept_without_llm(
+        self, make_optimizer, mock_llm_client, file_handler, temp_sql_file: Path
+    ):
+        """Test statements other than queries pass through unchanged."""
+        file_handler.read_sql_file.return_value = (
+            "CREATE INDEX ix_users ON users (id);\n"
+            "SELECT * FROM users;\n"
+            "INSERT INTO audit SELECT * FROM orders;\n"
+        )
+
+        result = await make_optimizer().optimize_query(temp_sql_file)
+
+        assert mock_llm_client.generate_response.call_count == 2
+        assert len(result.statements) == 1
+        assert file_handler.write_sql_file.call_args.args[1] == (
+            "CREATE INDEX ix_users ON users (id);\n\n"
+            "SELECT id FROM users ORDER BY id;\n\n"
+            "INSERT INTO audit SELECT * FROM orders;\n"
+        )
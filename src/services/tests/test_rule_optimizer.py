@@ -0,0 +1,215 @@
+# tests/test_rule_optimizer.py
+import sqlite3
+
+import pytest
+
+from services.rule_optimizer import RuleBasedOptimizer
+
+
+class TestRuleBasedOptimizer:
+    """Test RuleBasedOptimizer functionality."""
+
+    @pytest.fixture
+    def rules(self) -> RuleBasedOptimizer:
+        """Create the rule-based optimizer."""
+        return RuleBasedOptimizer()
+
+    def test_dominated_predicates(self, rules: RuleBasedOptimizer):
+        """Test that looser bounds on the same column are dropped with comments."""
+        rewrite = rules.optimize(
+            "SELECT employee_id FROM employees\n"
+            "WHERE salary > 50000\n"
+            "    AND salary > 40000 -- redundant\n"
+            "    AND salary > 30000 -- redundant\n"
+            "    AND department_id IN (10, 20, 30)\n"
+            "ORDER BY salary DESC;"
+        )
+
+        assert rewrite.query == (
+            "SELECT employee_id FROM employees\n"
+            "WHERE salary > 50000\n"
+            "    AND department_id IN (10, 20, 30)\n"
+            "ORDER BY salary DESC;"
+        )
+        assert rewrite.complete
+        assert [r.rule for r in rewrite.applied_rules] == ["dominated_predicates"] * 2
+        assert "implied by `salary > 50000`" in rewrite.applied_rules[0].description
+
+    @pytest.mark.parametrize(
+        ("where", "expected"),
+        [
+            ("a >= 5 AND 10 > a AND a <= 20 AND a > 5", "10 > a AND a > 5"),
+            ("a = 3 AND a < 9 AND b = 1 AND a = 3", "a = 3 AND b = 1"),
+            # As text, '3' < '10' and '10' < '9' are false
+            ("a = 3 AND a < 10", "a = 3 AND a < 10"),
+            ("a > 10 AND a > 9", "a > 10 AND a > 9"),
+            ("a = 3 AND a > 10", "a = 3 AND a > 10"),
+            ("a > 1 OR a > 2", "a > 1 OR a > 2"),
+            ("a BETWEEN 1 AND 5 AND a BETWEEN 1 AND 5", "a BETWEEN 1 AND 5"),
+        ],
+    )
+    def test_predicate_cases(
+        self, rules: RuleBasedOptimizer, where: str, expected: str
+    ):
+        """Test bound tightening, equalities, contradictions and disjunctions."""
+        rewrite = rules.optimize(f"SELECT * FROM t WHERE {where}")
+
+        assert rewrite.query.rstrip(";") == f"SELECT * FROM t WHERE {expected}"
+
+    @pytest.mark.parametrize(
+        ("where", "expected"),
+        [
+            ("id IN (1, 2, 2, 3)", "id IN (1, 2, 3)"),
+            ("id IN (3, 12, 40) AND id > 10", "id IN (12, 40) AND id > 10"),
+            ("status IN ('open')", "status = 'open'"),
+            ("status NOT IN ('x', 'x')", "status <> 'x'"),
+            ("id IN (1, 2) AND id > 5", "id IN (1, 2) AND id > 5"),
+        ],
+    )
+    def test_in_list_folding(
+        self, rules: RuleBasedOptimizer, where: str, expected: str
+    ):
+        """Test deduplication, bound filtering and singleton folding of IN lists."""
+        rewrite = rules.optimize(f"SELECT * FROM t WHERE {where}")
+
+        assert rewrite.query.rstrip(";") == f"SELECT * FROM t WHERE {expected}"
+
+    @pytest.mark.parametrize(
+        ("sql", "expected"),
+        [
+            (
+                "SELECT * FROM t WHERE id IN (SELECT DISTINCT t_id FROM u)",
+                "SELECT * FROM t WHERE id IN (SELECT t_id FROM u)",
+            ),
+            (
+                "SELECT DISTINCT dept, COUNT(*) AS n FROM emp GROUP BY dept",
+                "SELECT dept, COUNT(*) AS n FROM emp GROUP BY dept",
+            ),
+            ("SELECT DISTINCT MAX(salary) FROM emp", "SELECT MAX(salary) FROM emp"),
+            (
+                "SELECT DISTINCT COUNT(*) - dept FROM emp GROUP BY dept",
+                "SELECT DISTINCT COUNT(*) - dept FROM emp GROUP BY dept",
+            ),
+            ("SELECT DISTINCT dept FROM emp", "SELECT DISTINCT dept FROM emp"),
+            (
+                "SELECT * FROM t WHERE id IN "
+                "(SELECT DISTINCT t_id FROM u ORDER BY t_id LIMIT 10)",
+                "SELECT * FROM t WHERE id IN "
+                "(SELECT DISTINCT t_id FROM u ORDER BY t_id LIMIT 10)",
+            ),
+            (
+                "SELECT * FROM t WHERE id IN "
+                "(SELECT DISTINCT t_id FROM u FETCH FIRST 5 ROWS ONLY)",
+                "SELECT * FROM t WHERE id IN "
+                "(SELECT DISTINCT t_id FROM u FETCH FIRST 5 ROWS ONLY)",
+            ),
+            (
+                "SELECT * FROM t WHERE EXISTS "
+                "(SELECT DISTINCT t_id FROM u WHERE ROWNUM <= 5)",
+                "SELECT * FROM t WHERE EXISTS "
+                "(SELECT DISTINCT t_id FROM u WHERE ROWNUM <= 5)",
+            ),
+        ],
+    )
+    def test_unnecessary_distinct(
+        self, rules: RuleBasedOptimizer, sql: str, expected: str
+    ):
+        """Test DISTINCT is only removed where rows are already unique."""
+        assert rules.optimize(sql).query.rstrip(";") == expected
+
+    def test_merge_correlated_aggregates(self, rules: RuleBasedOptimizer):
+        """Test repeated correlated aggregates become one grouped join."""
+        rewrite = rules.optimize(
+            "SELECT c.id,\n"
+            "  (SELECT COUNT(*) FROM orders o1 WHERE o1.customer_id = c.id) AS total,\n"
+            "  (SELECT SUM(o2.amount) FROM orders o2 WHERE c.id = o2.customer_id"
+            " AND o2.status = 'paid') AS paid\n"
+            "FROM customers c\n"
+            "ORDER BY (SELECT COUNT(*) FROM orders o3 WHERE o3.customer_id = c.id)"
+        )
+
+        assert rewrite.query == (
+            "SELECT c.id,\n"
+            "  COALESCE(orders_agg.total, 0) AS total,\n"
+            "  orders_agg.paid AS paid\n"
+            "FROM customers c\n"
+            "LEFT JOIN (\n"
+            "    SELECT\n"
+            "        o1.customer_id,\n"
+            "        COUNT(*) AS total,\n"
+            "        SUM(CASE WHEN o1.status = 'paid' THEN o1.amount END) AS paid\n"
+            "    FROM orders o1\n"
+            "    GROUP BY o1.customer_id\n"
+            ") orders_agg ON orders_agg.customer_id = c.id\n"
+            "ORDER BY COALESCE(orders_agg.total, 0);"
+        )
+        assert not rewrite.complete
+        assert rewrite.applied_rules[0].rule == "merge_correlated_aggregates"
+
+    @pytest.mark.parametrize(
+        "sql",
+        [
+            # Unqualified column could be correlated to the outer query
+            "SELECT (SELECT COUNT(*) FROM o a WHERE a.k = c.id AND flag = 1),"
+            " (SELECT MAX(a.x) FROM o a WHERE a.k = c.id) FROM c",
+            # LIMIT inside the subquery
+            "SELECT (SELECT MAX(a.x) FROM o a WHERE a.k = c.id LIMIT 1),"
+            " (SELECT MIN(a.x) FROM o a WHERE a.k = c.id) FROM c",
+            # Outer GROUP BY would need the joined columns grouped too
+            "SELECT (SELECT MAX(a.x) FROM o a WHERE a.k = c.id),"
+            " (SELECT MIN(a.x) FROM o a WHERE a.k = c.id) FROM c GROUP BY c.id",
+            # Only one subquery per table and key
+            "SELECT (SELECT MAX(a.x) FROM o a WHERE a.k = c.id) FROM c",
+        ],
+    )
+    def test_merge_skips_unsafe_subqueries(self, rules: RuleBasedOptimizer, sql: str):
+        """Test that subqueries the rule cannot prove safe are left alone."""
+        rewrite = rules.optimize(sql)
+
+        assert rewrite.query == sql
+        assert not rewrite.applied_rules
+
+    @pytest.mark.parametrize(
+        "sql",
+        [
+            "SELECT *,"
+            " (SELECT COUNT(*) FROM orders o WHERE o.customer_id = c.id) AS n,"
+            " (SELECT SUM(o.amount) FROM orders o WHERE o.customer_id = c.id"
+            " AND o.status = 'x') AS s FROM customers c",
+            "SELECT c.*,"
+            " (SELECT COUNT(*) FROM orders o WHERE o.customer_id = c.id) AS n,"
+            " (SELECT SUM(o.amount) FROM orders o WHERE o.customer_id = c.id"
+            " AND o.status = 'x') AS s FROM customers c",
+            "SELECT c.id FROM customers c WHERE c.code > 10 AND c.code > 9",
+        ],
+    )
+    def test_rewrites_return_same_rows(self, rules: RuleBasedOptimizer, sql: str):
+        """Test that rewritten queries return the same columns and rows on SQLite."""
+        connection = sqlite3.connect(":memory:")
+        connection.executescript(
+            "CREATE TABLE customers (id INTEGER PRIMARY KEY, name TEXT, code TEXT);"
+            "CREATE TABLE orders (customer_id INTEGER, amount REAL, status TEXT);"
+            "INSERT INTO customers VALUES (1, 'a', '5'), (2, 'b', '95'), (3, 'c', '7');"
+            "INSERT INTO orders VALUES (1, 10, 'x'), (1, 5, 'y'), (2, 7, 'x');"
+        )
+
+        def run(query: str) -> tuple[int, list[tuple]]:
+            cursor = connection.execute(query.rstrip(";") + " ORDER BY 1")
+            return len(cursor.description), cursor.fetchall()
+
+        rewrite = rules.optimize(sql)
+
+        assert run(rewrite.query) == run(sql)
+        if sql.startswith("SELECT *"):
+            assert not rewrite.applied_rules
+
+    def test_untouched_queries(self, rules: RuleBasedOptimizer):
+        """Test that queries without matches, scripts and broken SQL are unchanged."""
+        for sql in [
+            "SELECT * FROM users;",
+            "SELECT 1 FROM t WHERE a > 1 AND a > 2; SELECT 2",
+            "SELECT (a FROM t WHERE a > 1 AND a > 2",
+        ]:
+            rewrite = rules.optimize(sql)
+            assert rewrite.query == sql
+            assert not rewrite.complete
@@ -0,0 +1,160 @@
+# tests/test_sql_extraction.py
+import pytest
+
+from services.sql_extraction import (
+    SqlStatement,
+    SqlStreamTerminator,
+    extract_sql,
+    find_sql_end,
+    is_query,
+    is_well_formed_sql,
+    join_sql_statements,
+    split_sql_script,
+)
+
+
+class TestSqlExtraction:
+    """Test SQL completion detection and extraction."""
+
+    @pytest.mark.parametrize(
+        ("text", "expected"),
+        [
+            ("SELECT 1 FROM dual; -- done", "SELECT 1 FROM dual;"),
+            ("```sql\nSELECT 1;\nSELECT 2;\n```\nThis query...", None),
+            ("SELECT ';' FROM dual; trailing", "SELECT ';' FROM dual;"),
+            ("SELECT 1 /* ; */ FROM dual; x", "SELECT 1 /* ; */ FROM dual;"),
+        ],
+    )
+    def test_find_sql_end(self, text: str, expected: str | None):
+        """Test the end of the first complete statement is found."""
+        end = find_sql_end(text)
+
+        if expected is None:
+            assert text[:end].endswith("```")
+        else:
+            assert text[:end] == expected
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "SELECT a FROM t WHERE b = 'unterminated;",
+            "Here is the optimized query; it uses an index:\n```sql\nSELECT 1;",
+            "BEGIN\n  UPDATE t SET a = 1;\n",
+            "CREATE INDEX ix_orders ON orders (status);\nSELECT id FROM orders",
+            "```sql\nSELECT 1;",
+        ],
+    )
+    def test_incomplete_answers(self, text: str):
+        """Test prose, open fences, strings, DDL and PL/SQL blocks are not cut."""
+        assert find_sql_end(text) is None
+
+    def test_extract_sql(self):
+        """Test fenced SQL is extracted without surrounding prose."""
+        assert (
+            extract_sql("Optimized:\n```sql\nSELECT 1 FROM dual;\n```\nDone.")
+            == "SELECT 1 FROM dual;"
+        )
+        assert extract_sql("  SELECT 1;  ") == "SELECT 1;"
+
+    def test_terminator_across_chunks(self):
+        """Test a fence split over chunks is still detected."""
+        terminator = SqlStreamTerminator()
+
+        assert not terminator.feed("```sql\nSELECT 1;\n`")
+        assert terminator.feed("``\nExplanation follows")
+        assert terminator.text == "```sql\nSELECT 1;\n```"
+
+    @pytest.mark.parametrize(
+        ("sql", "expected"),
+        [
+            ("WITH t AS (SELECT 1) SELECT * FROM t;", True),
+            ("SELECT COUNT(*) FROM (SELECT 1", False),
+            ("SELECT 'unterminated FROM dual", False),
+            ("SELECT 1 /* open comment", False),
+            ("Here is the optimized query", False),
+        ],
+    )
+    def test_is_well_formed_sql(self, sql: str, expected: bool):
+        """Test the dialect-neutral syntax check for candidate rewrites."""
+        assert is_well_formed_sql(sql) is expected
+
+    def test_split_sql_script(self):
+        """Test statements split on semicolons outside strings and comments."""
+        script = (
+            "-- totals\nSELECT 'a;b' FROM dual; /* note; */\n"
+            "UPDATE t SET x = 1\n/\n;\nDELETE FROM t"
+        )
+
+        statements = split_sql_script(script)
+
+        assert statements == [
+            SqlStatement("-- totals\nSELECT 'a;b' FROM dual;"),
+            SqlStatement("/* note; */\nUPDATE t SET x = 1", slash_terminated=True),
+            SqlStatement("DELETE FROM t"),
+        ]
+        assert split_sql_script(join_sql_statements(statements)) == [
+            statements[0],
+            statements[1],
+            SqlStatement("DELETE FROM t;"),
+        ]
+
+    def test_split_sql_script_keeps_blocks_whole(self):
+        """Test PL/SQL blocks and trigger bodies keep their inner semicolons."""
+        plsql = (
+            "CREATE OR REPLACE PROCEDURE p IS\n  v NUMBER;\nBEGIN\n"
+            "  IF v > 0 THEN v := CASE WHEN v > 1 THEN 1 END; END IF;\n"
+            "  BEGIN NULL; END;\nEND p;\n/\n"
+            "CREATE PACKAGE BODY pk AS PROCEDURE a IS BEGIN NULL; END a; END pk;\n/\n"
+            "SELECT 1 FROM dual;"
+        )
+        trigger = (
+            "CREATE TRIGGER tr AFTER INSERT ON t BEGIN "
+            "UPDATE s SET n = n + 1; DELETE FROM u; END; SELECT 1;"
+        )
+
+        assert [s.text.split()[-1] for s in split_sql_script(plsql)] == [
+            "p;",
+            "pk;",
+            "dual;",
+        ]
+        assert [s.text for s in split_sql_script(trigger)] == [
+            trigger.removesuffix(" SELECT 1;"),
+            "SELECT 1;",
+        ]
+
+    def test_split_sql_script_packages_without_slash_lines(self):
+        """Test package units end at their own END when no line holds a slash."""
+        script = (
+            "CREATE PACKAGE BODY pk AS\n"
+            "  PROCEDURE a IS BEGIN NULL; END a;\n"
+            "  PROCEDURE b IS v NUMBER; BEGIN\n"
+            "    SELECT body INTO v FROM t WHERE x IS NULL;\n"
+            "  END b;\n"
+            "BEGIN\n  NULL;\nEND pk;\n"
+            "CREATE PACKAGE pk AS\n  PROCEDURE a;\n  CURSOR c IS SELECT 1 FROM dual;\n"
+            "END pk;\n"
+            "CREATE TYPE tt AS OBJECT (a NUMBER);\n"
+            "SELECT 1 FROM dual;"
+        )
+
+        assert [s.text.split()[:3] for s in split_sql_script(script)] == [
+            ["CREATE", "PACKAGE", "BODY"],
+            ["CREATE", "PACKAGE", "pk"],
+            ["CREATE", "TYPE", "tt"],
+            ["SELECT", "1", "FROM"],
+        ]
+
+    @pytest.mark.parametrize(
+        ("sql", "expected"),
+        [
+            ("-- report\nSELECT 1 FROM dual;", True),
+            ("WITH a AS (SELECT 1) SELECT * FROM a", True),
+            ("(SELECT 1) UNION (SELECT 2)", True),
+            ("INSERT INTO t SELECT * FROM s", False),
+            ("CREATE INDEX ix ON t (a)", False),
+            ("BEGIN NULL; END;", False),
+        ],
+    )
+    def test_is_query(self, sql: str, expected: bool):
+        """Test only queries are recognized, not DDL, DML or blocks."""
+        assert is_query(sql) is expected
@@ -0,0 +1,155 @@
+# tests/test_watcher.py
+import asyncio
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from config.config import OptimizerConfig
+from core.types import DatabaseType, WatchRun
+from infra.file_handler import LocalFileHandler
+from infra.metadata_repository import JsonMetadataRepository
+from infra.watch_manifest import WatchManifest
+from services.query_optimizer import DatabaseQueryOptimizer
+from services.watcher import QueryWatcher
+
+
+class TestQueryWatcher:
+    """Test incremental re-optimization of watched SQL files."""
+
+    @pytest.fixture
+    def sql_dir(self, tmp_path: Path) -> Path:
+        """Directory with a single-statement file and a two-statement script."""
+        sql_dir = tmp_path / "queries"
+        sql_dir.mkdir()
+        (sql_dir / "report.sql").write_text("SELECT * FROM orders WHERE id = 1;")
+        (sql_dir / "script.sql").write_text(
+            "SELECT * FROM customers;\nSELECT * FROM invoices;"
+        )
+        return sql_dir
+
+    @pytest.fixture
+    def watcher(self, mock_llm_client, sql_dir: Path, tmp_path: Path) -> QueryWatcher:
+        """Watcher over the directory with a fresh manifest and metadata store."""
+        config = OptimizerConfig(apply_rules=False)
+        mock_llm_client.generate_response.return_value = "SELECT 1;"
+        optimizer = DatabaseQueryOptimizer(
+            llm_client=mock_llm_client,
+            file_handler=LocalFileHandler(),
+            metadata_repo=JsonMetadataRepository(tmp_path / "metadata.json"),
+            config=config,
+            database_type=DatabaseType.ORACLE,
+        )
+        return QueryWatcher(
+            optimizer,
+            str(sql_dir),
+            WatchManifest(tmp_path / "manifest.json"),
+            DatabaseType.ORACLE,
+            debounce_seconds=0.1,
+            poll_interval=0.02,
+        )
+
+    @staticmethod
+    def _edit(sql_file: Path, content: str) -> None:
+        """Rewrite a file with a modification time that is sure to differ."""
+        mtime = sql_file.stat().st_mtime_ns
+        sql_file.write_text(content)
+        os.utime(sql_file, ns=(mtime + 10**9, mtime + 10**9))
+
+    @pytest.mark.asyncio
+    async def test_manifest_records_metadata_keys_and_outputs(
+        self, watcher: QueryWatcher, sql_dir: Path, tmp_path: Path
+    ):
+        """Test the first pass optimizes everything and records what it produced."""
+        run = await watcher.run_once()
+
+        assert run.summary is not None
+        assert len(run.summary.succeeded) == 2
+        assert run.changed_statements == 3
+        files = json.loads((tmp_path / "manifest.json").read_text())["files"]
+        script = files[str((sql_dir / "script.sql").resolve())]
+        assert len(script["statement_hashes"]) == 2
+        assert set(script["statement_hashes"]) <= set(
+            json.loads((tmp_path / "metadata.json").read_text())
+        )
+        assert Path(script["output_path"]).exists()
+        assert Path(script["script_path"]).name == "script_oracle_optimized.sql"
+
+    @pytest.mark.asyncio
+    async def test_only_changed_statements_reach_the_llm(
+        self, watcher: QueryWatcher, sql_dir: Path, mock_llm_client
+    ):
+        """Test untouched files are skipped and unchanged statements reused."""
+        await watcher.run_once()
+        calls = mock_llm_client.generate_response.await_count
+
+        (sql_dir / "report.sql").touch()
+        assert (await watcher.run_once()).is_empty
+
+        self._edit(
+            sql_dir / "script.sql", "SELECT * FROM customers;\nSELECT * FROM payments;"
+        )
+        run = await watcher.run_once()
+
+        assert run.summary is not None
+        assert [item.sql_file for item in run.summary.items] == [
+            str(sql_dir / "script.sql")
+        ]
+        assert run.changed_statements == 1
+        # Both LLM stages for the one new statement
+        assert mock_llm_client.generate_response.await_count == calls + 2
+
+    @pytest.mark.asyncio
+    async def test_failed_files_are_retried_without_edits(
+        self, watcher: QueryWatcher, sql_dir: Path, mock_llm_client
+    ):
+        """Test files whose optimization failed are retried on the next pass."""
+        mock_llm_client.generate_response.side_effect = RuntimeError("provider down")
+        first = await watcher.run_once()
+        mock_llm_client.generate_response.side_effect = None
+        (sql_dir / "report.sql").touch()
+
+        second = await watcher.run_once()
+
+        assert first.summary is not None and not first.summary.succeeded
+        assert second.summary is not None
+        assert len(second.summary.succeeded) == 2
+        assert (await watcher.run_once()).is_empty
+
+    @pytest.mark.asyncio
+    async def test_deleted_file_outputs_are_removed(
+        self, watcher: QueryWatcher, sql_dir: Path
+    ):
+        """Test outputs of a deleted file are removed with its manifest entry."""
+        await watcher.run_once()
+        output = sql_dir / "report_oracle_optimization.json"
+        assert output.exists()
+
+        (sql_dir / "report.sql").unlink()
+        run = await watcher.run_once()
+
+        assert run.removed == [str((sql_dir / "report.sql").resolve())]
+        assert not output.exists()
+
+    @pytest.mark.asyncio
+    async def test_burst_of_saves_causes_one_pass(
+        self, watcher: QueryWatcher, sql_dir: Path
+    ):
+        """Test saves in quick succession are debounced into a single pass."""
+        runs: list[WatchRun] = []
+        watcher._on_run = runs.append
+        stop = asyncio.Event()
+        task = asyncio.create_task(watcher.watch(stop))
+        while not runs:
+            await asyncio.sleep(0.01)
+
+        for i in range(5):
+            self._edit(sql_dir / "report.sql", f"SELECT * FROM orders WHERE id = {i};")
+            await asyncio.sleep(0.03)
+        await asyncio.sleep(0.4)
+        stop.set()
+        await task
+
+        assert len(runs) == 2
+        assert runs[1].changed_statements == 1
@@ -0,0 +1,204 @@
+# src/services/watcher.py
+import asyncio
+import hashlib
+import signal
+import time
+from collections.abc import Callable
+from contextlib import suppress
+from dataclasses import replace
+from pathlib import Path
+
+from config.logger import logger
+from core.types import DatabaseType, WatchedFile, WatchRun
+from infra.watch_manifest import WatchManifest
+from services.batch_optimizer import BatchQueryOptimizer
+from services.query_optimizer import DatabaseQueryOptimizer
+
+# Size and modification time of each watched file
+Snapshot = dict[Path, tuple[int, int]]
+
+
+class QueryWatcher:
+    """
+    Keeps the optimizations of a directory of SQL files in step with edits.
+
+    Each pass compares the files with the manifest: untouched files are
+    skipped by size and modification time, saved-but-identical files by
+    content hash, and only files whose content changed or whose last
+    optimization failed are re-optimized.
+    Within those, statements whose fingerprint is unchanged reuse their
+    stored metadata, so only new or edited statements reach the LLM. Outputs
+    of deleted files are removed. Changes are polled and debounced: a pass
+    starts once no file has changed for ``debounce_seconds``.
+    """
+
+    def __init__(
+        self,
+        optimizer: DatabaseQueryOptimizer,
+        target: str,
+        manifest: WatchManifest,
+        database_type: DatabaseType,
+        jobs: int = 4,
+        debounce_seconds: float = 0.5,
+        poll_interval: float = 0.25,
+        on_run: Callable[[WatchRun], None] | None = None,
+    ) -> None:
+        """Initialize with the optimizer, the watched directory or glob and timing."""
+        self._optimizer = optimizer
+        self._target = target
+        self._manifest = manifest
+        self._batch = BatchQueryOptimizer(optimizer, database_type, jobs=jobs)
+        self._debounce_seconds = debounce_seconds
+        self._poll_interval = poll_interval
+        self._on_run = on_run
+
+    async def run_once(self) -> WatchRun:
+        """Re-optimize changed files, drop deleted ones and save the manifest."""
+        run = WatchRun()
+        sql_files = BatchQueryOptimizer.collect_sql_files(self._target)
+        changed: dict[Path, WatchedFile] = {}
+        for sql_file in sql_files:
+            if (current := await self._check(sql_file)) is not None:
+                changed[sql_file] = current
+
+        watched = {sql_file.resolve() for sql_file in sql_files}
+        for sql_file in self._manifest.files():
+            if sql_file not in watched:
+                self._remove_outputs(sql_file)
+                run.removed.append(str(sql_file))
+
+        if changed:
+            for sql_file, current in changed.items():
+                previous = self._manifest.get(sql_file)
+                known = set(previous.statement_hashes) if previous else set()
+                run.changed_statements += len(set(current.statement_hashes) - known)
+            logger.info(
+                f"Re-optimizing {len(changed)} changed files "
+                f"({run.changed_statements} changed statements)"
+            )
+            run.summary = await self._batch.optimize_files(list(changed))
+            for item in run.summary.items:
+                sql_file = Path(item.sql_file)
+                self._record(sql_file, changed[sql_file], item.version, item.error)
+
+        if changed or run.removed:
+            await self._manifest.save()
+        return run
+
+    async def watch(self, stop: asyncio.Event | None = None) -> None:
+        """Run a pass now, then one after every burst of changes until stopped."""
+        loop = asyncio.get_running_loop()
+        if own_stop := stop is None:
+            stop = asyncio.Event()
+            loop.add_signal_handler(signal.SIGTERM, stop.set)
+        try:
+            await self._run_and_report()
+            snapshot = await asyncio.to_thread(self._snapshot)
+            changed_at: float | None = None
+            while not stop.is_set():
+                with suppress(TimeoutError):
+                    await asyncio.wait_for(stop.wait(), self._poll_interval)
+                if (current := await asyncio.to_thread(self._snapshot)) != snapshot:
+                    # Every further save restarts the quiet period
+                    snapshot, changed_at = current, time.monotonic()
+                elif (
+                    changed_at is not None
+                    and time.monotonic() - changed_at >= self._debounce_seconds
+                ):
+                    changed_at = None
+                    await self._run_and_report()
+        finally:
+            if own_stop:
+                loop.remove_signal_handler(signal.SIGTERM)
+
+    async def _run_and_report(self) -> None:
+        """Run a pass, keeping the watch alive if it fails."""
+        try:
+            run = await self.run_once()
+        except Exception as e:
+            logger.error(f"Watch pass failed: {str(e)}")
+            return
+        if self._on_run is not None and not run.is_empty:
+            self._on_run(run)
+
+    async def _check(self, sql_file: Path) -> WatchedFile | None:
+        """New manifest entry of a file whose content changed, else ``None``."""
+        try:
+            stat = sql_file.stat()
+        except FileNotFoundError:
+            return None
+        # Files that failed last time are retried even when untouched
+        entry = self._manifest.get(sql_file)
+        if (
+            entry
+            and not entry.error
+            and (entry.mtime_ns, entry.size) == (stat.st_mtime_ns, stat.st_size)
+        ):
+            return None
+        content = await asyncio.to_thread(sql_file.read_bytes)
+        content_hash = hashlib.sha256(content).hexdigest()
+        if entry and not entry.error and entry.content_hash == content_hash:
+            # Saved without edits: only remember the new modification time
+            self._manifest.set(
+                sql_file, replace(entry, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            )
+            return None
+        return WatchedFile(
+            content_hash=content_hash,
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            statement_hashes=self._optimizer.statement_hashes(
+                content.decode("utf-8", errors="replace").strip()
+            ),
+        )
+
+    def _record(
+        self,
+        sql_file: Path,
+        current: WatchedFile,
+        version: str | None,
+        error: str | None,
+    ) -> None:
+        """Store the outcome of re-optimizing a file in the manifest."""
+        previous = self._manifest.get(sql_file)
+        if error is None:
+            output_path: str | None = str(
+                self._optimizer.get_output_path(sql_file).resolve()
+            )
+            script_path = (
+                str(self._optimizer.get_script_output_path(sql_file).resolve())
+                if len(current.statement_hashes) > 1
+                else None
+            )
+        else:
+            # Outputs of the last successful run stay in place
+            output_path = previous.output_path if previous else None
+            script_path = previous.script_path if previous else None
+        self._manifest.set(
+            sql_file,
+            replace(
+                current,
+                output_path=output_path,
+                script_path=script_path,
+                version=version if error is None else None,
+                error=error,
+            ),
+        )
+
+    def _remove_outputs(self, sql_file: Path) -> None:
+        """Forget a deleted file and delete the outputs generated for it."""
+        if (entry := self._manifest.remove(sql_file)) is None:
+            return
+        for output in (entry.output_path, entry.script_path):
+            if output is not None:
+                Path(output).unlink(missing_ok=True)
+        logger.info(f"Removed outputs of deleted file {sql_file}")
+
+    def _snapshot(self) -> Snapshot:
+        """Size and modification time of every watched file."""
+        snapshot: Snapshot = {}
+        for sql_file in BatchQueryOptimizer.collect_sql_files(self._target):
+            with suppress(FileNotFoundError):
+                stat = sql_file.stat()
+                snapshot[sql_file] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
@@ -0,0 +1,63 @@
+# tests/test_startup.py
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[1]
+STARTUP_BUDGET_SECONDS = float(os.getenv("SQLO_STARTUP_BUDGET_SECONDS", "1.5"))
+PROVIDER_SDKS = ("anthropic", "openai", "google.genai")
+
+
+def _run_python(*args: str) -> subprocess.CompletedProcess:
+    """Run a fresh interpreter from the source directory."""
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+class TestStartup:
+    """Test CLI startup cost."""
+
+    def test_cli_import_does_not_load_provider_sdks(self):
+        """Test importing the CLI leaves every provider SDK unloaded."""
+        loaded = _run_python(
+            "-c",
+            "import sys, main; "
+            f"print(','.join(m for m in {PROVIDER_SDKS!r} if m in sys.modules))",
+        ).stdout.strip()
+
+        assert loaded == ""
+
+    def test_factory_imports_only_selected_sdk(self):
+        """Test creating a client imports just that provider's SDK."""
+        loaded = _run_python(
+            "-c",
+            "import sys; "
+            "from config.config import OptimizerConfig; "
+            "from core.client import LLMClientFactory; "
+            "LLMClientFactory.create_client("
+            "OptimizerConfig(provider='openai'), api_key='test-key'); "
+            f"print(','.join(m for m in {PROVIDER_SDKS!r} if m in sys.modules))",
+        ).stdout.strip()
+
+        assert loaded == "openai"
+
+    def test_help_within_startup_budget(self):
+        """Test `sqlo --help` stays within the wall-clock budget (best of 3)."""
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            _run_python("main.py", "--help")
+            timings.append(time.perf_counter() - start)
+        elapsed = min(timings)
+
+        assert elapsed < STARTUP_BUDGET_SECONDS, (
+            f"sqlo --help took {elapsed:.2f}s "
+            f"(budget {STARTUP_BUDGET_SECONDS:.2f}s)"
+        )